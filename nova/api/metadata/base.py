@@ -22,8 +22,10 @@ import posixpath
 from oslo_log import log as logging
 from oslo_serialization import base64
 from oslo_serialization import jsonutils
+from oslo_utils import encodeutils
 from oslo_utils import importutils
 from oslo_utils import timeutils
+from oslo_utils import uuidutils
 import six
 
 from nova.api.ec2 import ec2utils
@@ -206,6 +208,10 @@ class InstanceMetadata(object):
 
         self.route_configuration = None
 
+        # Identifies this copy of the metadata of the instance, with which
+        # the metadata API caches the responses it renders from it.
+        self.cache_id = uuidutils.generate_uuid()
+
         # NOTE(mikal): the decision to not pass extra_md here like we
         # do to the StaticJSON driver is deliberate. extra_md will
         # contain the admin password for the instance, and we shouldn't
@@ -600,6 +606,18 @@ class InstanceMetadata(object):
 
         return data
 
+    def lookup_response(self, path):
+        """Look up a path and render it as a response.
+
+        Returns a (body, mimetype) tuple, or the callable handling the path
+        for those which are not static.
+        """
+        data = self.lookup(path)
+        if callable(data):
+            return data
+
+        return (encodeutils.to_utf8(ec2_md_print(data)), self.get_mimetype())
+
     def metadata_for_config_drive(self):
         """Yields (path, value) tuples for metadata elements."""
         # EC2 style metadata
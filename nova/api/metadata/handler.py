@@ -55,7 +55,7 @@ class MetadataRequestHandler(wsgi.Application):
         if not address:
             raise exception.FixedIpNotFoundForAddress(address=address)
 
-        cache_key = 'metadata-%s' % address
+        cache_key = cache_utils.metadata_address_key(address)
         data = self._cache.get(cache_key)
         if data:
             LOG.debug("Using cached metadata for %s", address)
@@ -72,7 +72,7 @@ class MetadataRequestHandler(wsgi.Application):
         return data
 
     def get_metadata_by_instance_id(self, instance_id, address):
-        cache_key = 'metadata-%s' % instance_id
+        cache_key = cache_utils.metadata_instance_key(instance_id)
         data = self._cache.get(cache_key)
         if data:
             LOG.debug("Using cached metadata for instance %s", instance_id)
@@ -88,6 +88,29 @@ class MetadataRequestHandler(wsgi.Application):
 
         return data
 
+    def _lookup_response(self, meta_data, path):
+        """Look up a path, reusing the response cached for it if any.
+
+        The responses rendered from the metadata of an instance are cached
+        next to it, so that the repeated requests an instance makes while
+        booting are only rendered once even when the cache is shared between
+        the metadata API processes. They are cached by the id of the copy of
+        the metadata they were rendered from, so they are no longer used
+        once that copy expires or is invalidated.
+        """
+        if CONF.api.metadata_cache_expiration <= 0:
+            return meta_data.lookup_response(path)
+
+        cache_key = 'metadata-response-%s-%s' % (meta_data.cache_id, path)
+        response = self._cache.get(cache_key)
+        if response:
+            return response
+
+        response = meta_data.lookup_response(path)
+        if not callable(response):
+            self._cache.set(cache_key, response)
+        return response
+
     @webob.dec.wsgify(RequestClass=wsgi.Request)
     def __call__(self, req):
         if os.path.normpath(req.path_info) == "/":
@@ -114,17 +137,14 @@ class MetadataRequestHandler(wsgi.Application):
             raise webob.exc.HTTPNotFound()
 
         try:
-            data = meta_data.lookup(req.path_info)
+            data = self._lookup_response(meta_data, req.path_info)
         except base.InvalidMetadataPath:
             raise webob.exc.HTTPNotFound()
 
         if callable(data):
             return data(req, meta_data)
 
-        resp = base.ec2_md_print(data)
-        req.response.body = encodeutils.to_utf8(resp)
-
-        req.response.content_type = meta_data.get_mimetype()
+        req.response.body, req.response.content_type = data
         return req.response
 
     def _handle_remote_ip_request(self, req):
@@ -15,6 +15,7 @@
 #    under the License.
 
 import functools
+import json
 
 import microversion_parse
 from oslo_log import log as logging
@@ -70,6 +71,15 @@ LEGACY_API_VERSION_REQUEST_HEADER = 'X-OpenStack-Nova-API-Version'
 
 ENV_LEGACY_V2 = 'openstack.legacy_v2'
 
+# The encoder used for all response bodies, equivalent to jsonutils.dumps()
+# but built once rather than for every response.
+_JSON_ENCODER = json.JSONEncoder(default=jsonutils.to_primitive)
+
+# Dispatch table of (controller class, method name, major, minor) to the
+# VersionedMethod implementing that method for that microversion, or None if
+# no version of the method matches.
+_VERSIONED_METHODS = {}
+
 
 def get_supported_content_types():
     return _SUPPORTED_CONTENT_TYPES
@@ -272,7 +282,7 @@ class JSONDictSerializer(ActionDispatcher):
         return self.dispatch(data, action=action)
 
     def default(self, data):
-        return six.text_type(jsonutils.dumps(data))
+        return six.text_type(_JSON_ENCODER.encode(data))
 
 
 def response(code):
@@ -852,6 +862,16 @@ class Controller(object):
             self._view_builder = None
 
     def __getattribute__(self, key):
+        try:
+            version_meth_dict = object.__getattribute__(self, VER_METHOD_ATTR)
+        except AttributeError:
+            # No versioning on this class
+            return object.__getattribute__(self, key)
+
+        # NOTE: This runs for every attribute of the controller, so only
+        # build the version_select wrapper for versioned methods.
+        if not version_meth_dict or key not in version_meth_dict:
+            return object.__getattribute__(self, key)
 
         def version_select(*args, **kwargs):
             """Look for the method which matches the name supplied and version
@@ -870,29 +890,38 @@ class Controller(object):
             else:
                 ver = args[0].api_version_request
 
-            func_list = self.versioned_methods[key]
-            for func in func_list:
-                if ver.matches(func.start_version, func.end_version):
-                    # Update the version_select wrapper function so
-                    # other decorator attributes like wsgi.response
-                    # are still respected.
-                    functools.update_wrapper(version_select, func.func)
-                    return func.func(self, *args, **kwargs)
+            func = self._select_versioned_method(version_meth_dict, key, ver)
+            if func is None:
+                # No version match
+                raise exception.VersionNotFoundForAPIMethod(version=ver)
 
-            # No version match
-            raise exception.VersionNotFoundForAPIMethod(version=ver)
+            # Update the version_select wrapper function so
+            # other decorator attributes like wsgi.response
+            # are still respected.
+            functools.update_wrapper(version_select, func.func)
+            return func.func(self, *args, **kwargs)
 
-        try:
-            version_meth_dict = object.__getattribute__(self, VER_METHOD_ATTR)
-        except AttributeError:
-            # No versioning on this class
-            return object.__getattribute__(self, key)
+        return version_select
+
+    def _select_versioned_method(self, version_meth_dict, key, ver):
+        """Return the VersionedMethod for key matching ver, or None.
 
-        if version_meth_dict and \
-          key in object.__getattribute__(self, VER_METHOD_ATTR):
-            return version_select
+        The result is kept in a dispatch table so that the versions of a
+        method are only scanned the first time a microversion requests it.
+        """
+        table_key = (type(self), key, ver.ver_major, ver.ver_minor)
+        try:
+            return _VERSIONED_METHODS[table_key]
+        except KeyError:
+            pass
 
-        return object.__getattribute__(self, key)
+        selected = None
+        for func in version_meth_dict[key]:
+            if ver.matches(func.start_version, func.end_version):
+                selected = func
+                break
+        _VERSIONED_METHODS[table_key] = selected
+        return selected
 
     # NOTE(cyeoh): This decorator MUST appear first (the outermost
     # decorator) on an API method for it to work correctly
@@ -128,3 +128,59 @@ class CacheClient(object):
 
     def delete_multi(self, keys):
         return self.region.delete_multi(keys)
+
+
+def metadata_instance_key(instance_uuid):
+    """Key of the metadata of an instance looked up by its uuid."""
+    return 'metadata-%s' % instance_uuid
+
+
+def metadata_address_key(address):
+    """Key of the metadata of an instance looked up by its fixed IP."""
+    return 'metadata-%s' % address
+
+
+_METADATA_CLIENT = None
+
+
+def _get_metadata_client():
+    global _METADATA_CLIENT
+    if _METADATA_CLIENT is None:
+        _METADATA_CLIENT = get_client()
+    return _METADATA_CLIENT
+
+
+def invalidate_metadata(instance, *network_infos):
+    """Drop the metadata of an instance cached by the metadata API.
+
+    This removes the entries cached for the instance by uuid and by each of
+    the fixed IP addresses in the given network infos, so that the next
+    request from the instance sees the updated metadata rather than waiting
+    for the cached entries to expire. The network info of the instance in
+    its info cache is used if none is given.
+
+    Cached metadata is only shared between services when the [cache] group
+    is enabled with a shared backend; otherwise every metadata API process
+    keeps its own entries and this is a no-op.
+    """
+    if not CONF.cache.enabled or CONF.api.metadata_cache_expiration <= 0:
+        return
+
+    if (not network_infos and instance.obj_attr_is_set('info_cache') and
+            instance.info_cache is not None):
+        network_infos = [instance.info_cache.network_info]
+
+    keys = [metadata_instance_key(instance.uuid)]
+    for network_info in network_infos:
+        for vif in network_info or []:
+            for ip in vif.fixed_ips():
+                key = metadata_address_key(ip['address'])
+                if key not in keys:
+                    keys.append(key)
+    try:
+        _get_metadata_client().delete_multi(keys)
+    except Exception:
+        # The entries will still expire, so this is not worth failing the
+        # operation which changed the instance for.
+        LOG.warning('Failed to invalidate cached metadata', exc_info=True,
+                    instance=instance)
@@ -59,9 +59,11 @@ import functools
 import os
 import re
 import sys
+import time
 import traceback
 
 import decorator
+import eventlet
 import netaddr
 from oslo_config import cfg
 from oslo_db import exception as db_exc
@@ -78,6 +80,7 @@ from sqlalchemy.engine import url as sqla_url
 from nova.api.ec2 import ec2utils
 from nova import availability_zones
 from nova.cmd import common as cmd_common
+from nova import conductor
 import nova.conf
 from nova import config
 from nova import context
@@ -136,6 +139,18 @@ def mask_passwd_in_url(url):
     return urlparse.urlunparse(new_parsed)
 
 
+def _parse_workers(workers):
+    """Returns the number of workers, or None if it is not valid."""
+    try:
+        workers = int(workers)
+    except ValueError:
+        workers = -1
+    if workers < 1:
+        print(_('Must supply a positive value for workers'))
+        return None
+    return workers
+
+
 class ShellCommands(object):
 
     # TODO(stephenfin): Remove this during the Queens cycle
@@ -597,12 +612,30 @@ class NetworkCommands(object):
 
 
 class HostCommands(object):
-    """List hosts."""
+    """Manage hosts."""
 
-    # TODO(stephenfin): Remove this during the Queens cycle
-    description = ('DEPRECATED: The host commands are deprecated since '
-                   'Pike as this information is available over the API. They '
-                   'will be removed in an upcoming release.')
+    # TODO(stephenfin): Remove the list command during the Queens cycle
+    description = ('The host list command is deprecated since Pike as this '
+                   'information is available over the API. It will be '
+                   'removed in an upcoming release.')
+
+    @args('--host', metavar='<host>', help=_('Compute host to drain'))
+    def drain(self, host):
+        """Live migrates all the instances of a compute host.
+
+        This asks the conductor to live migrate the active and paused
+        instances of the host to other hosts, and returns without waiting for
+        the live migrations to complete.
+        """
+        ctxt = context.get_admin_context()
+        try:
+            objects.HostMapping.get_by_host(ctxt, host)
+        except exception.HostMappingNotFound:
+            print(_('The host %s is not mapped to a cell.') % host)
+            return 1
+        conductor.ComputeTaskAPI().drain_host(ctxt, host)
+        print(_('The host %s is being drained.') % host)
+        return 0
 
     def list(self, zone=None):
         """Show a list of all physical hosts. Filter by zone.
@@ -654,6 +687,15 @@ class DbCommands(object):
         sa_db.migration_migrate_to_uuid,
     )
 
+    # The online migrations which only change the API database. With
+    # --workers or --all-cells, they run once, after the migrations of every
+    # cell are complete, since the aggregates id sequence must be reset after
+    # the aggregates of the cells are migrated.
+    api_db_online_migrations = (
+        aggregate_obj.migrate_aggregate_reset_autoincrement,
+        build_request_obj.delete_build_requests_with_no_instance_uuid,
+    )
+
     def __init__(self):
         pass
 
@@ -852,10 +894,115 @@ Error: %s""") % six.text_type(e))
                     break
         return migrations
 
+    def _run_migration_batches(self, ctxt, cell_name, migration_meth,
+                               max_count, unlimited):
+        """Run batches of a migration against a cell until it is complete.
+
+        Only a single batch is run unless unlimited is True.
+
+        :returns: A (found, done, elapsed) tuple, elapsed being the seconds
+                  spent running the batches.
+        """
+        name = migration_meth.__name__
+        total_found = total_done = 0
+        elapsed = 0
+        while True:
+            start = time.time()
+            try:
+                found, done = migration_meth(ctxt, max_count)
+            except Exception:
+                print(_("Error attempting to run %(method)s in cell "
+                        "%(cell)s") % dict(method=name, cell=cell_name))
+                break
+            batch_time = time.time() - start
+            elapsed += batch_time
+            if found:
+                print(_('%(cell)s: %(total)i rows matched query %(meth)s, '
+                        '%(done)i migrated (%(rate).1f rows/s)') % {
+                            'cell': cell_name,
+                            'total': found,
+                            'meth': name,
+                            'done': done,
+                            'rate': done / batch_time if batch_time else 0})
+            total_found += found
+            total_done += done
+            if not unlimited or not done:
+                break
+        return total_found, total_done, elapsed
+
+    def _run_parallel_migrations(self, ctxt, max_count, unlimited,
+                                 all_cells, workers):
+        """Run the migrations of every cell from a pool of green threads.
+
+        Each migration of each cell runs its batches independently, so that
+        a slow migration or a large cell does not hold back the others. The
+        migrations of the API database run once, when those of the cells
+        are complete.
+        """
+        if all_cells:
+            cells = [(cell.name or cell.uuid, cell) for cell in
+                     objects.CellMappingList.get_all(ctxt)]
+        else:
+            cells = [(_('default'), None)]
+
+        results = {}
+
+        def _run(cell_name, cell_mapping, migration_meth):
+            # Every green thread gets its own copy of the context so that
+            # they do not share a database transaction.
+            with context.target_cell(ctxt, cell_mapping) as cctxt:
+                results[(cell_name, migration_meth.__name__)] = (
+                    self._run_migration_batches(cctxt, cell_name,
+                                                migration_meth, max_count,
+                                                unlimited))
+
+        api_db_migrations = [
+            migration_meth for migration_meth in self.online_migrations
+            if migration_meth in self.api_db_online_migrations]
+        pool = eventlet.GreenPool(workers)
+        for cell_name, cell_mapping in cells:
+            for migration_meth in self.online_migrations:
+                if migration_meth not in api_db_migrations:
+                    pool.spawn_n(_run, cell_name, cell_mapping,
+                                 migration_meth)
+        pool.waitall()
+        for migration_meth in api_db_migrations:
+            pool.spawn_n(_run, _('API'), None, migration_meth)
+        pool.waitall()
+
+        t = prettytable.PrettyTable([_('Cell'),
+                                     _('Migration'),
+                                     _('Total Needed'),
+                                     _('Completed'),
+                                     _('Rows/s')])
+        for cell_name, name in sorted(results.keys()):
+            found, done, elapsed = results[(cell_name, name)]
+            t.add_row([cell_name, name, found, done,
+                       '%.1f' % (done / elapsed if elapsed else 0)])
+        print(t)
+
+        ran = sum(done for found, done, elapsed in results.values())
+        return 1 if not unlimited and ran else 0
+
     @args('--max-count', metavar='<number>', dest='max_count',
-          help='Maximum number of objects to consider')
-    def online_data_migrations(self, max_count=None):
+          help='Maximum number of objects to consider. With --all-cells or '
+               'more than one worker, the maximum applies to each migration '
+               'of each cell rather than to the whole run.')
+    @args('--all-cells', action='store_true', dest='all_cells',
+          default=False,
+          help='Run the migrations against the database of every cell, '
+               'including cell0, instead of the one set in '
+               '[database]/connection')
+    @args('--workers', metavar='<number>', dest='workers', default=1,
+          help='Number of migrations run concurrently. With more than one '
+               'worker, each migration runs its batches independently for '
+               'each cell and the rate of migrated rows is reported.')
+    def online_data_migrations(self, max_count=None, all_cells=False,
+                               workers=1):
         ctxt = context.get_admin_context()
+        workers = _parse_workers(workers)
+        if workers is None:
+            return 127
         if max_count is not None:
             try:
                 max_count = int(max_count)
@@ -870,6 +1017,10 @@ Error: %s""") % six.text_type(e))
             max_count = 50
             print(_('Running batches of %i until complete') % max_count)
 
+        if all_cells or workers > 1:
+            return self._run_parallel_migrations(ctxt, max_count, unlimited,
+                                                 all_cells, workers)
+
         ran = None
         migration_info = {}
         while ran is None or ran != 0:
@@ -1417,7 +1568,7 @@ class CellV2Commands(object):
         cell_mapping.create()
         return cell_mapping
 
-    def _get_and_map_instances(self, ctxt, cell_mapping, limit, marker):
+    def _get_instances(self, ctxt, cell_mapping, limit, marker):
         filters = {}
         with context.target_cell(ctxt, cell_mapping) as cctxt:
             instances = objects.InstanceList.get_by_filters(
@@ -1425,21 +1576,37 @@ class CellV2Commands(object):
                     sort_key='created_at', sort_dir='asc', limit=limit,
                     marker=marker)
 
-        for instance in instances:
-            try:
-                mapping = objects.InstanceMapping(ctxt)
-                mapping.instance_uuid = instance.uuid
-                mapping.cell_mapping = cell_mapping
-                mapping.project_id = instance.project_id
-                mapping.create()
-            except db_exc.DBDuplicateEntry:
-                continue
-
         if len(instances) == 0 or len(instances) < limit:
             # We've hit the end of the instances table
             marker = None
         else:
             marker = instances[-1].uuid
+        return instances, marker
+
+    @staticmethod
+    def _map_instances(ctxt, cell_mapping, instances):
+        project_ids = {instance.uuid: instance.project_id
+                       for instance in instances}
+        if not project_ids:
+            return
+        try:
+            objects.InstanceMappingList.create_missing(ctxt, cell_mapping,
+                                                       project_ids)
+        except db_exc.DBDuplicateEntry:
+            # Some of the instances got mapped concurrently, fall back to
+            # mapping them one by one.
+            for uuid, project_id in project_ids.items():
+                try:
+                    objects.InstanceMapping(
+                        ctxt, instance_uuid=uuid, cell_mapping=cell_mapping,
+                        project_id=project_id).create()
+                except db_exc.DBDuplicateEntry:
+                    continue
+
+    def _get_and_map_instances(self, ctxt, cell_mapping, limit, marker):
+        instances, marker = self._get_instances(ctxt, cell_mapping, limit,
+                                                marker)
+        self._map_instances(ctxt, cell_mapping, instances)
         return marker
 
     @args('--cell_uuid', metavar='<cell_uuid>', dest='cell_uuid',
@@ -1448,7 +1615,9 @@ class CellV2Commands(object):
                'uuid provided.')
     @args('--max-count', metavar='<max_count>', dest='max_count',
           help='Maximum number of instances to map')
-    def map_instances(self, cell_uuid, max_count=None):
+    @args('--workers', metavar='<workers>', dest='workers', default=1,
+          help='Number of batches of instances mapped concurrently')
+    def map_instances(self, cell_uuid, max_count=None, workers=1):
         """Map instances into the provided cell.
 
         Instances in the nova database of the provided cell (nova database
@@ -1458,7 +1627,13 @@ class CellV2Commands(object):
         run. Repeated runs of the command will start from where the last run
         finished so it is not necessary to increase max-count to finish. An
         exit code of 0 indicates that all instances have been mapped.
+
+        With more than one worker, each batch of instances is split between
+        the workers and mapped concurrently.
         """
+        workers = _parse_workers(workers)
+        if workers is None:
+            return 127
 
         if max_count is not None:
             try:
@@ -1471,7 +1646,7 @@ class CellV2Commands(object):
                 return 127
         else:
             map_all = True
-            max_count = 50
+            max_count = 50 * workers
 
         ctxt = context.RequestContext()
         marker_project_id = 'INSTANCE_MIGRATION_MARKER'
@@ -1489,13 +1664,37 @@ class CellV2Commands(object):
             marker = marker_mapping[0].instance_uuid.replace(' ', '-')
             marker_mapping[0].destroy()
 
-        next_marker = True
-        while next_marker is not None:
-            next_marker = self._get_and_map_instances(ctxt, cell_mapping,
-                    max_count, marker)
-            marker = next_marker
-            if not map_all:
-                break
+        if workers == 1:
+            next_marker = True
+            while next_marker is not None:
+                next_marker = self._get_and_map_instances(ctxt, cell_mapping,
+                        max_count, marker)
+                marker = next_marker
+                if not map_all:
+                    break
+        else:
+            pool = eventlet.GreenPool(workers)
+            next_marker = True
+            while next_marker is not None:
+                instances, next_marker = self._get_instances(
+                    ctxt, cell_mapping, max_count, marker)
+                chunk = max(1, -(-len(instances) // workers))
+                threads = []
+                for i in range(0, len(instances), chunk):
+                    # Every green thread gets its own context so that they
+                    # do not share a database transaction.
+                    threads.append(pool.spawn(self._map_instances,
+                                              context.RequestContext(),
+                                              cell_mapping,
+                                              instances[i:i + chunk]))
+                # Map the whole batch, re-raising the errors of the workers
+                # if any, before reading the next one or recording the
+                # marker.
+                for thread in threads:
+                    thread.wait()
+                marker = next_marker
+                if not map_all:
+                    break
 
         if next_marker:
             # Don't judge me. There's already an InstanceMapping with this UUID
@@ -1653,7 +1852,10 @@ class CellV2Commands(object):
           help=_('Considered successful (exit code 0) only when an unmapped '
                  'host is discovered. Any other outcome will be considered a '
                  'failure (exit code 1).'))
-    def discover_hosts(self, cell_uuid=None, verbose=False, strict=False):
+    @args('--workers', metavar='<workers>', dest='workers', default=1,
+          help=_('Number of cells searched concurrently'))
+    def discover_hosts(self, cell_uuid=None, verbose=False, strict=False,
+                       workers=1):
         """Searches cells, or a single cell, and maps found hosts.
 
         When a new host is added to a deployment it will add a service entry
@@ -1661,12 +1863,17 @@ class CellV2Commands(object):
         each cell, or a single one if passed in, and map any hosts which are
         not currently mapped. If a host is already mapped nothing will be done.
         """
+        workers = _parse_workers(workers)
+        if workers is None:
+            return 127
+
         def status_fn(msg):
             if verbose:
                 print(msg)
 
         ctxt = context.RequestContext()
-        hosts = host_mapping_obj.discover_hosts(ctxt, cell_uuid, status_fn)
+        hosts = host_mapping_obj.discover_hosts(ctxt, cell_uuid, status_fn,
+                                                workers=workers)
         # discover_hosts will return an empty list if no hosts are discovered
         if strict:
             return int(not hosts)
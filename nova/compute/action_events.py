@@ -0,0 +1,161 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Buffered recording of instance action events.
+
+When ``[compute] action_event_flush_interval`` is set, nova-compute queues the
+start and finish of instance action events locally instead of writing each of
+them with a synchronous conductor call. A start and finish pair which is still
+queued is coalesced into a single entry, and the queue is written in order in
+batches through InstanceActionEvent.record_events().
+"""
+
+import threading
+import traceback
+
+from oslo_log import log as logging
+from oslo_service import loopingcall
+import six
+
+import nova.conf
+from nova import context as nova_context
+from nova import objects
+from nova import utils
+
+CONF = nova.conf.CONF
+LOG = logging.getLogger(__name__)
+
+# The buffer of the running nova-compute service, if enabled. Other services
+# using compute_utils.EventReporter keep recording events synchronously.
+_BUFFER = None
+
+
+def init():
+    """Start buffering action events if configured to do so."""
+    global _BUFFER
+    if _BUFFER is None and CONF.compute.action_event_flush_interval:
+        _BUFFER = ActionEventBuffer(CONF.compute.action_event_flush_interval,
+                                    CONF.compute.action_event_batch_size)
+        _BUFFER.start()
+
+
+def cleanup():
+    """Stop buffering action events, writing any which are still queued."""
+    global _BUFFER
+    if _BUFFER is not None:
+        _BUFFER.stop()
+        _BUFFER = None
+
+
+def get_buffer():
+    return _BUFFER
+
+
+class ActionEventBuffer(object):
+    """Queue of instance action event starts and finishes.
+
+    Entries are kept in the order in which they happened. A batch is written
+    by at most one flush at a time and entries of a batch which failed to be
+    written are put back at the head of the queue, so a finish can never be
+    recorded before its start.
+    """
+
+    def __init__(self, flush_interval, batch_size):
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self._queue = []
+        # Queued starts, by (instance_uuid, request_id, event), which a
+        # finish can still be merged into.
+        self._open = {}
+        self._flush_lock = threading.Lock()
+        self._flush_pending = False
+        self._timer = None
+        self.stats = {'queued': 0, 'coalesced': 0, 'batches': 0,
+                      'written': 0}
+
+    def start(self):
+        self._timer = loopingcall.FixedIntervalLoopingCall(self.flush)
+        self._timer.start(interval=self.flush_interval,
+                          initial_delay=self.flush_interval)
+
+    def stop(self):
+        if self._timer is not None:
+            self._timer.stop()
+            self._timer = None
+        self.flush()
+        LOG.debug('Stopped action event buffer: %s', self.stats)
+
+    @staticmethod
+    def _key(values):
+        return values['instance_uuid'], values['request_id'], values['event']
+
+    def _append(self, context, values):
+        values['project_id'] = context.project_id
+        self._queue.append(values)
+        self.stats['queued'] += 1
+        if len(self._queue) >= self.batch_size and not self._flush_pending:
+            self._flush_pending = True
+            utils.spawn_n(self.flush)
+
+    def event_start(self, context, instance_uuid, event_name):
+        values = objects.InstanceActionEvent.pack_action_event_start(
+            context, instance_uuid, event_name)
+        values['start_time'] = utils.strtime(values['start_time'])
+        self._open[self._key(values)] = values
+        self._append(context, values)
+
+    def event_finish(self, context, instance_uuid, event_name, exc_val=None,
+                     exc_tb=None):
+        values = objects.InstanceActionEvent.pack_action_event_finish(
+            context, instance_uuid, event_name, exc_val=exc_val,
+            exc_tb=exc_tb)
+        values['finish_time'] = utils.strtime(values['finish_time'])
+        # NOTE: The traceback has to be rendered now, it references frames
+        # which are gone by the time the batch is written.
+        if exc_val is not None:
+            values['message'] = six.text_type(exc_val)
+        if exc_tb is not None and not isinstance(exc_tb, six.string_types):
+            values['traceback'] = ''.join(traceback.format_tb(exc_tb))
+
+        started = self._open.pop(self._key(values), None)
+        if started is not None:
+            started.update(values)
+            self.stats['coalesced'] += 1
+        else:
+            self._append(context, values)
+
+    def flush(self):
+        with self._flush_lock:
+            self._flush_pending = False
+            written = self.stats['written']
+            while self._queue:
+                batch = self._queue[:self.batch_size]
+                del self._queue[:self.batch_size]
+                # Once taken, entries of the batch can't be merged into
+                # anymore; their finish is queued behind them instead.
+                for values in batch:
+                    self._open.pop(self._key(values), None)
+                try:
+                    objects.InstanceActionEvent.record_events(
+                        nova_context.get_admin_context(), batch)
+                except Exception:
+                    LOG.exception('Failed to record %d instance action '
+                                  'events, will retry.', len(batch))
+                    self._queue[:0] = batch
+                    return
+                self.stats['batches'] += 1
+                self.stats['written'] += len(batch)
+            if self.stats['written'] != written:
+                LOG.debug('Recorded %(count)d instance action events, '
+                          'totals: %(stats)s',
+                          {'count': self.stats['written'] - written,
+                           'stats': self.stats})
@@ -40,6 +40,7 @@ from six.moves import range
 
 from nova import availability_zones
 from nova import block_device
+from nova import cache_utils
 from nova.cells import opts as cells_opts
 from nova.compute import flavors
 from nova.compute import instance_actions
@@ -3979,6 +3980,7 @@ class API(base.Base):
     def delete_instance_metadata(self, context, instance, key):
         """Delete the given metadata item from an instance."""
         instance.delete_metadata_key(key)
+        cache_utils.invalidate_metadata(instance)
         self.compute_rpcapi.change_instance_metadata(context,
                                                      instance=instance,
                                                      diff={key: ['-']})
@@ -4005,6 +4007,7 @@ class API(base.Base):
         self._check_metadata_properties_quota(context, _metadata)
         instance.metadata = _metadata
         instance.save()
+        cache_utils.invalidate_metadata(instance)
         diff = _diff_dict(orig, instance.metadata)
         self.compute_rpcapi.change_instance_metadata(context,
                                                      instance=instance,
@@ -56,6 +56,7 @@ from six.moves import range
 from nova import block_device
 from nova.cells import rpcapi as cells_rpcapi
 from nova import compute
+from nova.compute import action_events
 from nova.compute import build_results
 from nova.compute import claims
 from nova.compute import power_state
@@ -485,7 +486,7 @@ class ComputeVirtAPI(virtapi.VirtAPI):
 class ComputeManager(manager.Manager):
     """Manages the running instances from creation to destruction."""
 
-    target = messaging.Target(version='4.18')
+    target = messaging.Target(version='4.19')
 
     # How long to wait in seconds before re-issuing a shutdown
     # signal to an instance during power off.  The overall
@@ -658,13 +659,14 @@ class ComputeManager(manager.Manager):
         # we cannot rely on the resource tracker here.
         compute_nodes = {}
 
+        nw_info_kwargs = self._prefetch_instance_nw_info(context, evacuated)
         for instance in evacuated:
             migration = evacuations[instance.uuid]
             LOG.info('Deleting instance as it has been evacuated from '
                      'this host', instance=instance)
             try:
                 network_info = self.network_api.get_instance_nw_info(
-                    context, instance)
+                    context, instance, **nw_info_kwargs)
                 bdi = self._get_instance_block_device_info(context,
                                                            instance)
                 destroy_disks = not (self._is_instance_storage_shared(
@@ -1056,6 +1058,35 @@ class ComputeManager(manager.Manager):
         instance = objects.Instance.get_by_uuid(context,
                                                 event.get_instance_uuid(),
                                                 expected_attrs=[])
+        self._handle_lifecycle_event(context, instance, event)
+
+    def handle_lifecycle_event_batch(self, batch):
+        """Handle lifecycle events emitted together by the driver.
+
+        The instances of all of the events are fetched with a single query.
+        """
+        events = batch.get_events()
+        context = nova.context.get_admin_context(read_deleted='yes')
+        instances = objects.InstanceList.get_by_filters(
+            context, {'uuid': [event.get_instance_uuid() for event in events]},
+            expected_attrs=[])
+        instances = {instance.uuid: instance for instance in instances}
+        for event in events:
+            LOG.info("VM %(state)s (Lifecycle Event)",
+                     {'state': event.get_name()},
+                     instance_uuid=event.get_instance_uuid())
+            instance = instances.get(event.get_instance_uuid())
+            if instance is None:
+                LOG.debug("Event %s arrived for non-existent instance. The "
+                          "instance was probably deleted.", event)
+                continue
+            try:
+                self._handle_lifecycle_event(context, instance, event)
+            except Exception:
+                LOG.exception("Failed to handle lifecycle event %s", event,
+                              instance=instance)
+
+    def _handle_lifecycle_event(self, context, instance, event):
         vm_power_state = None
         if event.get_transition() == virtevent.EVENT_LIFECYCLE_STOPPED:
             vm_power_state = power_state.SHUTDOWN
@@ -1096,6 +1127,8 @@ class ComputeManager(manager.Manager):
             except exception.InstanceNotFound:
                 LOG.debug("Event %s arrived for non-existent instance. The "
                           "instance was probably deleted.", event)
+        elif isinstance(event, virtevent.LifecycleEventBatch):
+            self.handle_lifecycle_event_batch(event)
         else:
             LOG.debug("Ignoring event %s", event)
 
@@ -1139,6 +1172,7 @@ class ComputeManager(manager.Manager):
             raise exception.PlacementNotConfigured()
 
         self.driver.init_host(host=self.host)
+        action_events.init()
         context = nova.context.get_admin_context()
         instances = objects.InstanceList.get_by_host(
             context, self.host, expected_attrs=['info_cache', 'metadata'])
@@ -1169,6 +1203,7 @@ class ComputeManager(manager.Manager):
         self.driver.register_event_listener(None)
         self.instance_events.cancel_all_events()
         self.driver.cleanup_host(host=self.host)
+        action_events.cleanup()
 
     def pre_start_hook(self):
         """After the service is initialized, but before we fully bring
@@ -6769,26 +6804,27 @@ class ComputeManager(manager.Manager):
                 return
 
             refreshed = timeutils.utcnow()
+            instance_uuids = set(bw_ctr['uuid'] for bw_ctr in bw_counters)
+            curr_usages = self._get_bw_usages_by_mac(context, instance_uuids,
+                                                     start_time)
+            prev_usages = self._get_bw_usages_by_mac(context, instance_uuids,
+                                                     prev_time)
+            bw_usages = objects.BandwidthUsageList(context=context,
+                                                   objects=[])
             for bw_ctr in bw_counters:
-                # Allow switching of greenthreads between queries.
-                greenthread.sleep(0)
                 bw_in = 0
                 bw_out = 0
                 last_ctr_in = None
                 last_ctr_out = None
-                usage = objects.BandwidthUsage.get_by_instance_uuid_and_mac(
-                    context, bw_ctr['uuid'], bw_ctr['mac_address'],
-                    start_period=start_time, use_slave=True)
+                key = (bw_ctr['uuid'], bw_ctr['mac_address'])
+                usage = curr_usages.get(key)
                 if usage:
                     bw_in = usage.bw_in
                     bw_out = usage.bw_out
                     last_ctr_in = usage.last_ctr_in
                     last_ctr_out = usage.last_ctr_out
                 else:
-                    usage = (objects.BandwidthUsage.
-                             get_by_instance_uuid_and_mac(
-                        context, bw_ctr['uuid'], bw_ctr['mac_address'],
-                        start_period=prev_time, use_slave=True))
+                    usage = prev_usages.get(key)
                     if usage:
                         last_ctr_in = usage.last_ctr_in
                         last_ctr_out = usage.last_ctr_out
@@ -6807,16 +6843,32 @@ class ComputeManager(manager.Manager):
                     else:
                         bw_out += (bw_ctr['bw_out'] - last_ctr_out)
 
-                objects.BandwidthUsage(context=context).create(
-                                              bw_ctr['uuid'],
-                                              bw_ctr['mac_address'],
-                                              bw_in,
-                                              bw_out,
-                                              bw_ctr['bw_in'],
-                                              bw_ctr['bw_out'],
-                                              start_period=start_time,
-                                              last_refreshed=refreshed,
-                                              update_cells=update_cells)
+                bw_usages.objects.append(objects.BandwidthUsage(
+                    instance_uuid=bw_ctr['uuid'],
+                    mac=bw_ctr['mac_address'],
+                    start_period=start_time,
+                    last_refreshed=refreshed,
+                    bw_in=bw_in,
+                    bw_out=bw_out,
+                    last_ctr_in=bw_ctr['bw_in'],
+                    last_ctr_out=bw_ctr['bw_out']))
+
+            # The usages of all the interfaces are written at once, which
+            # saves a round trip to the conductor and a database transaction
+            # for each of them.
+            if bw_usages:
+                bw_usages.create(update_cells=update_cells)
+
+    @staticmethod
+    def _get_bw_usages_by_mac(context, instance_uuids, start_period):
+        """Returns the bandwidth usages of instances started at a period,
+        keyed by instance uuid and MAC address.
+        """
+        bw_usages = objects.BandwidthUsageList.get_by_uuids(
+            context, list(instance_uuids), start_period=start_period,
+            use_slave=True)
+        return {(bw_usage.instance_uuid, bw_usage.mac): bw_usage
+                for bw_usage in bw_usages}
 
     def _get_host_volume_bdms(self, context, use_slave=False):
         """Return all block device mappings on a compute host."""
@@ -6834,10 +6886,13 @@ class ComputeManager(manager.Manager):
 
     def _update_volume_usage_cache(self, context, vol_usages):
         """Updates the volume usage cache table with a list of stats."""
+        if not vol_usages:
+            return
+
+        vol_usage_list = objects.VolumeUsageList(context=context,
+                                                 objects=[])
         for usage in vol_usages:
-            # Allow switching of greenthreads between queries.
-            greenthread.sleep(0)
-            vol_usage = objects.VolumeUsage(context)
+            vol_usage = objects.VolumeUsage()
             vol_usage.volume_id = usage['volume']
             vol_usage.instance_uuid = usage['instance'].uuid
             vol_usage.project_id = usage['instance'].project_id
@@ -6847,7 +6902,10 @@ class ComputeManager(manager.Manager):
             vol_usage.curr_read_bytes = usage['rd_bytes']
             vol_usage.curr_writes = usage['wr_req']
             vol_usage.curr_write_bytes = usage['wr_bytes']
-            vol_usage.save()
+            vol_usage_list.objects.append(vol_usage)
+
+        vol_usage_list.save()
+        for vol_usage in vol_usage_list:
             self.notifier.info(context, 'volume.usage',
                                compute_utils.usage_volume_info(vol_usage))
 
@@ -7191,6 +7249,18 @@ class ComputeManager(manager.Manager):
         # Delete orphan compute node not reported by driver but still in db
         for cn in compute_nodes_in_db:
             if cn.hypervisor_hostname not in nodenames:
+                if (self.driver.rebalances_nodes and
+                        self.driver.node_is_available(cn.hypervisor_hostname)):
+                    # NOTE: The node was rebalanced to another service, which
+                    # takes over its compute node record and resource
+                    # provider, so they are kept rather than being deleted
+                    # and created again.
+                    LOG.info("Compute node %(id)s for hypervisor host %(hh)s "
+                             "is no longer managed by this host",
+                             {'id': cn.id, 'hh': cn.hypervisor_hostname})
+                    self._get_resource_tracker().remove_node(
+                        cn.hypervisor_hostname)
+                    continue
                 LOG.info("Deleting orphan compute node %(id)s "
                          "hypervisor host is %(hh)s, "
                          "nodes are %(nodes)s",
@@ -7203,6 +7273,8 @@ class ComputeManager(manager.Manager):
                 self.scheduler_client.reportclient.delete_resource_provider(
                     context, cn, cascade=True)
 
+        utils.log_execute_stats()
+
     def _get_compute_nodes_in_db(self, context, use_slave=False,
                                  startup=False):
         try:
@@ -7478,12 +7550,34 @@ class ComputeManager(manager.Manager):
                         instance=instance)
             raise
 
+    def _prefetch_instance_nw_info(self, context, instances):
+        """Prefetch the network info of several instances at once.
+
+        Returns the keyword arguments to pass to get_instance_nw_info() for
+        each of the instances. Failing to prefetch is not fatal, the network
+        info is then looked up for each instance on its own.
+        """
+        if len(instances) < 2:
+            return {}
+        try:
+            return self.network_api.prefetch_instance_nw_info(context,
+                                                              instances)
+        except Exception:
+            LOG.warning('Failed to prefetch the network info of %d '
+                        'instances', len(instances), exc_info=True)
+            return {}
+
     @wrap_exception()
     def external_instance_event(self, context, instances, events):
         # NOTE(danms): Some event types are handled by the manager, such
         # as when we're asked to update the instance's info_cache. If it's
         # not one of those, look for some thread(s) waiting for the event and
         # unblock them if so.
+        nw_info_kwargs = self._prefetch_instance_nw_info(
+            context, [inst for inst in instances
+                      if any(event.instance_uuid == inst.uuid and
+                             event.name == 'network-changed'
+                             for event in events)])
         for event in events:
             instance = [inst for inst in instances
                         if inst.uuid == event.instance_uuid][0]
@@ -7492,7 +7586,8 @@ class ComputeManager(manager.Manager):
                       instance=instance)
             if event.name == 'network-changed':
                 try:
-                    self.network_api.get_instance_nw_info(context, instance)
+                    self.network_api.get_instance_nw_info(context, instance,
+                                                          **nw_info_kwargs)
                 except exception.NotFound as e:
                     LOG.info('Failed to process external instance event '
                              '%(event)s due to: %(error)s',
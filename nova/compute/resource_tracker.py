@@ -488,6 +488,15 @@ class ResourceTracker(object):
             self._update_usage_from_instance(context, instance, nodename)
             self._update(context.elevated(), self.compute_nodes[nodename])
 
+    @utils.synchronized(COMPUTE_RESOURCE_SEMAPHORE)
+    def remove_node(self, nodename):
+        """Stops tracking a node no longer managed by this host.
+
+        :param nodename: The name of the node
+        """
+        self.compute_nodes.pop(nodename, None)
+        self.old_resources.pop(nodename, None)
+
     def disabled(self, nodename):
         return (nodename not in self.compute_nodes or
                 not self.driver.node_is_available(nodename))
@@ -18,6 +18,7 @@ Client side of the compute RPC API.
 from oslo_log import log as logging
 import oslo_messaging as messaging
 from oslo_serialization import jsonutils
+from oslo_utils import versionutils
 
 import nova.conf
 from nova import context
@@ -329,6 +330,9 @@ class ComputeAPI(object):
         * 4.16 - Add tag argument to attach_interface()
         * 4.17 - Add new_attachment_id to swap_volume.
         * 4.18 - Add migration to prep_resize()
+        * 4.19 - Accept objects in the compact serialization format. No
+                 method changed, the version signals that objects may be
+                 sent with obj_to_compact_primitive()
     '''
 
     VERSION_ALIASES = {
@@ -350,10 +354,20 @@ class ComputeAPI(object):
         else:
             version_cap = self.VERSION_ALIASES.get(upgrade_level,
                                                    upgrade_level)
-        serializer = objects_base.NovaObjectSerializer()
+        serializer = objects_base.NovaObjectSerializer(
+            compact=self._use_compact_serialization(version_cap))
         default_client = self.get_client(target, version_cap, serializer)
         self.router = rpc.ClientRouter(default_client)
 
+    @staticmethod
+    def _use_compact_serialization(version_cap):
+        if not CONF.compute.compact_rpc_objects:
+            return False
+        # NOTE: Only send compact objects once all computes can read them.
+        return (version_cap is None or
+                versionutils.convert_version_to_tuple(version_cap) >=
+                versionutils.convert_version_to_tuple('4.19'))
+
     def _determine_version_cap(self, target):
         global LAST_VERSION
         if LAST_VERSION:
@@ -27,6 +27,7 @@ from oslo_log import log
 import six
 
 from nova import block_device
+from nova.compute import action_events
 from nova.compute import power_state
 from nova.compute import task_states
 import nova.conf
@@ -876,17 +877,26 @@ class EventReporter(object):
         self.instance_uuids = instance_uuids
 
     def __enter__(self):
+        event_buffer = action_events.get_buffer()
         for uuid in self.instance_uuids:
-            objects.InstanceActionEvent.event_start(
-                self.context, uuid, self.event_name, want_result=False)
+            if event_buffer is not None:
+                event_buffer.event_start(self.context, uuid, self.event_name)
+            else:
+                objects.InstanceActionEvent.event_start(
+                    self.context, uuid, self.event_name, want_result=False)
 
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
+        event_buffer = action_events.get_buffer()
         for uuid in self.instance_uuids:
-            objects.InstanceActionEvent.event_finish_with_failure(
-                self.context, uuid, self.event_name, exc_val=exc_val,
-                exc_tb=exc_tb, want_result=False)
+            if event_buffer is not None:
+                event_buffer.event_finish(self.context, uuid, self.event_name,
+                                          exc_val=exc_val, exc_tb=exc_tb)
+            else:
+                objects.InstanceActionEvent.event_finish_with_failure(
+                    self.context, uuid, self.event_name, exc_val=exc_val,
+                    exc_tb=exc_tb, want_result=False)
         return False
 
 
@@ -37,6 +37,19 @@ class API(object):
         return self.conductor_rpcapi.object_backport_versions(context, objinst,
                                                               object_versions)
 
+    def service_heartbeat(self, context, service_ref):
+        """Reports the state of a service to be written with the state
+        reports of other services.
+
+        If nova-conductor cannot aggregate state reports yet, the service
+        record is saved instead.
+        """
+        if not self.conductor_rpcapi.can_send_service_heartbeat():
+            service_ref.report_count += 1
+            service_ref.save()
+            return
+        self.conductor_rpcapi.service_heartbeat(context, service_ref.id)
+
     def wait_until_ready(self, context, early_timeout=10, early_attempts=10):
         '''Wait until a conductor service is up and running.
 
@@ -110,6 +123,12 @@ class ComputeTaskAPI(object):
                 block_migration, disk_over_commit, None,
                 request_spec=request_spec)
 
+    def drain_host(self, context, host_name, block_migration=None,
+                   disk_over_commit=None):
+        """Live migrate all the active instances of a host to other hosts"""
+        self.conductor_compute_rpcapi.drain_host(
+            context, host_name, block_migration, disk_over_commit)
+
     def build_instances(self, context, instances, image, filter_properties,
             admin_password, injected_files, requested_networks,
             security_groups, block_device_mapping, legacy_bdm=True):
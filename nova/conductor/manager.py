@@ -14,13 +14,17 @@
 
 """Handles database requests from other nova services."""
 
+import collections
 import contextlib
 import copy
 import functools
+import time
 
+from eventlet import greenthread
 from oslo_config import cfg
 from oslo_log import log as logging
 import oslo_messaging as messaging
+from oslo_service import periodic_task
 from oslo_utils import excutils
 from oslo_utils import versionutils
 import six
@@ -97,13 +101,23 @@ class ConductorManager(manager.Manager):
     namespace.  See the ComputeTaskManager class for details.
     """
 
-    target = messaging.Target(version='3.0')
+    target = messaging.Target(version='3.1')
 
     def __init__(self, *args, **kwargs):
         super(ConductorManager, self).__init__(service_name='conductor',
                                                *args, **kwargs)
         self.compute_task_mgr = ComputeTaskManager()
         self.additional_endpoints.append(self.compute_task_mgr)
+        # The number of state reports received and not written yet, keyed
+        # by service ID, and when they were last written.
+        self._heartbeats = collections.Counter()
+        self._heartbeats_written = time.time()
+        # The number of state reports received, of times they were written
+        # and of services updated by those writes, and how long the last
+        # write took.
+        self.heartbeat_stats = {'received': 0, 'writes': 0,
+                                'services_updated': 0,
+                                'last_write_duration': 0.0}
 
     # NOTE(hanlind): This can be removed in version 4.0 of the RPC API
     def provider_fw_rule_get_all(self, context):
@@ -180,6 +194,50 @@ class ConductorManager(manager.Manager):
         return objinst.obj_to_primitive(target_version=target,
                                         version_manifest=object_versions)
 
+    def service_heartbeat(self, context, service_id):
+        """Records a state report of a service.
+
+        The state reports received within [DEFAULT]/heartbeat_batch_interval
+        are written to the database together.
+        """
+        self._heartbeats[service_id] += 1
+        self.heartbeat_stats['received'] += 1
+        if (time.time() - self._heartbeats_written >=
+                CONF.heartbeat_batch_interval):
+            self._write_heartbeats(context)
+
+    def _write_heartbeats(self, context):
+        heartbeats, self._heartbeats = self._heartbeats, collections.Counter()
+        start = self._heartbeats_written = time.time()
+        if not heartbeats:
+            return
+        try:
+            self.db.service_heartbeat_all(context, heartbeats)
+        except Exception:
+            LOG.exception('Failed to write the state reports of %d services',
+                          len(heartbeats))
+            # Keep them to be written with the next state reports
+            self._heartbeats.update(heartbeats)
+            return
+        duration = time.time() - start
+        self.heartbeat_stats['writes'] += 1
+        self.heartbeat_stats['services_updated'] += len(heartbeats)
+        self.heartbeat_stats['last_write_duration'] = duration
+        LOG.debug('Wrote the state reports of %(num)d services in '
+                  '%(duration).3f seconds, totals since the service '
+                  'started: %(stats)s',
+                  {'num': len(heartbeats), 'duration': duration,
+                   'stats': self.heartbeat_stats})
+
+    @periodic_task.periodic_task(spacing=CONF.heartbeat_batch_interval)
+    def _flush_heartbeats(self, context):
+        # NOTE: State reports are written as they are received once the
+        # interval has passed, this writes those received since when no
+        # other state report followed them.
+        if (time.time() - self._heartbeats_written >=
+                CONF.heartbeat_batch_interval):
+            self._write_heartbeats(context)
+
     def reset(self):
         objects.Service.clear_min_version_cache()
 
@@ -218,7 +276,11 @@ class ComputeTaskManager(base.Base):
     may involve coordinating activities on multiple compute nodes.
     """
 
-    target = messaging.Target(namespace='compute_task', version='1.17')
+    target = messaging.Target(namespace='compute_task', version='1.18')
+
+    # Seconds between checks of the live migrations run by drain_host()
+    DRAIN_POLL_INTERVAL = 5
+    DRAIN_FINISHED_STATUSES = ('completed', 'failed', 'error', 'cancelled')
 
     def __init__(self):
         super(ComputeTaskManager, self).__init__()
@@ -383,20 +445,15 @@ class ComputeTaskManager(base.Base):
     def _live_migrate(self, context, instance, scheduler_hint,
                       block_migration, disk_over_commit, request_spec):
         destination = scheduler_hint.get("host")
+        migration = self._create_live_migration(context, instance,
+                                                destination)
+        task = self._build_live_migrate_task(context, instance, destination,
+                                             block_migration, disk_over_commit,
+                                             migration, request_spec)
+        self._run_live_migrate_task(context, task, task.execute)
 
-        def _set_vm_state(context, instance, ex, vm_state=None,
-                          task_state=None):
-            request_spec = {'instance_properties': {
-                'uuid': instance.uuid, },
-            }
-            scheduler_utils.set_vm_state_and_notify(context,
-                instance.uuid,
-                'compute_task', 'migrate_server',
-                dict(vm_state=vm_state,
-                     task_state=task_state,
-                     expected_task_state=task_states.MIGRATING,),
-                ex, request_spec)
-
+    @staticmethod
+    def _create_live_migration(context, instance, destination):
         migration = objects.Migration(context=context.elevated())
         migration.dest_compute = destination
         migration.status = 'accepted'
@@ -410,12 +467,32 @@ class ComputeTaskManager(base.Base):
             migration.old_instance_type_id = instance.instance_type_id
             migration.new_instance_type_id = instance.instance_type_id
         migration.create()
+        return migration
+
+    def _run_live_migrate_task(self, context, task, method):
+        """Runs a step of a live migration task and handles its failures
+
+        :param task: nova.conductor.tasks.live_migrate.LiveMigrationTask
+        :param method: the method of the task to run
+        """
+        instance = task.instance
+        migration = task.migration
+
+        def _set_vm_state(context, instance, ex, vm_state=None,
+                          task_state=None):
+            request_spec = {'instance_properties': {
+                'uuid': instance.uuid, },
+            }
+            scheduler_utils.set_vm_state_and_notify(context,
+                instance.uuid,
+                'compute_task', 'migrate_server',
+                dict(vm_state=vm_state,
+                     task_state=task_state,
+                     expected_task_state=task_states.MIGRATING,),
+                ex, request_spec)
 
-        task = self._build_live_migrate_task(context, instance, destination,
-                                             block_migration, disk_over_commit,
-                                             migration, request_spec)
         try:
-            task.execute()
+            method()
         except (exception.NoValidHost,
                 exception.ComputeHostNotFound,
                 exception.ComputeServiceUnavailable,
@@ -439,7 +516,8 @@ class ComputeTaskManager(base.Base):
         except Exception as ex:
             LOG.error('Migration of instance %(instance_id)s to host'
                       ' %(dest)s unexpectedly failed.',
-                      {'instance_id': instance.uuid, 'dest': destination},
+                      {'instance_id': instance.uuid,
+                       'dest': task.destination},
                       exc_info=True)
             # Reset the task state to None to indicate completion of
             # the operation as it is done in case of known exceptions.
@@ -449,6 +527,192 @@ class ComputeTaskManager(base.Base):
             migration.save()
             raise exception.MigrationError(reason=six.text_type(ex))
 
+    def drain_host(self, context, host, block_migration, disk_over_commit):
+        """Live migrates all the instances of a host to other hosts
+
+        The live migrations are started as earlier ones complete, within the
+        limits set by [conductor]/drain_max_concurrent_migrations and
+        [conductor]/drain_max_concurrent_migrations_per_destination. Only the
+        instances about to be live migrated are marked as migrating, and the
+        destinations of those are picked by the scheduler with as few calls
+        as possible. This returns once all the live migrations have completed
+        or failed, or have not completed within
+        [conductor]/drain_migration_timeout seconds.
+
+        Only the active and paused instances which have no task in progress
+        are live migrated.
+        """
+        try:
+            host_mapping = objects.HostMapping.get_by_host(context, host)
+        except exception.HostMappingNotFound:
+            LOG.error('Unable to drain host %s which is not mapped to a '
+                      'cell', host)
+            return
+        nova_context.set_target_cell(context, host_mapping.cell_mapping)
+
+        instances = objects.InstanceList.get_by_host(
+            context, host, expected_attrs=['flavor', 'numa_topology',
+                                           'pci_requests',
+                                           'system_metadata'])
+        drained = [instance for instance in instances
+                   if self._can_drain_instance(instance)]
+        LOG.info('Draining %(count)d of the %(total)d instances of host '
+                 '%(host)s', {'count': len(drained), 'total': len(instances),
+                              'host': host})
+        self._run_drain_tasks(context, drained, block_migration,
+                              disk_over_commit)
+
+    @staticmethod
+    def _can_drain_instance(instance):
+        if (instance.vm_state not in (vm_states.ACTIVE, vm_states.PAUSED) or
+                instance.task_state is not None):
+            LOG.debug('Not draining instance in state %(vm_state)s with task '
+                      '%(task_state)s', {'vm_state': instance.vm_state,
+                                         'task_state': instance.task_state},
+                      instance=instance)
+            return False
+        return True
+
+    def _prepare_drain_task(self, context, instance, block_migration,
+                            disk_over_commit):
+        instance.task_state = task_states.MIGRATING
+        try:
+            instance.save(expected_task_state=[None])
+        except exception.UnexpectedTaskStateError:
+            LOG.debug('Not draining instance which started another task',
+                      instance=instance)
+            return None
+        objects.InstanceAction.action_start(
+            context, instance.uuid, instance_actions.LIVE_MIGRATION,
+            want_result=False)
+
+        try:
+            request_spec = objects.RequestSpec.get_by_instance_uuid(
+                context, instance.uuid)
+        except exception.RequestSpecNotFound:
+            request_spec = None
+        migration = self._create_live_migration(context, instance, None)
+        task = self._build_live_migrate_task(context, instance, None,
+                                             block_migration, disk_over_commit,
+                                             migration, request_spec)
+        try:
+            self._run_live_migrate_task(context, task, task.prepare)
+        except Exception as ex:
+            LOG.warning('Unable to drain instance: %s', ex,
+                        instance=instance)
+            return None
+        return task
+
+    @staticmethod
+    def _reset_drain_task(task):
+        """Undoes the preparation of a live migration which was not started
+
+        :param task: nova.conductor.tasks.live_migrate.LiveMigrationTask
+        """
+        task.rollback()
+        task.migration.status = 'error'
+        task.migration.save()
+        instance = task.instance
+        instance.task_state = None
+        try:
+            instance.save(expected_task_state=[task_states.MIGRATING])
+        except exception.UnexpectedTaskStateError:
+            LOG.debug('Not resetting the task state of instance which '
+                      'started another task', instance=instance)
+
+    def _run_drain_tasks(self, context, instances, block_migration,
+                         disk_over_commit):
+        """Live migrates instances as earlier live migrations complete
+
+        The instances are prepared for live migration by groups as large as
+        the number of live migrations which can be started, and their
+        destinations are picked with the destinations still busy with the
+        maximum number of live migrations excluded. A prepared task whose
+        destination is busy anyway waits for it, and is reset if it does not
+        start within [conductor]/drain_migration_timeout seconds. Running
+        live migrations which do not complete within that time are left to
+        the compute services and no longer waited for.
+        """
+        max_migrations = CONF.conductor.drain_max_concurrent_migrations
+        max_per_destination = (
+            CONF.conductor.drain_max_concurrent_migrations_per_destination)
+        timeout = CONF.conductor.drain_migration_timeout
+        pending = list(instances)
+        # The prepared tasks waiting for their destination to be less busy
+        ready = []
+        running = []
+        deadlines = {}
+        per_destination = collections.Counter()
+        while pending or ready or running:
+            free = max_migrations - len(running) - len(ready)
+            if pending and free > 0:
+                tasks = []
+                while pending and len(tasks) < free:
+                    task = self._prepare_drain_task(
+                        context, pending.pop(0), block_migration,
+                        disk_over_commit)
+                    if task is not None:
+                        deadlines[task] = time.time() + timeout
+                        tasks.append(task)
+                busy_hosts = [host for host, count in per_destination.items()
+                              if count >= max_per_destination]
+                live_migrate.select_destinations_for_tasks(
+                    context, self.scheduler_client, tasks, busy_hosts)
+                ready.extend(tasks)
+
+            for task in list(ready):
+                if len(running) >= max_migrations:
+                    break
+                busy_hosts = [host for host, count in per_destination.items()
+                              if count >= max_per_destination]
+                if (task.selection is not None and
+                        task.selection.service_host in busy_hosts):
+                    continue
+                # The destination of a task without selection, or whose
+                # selection does not pass the checks, is picked by the
+                # scheduler when it is executed.
+                task.ignore_hosts = busy_hosts
+                ready.remove(task)
+                try:
+                    self._run_live_migrate_task(context, task, task.execute)
+                except Exception as ex:
+                    LOG.warning('Unable to drain instance: %s', ex,
+                                instance=task.instance)
+                    continue
+                running.append(task)
+                per_destination[task.destination] += 1
+
+            if not ready and not running:
+                continue
+            greenthread.sleep(self.DRAIN_POLL_INTERVAL)
+            now = time.time()
+            for task in list(running):
+                migration = objects.Migration.get_by_id(context,
+                                                        task.migration.id)
+                if migration.status in self.DRAIN_FINISHED_STATUSES:
+                    LOG.info('Live migration to host %(dest)s %(status)s',
+                             {'dest': task.destination,
+                              'status': migration.status},
+                             instance=task.instance)
+                elif now >= deadlines[task]:
+                    LOG.warning('Live migration to host %(dest)s did not '
+                                'complete within %(timeout)d seconds, it is '
+                                'no longer waited for',
+                                {'dest': task.destination,
+                                 'timeout': timeout},
+                                instance=task.instance)
+                else:
+                    continue
+                running.remove(task)
+                per_destination[task.destination] -= 1
+            for task in list(ready):
+                if now >= deadlines[task]:
+                    LOG.warning('Live migration did not start within '
+                                '%d seconds, it is cancelled', timeout,
+                                instance=task.instance)
+                    ready.remove(task)
+                    self._reset_drain_task(task)
+
     def _build_live_migrate_task(self, context, instance, destination,
                                  block_migration, disk_over_commit, migration,
                                  request_spec=None):
@@ -195,6 +195,8 @@ class ConductorAPI(object):
     that they can handle the version_cap being set to 3.0.
 
     * Remove provider_fw_rule_get_all()
+
+    * 3.1  - Added service_heartbeat()
     """
 
     VERSION_ALIASES = {
@@ -249,6 +251,13 @@ class ConductorAPI(object):
         return cctxt.call(context, 'object_backport_versions', objinst=objinst,
                           object_versions=object_versions)
 
+    def can_send_service_heartbeat(self):
+        return self.client.can_send_version('3.1')
+
+    def service_heartbeat(self, context, service_id):
+        cctxt = self.client.prepare(version='3.1')
+        return cctxt.call(context, 'service_heartbeat', service_id=service_id)
+
 
 @profiler.trace_cls("rpc")
 class ComputeTaskAPI(object):
@@ -274,6 +283,7 @@ class ComputeTaskAPI(object):
     1.15 - Added live_migrate_instance
     1.16 - Added schedule_and_build_instances
     1.17 - Added tags to schedule_and_build_instances()
+    1.18 - Added drain_host
     """
 
     def __init__(self):
@@ -295,6 +305,15 @@ class ComputeTaskAPI(object):
         cctxt = self.client.prepare(version=version)
         cctxt.cast(context, 'live_migrate_instance', **kw)
 
+    def drain_host(self, context, host, block_migration, disk_over_commit):
+        kw = {'host': host,
+              'block_migration': block_migration,
+              'disk_over_commit': disk_over_commit,
+              }
+        version = '1.18'
+        cctxt = self.client.prepare(version=version)
+        cctxt.cast(context, 'drain_host', **kw)
+
     # TODO(melwitt): Remove the reservations parameter in version 2.0 of the
     # RPC API.
     def migrate_server(self, context, instance, scheduler_hint, live, rebuild,
@@ -10,6 +10,8 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import collections
+
 from oslo_log import log as logging
 import oslo_messaging as messaging
 import six
@@ -34,6 +36,78 @@ def should_do_migration_allocation(context):
     return minver >= 25
 
 
+def _batch_key(task):
+    """Returns what has to be shared by tasks scheduled together
+
+    The scheduler picks the destinations of several instances from a single
+    request spec, so only instances which have the same flavor, image,
+    project, availability zone and server group can be scheduled together.
+    Instances with NUMA topologies, PCI requests or scheduler hints are
+    scheduled on their own.
+    """
+    instance = task.instance
+    request_spec = task.request_spec
+    if (instance.numa_topology or
+            (instance.pci_requests and instance.pci_requests.requests) or
+            (request_spec and request_spec.obj_attr_is_set('scheduler_hints')
+             and request_spec.scheduler_hints)):
+        return instance.uuid
+    group = None
+    if (request_spec and request_spec.obj_attr_is_set('instance_group') and
+            request_spec.instance_group):
+        group = request_spec.instance_group.uuid
+    return (instance.flavor.flavorid, instance.image_ref,
+            instance.project_id, instance.availability_zone, group)
+
+
+def select_destinations_for_tasks(context, scheduler_client, tasks,
+                                  busy_hosts=None):
+    """Picks the destinations of several live migrations at once
+
+    The tasks are grouped by what the scheduler needs to know about their
+    instances, and the destinations of the instances of each group are
+    picked with a single call to the scheduler, which spreads them across
+    hosts and claims resources on them as it does for the instances of a
+    multi-create request. The destination picked for each task is stored
+    in its selection attribute, to be tried first when it is executed.
+
+    The tasks whose destination cannot be picked that way are left to ask
+    the scheduler for their destination when they are executed, with the
+    hosts in their ignore_hosts attribute excluded.
+
+    :param context: nova.context.RequestContext targeted at the cell of the
+        instances
+    :param scheduler_client: nova.scheduler.client.SchedulerClient
+    :param tasks: list of prepared LiveMigrationTask, of instances on the
+        same host
+    :param busy_hosts: list of host names which cannot be picked as the
+        destination of any of the tasks, besides their source host
+    """
+    groups = collections.OrderedDict()
+    for task in tasks:
+        groups.setdefault(_batch_key(task), []).append(task)
+
+    for group in groups.values():
+        attempted_hosts = [group[0].source] + list(busy_hosts or [])
+        request_spec = group[0]._get_request_spec_for_select_destinations(
+            attempted_hosts).obj_clone()
+        request_spec.ignore_hosts = attempted_hosts
+        request_spec.num_instances = len(group)
+        instance_uuids = [task.instance.uuid for task in group]
+        try:
+            selection_lists = scheduler_client.select_destinations(
+                context, request_spec, instance_uuids,
+                return_objects=True, return_alternates=False)
+        except (exception.NoValidHost, messaging.RemoteError) as ex:
+            LOG.info('Unable to pick the destinations of instances '
+                     '%(instances)s at once, they will be picked one by '
+                     'one: %(error)s',
+                     {'instances': ', '.join(instance_uuids), 'error': ex})
+            continue
+        for task, selections in zip(group, selection_lists):
+            task.selection = selections[0]
+
+
 class LiveMigrationTask(base.TaskBase):
     def __init__(self, context, instance, destination,
                  block_migration, disk_over_commit, migration, compute_rpcapi,
@@ -50,10 +124,27 @@ class LiveMigrationTask(base.TaskBase):
         self.servicegroup_api = servicegroup_api
         self.scheduler_client = scheduler_client
         self.request_spec = request_spec
+        # The destination picked by the scheduler along with those of other
+        # instances live migrated at the same time, see
+        # select_destinations_for_tasks()
+        self.selection = None
+        # The hosts the scheduler must not pick as the destination, besides
+        # the source host and the hosts which did not pass the checks
+        self.ignore_hosts = []
         self._source_cn = None
         self._held_allocations = None
+        self._prepared = False
 
-    def _execute(self):
+    def prepare(self):
+        """Checks the instance can be live migrated off its host
+
+        This also moves the allocations of the instance against its source
+        node to the migration, so that the scheduler can claim resources on
+        the destination for the instance. It is run by execute() if it was
+        not already.
+        """
+        if self._prepared:
+            return
         self._check_instance_is_active()
         self._check_host_is_up(self.source)
 
@@ -66,6 +157,10 @@ class LiveMigrationTask(base.TaskBase):
                 migrate.replace_allocation_with_migration(self.context,
                                                           self.instance,
                                                           self.migration))
+        self._prepared = True
+
+    def _execute(self):
+        self.prepare()
 
         if not self.destination:
             # Either no host was specified in the API request and the user
@@ -311,23 +406,15 @@ class LiveMigrationTask(base.TaskBase):
         host = None
         while host is None:
             self._check_not_over_max_retries(attempted_hosts)
-            request_spec.ignore_hosts = attempted_hosts
-            try:
-                selection_lists = self.scheduler_client.select_destinations(
-                        self.context, request_spec, [self.instance.uuid],
-                        return_objects=True, return_alternates=False)
-                # We only need the first item in the first list, as there is
-                # only one instance, and we don't care about any alternates.
-                selection = selection_lists[0][0]
-                host = selection.service_host
-            except messaging.RemoteError as ex:
-                # TODO(ShaoHe Feng) There maybe multi-scheduler, and the
-                # scheduling algorithm is R-R, we can let other scheduler try.
-                # Note(ShaoHe Feng) There are types of RemoteError, such as
-                # NoSuchMethod, UnsupportedVersion, we can distinguish it by
-                # ex.exc_type.
-                raise exception.MigrationSchedulerRPCError(
-                    reason=six.text_type(ex))
+            request_spec.ignore_hosts = attempted_hosts + self.ignore_hosts
+            if self.selection is not None:
+                # The scheduler already picked a destination and claimed
+                # resources on it, only try the scheduler again if it does
+                # not pass the checks below.
+                selection, self.selection = self.selection, None
+            else:
+                selection = self._select_destination(request_spec)
+            host = selection.service_host
             try:
                 self._check_compatible_with_source_hypervisor(host)
                 self._call_livem_checks_on_host(host)
@@ -342,6 +429,23 @@ class LiveMigrationTask(base.TaskBase):
                 host = None
         return selection.service_host, selection.nodename
 
+    def _select_destination(self, request_spec):
+        try:
+            selection_lists = self.scheduler_client.select_destinations(
+                    self.context, request_spec, [self.instance.uuid],
+                    return_objects=True, return_alternates=False)
+        except messaging.RemoteError as ex:
+            # TODO(ShaoHe Feng) There maybe multi-scheduler, and the
+            # scheduling algorithm is R-R, we can let other scheduler try.
+            # Note(ShaoHe Feng) There are types of RemoteError, such as
+            # NoSuchMethod, UnsupportedVersion, we can distinguish it by
+            # ex.exc_type.
+            raise exception.MigrationSchedulerRPCError(
+                reason=six.text_type(ex))
+        # We only need the first item in the first list, as there is
+        # only one instance, and we don't care about any alternates.
+        return selection_lists[0][0]
+
     def _remove_host_allocations(self, host, node):
         """Removes instance allocations against the given host from Placement
 
@@ -637,6 +637,66 @@ Possible values:
 
 * Any positive integer representing a build failure count.
 * Zero to never auto-disable.
+"""),
+    cfg.IntOpt('action_event_flush_interval',
+        default=0,
+        min=0,
+        help="""
+Interval in seconds at which buffered instance action events are written.
+
+By default nova-compute records the start and the finish of every instance
+action event (as seen in ``os-instance-actions``) with a separate, synchronous
+call to nova-conductor. When this option is set, the events are queued
+locally instead: a start and finish pair which happen within the same interval
+is coalesced into a single record, and the queue is written in order through
+one conductor call per batch. The queue is also flushed when it reaches
+``action_event_batch_size`` entries and when the service stops.
+
+This considerably reduces conductor load during mass operations such as
+host evacuation, at the cost of events becoming visible in the API up to
+this many seconds later.
+
+Possible values:
+
+* 0: Disabled, events are written synchronously (default).
+* Any positive integer representing the flush interval in seconds.
+
+Related options:
+
+* ``[compute] action_event_batch_size``
+"""),
+    cfg.IntOpt('action_event_batch_size',
+        default=100,
+        min=1,
+        help="""
+Maximum number of buffered instance action events written in one batch.
+
+Once this many events are queued a flush is triggered without waiting for
+the next ``action_event_flush_interval``. Only used when
+``action_event_flush_interval`` is set.
+
+Possible values:
+
+* Any positive integer representing a number of events.
+
+Related options:
+
+* ``[compute] action_event_flush_interval``
+"""),
+    cfg.BoolOpt('compact_rpc_objects',
+        default=False,
+        help="""
+Send objects to nova-compute in the compact serialization format.
+
+The compact format sends the name, version and field names of each object
+class once per message instead of once per object, which noticeably shrinks
+messages carrying instances with their flavor, NUMA topology, PCI requests
+and network info, and makes them cheaper to encode and decode.
+
+This option applies to the services sending messages to nova-compute, such
+as nova-api and nova-conductor. It only takes effect once all nova-compute
+services support compute RPC API version 4.19, as per ``[upgrade_levels]
+compute``; all services always accept messages in either format.
 """),
 ]
 
@@ -44,6 +44,59 @@ Topic exchange name on which conductor nodes listen.
         help="""
 Number of workers for OpenStack Conductor service. The default will be the
 number of CPUs available.
+"""),
+    cfg.IntOpt(
+        'drain_max_concurrent_migrations',
+        default=4,
+        min=1,
+        help="""
+Maximum number of live migrations run at once when draining a host.
+
+When all the instances of a host are live migrated off it at once, their
+destinations are picked together and their live migrations are started as
+earlier ones complete, so that no more than this number of them run at the
+same time off the host.
+
+Related options:
+
+* drain_max_concurrent_migrations_per_destination
+* drain_migration_timeout
+* [DEFAULT]/max_concurrent_live_migrations
+"""),
+    cfg.IntOpt(
+        'drain_max_concurrent_migrations_per_destination',
+        default=1,
+        min=1,
+        help="""
+Maximum number of live migrations run at once to the same destination host
+when draining a host.
+
+This keeps a host picked as the destination of several of the instances of
+the drained host from receiving all of them at once.
+
+Related options:
+
+* drain_max_concurrent_migrations
+"""),
+    cfg.IntOpt(
+        'drain_migration_timeout',
+        default=3600,
+        min=1,
+        help="""
+Number of seconds the conductor waits for each live migration when draining
+a host.
+
+An instance prepared for live migration which could not be started within
+this time, because its destination stayed busy, has its live migration
+cancelled and is left on the drained host. A live migration which did not
+complete within this time is left to the compute services and the conductor
+stops waiting for it, so that a stuck live migration does not hold up the
+drain forever.
+
+Related options:
+
+* drain_max_concurrent_migrations
+* drain_max_concurrent_migrations_per_destination
 """),
 ]
 
@@ -40,6 +40,60 @@ values other than host are allowed in the origin header.
 Possible values:
 
 * A list where each element is an allowed origin hostnames, else an empty list
+"""),
+    cfg.BoolOpt('proxy_use_greenthreads',
+        default=False,
+        help="""
+Serve the connections of the console websocket proxies in green threads.
+
+By default, the console websocket proxies fork a process for each connection.
+When this is enabled, all the connections are served by green threads of a
+single process instead, which uses much less memory and CPU for many
+concurrent connections.
+
+Related options:
+
+* proxy_max_connections
+"""),
+    cfg.IntOpt('proxy_max_connections',
+        default=1000,
+        min=1,
+        help="""
+Maximum number of connections served at once by a console websocket proxy
+serving them in green threads.
+
+Further connections wait to be served until earlier ones are closed.
+
+Related options:
+
+* proxy_use_greenthreads
+"""),
+    cfg.IntOpt('token_cache_ttl',
+        default=0,
+        min=0,
+        help="""
+Number of seconds the console websocket proxies cache the console tokens they
+validated.
+
+When this is set, the connection information of a console token is reused
+for further connections using the same token for this number of seconds, or
+until the token expires if that comes first, instead of validating the token
+again with the nova-consoleauth service. Note that a token then remains
+usable for that long after it is deleted, for instance because the instance
+was deleted.
+
+This is only useful with proxy_use_greenthreads, as otherwise each connection
+is served by its own process.
+
+Possible values:
+
+* 0: Disables the cache, each connection validates its token
+* Any positive integer in seconds
+
+Related options:
+
+* proxy_use_greenthreads
+* [consoleauth]/token_ttl
 """),
 ]
 
@@ -79,6 +79,20 @@ Related options:
         min=0,
         help='Timeout (seconds) to wait for node serial console state '
              'changed. Set to 0 to disable timeout.'),
+    cfg.BoolOpt(
+        'incremental_node_cache',
+        default=False,
+        help="""
+Refresh the cache of the Ironic nodes incrementally.
+
+The compute service refreshes its cache of the Ironic nodes each time the
+resources of its nodes are updated. By default it lists all the fields of
+the nodes it needs each time. When this is enabled, only the UUID and the
+time of the last update of each node are listed, and only the nodes updated
+since the previous refresh are retrieved again, which greatly reduces the
+load on the Ironic API of deployments with many nodes. All the nodes are
+listed again when more than a few of them changed.
+"""),
 ]
 
 deprecated_opts = {
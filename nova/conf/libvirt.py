@@ -436,6 +436,27 @@ of libvirt and QEMU in use.
 
 Related options:
 
+    * live_migration_permit_post_copy
+"""),
+    cfg.BoolOpt('live_migration_adaptive_tuning',
+                default=False,
+                help="""
+This option makes nova tune on-going live migrations from the progress they
+are observed to make.
+
+The rate at which data is transferred and the rate at which the guest dirties
+its memory are estimated from the statistics of the migration job. The max
+downtime is then raised as soon as the remaining data could be transferred
+within it, up to the ``live_migration_downtime`` value, rather than only
+following the steps set by ``live_migration_downtime_steps`` and
+``live_migration_downtime_delay``. When post-copy is permitted, the migration
+is switched to post-copy as soon as the guest is observed to dirty its memory
+about as fast as it is transferred after the first memory copy iteration,
+rather than when an iteration makes less than 10% progress.
+
+Related options:
+
+    * live_migration_downtime
     * live_migration_permit_post_copy
 """),
     cfg.StrOpt('snapshot_image_format',
@@ -622,6 +643,22 @@ Possible values:
   The supported events list can be found in
   https://libvirt.org/html/libvirt-libvirt-domain.html ,
   which you may need to search key words ``VIR_PERF_PARAM_*``
+"""),
+    cfg.BoolOpt('guest_config_cache',
+                default=False,
+                help="""
+Cache the parsed configuration of the guests.
+
+The periodic tasks of the compute service, such as the one computing the disk
+over-commit of the host, read and parse the XML description of every guest of
+the host each time they run. When this is enabled, the configuration parsed
+from the XML description of a guest is kept until a libvirt event signals
+that it changed, or nova changes it itself, which saves most of this work on
+hosts running many guests.
+
+Changes to the configuration of a guest which libvirt does not send events
+for, such as changes done outside of nova on hosts whose libvirt does not
+send device events, may not be seen by nova until the guest is restarted.
 """),
 ]
 
@@ -873,6 +873,30 @@ Possible values:
 Related options:
 
 * iptables_top_regex
+"""),
+    cfg.BoolOpt("iptables_incremental_apply",
+        default=False,
+        deprecated_for_removal=True,
+        deprecated_since="17.0.0",
+        deprecated_reason="""
+nova-network is deprecated, as are any related configuration options.
+""",
+        help="""
+When set to True, only the chains which changed since the rules were last
+applied are sent to iptables-restore, using its --noflush mode, instead of
+saving, rewriting and restoring the whole of the iptables tables each time the
+rules change. The whole tables are still rewritten the first time the rules
+are applied, when rules outside of the chains owned by nova have to change and
+after any error applying the rules.
+
+This greatly reduces the cost of refreshing the rules of a single instance on
+hosts with many instances, but assumes that no other tool changes the chains
+owned by nova.
+
+Related options:
+
+* ``iptables_top_regex``
+* ``iptables_bottom_regex``
 """),
     cfg.StrOpt("iptables_drop_action",
         default="DROP",
@@ -1181,6 +1205,33 @@ Related options:
 * ``firewall_driver``: This must be set to
   ``nova.virt.libvirt.firewall.IptablesFirewallDriver`` to ensure the
   libvirt firewall driver is enabled.
+"""),
+    cfg.FloatOpt('firewall_refresh_delay',
+        default=0.0,
+        min=0.0,
+        deprecated_for_removal=True,
+        deprecated_since='17.0.0',
+        deprecated_reason="""
+nova-network is deprecated, as are any related configuration options.
+""",
+        help="""
+Number of seconds the iptables firewall driver waits for further security
+group refreshes before doing a requested one.
+
+Changing a security group used by many instances causes a refresh to be
+requested for each of them. When this is greater than 0, the refreshes
+requested within that many seconds of each other are done together: the rules
+of each affected instance are rebuilt once and all of them are applied at
+once. A refresh request still only returns once the refresh is done.
+
+Possible values:
+
+* 0: Refreshes are done as soon as they are requested
+* A positive number of seconds
+
+Related options:
+
+* ``firewall_driver``
 """),
 ]
 
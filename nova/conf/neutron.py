@@ -76,6 +76,19 @@ Neutron for extensions.  After this number of seconds the next time Nova
 needs to create a resource in Neutron it will requery Neutron for the
 extensions that it has loaded.  Setting value to 0 will refresh the
 extensions with no wait.
+"""),
+    cfg.IntOpt('max_concurrent_port_operations',
+         default=1,
+         min=1,
+         help="""
+Maximum number of ports created or updated concurrently when allocating the
+network of an instance.
+
+With the default of 1, the ports requested for an instance are created and
+then updated one after the other. Higher values let instances with many
+network interfaces get their networking allocated in fewer round trips to
+Neutron: when more than one port has to be created they are created with a
+single bulk request, and up to this number of ports are updated at once.
 """),
 ]
 
@@ -128,7 +128,47 @@ If enabled, include block device information in the versioned notification
 payload. Sending block device information is disabled by default as providing
 that information can incur some overhead on the system since the information
 may need to be loaded from the database.
-""")
+"""),
+    cfg.IntOpt(
+        'notification_queue_size',
+        default=0,
+        min=0,
+        help="""
+Number of versioned notifications queued to be sent in the background.
+
+When this is set, the versioned notifications are queued and built and sent
+by a background green thread of the service, rather than by the operation
+which emits them. The compute.instance.update notifications in particular are
+then built from a copy of the instance. Notifications still queued when the
+service stops are lost.
+
+Possible values:
+
+* 0: Disables the queue, the versioned notifications are built and sent
+  synchronously (Default)
+* Any positive integer
+
+Related options:
+
+* notification_queue_overflow
+"""),
+    cfg.StrOpt(
+        'notification_queue_overflow',
+        default='block',
+        choices=['block', 'drop'],
+        help="""
+What to do with a versioned notification emitted while the notification
+queue is full.
+
+Possible values:
+
+* block: Wait for room in the queue (Default)
+* drop: Drop the notification and log a warning
+
+Related options:
+
+* notification_queue_size
+"""),
 ]
 
 
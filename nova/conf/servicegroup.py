@@ -38,6 +38,36 @@ Possible Values:
 Related Options:
 
     * service_down_time (maximum time since last check-in for up service)
+"""),
+    cfg.IntOpt('heartbeat_batch_interval',
+        default=0,
+        min=0,
+        help="""
+Number of seconds the state reports of services are aggregated for before
+they are written to the database.
+
+This is only used by the database ServiceGroup driver. When this is set on
+the services which report their state through nova-conductor, such as
+nova-compute, they send their state reports to nova-conductor instead of
+saving their whole service record. When this is set on nova-conductor, the
+state reports it receives within this number of seconds are written to the
+database together, updating only the report count and the last time each
+service was seen up.
+
+The sum of this and report_interval should be well below service_down_time,
+otherwise services may be seen as down while their state reports are
+waiting to be written.
+
+Possible Values:
+
+    * 0: Disables the aggregation, each state report saves the service
+      record
+    * Any positive integer in seconds
+
+Related Options:
+
+    * report_interval
+    * service_down_time
 """),
 ]
 
@@ -277,6 +277,27 @@ host or they have a shared file system.
 Possible values:
 
 * Any string representing the cache prefix to the folder
+"""),
+    cfg.IntOpt('vm_state_cache_ttl',
+               min=0,
+               default=0,
+               help="""
+Number of seconds the power state of the instances is cached for.
+
+When this is set, the power state and connection state of all the VMs in
+the cluster are retrieved by a single query and kept for this number of
+seconds. The instance information requested by the periodic power state
+sync and the list of instances are answered from it, instead of each of
+them querying vCenter. The state of an instance is retrieved again
+after nova performs an operation on it.
+
+This should be lower than [DEFAULT]/sync_power_state_interval, so that the
+power state sync sees recent states.
+
+Possible values:
+
+* 0: Disables the cache, the state of each instance is queried when needed
+* Any positive integer in seconds
 """)
 ]
 
@@ -18,11 +18,13 @@ Websocket proxy that is compatible with OpenStack Nova.
 Leverages websockify.py by Joel Martin
 '''
 
+import errno
 import socket
 import sys
+import time
 
+import eventlet
 from oslo_log import log as logging
-import six
 from six.moves import http_cookies as Cookie
 import six.moves.urllib.parse as urlparse
 import websockify
@@ -37,6 +39,10 @@ LOG = logging.getLogger(__name__)
 
 CONF = nova.conf.CONF
 
+# Seconds waited before accepting connections again after failing to accept
+# one
+ACCEPT_RETRY_INTERVAL = 0.1
+
 
 class TenantSock(object):
     """A socket wrapper for communicating with the tenant.
@@ -48,7 +54,7 @@ class TenantSock(object):
 
     def __init__(self, reqhandler):
         self.reqhandler = reqhandler
-        self.queue = []
+        self.queue = bytearray()
 
     def recv(self, cnt):
         # NB(sross): it's ok to block here because we know
@@ -56,30 +62,23 @@ class TenantSock(object):
         while len(self.queue) < cnt:
             # new_frames looks like ['abc', 'def']
             new_frames, closed = self.reqhandler.recv_frames()
-            # flatten frames onto queue
+            # NOTE: The frames are appended to the buffer as they are, rather
+            # than byte by byte.
             for frame in new_frames:
-                # The socket returns (byte) strings in Python 2...
-                if six.PY2:
-                    self.queue.extend(frame)
-                # ...and integers in Python 3. For the Python 3 case, we need
-                # to convert these to characters using 'chr' and then, as this
-                # returns unicode, convert the result to byte strings.
-                else:
-                    self.queue.extend(
-                        [six.binary_type(chr(c), 'ascii') for c in frame])
+                self.queue.extend(frame)
 
             if closed:
                 break
 
-        popped = self.queue[0:cnt]
-        del self.queue[0:cnt]
-        return b''.join(popped)
+        popped = bytes(self.queue[:cnt])
+        del self.queue[:cnt]
+        return popped
 
     def sendall(self, data):
         self.reqhandler.send_frames([data])
 
     def finish_up(self):
-        self.reqhandler.send_frames([b''.join([self.queue])])
+        self.reqhandler.send_frames([bytes(self.queue)])
 
     def close(self):
         self.finish_up()
@@ -110,12 +109,43 @@ class NovaProxyRequestHandlerBase(object):
 
         return origin_proto in expected_protos
 
+    def _check_token(self, token):
+        """Returns the connection info of a console token.
+
+        With [console]/token_cache_ttl, the connection info of the tokens
+        validated by the nova-consoleauth service is cached.
+        """
+        cache_ttl = CONF.console.token_cache_ttl
+        token_cache = self.server.token_cache
+        now = time.time()
+        if cache_ttl:
+            expires, connect_info = token_cache.get(token, (0, None))
+            if expires > now:
+                return connect_info
+
+        ctxt = context.get_admin_context()
+        rpcapi = consoleauth_rpcapi.ConsoleAuthAPI()
+        connect_info = rpcapi.check_token(ctxt, token=token)
+
+        if connect_info and cache_ttl:
+            # Drop the expired tokens
+            for cached_token, (expires, _info) in list(token_cache.items()):
+                if expires <= now:
+                    del token_cache[cached_token]
+            expires = now + cache_ttl
+            if connect_info.get('last_activity_at'):
+                expires = min(expires, connect_info['last_activity_at'] +
+                              CONF.consoleauth.token_ttl)
+            token_cache[token] = (expires, connect_info)
+        return connect_info
+
     def new_websocket_client(self):
         """Called after a new WebSocket connection has been established."""
-        # Reopen the eventlet hub to make sure we don't share an epoll
-        # fd with parent and/or siblings, which would be bad
-        from eventlet import hubs
-        hubs.use_hub()
+        if not CONF.console.proxy_use_greenthreads:
+            # Reopen the eventlet hub to make sure we don't share an epoll
+            # fd with parent and/or siblings, which would be bad
+            from eventlet import hubs
+            hubs.use_hub()
 
         # The nova expected behavior is to have token
         # passed to the method GET of the request
@@ -149,9 +179,7 @@ class NovaProxyRequestHandlerBase(object):
                         if 'token' in cookie:
                             token = cookie['token'].value
 
-        ctxt = context.get_admin_context()
-        rpcapi = consoleauth_rpcapi.ConsoleAuthAPI()
-        connect_info = rpcapi.check_token(ctxt, token=token)
+        connect_info = self._check_token(token)
 
         if not connect_info:
             raise exception.InvalidToken(token=token)
@@ -164,8 +192,10 @@ class NovaProxyRequestHandlerBase(object):
                 expected_origin_hostname = e.split(']')[0][1:]
             else:
                 expected_origin_hostname = e.split(':')[0]
-        expected_origin_hostnames = CONF.console.allowed_origins
-        expected_origin_hostnames.append(expected_origin_hostname)
+        # NOTE: The option value is not modified, the host of this request
+        # must not be allowed for the next ones served by this process.
+        expected_origin_hostnames = (list(CONF.console.allowed_origins) +
+                                     [expected_origin_hostname])
         origin_url = self.headers.get('Origin')
         # missing origin header indicates non-browser client which is OK
         if origin_url is not None:
@@ -253,8 +283,55 @@ class NovaWebSocketProxy(websockify.WebSocketProxy):
         with the compute node.
         """
         self.security_proxy = kwargs.pop('security_proxy', None)
+        # The expiry time and connection info of console tokens, keyed by
+        # token, with [console]/token_cache_ttl
+        self.token_cache = {}
         super(NovaWebSocketProxy, self).__init__(*args, **kwargs)
 
+    def start_server(self):
+        if not CONF.console.proxy_use_greenthreads:
+            return super(NovaWebSocketProxy, self).start_server()
+
+        lsock = self.socket(self.listen_host, self.listen_port, False,
+                            self.prefer_ipv6,
+                            tcp_keepalive=self.tcp_keepalive,
+                            tcp_keepcnt=self.tcp_keepcnt,
+                            tcp_keepidle=self.tcp_keepidle,
+                            tcp_keepintvl=self.tcp_keepintvl)
+        if self.daemon:
+            keepfd = self.get_log_fd()
+            keepfd.append(lsock.fileno())
+            self.daemonize(keepfd=keepfd, chdir=self.web)
+        self.started()
+
+        # NOTE: Rather than forking a process for each connection, each
+        # connection is served by a green thread of this process.
+        pool = eventlet.GreenPool(CONF.console.proxy_max_connections)
+        try:
+            while True:
+                try:
+                    startsock, address = lsock.accept()
+                except socket.error as exc:
+                    # NOTE: The proxy keeps serving the clients it has
+                    # when it runs out of file descriptors for instance,
+                    # and accepts new ones again once some are closed.
+                    if exc.errno != errno.EINTR:
+                        LOG.warning('Failed to accept a connection: %s', exc)
+                        eventlet.sleep(ACCEPT_RETRY_INTERVAL)
+                    continue
+                self.handler_id += 1
+                pool.spawn_n(self._serve_client, startsock, address)
+        except (KeyboardInterrupt, SystemExit):
+            self.msg("In exit")
+        finally:
+            lsock.close()
+
+    def _serve_client(self, startsock, address):
+        try:
+            self.top_new_client(startsock, address)
+        finally:
+            startsock.close()
+
     @staticmethod
     def get_logger():
         return LOG
@@ -139,6 +139,7 @@ class RequestContext(context.RequestContext):
         self.mq_connection = None
 
         self.user_auth_plugin = user_auth_plugin
+        self.policy_memo = policy.ResultMemo()
         if self.is_admin is None:
             self.is_admin = policy.check_is_admin(self)
 
@@ -217,6 +218,7 @@ class RequestContext(context.RequestContext):
         # without changes
         context.roles = copy.deepcopy(self.roles)
         context.is_admin = True
+        context.policy_memo = policy.ResultMemo()
 
         if 'admin' not in context.roles:
             context.roles.append('admin')
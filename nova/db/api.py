@@ -189,6 +189,15 @@ def service_update(context, service_id, values):
     return IMPL.service_update(context, service_id, values)
 
 
+def service_heartbeat_all(context, report_counts):
+    """Record state reports of services.
+
+    :param report_counts: The number of state reports received from each
+                          service, keyed by service ID
+    """
+    return IMPL.service_heartbeat_all(context, report_counts)
+
+
 ###################
 
 
@@ -336,6 +345,18 @@ def compute_node_update(context, compute_id, values):
     return IMPL.compute_node_update(context, compute_id, values)
 
 
+def compute_node_set_mapped(context, compute_ids, mapped):
+    """Set the mapped value of a list of compute nodes.
+
+    :param context: The security context
+    :param compute_ids: IDs of the compute nodes
+    :param mapped: The mapped value to set
+
+    :returns: The number of compute nodes updated
+    """
+    return IMPL.compute_node_set_mapped(context, compute_ids, mapped)
+
+
 def compute_node_delete(context, compute_id):
     """Delete a compute node from the database.
 
@@ -1733,6 +1754,28 @@ def bw_usage_update(context, uuid, mac, start_period, bw_in, bw_out,
     return rv
 
 
+def bw_usage_update_all(context, bw_usages, update_cells=True):
+    """Update the cached bandwidth usage of several instance networks at once.
+
+    :param bw_usages: list of dicts of the arguments of bw_usage_update for
+                      each network
+    :returns: the updated records, in the order of bw_usages
+    """
+    rv = IMPL.bw_usage_update_all(context, bw_usages)
+    if update_cells:
+        for bw_usage in bw_usages:
+            try:
+                cells_rpcapi.CellsAPI().bw_usage_update_at_top(context,
+                        bw_usage['uuid'], bw_usage['mac'],
+                        bw_usage['start_period'], bw_usage['bw_in'],
+                        bw_usage['bw_out'], bw_usage['last_ctr_in'],
+                        bw_usage['last_ctr_out'],
+                        bw_usage.get('last_refreshed'))
+            except Exception:
+                LOG.exception("Failed to notify cells of bw_usage update")
+    return rv
+
+
 ###################
 
 
@@ -1754,6 +1797,17 @@ def vol_usage_update(context, id, rd_req, rd_bytes, wr_req, wr_bytes,
                                  update_totals=update_totals)
 
 
+def vol_usage_update_all(context, vol_usages, update_totals=False):
+    """Update the cached usage of several volumes at once
+
+       :param vol_usages: list of dicts of the arguments of vol_usage_update
+                          for each volume
+       :returns: the updated records, in the order of vol_usages
+    """
+    return IMPL.vol_usage_update_all(context, vol_usages,
+                                     update_totals=update_totals)
+
+
 ###################
 
 
@@ -1906,6 +1960,11 @@ def action_event_finish(context, values):
     return IMPL.action_event_finish(context, values)
 
 
+def action_events_record(context, events):
+    """Record a batch of instance action event starts and finishes."""
+    return IMPL.action_events_record(context, events)
+
+
 def action_events_get(context, action_id):
     """Get the events by action id."""
     return IMPL.action_events_get(context, action_id)
@@ -591,6 +591,22 @@ def service_update(context, service_id, values):
     return service_ref
 
 
+@pick_context_manager_writer
+def service_heartbeat_all(context, report_counts):
+    now = timeutils.utcnow()
+    service_ids_by_count = collections.defaultdict(list)
+    for service_id, count in report_counts.items():
+        service_ids_by_count[count].append(service_id)
+    # NOTE: One update is made per number of state reports rather than per
+    # service, which is a single update when each service reported once.
+    for count, service_ids in service_ids_by_count.items():
+        model_query(context, models.Service).\
+            filter(models.Service.id.in_(service_ids)).\
+            update({'report_count': models.Service.report_count + count,
+                    'last_seen_up': now},
+                   synchronize_session=False)
+
+
 ###################
 
 
@@ -740,6 +756,15 @@ def compute_node_update(context, compute_id, values):
     return compute_ref
 
 
+@pick_context_manager_writer
+def compute_node_set_mapped(context, compute_ids, mapped):
+    if not compute_ids:
+        return 0
+    return model_query(context, models.ComputeNode).\
+        filter(models.ComputeNode.id.in_(compute_ids)).\
+        update({'mapped': mapped}, synchronize_session=False)
+
+
 @pick_context_manager_writer
 def compute_node_delete(context, compute_id):
     """Delete a ComputeNode record."""
@@ -4389,19 +4414,31 @@ def migration_get_all_by_filters(context, filters):
     return query.all()
 
 
-@pick_context_manager_writer
-def migration_migrate_to_uuid(context, count):
-    # Avoid circular import
-    from nova import objects
+def _generate_missing_uuids(context, model, count):
+    """Set a generated uuid on up to count rows of model which have none.
+
+    The uuids are set with a single executemany UPDATE rather than by
+    loading and saving each row, which is what makes the backfill of large
+    tables bearable. Rows which got a uuid from someone else in the meantime
+    are left alone.
+    """
+    ids = [row.id for row in model_query(context, model, (model.id,)).
+           filter_by(uuid=None).limit(count)]
+    if ids:
+        table = model.__table__
+        stmt = table.update().\
+            where(table.c.id == sql.bindparam('_id')).\
+            where(table.c.uuid == null()).\
+            values(uuid=sql.bindparam('_uuid'))
+        context.session.execute(
+            stmt, [{'_id': id_, '_uuid': uuidutils.generate_uuid()}
+                   for id_ in ids])
+    return len(ids)
 
-    db_migrations = model_query(context, models.Migration).filter_by(
-        uuid=None).limit(count).all()
 
-    done = 0
-    for db_migration in db_migrations:
-        mig = objects.Migration(context)
-        mig._from_db_object(context, mig, db_migration)
-        done += 1
+@pick_context_manager_writer
+def migration_migrate_to_uuid(context, count):
+    done = _generate_missing_uuids(context, models.Migration, count)
 
     # We don't have any situation where we can (detectably) not
     # migrate a thing, so report anything that matched as "completed".
@@ -5074,12 +5111,8 @@ def bw_usage_get_by_uuids(context, uuids, start_period):
     )
 
 
-@require_context
-@oslo_db_api.wrap_db_retry(max_retries=5, retry_on_deadlock=True)
-@pick_context_manager_writer
-def bw_usage_update(context, uuid, mac, start_period, bw_in, bw_out,
-                    last_ctr_in, last_ctr_out, last_refreshed=None):
-
+def _bw_usage_update(context, uuid, mac, start_period, bw_in, bw_out,
+                     last_ctr_in, last_ctr_out, last_refreshed=None):
     if last_refreshed is None:
         last_refreshed = timeutils.utcnow()
 
@@ -5123,6 +5156,23 @@ def bw_usage_update(context, uuid, mac, start_period, bw_in, bw_out,
     return bwusage
 
 
+@require_context
+@oslo_db_api.wrap_db_retry(max_retries=5, retry_on_deadlock=True)
+@pick_context_manager_writer
+def bw_usage_update(context, uuid, mac, start_period, bw_in, bw_out,
+                    last_ctr_in, last_ctr_out, last_refreshed=None):
+    return _bw_usage_update(context, uuid, mac, start_period, bw_in, bw_out,
+                            last_ctr_in, last_ctr_out,
+                            last_refreshed=last_refreshed)
+
+
+@require_context
+@oslo_db_api.wrap_db_retry(max_retries=5, retry_on_deadlock=True)
+@pick_context_manager_writer
+def bw_usage_update_all(context, bw_usages):
+    return [_bw_usage_update(context, **bw_usage) for bw_usage in bw_usages]
+
+
 ####################
 
 
@@ -5138,12 +5188,9 @@ def vol_get_usage_by_time(context, begin):
                               )).all()
 
 
-@require_context
-@pick_context_manager_writer
-def vol_usage_update(context, id, rd_req, rd_bytes, wr_req, wr_bytes,
-                     instance_id, project_id, user_id, availability_zone,
-                     update_totals=False):
-
+def _vol_usage_update(context, id, rd_req, rd_bytes, wr_req, wr_bytes,
+                      instance_id, project_id, user_id, availability_zone,
+                      update_totals=False):
     refreshed = timeutils.utcnow()
 
     values = {}
@@ -5243,6 +5290,24 @@ def vol_usage_update(context, id, rd_req, rd_bytes, wr_req, wr_bytes,
     return vol_usage
 
 
+@require_context
+@pick_context_manager_writer
+def vol_usage_update(context, id, rd_req, rd_bytes, wr_req, wr_bytes,
+                     instance_id, project_id, user_id, availability_zone,
+                     update_totals=False):
+    return _vol_usage_update(context, id, rd_req, rd_bytes, wr_req, wr_bytes,
+                             instance_id, project_id, user_id,
+                             availability_zone, update_totals=update_totals)
+
+
+@require_context
+@pick_context_manager_writer
+def vol_usage_update_all(context, vol_usages, update_totals=False):
+    return [_vol_usage_update(context, update_totals=update_totals,
+                              **vol_usage)
+            for vol_usage in vol_usages]
+
+
 ####################
 
 
@@ -5828,6 +5893,77 @@ def action_event_finish(context, values):
     return event_ref
 
 
+@oslo_db_api.wrap_db_retry(max_retries=5, retry_on_deadlock=True)
+@pick_context_manager_writer
+def action_events_record(context, events):
+    """Record a batch of instance action event starts and finishes.
+
+    Each entry is a dict of event values as built by
+    InstanceActionEvent.pack_action_event_start/finish, plus the project_id
+    of the context which generated it. An entry with a start_time creates a
+    new event (already finished if it also carries a finish_time), an entry
+    without one finishes a previously started event. Entries are applied in
+    order and the action of each (instance_uuid, request_id) pair is only
+    looked up once per batch.
+
+    Returns the list of entries which could not be recorded because their
+    action or started event does not exist.
+    """
+    actions = {}
+    started = {}
+    failed = []
+    for entry in events:
+        values = convert_objects_related_datetimes(
+            dict(entry), 'start_time', 'finish_time')
+        project_id = values.pop('project_id', None)
+        key = (values['instance_uuid'], values['request_id'])
+        if key not in actions:
+            action = _action_get_by_request_id(context, *key)
+            update_action = True
+            # NOTE: Same init_host fallback as action_event_start/finish.
+            if not action and not project_id:
+                action = _action_get_last_created_by_instance_uuid(
+                    context, values['instance_uuid'])
+                update_action = False
+            actions[key] = (action, update_action)
+        action, update_action = actions[key]
+        if not action:
+            failed.append(entry)
+            continue
+
+        event_key = (action['id'], values['event'])
+        if values.get('start_time'):
+            values['action_id'] = action['id']
+            event_ref = models.InstanceActionEvent()
+            event_ref.update(values)
+            context.session.add(event_ref)
+            started[event_key] = event_ref
+        else:
+            event_ref = started.get(event_key)
+            if event_ref is None:
+                event_ref = model_query(context, models.InstanceActionEvent).\
+                                        filter_by(action_id=action['id']).\
+                                        filter_by(event=values['event']).\
+                                        first()
+            if event_ref is None:
+                failed.append(entry)
+                continue
+            event_ref.update(values)
+
+        if (values.get('result') or '').lower() == 'error':
+            action.update({'message': 'Error'})
+
+        if update_action:
+            action.update({'updated_at': values.get('finish_time') or
+                                         values['start_time']})
+
+    for action, update_action in actions.values():
+        if action:
+            action.save(context.session)
+
+    return failed
+
+
 @pick_context_manager_reader
 def action_events_get(context, action_id):
     events = model_query(context, models.InstanceActionEvent).\
@@ -6177,20 +6313,8 @@ def archive_deleted_rows(max_rows=None):
 
 @pick_context_manager_writer
 def service_uuids_online_data_migration(context, max_count):
-    from nova.objects import service
-
-    count_all = 0
-    count_hit = 0
-
-    db_services = model_query(context, models.Service).filter_by(
-        uuid=None).limit(max_count)
-    for db_service in db_services:
-        count_all += 1
-        service_obj = service.Service._from_db_object(
-            context, service.Service(), db_service)
-        if 'uuid' in service_obj:
-            count_hit += 1
-    return count_all, count_hit
+    done = _generate_missing_uuids(context, models.Service, max_count)
+    return done, done
 
 
 ####################
@@ -20,6 +20,7 @@ from oslo_concurrency import lockutils
 from oslo_log import log as logging
 from oslo_utils import excutils
 
+from nova import cache_utils
 from nova.db import base
 from nova import hooks
 from nova.i18n import _
@@ -47,6 +48,11 @@ def update_instance_cache_with_nw_info(impl, context, instance,
         LOG.debug('Updating instance_info_cache with network_info: %s',
                   nw_info, instance=instance)
 
+        old_nw_info = None
+        if (instance.obj_attr_is_set('info_cache') and
+                instance.info_cache is not None):
+            old_nw_info = instance.info_cache.network_info
+
         # NOTE(comstud): The save() method actually handles updating or
         # creating the instance.  We don't need to retrieve the object
         # from the DB first.
@@ -54,6 +60,11 @@ def update_instance_cache_with_nw_info(impl, context, instance,
         ic.network_info = nw_info
         ic.save(update_cells=update_cells)
         instance.info_cache = ic
+        # NOTE: the cache is healed periodically with network info which
+        # usually did not change, and which is then still up to date in the
+        # cached metadata.
+        if old_nw_info != nw_info:
+            cache_utils.invalidate_metadata(instance, old_nw_info, nw_info)
     except Exception:
         with excutils.save_and_reraise_exception():
             LOG.exception('Failed storing info cache', instance=instance)
@@ -261,6 +272,15 @@ class NetworkAPI(base.Base):
         """Template method, so a subclass can implement for neutron/network."""
         raise NotImplementedError()
 
+    def prefetch_instance_nw_info(self, context, instances):
+        """Fetch what is needed to build the network info of instances.
+
+        Returns a dict of keyword arguments to pass to get_instance_nw_info()
+        for each of the instances, which lets network APIs able to do so
+        look up the network info of all of them at once.
+        """
+        return {}
+
     def create_pci_requests_for_sriov_ports(self, context,
                                             pci_requests,
                                             requested_networks):
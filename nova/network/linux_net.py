@@ -271,6 +271,10 @@ class IptablesManager(object):
 
         self.iptables_apply_deferred = False
 
+        # The state of the tables as last applied, by command, when
+        # applying the rules incrementally
+        self._applied = {}
+
         # Add a nova-filter-top chain. It's intended to be shared
         # among the various nova components. It sits at the very top
         # of FORWARD and OUTPUT.
@@ -355,25 +359,116 @@ class IptablesManager(object):
         rules. This happens atomically, thanks to iptables-restore.
 
         """
+        # NOTE: The whole in-memory set of rules is applied at once, so the
+        # changes of callers which waited for the lock while the rules were
+        # being applied have been applied with them.
+        if not self.dirty():
+            LOG.debug("Skipping apply, the rules were already applied")
+            return
+
         s = [('iptables', self.ipv4)]
         if CONF.use_ipv6:
             s += [('ip6tables', self.ipv6)]
 
         for cmd, tables in s:
-            all_tables, _err = self.execute('%s-save' % (cmd,), '-c',
-                                                run_as_root=True,
-                                                attempts=5)
-            all_lines = all_tables.split('\n')
-            for table_name, table in tables.items():
-                start, end = self._find_table(all_lines, table_name)
-                all_lines[start:end] = self._modify_rules(
-                        all_lines[start:end], table, table_name)
-                table.dirty = False
-            self.execute('%s-restore' % (cmd,), '-c', run_as_root=True,
-                         process_input=six.b('\n'.join(all_lines)),
-                         attempts=5)
+            try:
+                if not (CONF.iptables_incremental_apply and
+                        cmd in self._applied and
+                        self._apply_incremental(cmd, tables)):
+                    self._apply_full(cmd, tables)
+            except Exception:
+                with excutils.save_and_reraise_exception():
+                    # We no longer know what the rules in the kernel are,
+                    # so the next apply has to rewrite them all.
+                    self._applied.pop(cmd, None)
         LOG.debug("IPTablesManager.apply completed with success")
 
+    def _apply_full(self, cmd, tables):
+        all_tables, _err = self.execute('%s-save' % (cmd,), '-c',
+                                            run_as_root=True,
+                                            attempts=5)
+        all_lines = all_tables.split('\n')
+        states = {}
+        for table_name, table in tables.items():
+            start, end = self._find_table(all_lines, table_name)
+            all_lines[start:end] = self._modify_rules(
+                    all_lines[start:end], table, table_name)
+            states[table_name] = self._table_state(table)
+            table.dirty = False
+        self.execute('%s-restore' % (cmd,), '-c', run_as_root=True,
+                     process_input=six.b('\n'.join(all_lines)),
+                     attempts=5)
+        if CONF.iptables_incremental_apply:
+            self._applied[cmd] = states
+
+    def _apply_incremental(self, cmd, tables):
+        """Apply the changes made to tables since they were last applied.
+
+        Only the wrapped chains which were added, changed or removed since
+        the rules were last applied are sent to iptables-restore, with
+        --noflush so that the rest of the rules are left alone. Declaring an
+        existing chain flushes it, so each changed chain is declared and has
+        all of its rules added back.
+
+        :returns: False if the changes cannot be applied incrementally
+            because they are not limited to the wrapped chains, in which case
+            nothing was done.
+        """
+        applied = self._applied[cmd]
+        states = {}
+        for table_name, table in tables.items():
+            if table.remove_chains or table.remove_rules:
+                return False
+            states[table_name] = self._table_state(table)
+            if states[table_name][1] != applied[table_name][1]:
+                return False
+
+        lines = []
+        for table_name, (chains, _unwrapped) in sorted(states.items()):
+            applied_chains = applied[table_name][0]
+            changed = [name for name in sorted(chains)
+                       if chains[name] != applied_chains.get(name)]
+            removed = [name for name in sorted(applied_chains)
+                       if name not in chains]
+            if changed or removed:
+                lines.append('*%s' % table_name)
+                lines.extend(':%s - [0:0]' % name
+                             for name in changed + removed)
+                for name in changed:
+                    lines.extend(chains[name])
+                lines.extend('-X %s' % name for name in removed)
+                lines.append('COMMIT')
+            tables[table_name].dirty = False
+
+        if lines:
+            self.execute('%s-restore' % (cmd,), '-c', '--noflush',
+                         run_as_root=True,
+                         process_input=six.b('\n'.join(lines) + '\n'),
+                         attempts=5)
+        self._applied[cmd] = states
+        return True
+
+    @staticmethod
+    def _table_state(table):
+        """Returns the rules of a table in the form they are applied.
+
+        :returns: A tuple of a dict of the rules of each wrapped chain, in
+            the order they are applied, keyed by the wrapped chain name, and
+            of a tuple of everything applied outside of the wrapped chains.
+        """
+        chains = {'%s-%s' % (binary_name, name): []
+                  for name in table.chains}
+        unwrapped = []
+        # top rules come first, as in _modify_rules
+        for rule in sorted(table.rules, key=lambda r: not r.top):
+            if rule.wrap:
+                chains.setdefault('%s-%s' % (binary_name, rule.chain),
+                                  []).append(str(rule))
+            else:
+                unwrapped.append((str(rule), rule.top))
+        return ({name: tuple(rules) for name, rules in chains.items()},
+                (tuple(sorted(table.unwrapped_chains)), tuple(unwrapped)))
+
     def _find_table(self, lines, table_name):
         if len(lines) < 3:
             # length only <2 when fake iptables
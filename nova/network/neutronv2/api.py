@@ -15,9 +15,12 @@
 #    under the License.
 #
 
+import collections
 import copy
+import sys
 import time
 
+import eventlet
 from keystoneauth1 import loading as ks_loading
 from neutronclient.common import exceptions as neutron_client_exc
 from neutronclient.v2_0 import client as clientv20
@@ -54,6 +57,9 @@ DEFAULT_SECGROUP = 'default'
 BINDING_PROFILE = 'binding:profile'
 BINDING_HOST_ID = 'binding:host_id'
 MIGRATING_ATTR = 'migrating_to'
+# Maximum number of ids in a single list query, to keep the URL of the
+# request within the limits of the Neutron API server.
+MAX_SEARCH_IDS = 150
 
 
 def reset_state():
@@ -245,6 +251,148 @@ def _filter_hypervisor_macs(instance, requested_ports_dict, hypervisor_macs):
     return available_macs
 
 
+def _chunks(ids, limit=MAX_SEARCH_IDS):
+    ids = list(ids)
+    for i in range(0, len(ids), limit):
+        yield ids[i:i + limit]
+
+
+class _PrefetchingClient(object):
+    """A Neutron client answering network info queries from bulk fetches.
+
+    Building the network info of an instance queries Neutron for its ports,
+    then for the networks, subnets, DHCP ports and floating IPs of each of
+    them in turn. This client is created by
+    API.prefetch_instance_nw_info() for a list of instances: it fetches
+    their ports with one query per batch of instances and the resources they
+    refer to with one query per batch of ids, then answers the queries made
+    while building the network info of each instance from what it fetched.
+    Resources which were not prefetched are fetched when first queried and
+    memoized, and any other call is passed to the wrapped client.
+    """
+
+    def __init__(self, api, client, instances):
+        self._api = api
+        self._client = client
+        self._instances = {}
+        self._ports = {}
+        self._networks = {}
+        self._subnets = {}
+        self._dhcp_ports = {}
+        self._floating_ips = {}
+
+        for inst in instances:
+            self._instances[inst.uuid] = inst
+        for uuids in _chunks(self._instances):
+            for uuid in uuids:
+                self._ports[uuid] = []
+            for port in client.list_ports(device_id=uuids).get('ports', []):
+                self._ports[port['device_id']].append(port)
+
+        ports = [port for ports in self._ports.values() for port in ports]
+        self._get_floating_ips(port['id'] for port in ports)
+        self._get_subnets(ip['subnet_id'] for port in ports
+                          for ip in port['fixed_ips'])
+        self._get_dhcp_ports(subnet['network_id']
+                             for subnet in self._subnets.values())
+        self._get_networks(vif['network']['id'] for inst in instances
+                           for vif in inst.get_network_info())
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+    @staticmethod
+    def _get(memo, keys, fetch):
+        keys = list(collections.OrderedDict.fromkeys(keys))
+        missing = [key for key in keys if key not in memo]
+        for chunk in _chunks(missing):
+            for key in chunk:
+                memo[key] = None
+            fetch(chunk)
+        return [memo[key] for key in keys if memo[key] is not None]
+
+    def _get_networks(self, network_ids):
+        def fetch(ids):
+            nets = self._client.list_networks(id=ids).get('networks', [])
+            for net in nets:
+                self._networks[net['id']] = net
+        return self._get(self._networks, network_ids, fetch)
+
+    def _get_subnets(self, subnet_ids):
+        def fetch(ids):
+            subnets = self._client.list_subnets(id=ids).get('subnets', [])
+            for subnet in subnets:
+                self._subnets[subnet['id']] = subnet
+        return self._get(self._subnets, subnet_ids, fetch)
+
+    def _get_dhcp_ports(self, network_ids):
+        def fetch(ids):
+            for network_id in ids:
+                self._dhcp_ports[network_id] = []
+            ports = self._client.list_ports(network_id=ids,
+                                            device_owner='network:dhcp')
+            for port in ports.get('ports', []):
+                self._dhcp_ports[port['network_id']].append(port)
+        return self._get(self._dhcp_ports, network_ids, fetch)
+
+    def _get_floating_ips(self, port_ids):
+        def fetch(ids):
+            for port_id in ids:
+                self._floating_ips[port_id] = []
+            fips = self._api._safe_get_floating_ips(self._client,
+                                                    port_id=ids)
+            for fip in fips:
+                self._floating_ips[fip['port_id']].append(fip)
+        return self._get(self._floating_ips, port_ids, fetch)
+
+    def _get_instance_ports(self, instance_uuid, tenant_id):
+        ports = self._ports.get(instance_uuid)
+        instance = self._instances.get(instance_uuid)
+        if ports is None or instance is None:
+            return None
+        # A port attached since the ports were prefetched would otherwise
+        # be dropped from the info cache, so look the ports up again if the
+        # info cache of the instance has one we do not know about.
+        port_ids = set(port['id'] for port in ports)
+        if any(vif['id'] not in port_ids
+               for vif in instance.get_network_info()):
+            return None
+        return [port for port in ports if port['tenant_id'] == tenant_id]
+
+    def list_ports(self, retrieve_all=True, **search_opts):
+        ports = None
+        if set(search_opts) == set(['tenant_id', 'device_id']):
+            ports = self._get_instance_ports(search_opts['device_id'],
+                                             search_opts['tenant_id'])
+        elif (set(search_opts) == set(['network_id', 'device_owner']) and
+                search_opts['device_owner'] == 'network:dhcp' and
+                isinstance(search_opts['network_id'], six.string_types)):
+            ports = self._get_dhcp_ports([search_opts['network_id']])[0]
+        if ports is None:
+            return self._client.list_ports(retrieve_all, **search_opts)
+        return {'ports': ports}
+
+    def list_networks(self, retrieve_all=True, **search_opts):
+        if set(search_opts) == set(['id']):
+            return {'networks': self._get_networks(search_opts['id'])}
+        return self._client.list_networks(retrieve_all, **search_opts)
+
+    def list_subnets(self, retrieve_all=True, **search_opts):
+        if set(search_opts) == set(['id']):
+            return {'subnets': self._get_subnets(search_opts['id'])}
+        return self._client.list_subnets(retrieve_all, **search_opts)
+
+    def list_floatingips(self, retrieve_all=True, **search_opts):
+        if (set(search_opts) == set(['fixed_ip_address', 'port_id']) and
+                isinstance(search_opts['port_id'], six.string_types)):
+            fips = self._get_floating_ips([search_opts['port_id']])[0]
+            return {'floatingips': [
+                fip for fip in fips
+                if fip['fixed_ip_address'] ==
+                search_opts['fixed_ip_address']]}
+        return self._client.list_floatingips(retrieve_all, **search_opts)
+
+
 class API(base_api.NetworkAPI):
     """API for interacting with the neutron 2.x API."""
 
@@ -369,6 +517,22 @@ class API(base_api.NetworkAPI):
 
         return nets
 
+    @staticmethod
+    def _port_create_body(instance, network_id, fixed_ip=None,
+                          security_group_ids=None):
+        # Set the device_id so it's clear who this port was created for,
+        # and to stop other instances trying to use it
+        port_req_body = {'port': {'device_id': instance.uuid}}
+        if fixed_ip:
+            port_req_body['port']['fixed_ips'] = [
+                {'ip_address': str(fixed_ip)}]
+        port_req_body['port']['network_id'] = network_id
+        port_req_body['port']['admin_state_up'] = True
+        port_req_body['port']['tenant_id'] = instance.project_id
+        if security_group_ids:
+            port_req_body['port']['security_groups'] = security_group_ids
+        return port_req_body
+
     def _create_port_minimal(self, port_client, instance, network_id,
                              fixed_ip=None, security_group_ids=None):
         """Attempts to create a port for the instance on the given network.
@@ -385,19 +549,9 @@ class API(base_api.NetworkAPI):
             IpAddressGenerationFailure error.
         :raises: PortBindingFailed: If port binding failed.
         """
-        # Set the device_id so it's clear who this port was created for,
-        # and to stop other instances trying to use it
-        port_req_body = {'port': {'device_id': instance.uuid}}
+        port_req_body = self._port_create_body(instance, network_id,
+                                               fixed_ip, security_group_ids)
         try:
-            if fixed_ip:
-                port_req_body['port']['fixed_ips'] = [
-                    {'ip_address': str(fixed_ip)}]
-            port_req_body['port']['network_id'] = network_id
-            port_req_body['port']['admin_state_up'] = True
-            port_req_body['port']['tenant_id'] = instance.project_id
-            if security_group_ids:
-                port_req_body['port']['security_groups'] = security_group_ids
-
             port_response = port_client.create_port(port_req_body)
 
             port = port_response['port']
@@ -439,6 +593,81 @@ class API(base_api.NetworkAPI):
                 LOG.exception('Neutron error creating port on network %s',
                               network_id, instance=instance)
 
+    def _create_ports_bulk(self, port_client, instance, requests,
+                           security_group_ids=None):
+        """Attempts to create the ports of requests with a single request.
+
+        :param port_client: The client to use to create the ports.
+        :param instance: Create the ports for the given instance.
+        :param requests: The NetworkRequest objects to create ports for.
+        :param security_group_ids: Optional list of security group IDs to
+            apply to the ports.
+        :returns: The created ports in the order of requests, or None if
+            Neutron failed to create them, in which case none were created
+            and they should be created one by one to find out which of the
+            requests could not be satisfied.
+        :raises: PortBindingFailed: If binding one of the ports failed.
+        """
+        port_req_body = {'ports': [
+            self._port_create_body(instance, request.network_id,
+                                   request.address,
+                                   security_group_ids)['port']
+            for request in requests]}
+        try:
+            ports = port_client.create_port(port_req_body)['ports']
+        except neutron_client_exc.NeutronClientException:
+            LOG.debug('Neutron failed to create %d ports in bulk, creating '
+                      'them one by one', len(requests), instance=instance,
+                      exc_info=True)
+            return None
+
+        port_ids = [port['id'] for port in ports]
+        try:
+            for port in ports:
+                _ensure_no_port_binding_failure(port)
+        except exception.PortBindingFailed:
+            with excutils.save_and_reraise_exception():
+                self._delete_ports(port_client, instance, port_ids)
+
+        LOG.debug('Successfully created ports: %s', ', '.join(port_ids),
+                  instance=instance)
+        return ports
+
+    def _map_port_operations(self, func, items):
+        """Calls func with each of items, concurrently if configured to.
+
+        Up to [neutron]/max_concurrent_port_operations calls are run at once.
+        When they are run one after the other, no call is made after the
+        first one which fails. Otherwise all of the calls are made and the
+        error of the first one which failed, in the order of items, is
+        raised once all of them are done.
+
+        :returns: The list of the results of the calls in the order of items
+        """
+        results = [None] * len(items)
+        errors = [None] * len(items)
+
+        def call(index):
+            try:
+                results[index] = func(items[index])
+            except Exception:
+                errors[index] = sys.exc_info()
+
+        concurrency = CONF.neutron.max_concurrent_port_operations
+        if concurrency == 1 or len(items) < 2:
+            for index in range(len(items)):
+                results[index] = func(items[index])
+        else:
+            pool = eventlet.GreenPool(concurrency)
+            for index in range(len(items)):
+                pool.spawn_n(call, index)
+            pool.waitall()
+
+        for error in errors:
+            if error:
+                six.reraise(*error)
+        return results
+
     def _update_port(self, port_client, instance, port_id,
                      port_req_body):
         try:
@@ -798,8 +1027,7 @@ class API(base_api.NetworkAPI):
             created_port_uuid will be None for the pair where a pre-existing
             port was part of the user request
         """
-        created_port_ids = []
-        requests_and_created_ports = []
+        requests = []
         for request in ordered_networks:
             network = nets.get(request.network_id)
             # if network_id did not pass validate_networks() and not available
@@ -807,47 +1035,76 @@ class API(base_api.NetworkAPI):
             if not network:
                 continue
 
-            try:
-                port_security_enabled = network.get(
-                    'port_security_enabled', True)
-                if port_security_enabled:
-                    if not network.get('subnets'):
-                        # Neutron can't apply security groups to a port
-                        # for a network without L3 assignments.
-                        LOG.debug('Network with port security enabled does '
-                                  'not have subnets so security groups '
-                                  'cannot be applied: %s',
-                                  network, instance=instance)
-                        raise exception.SecurityGroupCannotBeApplied()
-                else:
-                    if security_group_ids:
-                        # We don't want to apply security groups on port
-                        # for a network defined with
-                        # 'port_security_enabled=False'.
-                        LOG.debug('Network has port security disabled so '
-                                  'security groups cannot be applied: %s',
-                                  network, instance=instance)
-                        raise exception.SecurityGroupCannotBeApplied()
-
-                created_port_id = None
-                if not request.port_id:
-                    # create minimal port, if port not already created by user
-                    created_port = self._create_port_minimal(
-                            neutron, instance, request.network_id,
-                            request.address, security_group_ids)
-                    created_port_id = created_port['id']
-                    created_port_ids.append(created_port_id)
-
-                requests_and_created_ports.append((
-                    request, created_port_id))
+            port_security_enabled = network.get(
+                'port_security_enabled', True)
+            if port_security_enabled:
+                if not network.get('subnets'):
+                    # Neutron can't apply security groups to a port
+                    # for a network without L3 assignments.
+                    LOG.debug('Network with port security enabled does '
+                              'not have subnets so security groups '
+                              'cannot be applied: %s',
+                              network, instance=instance)
+                    raise exception.SecurityGroupCannotBeApplied()
+            else:
+                if security_group_ids:
+                    # We don't want to apply security groups on port
+                    # for a network defined with
+                    # 'port_security_enabled=False'.
+                    LOG.debug('Network has port security disabled so '
+                              'security groups cannot be applied: %s',
+                              network, instance=instance)
+                    raise exception.SecurityGroupCannotBeApplied()
+
+            requests.append(request)
+
+        # create minimal ports, for the requests without a port already
+        # created by the user
+        created_ports = self._create_ports(
+            neutron, instance, [req for req in requests if not req.port_id],
+            security_group_ids)
 
-            except Exception:
-                with excutils.save_and_reraise_exception():
-                    if created_port_ids:
-                        self._delete_ports(
-                            neutron, instance, created_port_ids)
+        created_port_ids = iter(port['id'] for port in created_ports)
+        return [(req, None if req.port_id else next(created_port_ids))
+                for req in requests]
+
+    def _create_ports(self, neutron, instance, requests, security_group_ids):
+        """Create a port for each of the given network requests.
 
-        return requests_and_created_ports
+        The ports are created with a single bulk request if there is more
+        than one and [neutron]/max_concurrent_port_operations allows
+        concurrent operations, otherwise with one request per port. If
+        creating any of them fails, the ones which were created are deleted.
+
+        :returns: the created ports, in the order of the requests
+        """
+        if (len(requests) > 1 and
+                CONF.neutron.max_concurrent_port_operations > 1):
+            ports = self._create_ports_bulk(neutron, instance, requests,
+                                            security_group_ids)
+            if ports is not None:
+                return ports
+
+        created_port_ids = {}
+
+        def create_port(args):
+            index, request = args
+            port = self._create_port_minimal(
+                neutron, instance, request.network_id, request.address,
+                security_group_ids)
+            created_port_ids[index] = port['id']
+            return port
+
+        try:
+            return self._map_port_operations(create_port,
+                                             list(enumerate(requests)))
+        except Exception:
+            with excutils.save_and_reraise_exception():
+                if created_port_ids:
+                    self._delete_ports(
+                        neutron, instance,
+                        [created_port_ids[index]
+                         for index in sorted(created_port_ids)])
 
     def allocate_for_instance(self, context, instance, vpn,
                               requested_networks, macs=None,
@@ -986,23 +1243,34 @@ class API(base_api.NetworkAPI):
         # We currently require admin creds to set port bindings.
         port_client = admin_client
 
-        preexisting_port_ids = []
-        created_port_ids = []
-        ports_in_requested_order = []
-        nets_in_requested_order = []
-        created_vifs = []   # this list is for cleanups if we fail
+        requests = []
         for request, created_port_id in requests_and_created_ports:
-            vifobj = objects.VirtualInterface(context)
-            vifobj.instance_uuid = instance.uuid
-            vifobj.tag = request.tag if 'tag' in request else None
-
             network = nets.get(request.network_id)
             # if network_id did not pass validate_networks() and not available
             # here then skip it safely not continuing with a None Network
             if not network:
                 continue
-
-            nets_in_requested_order.append(network)
+            requests.append((request, created_port_id, network))
+
+        nets_in_requested_order = [net for _, _, net in requests]
+        # NOTE: this does not mean the port was requested by the user, it
+        # could be a port created on a network requested by the user
+        ports_in_requested_order = [created_id or req.port_id
+                                    for req, created_id, _ in requests]
+        created_port_ids = [created_id for _, created_id, _ in requests
+                            if created_id]
+
+        # These are keyed by the index of the request, for cleanups if we
+        # fail and so that they are returned in the requested order.
+        updated_preexisting_port_ids = {}
+        updated_created_port_ids = {}
+        created_vifs = {}
+
+        def update_port(args):
+            index, (request, created_port_id, network) = args
+            vifobj = objects.VirtualInterface(context)
+            vifobj.instance_uuid = instance.uuid
+            vifobj.tag = request.tag if 'tag' in request else None
 
             zone = 'compute:%s' % instance.availability_zone
             port_req_body = {'port': {'device_id': instance.uuid,
@@ -1012,57 +1280,69 @@ class API(base_api.NetworkAPI):
                 requested_ports_dict[request.port_id].get(BINDING_PROFILE)):
                 port_req_body['port'][BINDING_PROFILE] = (
                     requested_ports_dict[request.port_id][BINDING_PROFILE])
-            try:
-                self._populate_neutron_extension_values(
-                    context, instance, request.pci_request_id, port_req_body,
-                    network=network, neutron=neutron,
-                    bind_host_id=bind_host_id)
-                self._populate_pci_mac_address(instance,
-                    request.pci_request_id, port_req_body)
-                self._populate_mac_address(
-                    instance, port_req_body, available_macs)
-
-                if created_port_id:
-                    port_id = created_port_id
-                    created_port_ids.append(port_id)
-                else:
-                    port_id = request.port_id
-                ports_in_requested_order.append(port_id)
-
-                # After port is created, update other bits
-                updated_port = self._update_port(
-                    port_client, instance, port_id, port_req_body)
-
-                # NOTE(danms): The virtual_interfaces table enforces global
-                # uniqueness on MAC addresses, which clearly does not match
-                # with neutron's view of the world. Since address is a 255-char
-                # string we can namespace it with our port id. Using '/' should
-                # be safely excluded from MAC address notations as well as
-                # UUIDs. We could stop doing this when we remove
-                # nova-network, but we'd need to leave the read translation in
-                # for longer than that of course.
-                vifobj.address = '%s/%s' % (updated_port['mac_address'],
-                                            updated_port['id'])
-                vifobj.uuid = port_id
-                vifobj.create()
-                created_vifs.append(vifobj)
-
-                if not created_port_id:
-                    # only add if update worked and port create not called
-                    preexisting_port_ids.append(port_id)
-
-                self._update_port_dns_name(context, instance, network,
-                                           ports_in_requested_order[-1],
-                                           neutron)
-            except Exception:
-                with excutils.save_and_reraise_exception():
-                    self._unbind_ports(context,
-                                       preexisting_port_ids,
-                                       neutron, port_client)
-                    self._delete_ports(neutron, instance, created_port_ids)
-                    for vif in created_vifs:
-                        vif.destroy()
+            self._populate_neutron_extension_values(
+                context, instance, request.pci_request_id, port_req_body,
+                network=network, neutron=neutron,
+                bind_host_id=bind_host_id)
+            self._populate_pci_mac_address(instance,
+                request.pci_request_id, port_req_body)
+            self._populate_mac_address(
+                instance, port_req_body, available_macs)
+
+            port_id = ports_in_requested_order[index]
+            if created_port_id:
+                updated_created_port_ids[index] = created_port_id
+
+            # After port is created, update other bits
+            updated_port = self._update_port(
+                port_client, instance, port_id, port_req_body)
+
+            # NOTE(danms): The virtual_interfaces table enforces global
+            # uniqueness on MAC addresses, which clearly does not match
+            # with neutron's view of the world. Since address is a 255-char
+            # string we can namespace it with our port id. Using '/' should
+            # be safely excluded from MAC address notations as well as
+            # UUIDs. We could stop doing this when we remove
+            # nova-network, but we'd need to leave the read translation in
+            # for longer than that of course.
+            vifobj.address = '%s/%s' % (updated_port['mac_address'],
+                                        updated_port['id'])
+            vifobj.uuid = port_id
+            vifobj.create()
+            created_vifs[index] = vifobj
+
+            if not created_port_id:
+                # only add if update worked and port create not called
+                updated_preexisting_port_ids[index] = port_id
+
+            self._update_port_dns_name(context, instance, network,
+                                       port_id, neutron)
+
+        if (len(requests) > 1 and
+                CONF.neutron.max_concurrent_port_operations > 1):
+            # Make sure the extensions are refreshed once up front rather
+            # than by each of the concurrent updates.
+            self._refresh_neutron_extensions_cache(context, neutron=neutron)
 
+        try:
+            self._map_port_operations(update_port, list(enumerate(requests)))
+        except Exception:
+            with excutils.save_and_reraise_exception():
+                self._unbind_ports(context,
+                                   [updated_preexisting_port_ids[index]
+                                    for index in
+                                    sorted(updated_preexisting_port_ids)],
+                                   neutron, port_client)
+                self._delete_ports(neutron, instance,
+                                   [updated_created_port_ids[index]
+                                    for index in
+                                    sorted(updated_created_port_ids)])
+                for index in sorted(created_vifs):
+                    created_vifs[index].destroy()
+
+        preexisting_port_ids = [updated_preexisting_port_ids[index]
+                                for index in
+                                sorted(updated_preexisting_port_ids)]
         return (nets_in_requested_order, ports_in_requested_order,
             preexisting_port_ids, created_port_ids)
 
@@ -1363,6 +1643,18 @@ class API(base_api.NetworkAPI):
                                                  preexisting_port_ids)
         return network_model.NetworkInfo.hydrate(nw_info)
 
+    def prefetch_instance_nw_info(self, context, instances):
+        """Fetch what is needed to build the network info of instances.
+
+        This queries Neutron for the ports of all the instances and for the
+        networks, subnets, DHCP ports and floating IPs they use, with a few
+        bulk queries rather than several per port. The client returned as
+        admin_client answers the queries made by get_instance_nw_info() for
+        those instances from what was fetched.
+        """
+        client = get_client(context, admin=True)
+        return {'admin_client': _PrefetchingClient(self, client, instances)}
+
     def _gather_port_ids_and_networks(self, context, instance, networks=None,
                                       port_ids=None, neutron=None):
         """Return an instance's complete list of port_ids and networks."""
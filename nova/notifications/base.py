@@ -209,7 +209,16 @@ def send_instance_update_notification(context, instance, old_vm_state=None,
     about instance state changes.
     """
 
-    payload = info_from_instance(context, instance, None, None)
+    send_legacy = rpc.legacy_notifications_enabled()
+    if not send_legacy and not rpc.versioned_notifications_enabled():
+        return
+
+    # NOTE: The legacy payload is only built if it is sent, the versioned
+    # notification only uses its states, audit period and bandwidth.
+    if send_legacy:
+        payload = info_from_instance(context, instance, None, None)
+    else:
+        payload = {}
 
     # determine how we'll report states
     payload.update(
@@ -230,14 +239,25 @@ def send_instance_update_notification(context, instance, old_vm_state=None,
     if old_display_name:
         payload["old_display_name"] = old_display_name
 
-    rpc.get_notifier(service, host).info(context,
-                                         'compute.instance.update', payload)
+    if send_legacy:
+        rpc.get_notifier(service, host).info(
+            context, 'compute.instance.update', payload)
 
     _send_versioned_instance_update(context, instance, payload, host, service)
 
 
 @rpc.if_notifications_enabled
 def _send_versioned_instance_update(context, instance, payload, host, service):
+    if rpc.NOTIFICATION_QUEUE is not None:
+        # The payload is built later from the notification queue, after the
+        # caller may have changed the instance
+        instance = instance.obj_clone()
+    rpc.emit_notification(_emit_versioned_instance_update, context, instance,
+                          payload, host, service)
+
+
+def _emit_versioned_instance_update(context, instance, payload, host,
+                                    service):
 
     def _map_legacy_service_to_source(legacy_service):
         if not legacy_service.startswith('nova-'):
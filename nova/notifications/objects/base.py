@@ -11,8 +11,12 @@
 #    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
 #    License for the specific language governing permissions and limitations
 #    under the License.
+import operator
+
 from oslo_log import log as logging
+from oslo_versionedobjects import base as ovo_base
 from oslo_versionedobjects import exception as ovo_exception
+from oslo_versionedobjects import fields as ovo_fields
 
 from nova import exception
 from nova.objects import base
@@ -36,6 +40,41 @@ class NotificationObject(base.NovaObject):
         # reset the object after creation.
         self.obj_reset_changes(recursive=False)
 
+    # NOTE: The notification objects are built, reset and serialized once
+    # per notification, so the methods of VersionedObject which list every
+    # field of the object or collect the changes of every nested object
+    # before resetting them are replaced by cheaper equivalents.
+    def obj_attr_is_set(self, attrname):
+        if attrname in self.fields:
+            return hasattr(self, '_obj_' + attrname)
+        return super(NotificationObject, self).obj_attr_is_set(attrname)
+
+    def obj_what_changed(self):
+        changes = set(field for field in self._changed_fields
+                      if field in self.fields)
+        for name in self.fields:
+            value = getattr(self, '_obj_' + name, None)
+            if (isinstance(value, ovo_base.VersionedObject) and
+                    value.obj_what_changed()):
+                changes.add(name)
+        return changes
+
+    def obj_reset_changes(self, fields=None, recursive=False):
+        if fields or not recursive:
+            return super(NotificationObject, self).obj_reset_changes(
+                fields=fields, recursive=recursive)
+
+        for name, field in self.fields.items():
+            value = getattr(self, '_obj_' + name, None)
+            if value is None:
+                continue
+            if isinstance(field, ovo_fields.ObjectField):
+                value.obj_reset_changes(recursive=True)
+            elif isinstance(field, ovo_fields.ListOfObjectsField):
+                for thing in value:
+                    thing.obj_reset_changes(recursive=True)
+        self._changed_fields.clear()
+
 
 @base.NovaObjectRegistry.register_notification
 class EventType(NotificationObject):
@@ -104,6 +143,22 @@ class NotificationPayloadBase(NotificationObject):
         super(NotificationPayloadBase, self).__init__()
         self.populated = not self.SCHEMA
 
+    @classmethod
+    def _get_schema_extractors(cls):
+        """Returns the SCHEMA of the payload class as a list of the payload
+        field name, the payload field, the data source name and a getter of
+        the field of the data source, built once per payload class.
+        """
+        # NOTE: Looked up in the class itself as subclasses may extend the
+        # SCHEMA of their parent.
+        extractors = cls.__dict__.get('_schema_extractors')
+        if extractors is None:
+            extractors = [(key, cls.fields[key], obj,
+                           operator.attrgetter(field))
+                          for key, (obj, field) in cls.SCHEMA.items()]
+            cls._schema_extractors = extractors
+        return extractors
+
     @rpc.if_notifications_enabled
     def populate_schema(self, **kwargs):
         """Populate the object based on the SCHEMA and the source objects
@@ -111,11 +166,11 @@ class NotificationPayloadBase(NotificationObject):
         :param kwargs: A dict contains the source object at the key defined in
                        the SCHEMA
         """
-        for key, (obj, field) in self.SCHEMA.items():
+        for key, field, obj, get_value in self._get_schema_extractors():
             source = kwargs[obj]
             # trigger lazy-load if possible
             try:
-                setattr(self, key, getattr(source, field))
+                value = get_value(source)
             # ObjectActionError - not lazy loadable field
             # NotImplementedError - obj_load_attr() is not even defined
             # OrphanedObjectError - lazy loadable field but context is None
@@ -132,7 +187,10 @@ class NotificationPayloadBase(NotificationObject):
                 # nullable, but that means that either the source object is not
                 # properly initialized or the payload field needs to be defined
                 # as nullable
-                setattr(self, key, None)
+                value = None
+            # NOTE: The value is coerced and stored without going through
+            # the property setter as the changes are reset below anyway.
+            setattr(self, '_obj_' + key, field.coerce(self, key, value))
         self.populated = True
 
         # the schema population will create changed fields but we don't need
@@ -184,7 +242,8 @@ class NotificationBase(NotificationObject):
     def _emit(self, context, event_type, publisher_id, payload):
         notifier = rpc.get_versioned_notifier(publisher_id)
         notify = getattr(notifier, self.priority)
-        notify(context, event_type=event_type, payload=payload)
+        rpc.emit_notification(notify, context, event_type=event_type,
+                              payload=payload)
 
     @rpc.if_notifications_enabled
     def emit(self, context):
@@ -202,7 +261,8 @@ class NotificationBase(NotificationObject):
                    publisher_id='%s:%s' %
                                 (self.publisher.source,
                                  self.publisher.host),
-                   payload=self.payload.obj_to_primitive())
+                   payload=rpc.PrimitivePayload(
+                       self.payload.obj_to_primitive()))
 
 
 def notification_sample(sample):
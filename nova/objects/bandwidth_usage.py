@@ -78,7 +78,8 @@ class BandwidthUsageList(base.ObjectListBase, base.NovaObject):
     # Version 1.0: Initial version
     # Version 1.1: Add use_slave to get_by_uuids
     # Version 1.2: BandwidthUsage <= version 1.2
-    VERSION = '1.2'
+    # Version 1.3: Add create
+    VERSION = '1.3'
     fields = {
         'objects': fields.ListOfObjectsField('BandwidthUsage'),
     }
@@ -97,3 +98,18 @@ class BandwidthUsageList(base.ObjectListBase, base.NovaObject):
                                                 start_period=start_period,
                                                 use_slave=use_slave)
         return base.obj_make_list(context, cls(), BandwidthUsage, db_bw_usages)
+
+    @base.remotable
+    def create(self, update_cells=True):
+        db_bw_usages = db.bw_usage_update_all(
+            self._context,
+            [dict(uuid=bw_usage.instance_uuid, mac=bw_usage.mac,
+                  start_period=bw_usage.start_period, bw_in=bw_usage.bw_in,
+                  bw_out=bw_usage.bw_out, last_ctr_in=bw_usage.last_ctr_in,
+                  last_ctr_out=bw_usage.last_ctr_out,
+                  last_refreshed=bw_usage.last_refreshed)
+             for bw_usage in self.objects],
+            update_cells=update_cells)
+        for bw_usage, db_bw_usage in zip(self.objects, db_bw_usages):
+            BandwidthUsage._from_db_object(self._context, bw_usage,
+                                           db_bw_usage)
@@ -170,6 +170,174 @@ class ObjectListBase(ovoo_base.ObjectListBase):
             return primitive.get(key, default)
 
 
+# Keys of the compact wire format, see obj_to_compact_primitive()
+COMPACT_SCHEMAS_KEY = 'nova_compact.schemas'
+COMPACT_DATA_KEY = 'nova_compact.data'
+
+# Field kinds in compact schemas: plain value, object, list or dict of objects
+_COMPACT_PLAIN, _COMPACT_OBJECT, _COMPACT_LIST, _COMPACT_DICT = '-old'
+
+# Per-class list of (name, field, kind) tuples, in the order in
+# which fields are laid out in the compact format.
+_COMPACT_FIELDS = {}
+
+
+def _compact_fields(cls):
+    compiled = _COMPACT_FIELDS.get(cls)
+    if compiled is not None:
+        return compiled
+    compiled = []
+    for name in sorted(cls.fields):
+        field = cls.fields[name]
+        field_type = field._type
+        kind = _COMPACT_PLAIN
+        if isinstance(field_type, obj_fields.Object):
+            kind = _COMPACT_OBJECT
+        elif (isinstance(field_type, obj_fields.List) and
+                isinstance(field_type._element_type._type,
+                           obj_fields.Object)):
+            kind = _COMPACT_LIST
+        elif (isinstance(field_type, obj_fields.Dict) and
+                isinstance(field_type._element_type._type,
+                           obj_fields.Object)):
+            kind = _COMPACT_DICT
+        compiled.append((name, field, kind))
+    _COMPACT_FIELDS[cls] = compiled
+    return compiled
+
+
+class _CompactEncoder(object):
+    def __init__(self):
+        self.schemas = []
+        self._schema_ids = {}
+
+    def encode(self, obj):
+        cls = obj.__class__
+        compiled = _compact_fields(cls)
+        key = (cls, obj.VERSION)
+        schema_id = self._schema_ids.get(key)
+        if schema_id is None:
+            schema_id = self._schema_ids[key] = len(self.schemas)
+            self.schemas.append([obj.obj_name(), obj.OBJ_PROJECT_NAMESPACE,
+                                 obj.VERSION, [f[0] for f in compiled],
+                                 ''.join(f[2] for f in compiled)])
+
+        changes = obj.obj_what_changed()
+        set_mask = changed_mask = 0
+        values = []
+        for bit, (name, field, kind) in enumerate(compiled):
+            if not obj.obj_attr_is_set(name):
+                continue
+            set_mask |= 1 << bit
+            if name in changes:
+                changed_mask |= 1 << bit
+            value = getattr(obj, name)
+            if value is None:
+                values.append(None)
+            elif kind == _COMPACT_PLAIN:
+                values.append(field.to_primitive(obj, name, value))
+            elif kind == _COMPACT_OBJECT:
+                values.append(self.encode(value))
+            elif kind == _COMPACT_LIST:
+                values.append([self.encode(item) if item is not None
+                               else None for item in value])
+            else:
+                values.append({k: self.encode(v) if v is not None else None
+                               for k, v in value.items()})
+        return [schema_id, set_mask, changed_mask, values]
+
+
+def obj_to_compact_primitive(obj):
+    """Turn an object into the compact wire format.
+
+    Unlike obj_to_primitive(), which repeats the name, namespace, version
+    and field names of every nested object, the compact format sends them
+    once per (object class, version) in a schema table. Each object is then
+    a [schema_id, set_mask, changed_mask, values] list, where bit N of the
+    masks tells whether the Nth field of the schema is set (and so has a
+    value in values) and whether it is changed.
+    """
+    encoder = _CompactEncoder()
+    data = encoder.encode(obj)
+    return {COMPACT_SCHEMAS_KEY: encoder.schemas, COMPACT_DATA_KEY: data}
+
+
+def _compact_decode(schemas, node, make_object):
+    schema_id, set_mask, changed_mask, values = node
+    field_names, kinds = schemas[schema_id][3:5]
+    data = {}
+    changes = []
+    index = 0
+    for bit, name in enumerate(field_names):
+        if not set_mask >> bit & 1:
+            continue
+        value = values[index]
+        index += 1
+        if changed_mask >> bit & 1:
+            changes.append(name)
+        kind = kinds[bit]
+        if value is None or kind == _COMPACT_PLAIN:
+            pass
+        elif kind == _COMPACT_OBJECT:
+            value = _compact_decode(schemas, value, make_object)
+        elif kind == _COMPACT_LIST:
+            value = [_compact_decode(schemas, item, make_object)
+                     if item is not None else None for item in value]
+        else:
+            value = {k: _compact_decode(schemas, v, make_object)
+                     if v is not None else None for k, v in value.items()}
+        data[name] = value
+    return make_object(schema_id, data, changes)
+
+
+def obj_from_compact_primitive(primitive, context=None):
+    """Rebuild an object from the format of obj_to_compact_primitive().
+
+    :raises: IncompatibleObjectVersion if any of the objects can not be
+             handled at its version by this service
+    """
+    schemas = primitive[COMPACT_SCHEMAS_KEY]
+    classes = []
+    for name, namespace, version in (schema[:3] for schema in schemas):
+        if namespace != NovaObject.OBJ_PROJECT_NAMESPACE:
+            raise ovoo_exc.UnsupportedObjectError(
+                objtype='%s.%s' % (namespace, name))
+        classes.append(NovaObject.obj_class_from_name(name, version))
+
+    def make_object(schema_id, data, changes):
+        cls = classes[schema_id]
+        # NOTE: Nested objects are already hydrated at this point and Object
+        # fields pass those through, so go through the regular hydration of
+        # the class for any special handling it does there.
+        return cls._obj_from_primitive(
+            context, schemas[schema_id][2],
+            {cls._obj_primitive_key('data'): data,
+             cls._obj_primitive_key('changes'): changes})
+
+    return _compact_decode(schemas, primitive[COMPACT_DATA_KEY], make_object)
+
+
+def compact_primitive_to_primitive(primitive):
+    """Expand the format of obj_to_compact_primitive() to obj_to_primitive().
+
+    This is used for objects which need to be backported by conductor
+    before this service can hydrate them.
+    """
+    schemas = primitive[COMPACT_SCHEMAS_KEY]
+
+    def make_object(schema_id, data, changes):
+        name, namespace, version = schemas[schema_id][:3]
+        objprim = {'nova_object.name': name,
+                   'nova_object.namespace': namespace,
+                   'nova_object.version': version,
+                   'nova_object.data': data}
+        if changes:
+            objprim['nova_object.changes'] = changes
+        return objprim
+
+    return _compact_decode(schemas, primitive[COMPACT_DATA_KEY], make_object)
+
+
 class NovaObjectSerializer(messaging.NoOpSerializer):
     """A NovaObject-aware Serializer.
 
@@ -177,8 +345,17 @@ class NovaObjectSerializer(messaging.NoOpSerializer):
     ability to serialize and deserialize NovaObject entities. Any service
     that needs to accept or return NovaObjects as arguments or result values
     should pass this to its RPCClient and RPCServer objects.
+
+    With compact=True, objects are serialized with
+    obj_to_compact_primitive(). This must only be used when the receiving
+    service is known to be able to deserialize that format, which all
+    services do since compute RPC API 4.19.
     """
 
+    def __init__(self, compact=False):
+        super(NovaObjectSerializer, self).__init__()
+        self.compact = compact
+
     @property
     def conductor(self):
         if not hasattr(self, '_conductor'):
@@ -232,14 +409,25 @@ class NovaObjectSerializer(messaging.NoOpSerializer):
         if isinstance(entity, (tuple, list, set, dict)):
             entity = self._process_iterable(context, self.serialize_entity,
                                             entity)
+        elif self.compact and isinstance(entity, NovaObject):
+            entity = obj_to_compact_primitive(entity)
         elif (hasattr(entity, 'obj_to_primitive') and
               callable(entity.obj_to_primitive)):
             entity = entity.obj_to_primitive()
         return entity
 
+    def _process_compact_object(self, context, objprim):
+        try:
+            return obj_from_compact_primitive(objprim, context=context)
+        except ovoo_exc.IncompatibleObjectVersion:
+            return self._process_object(
+                context, compact_primitive_to_primitive(objprim))
+
     def deserialize_entity(self, context, entity):
         if isinstance(entity, dict) and 'nova_object.name' in entity:
             entity = self._process_object(context, entity)
+        elif isinstance(entity, dict) and COMPACT_DATA_KEY in entity:
+            entity = self._process_compact_object(context, entity)
         elif isinstance(entity, (tuple, list, set, dict)):
             entity = self._process_iterable(context, self.deserialize_entity,
                                             entity)
@@ -10,9 +10,14 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import collections
+
+import eventlet
+from oslo_db import exception as db_exc
 from sqlalchemy.orm import joinedload
 
 from nova import context
+from nova import db
 from nova.db.sqlalchemy import api as db_api
 from nova.db.sqlalchemy import api_models
 from nova import exception
@@ -167,29 +172,90 @@ class HostMappingList(base.ObjectListBase, base.NovaObject):
         return base.obj_make_list(context, cls(), HostMapping, db_mappings)
 
 
+@db_api.api_context_manager.writer
+def _create_missing_host_mappings_in_db(context, cell_id, hosts):
+    """Create the mappings of the hosts which are not mapped yet.
+
+    :returns: The hosts which got a mapping, in the order they were given
+    """
+    existing = set(host for host, in context.session.query(
+        api_models.HostMapping.host).filter(
+            api_models.HostMapping.host.in_(hosts)))
+    missing = [host for host in hosts if host not in existing]
+    if missing:
+        context.session.execute(api_models.HostMapping.__table__.insert(),
+                                [{'host': host, 'cell_id': cell_id}
+                                 for host in missing])
+    return missing
+
+
 def _check_and_create_host_mappings(ctxt, cm, compute_nodes, status_fn):
-    host_mappings = []
+    # NOTE: Several compute nodes share the host of an ironic compute
+    # service, so the hosts are listed once, in the order of their nodes.
+    hosts = collections.OrderedDict()
     for compute in compute_nodes:
         status_fn(_("Checking host mapping for compute host "
                     "'%(host)s': %(uuid)s") %
                   {'host': compute.host, 'uuid': compute.uuid})
-        try:
-            HostMapping.get_by_host(ctxt, compute.host)
-        except exception.HostMappingNotFound:
-            status_fn(_("Creating host mapping for compute host "
-                        "'%(host)s': %(uuid)s") %
-                      {'host': compute.host, 'uuid': compute.uuid})
-            host_mapping = HostMapping(
-                ctxt, host=compute.host,
-                cell_mapping=cm)
-            host_mapping.create()
-            host_mappings.append(host_mapping)
-            compute.mapped = 1
-            compute.save()
+        hosts[compute.host] = None
+    hosts = list(hosts)
+    if not hosts:
+        return []
+
+    try:
+        created = _create_missing_host_mappings_in_db(ctxt, cm.id, hosts)
+    except db_exc.DBDuplicateEntry:
+        # Another discovery mapped some of the hosts in the meantime, the
+        # second try will leave them alone.
+        created = _create_missing_host_mappings_in_db(ctxt, cm.id, hosts)
+
+    host_mappings = []
+    for host in created:
+        status_fn(_("Created host mapping for compute host '%s'") % host)
+        host_mapping = HostMapping(ctxt, host=host, cell_mapping=cm)
+        host_mapping.obj_reset_changes()
+        host_mappings.append(host_mapping)
+    # The compute nodes of hosts which were already mapped are flagged as
+    # well, so that they are not checked again by the next discovery.
+    db.compute_node_set_mapped(ctxt, [compute.id for compute in compute_nodes],
+                               1)
     return host_mappings
 
 
-def discover_hosts(ctxt, cell_uuid=None, status_fn=None):
+def _discover_hosts_in_cell(ctxt, cm, status_fn):
+    from nova import objects
+
+    if 'name' in cm and cm.name:
+        status_fn(_("Getting compute nodes from cell '%(name)s': "
+                    "%(uuid)s") % {'name': cm.name,
+                                   'uuid': cm.uuid})
+    else:
+        status_fn(_("Getting compute nodes from cell: %(uuid)s") %
+                  {'uuid': cm.uuid})
+    with context.target_cell(ctxt, cm) as cctxt:
+        compute_nodes = objects.ComputeNodeList.get_all_by_not_mapped(
+            cctxt, 1)
+        status_fn(_('Found %(num)s unmapped computes in cell: %(uuid)s') %
+                  {'num': len(compute_nodes),
+                   'uuid': cm.uuid})
+        return _check_and_create_host_mappings(cctxt, cm, compute_nodes,
+                                               status_fn)
+
+
+def discover_hosts(ctxt, cell_uuid=None, status_fn=None, workers=1):
+    """Map the compute hosts of the cells which are not mapped yet.
+
+    The compute nodes of each cell are flagged as mapped once their host is,
+    so that an interrupted discovery resumes with the hosts it had not got
+    to.
+
+    :param ctxt: The RequestContext to use
+    :param cell_uuid: The uuid of the only cell to look into, or None to look
+                      into every cell
+    :param status_fn: A function called with the progress messages
+    :param workers: The number of cells looked into concurrently
+    :returns: The list of the HostMappings created
+    """
     # TODO(alaski): If this is not run on a host configured to use the API
     # database most of the lookups below will fail and may not provide a
     # great error message. Add a check which will raise a useful error
@@ -206,27 +272,16 @@ def discover_hosts(ctxt, cell_uuid=None, status_fn=None):
         cell_mappings = objects.CellMappingList.get_all(ctxt)
         status_fn(_('Found %s cell mappings.') % len(cell_mappings))
 
-    host_mappings = []
+    pool = eventlet.GreenPool(workers)
+    threads = []
     for cm in cell_mappings:
         if cm.is_cell0():
             status_fn(_('Skipping cell0 since it does not contain hosts.'))
             continue
-        if 'name' in cm and cm.name:
-            status_fn(_("Getting compute nodes from cell '%(name)s': "
-                        "%(uuid)s") % {'name': cm.name,
-                                       'uuid': cm.uuid})
-        else:
-            status_fn(_("Getting compute nodes from cell: %(uuid)s") %
-                      {'uuid': cm.uuid})
-        with context.target_cell(ctxt, cm) as cctxt:
-            compute_nodes = objects.ComputeNodeList.get_all_by_not_mapped(
-                cctxt, 1)
-            status_fn(_('Found %(num)s unmapped computes in cell: %(uuid)s') %
-                      {'num': len(compute_nodes),
-                       'uuid': cm.uuid})
-            added_hm = _check_and_create_host_mappings(cctxt, cm,
-                                                       compute_nodes,
-                                                       status_fn)
-            host_mappings.extend(added_hm)
+        threads.append(pool.spawn(_discover_hosts_in_cell, ctxt, cm,
+                                  status_fn))
 
+    host_mappings = []
+    for thread in threads:
+        host_mappings.extend(thread.wait())
     return host_mappings
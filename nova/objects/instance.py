@@ -59,6 +59,18 @@ _INSTANCE_OPTIONAL_NON_COLUMN_FIELDS = ['flavor', 'old_flavor',
 _INSTANCE_EXTRA_FIELDS = ['numa_topology', 'pci_requests',
                           'flavor', 'vcpu_model', 'migration_context',
                           'keypairs', 'device_metadata']
+# These are the instance_extra columns holding JSON that is kept as text by
+# _from_db_object() and only deserialized when one of the fields is first
+# accessed. The flavor column holds flavor, old_flavor and new_flavor.
+_DEFERRED_EXTRA_COLUMNS = {'numa_topology': 'numa_topology',
+                           'pci_requests': 'pci_requests',
+                           'device_metadata': 'device_metadata',
+                           'vcpu_model': 'vcpu_model',
+                           'migration_context': 'migration_context',
+                           'keypairs': 'keypairs',
+                           'flavor': 'flavor',
+                           'old_flavor': 'flavor',
+                           'new_flavor': 'flavor'}
 # These are fields that applied/drooped by migration_context
 _MIGRATION_CONTEXT_ATTRS = ['numa_topology', 'pci_requests',
                             'pci_devices']
@@ -228,6 +240,7 @@ class Instance(base.NovaPersistentObject, base.NovaObject,
             del primitive['services']
 
     def __init__(self, *args, **kwargs):
+        self._deferred_extra = {}
         super(Instance, self).__init__(*args, **kwargs)
         self._reset_metadata_tracking()
 
@@ -243,6 +256,14 @@ class Instance(base.NovaPersistentObject, base.NovaObject,
             self._orig_metadata = (dict(self.metadata) if
                                    'metadata' in self else {})
 
+    def __deepcopy__(self, memo):
+        # NOTE: Copy the deferred instance_extra columns as they are rather
+        # than deserializing them just to copy the resulting objects.
+        with self._deferred_extra_hidden() as deferred:
+            nobj = super(Instance, self).__deepcopy__(memo)
+        nobj._deferred_extra = dict(deferred)
+        return nobj
+
     def obj_clone(self):
         """Create a copy of this instance object."""
         nobj = super(Instance, self).obj_clone()
@@ -261,8 +282,17 @@ class Instance(base.NovaPersistentObject, base.NovaObject,
                                                 recursive=recursive)
         self._reset_metadata_tracking(fields=fields)
 
+    def obj_attr_is_set(self, attrname):
+        # NOTE: A field whose instance_extra column has not been deserialized
+        # yet is set, it is just not loaded into an object until accessed.
+        return (super(Instance, self).obj_attr_is_set(attrname) or
+                self._is_deferred(attrname))
+
     def obj_what_changed(self):
-        changes = super(Instance, self).obj_what_changed()
+        # NOTE: Deferred fields cannot have changed since they were read from
+        # the database, so do not deserialize them just to check.
+        with self._deferred_extra_hidden():
+            changes = super(Instance, self).obj_what_changed()
         if 'metadata' in self and self.metadata != self._orig_metadata:
             changes.add('metadata')
         if 'system_metadata' in self and (self.system_metadata !=
@@ -315,23 +345,68 @@ class Instance(base.NovaPersistentObject, base.NovaObject,
                 base_name = self.uuid
         return base_name
 
-    def _flavor_from_db(self, db_flavor):
-        """Load instance flavor information from instance_extra."""
+    def _flavor_from_db(self, db_flavor, only_unset=False):
+        """Load instance flavor information from instance_extra.
+
+        :param only_unset: Leave the flavor fields which are already set on
+                           this object untouched
+        """
 
         flavor_info = jsonutils.loads(db_flavor)
 
-        self.flavor = objects.Flavor.obj_from_primitive(flavor_info['cur'])
-        if flavor_info['old']:
-            self.old_flavor = objects.Flavor.obj_from_primitive(
-                flavor_info['old'])
+        loaded = []
+        for attr, key in (('flavor', 'cur'), ('old_flavor', 'old'),
+                          ('new_flavor', 'new')):
+            if only_unset and hasattr(self, base.get_attrname(attr)):
+                continue
+            if attr == 'flavor' or flavor_info[key]:
+                setattr(self, attr,
+                        objects.Flavor.obj_from_primitive(flavor_info[key]))
+            else:
+                setattr(self, attr, None)
+            loaded.append(attr)
+        self.obj_reset_changes(loaded)
+
+    def _is_deferred(self, attrname):
+        """Whether attrname still waits on its instance_extra column."""
+        column = _DEFERRED_EXTRA_COLUMNS.get(attrname)
+        return (column in self._deferred_extra and
+                not hasattr(self, base.get_attrname(attrname)))
+
+    @contextlib.contextmanager
+    def _deferred_extra_hidden(self):
+        """Make the deferred fields look unset for the duration."""
+        deferred, self._deferred_extra = self._deferred_extra, {}
+        try:
+            yield deferred
+        finally:
+            self._deferred_extra = deferred
+
+    def _defer_extra(self, column, db_value):
+        """Keep an instance_extra JSON column to deserialize on access.
+
+        If the field was already loaded on this object, as when it is being
+        created or refreshed, the new value is loaded right away instead.
+        """
+        if hasattr(self, base.get_attrname(column)):
+            self._deferred_extra.pop(column, None)
+            self._load_extra_column(column, db_value)
         else:
-            self.old_flavor = None
-        if flavor_info['new']:
-            self.new_flavor = objects.Flavor.obj_from_primitive(
-                flavor_info['new'])
+            self._deferred_extra[column] = db_value
+
+    def _load_extra_column(self, column, db_value, only_unset=False):
+        if column == 'flavor':
+            self._flavor_from_db(db_value, only_unset=only_unset)
         else:
-            self.new_flavor = None
-        self.obj_reset_changes(['flavor', 'old_flavor', 'new_flavor'])
+            getattr(self, '_load_%s' % column)(db_value)
+            self.obj_reset_changes([column])
+
+    def _load_deferred_extra(self, attrname):
+        column = _DEFERRED_EXTRA_COLUMNS[attrname]
+        db_value = self._deferred_extra.pop(column)
+        # NOTE: One of the flavor fields may have been assigned since the
+        # column was deferred, which must not be overwritten here.
+        self._load_extra_column(column, db_value, only_unset=True)
 
     @staticmethod
     def _from_db_object(context, instance, db_inst, expected_attrs=None):
@@ -370,39 +445,40 @@ class Instance(base.NovaPersistentObject, base.NovaObject,
                     context, instance.uuid))
         if 'numa_topology' in expected_attrs:
             if have_extra:
-                instance._load_numa_topology(
-                    db_inst['extra'].get('numa_topology'))
+                instance._defer_extra(
+                    'numa_topology', db_inst['extra'].get('numa_topology'))
             else:
                 instance.numa_topology = None
         if 'pci_requests' in expected_attrs:
             if have_extra:
-                instance._load_pci_requests(
-                    db_inst['extra'].get('pci_requests'))
+                instance._defer_extra(
+                    'pci_requests', db_inst['extra'].get('pci_requests'))
             else:
                 instance.pci_requests = None
         if 'device_metadata' in expected_attrs:
             if have_extra:
-                instance._load_device_metadata(
-                    db_inst['extra'].get('device_metadata'))
+                instance._defer_extra(
+                    'device_metadata', db_inst['extra'].get('device_metadata'))
             else:
                 instance.device_metadata = None
         if 'vcpu_model' in expected_attrs:
             if have_extra:
-                instance._load_vcpu_model(
-                    db_inst['extra'].get('vcpu_model'))
+                instance._defer_extra(
+                    'vcpu_model', db_inst['extra'].get('vcpu_model'))
             else:
                 instance.vcpu_model = None
         if 'ec2_ids' in expected_attrs:
             instance._load_ec2_ids()
         if 'migration_context' in expected_attrs:
             if have_extra:
-                instance._load_migration_context(
+                instance._defer_extra(
+                    'migration_context',
                     db_inst['extra'].get('migration_context'))
             else:
                 instance.migration_context = None
         if 'keypairs' in expected_attrs:
-            if have_extra:
-                instance._load_keypairs(db_inst['extra'].get('keypairs'))
+            if have_extra and db_inst['extra'].get('keypairs'):
+                instance._defer_extra('keypairs', db_inst['extra']['keypairs'])
         if 'info_cache' in expected_attrs:
             if db_inst.get('info_cache') is None:
                 instance.info_cache = None
@@ -419,7 +495,7 @@ class Instance(base.NovaPersistentObject, base.NovaObject,
                                               'old_flavor',
                                               'new_flavor')]):
             if have_extra and db_inst['extra'].get('flavor'):
-                instance._flavor_from_db(db_inst['extra']['flavor'])
+                instance._defer_extra('flavor', db_inst['extra']['flavor'])
 
         # TODO(danms): If we are updating these on a backlevel instance,
         # we'll end up sending back new versions of these objects (see
@@ -736,6 +812,7 @@ class Instance(base.NovaPersistentObject, base.NovaObject,
             # NOTE(danms): For object fields, we construct and call a
             # helper method like self._save_$attrname()
             if (self.obj_attr_is_set(field) and
+                    not self._is_deferred(field) and
                     isinstance(self.fields[field], fields.ObjectField)):
                 try:
                     getattr(self, '_save_%s' % field)(context)
@@ -1041,6 +1118,12 @@ class Instance(base.NovaPersistentObject, base.NovaObject,
             self.numa_topology = numa_topology.clear_host_pinning()
 
     def obj_load_attr(self, attrname):
+        if self._is_deferred(attrname):
+            # NOTE: This only needs the JSON we read along with the instance,
+            # so it works for orphaned objects too.
+            self._load_deferred_extra(attrname)
+            return
+
         if attrname not in INSTANCE_OPTIONAL_ATTRS:
             raise exception.ObjectActionError(
                 action='obj_load_attr',
@@ -12,6 +12,7 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+from oslo_log import log as logging
 from oslo_utils import timeutils
 
 from nova import db
@@ -20,6 +21,9 @@ from nova.objects import base
 from nova.objects import fields
 
 
+LOG = logging.getLogger(__name__)
+
+
 # TODO(berrange): Remove NovaObjectDictCompat
 @base.NovaObjectRegistry.register
 class InstanceAction(base.NovaPersistentObject, base.NovaObject,
@@ -120,7 +124,8 @@ class InstanceActionEvent(base.NovaPersistentObject, base.NovaObject,
                           base.NovaObjectDictCompat):
     # Version 1.0: Initial version
     # Version 1.1: event_finish_with_failure decorated with serialize_args
-    VERSION = '1.1'
+    # Version 1.2: Add record_events()
+    VERSION = '1.2'
     fields = {
         'id': fields.IntegerField(),
         'event': fields.StringField(nullable=True),
@@ -194,6 +199,22 @@ class InstanceActionEvent(base.NovaPersistentObject, base.NovaObject,
                                              exc_tb=None,
                                              want_result=want_result)
 
+    @base.remotable_classmethod
+    def record_events(cls, context, events):
+        """Record a batch of event starts and finishes in one call.
+
+        :param events: list of event value dicts, in the order the starts
+                       and finishes happened, as built by
+                       pack_action_event_start/finish with datetimes and
+                       exceptions already serialized to strings and the
+                       project_id of the originating context added
+        """
+        failed = db.action_events_record(context, events)
+        for values in failed:
+            LOG.warning('Unable to record event %(event)s for request '
+                        '%(request_id)s: action or started event not found',
+                        values, instance_uuid=values['instance_uuid'])
+
     @base.remotable
     def finish_with_failure(self, exc_val, exc_tb):
         values = self.pack_action_event_finish(self._context,
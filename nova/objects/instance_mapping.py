@@ -195,3 +195,31 @@ class InstanceMappingList(base.ObjectListBase, base.NovaObject):
     @classmethod
     def destroy_bulk(cls, context, instance_uuids):
         return cls._destroy_bulk_in_db(context, instance_uuids)
+
+    @staticmethod
+    @db_api.api_context_manager.writer
+    def _create_missing_in_db(context, cell_id, project_ids):
+        existing = set(uuid for uuid, in context.session.query(
+            api_models.InstanceMapping.instance_uuid).filter(
+                api_models.InstanceMapping.instance_uuid.in_(
+                    list(project_ids))))
+        values = [{'instance_uuid': uuid, 'cell_id': cell_id,
+                   'project_id': project_id}
+                  for uuid, project_id in project_ids.items()
+                  if uuid not in existing]
+        if values:
+            context.session.execute(
+                api_models.InstanceMapping.__table__.insert(), values)
+        return len(values)
+
+    @classmethod
+    def create_missing(cls, context, cell_mapping, project_ids):
+        """Map the instances which have no mapping yet to a cell.
+
+        :param cell_mapping: The CellMapping of the cell of the instances
+        :param project_ids: A dict of the project ids of the instances, keyed
+                            by their uuid
+        :returns: The number of instance mappings created
+        """
+        return cls._create_missing_in_db(context, cell_mapping.id,
+                                         project_ids)
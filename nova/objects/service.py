@@ -31,7 +31,7 @@ LOG = logging.getLogger(__name__)
 
 
 # NOTE(danms): This is the global service version counter
-SERVICE_VERSION = 25
+SERVICE_VERSION = 26
 
 
 # NOTE(danms): This is our SERVICE_VERSION history. The idea is that any
@@ -120,6 +120,8 @@ SERVICE_VERSION_HISTORY = (
     # Version 25: Compute hosts allow migration-based allocations
     # for live migration.
     {'compute_rpc': '4.18'},
+    # Version 26: Compute RPC version 4.19
+    {'compute_rpc': '4.19'},
 )
 
 
@@ -43,6 +43,55 @@ saved_file_rules = []
 KEY_EXPR = re.compile(r'%\((\w+)\)s')
 
 
+class ResultMemo(object):
+    """Memo of the policy checks already made for one request context.
+
+    API requests often check the same rule against the same target many
+    times, e.g. once per server in a server list, so the results are kept
+    for the lifetime of the context. The memo is emptied when the enforcer
+    rules are replaced or when the credentials of the context change.
+    """
+
+    def __init__(self):
+        self._rules = None
+        self._credentials = None
+        self._results = {}
+
+    @staticmethod
+    def _key(action, target):
+        # NOTE: Only plain dicts with hashable values are memoized, other
+        # targets like objects may not be cheaply compared.
+        if type(target) is not dict:
+            return None
+        try:
+            return action, frozenset(target.items())
+        except TypeError:
+            return None
+
+    def _validate(self, context):
+        credentials = (context.is_admin, tuple(context.roles),
+                       context.user_id, context.project_id)
+        if (self._rules is not _ENFORCER.rules or
+                self._credentials != credentials):
+            self._results.clear()
+            self._rules = _ENFORCER.rules
+            self._credentials = credentials
+
+    def get(self, context, action, target):
+        """Return the memoized result, or None if there is none."""
+        key = self._key(action, target)
+        if key is None:
+            return None
+        self._validate(context)
+        return self._results.get(key)
+
+    def set(self, context, action, target, result):
+        key = self._key(action, target)
+        if key is not None:
+            self._validate(context)
+            self._results[key] = result
+
+
 def reset():
     global _ENFORCER
     if _ENFORCER:
@@ -150,7 +199,18 @@ def authorize(context, action, target, do_raise=True, exc=None):
        :return: returns a non-False value (not necessarily "True") if
            authorized, and the exact value False if not authorized and
            do_raise is False.
+
+       The result of checks made without a custom exc for a plain dict
+       target is kept in the ``policy_memo`` of the context, if it has one,
+       and reused for the same action and target.
     """
+    memo = getattr(context, 'policy_memo', None) if not exc else None
+    if memo is not None and _ENFORCER:
+        result = memo.get(context, action, target)
+        if result is not None:
+            if not result and do_raise:
+                raise exception.PolicyNotAuthorized(action=action)
+            return result
     init()
     credentials = context.to_policy_values()
     if not exc:
@@ -161,11 +221,15 @@ def authorize(context, action, target, do_raise=True, exc=None):
     except policy.PolicyNotRegistered:
         with excutils.save_and_reraise_exception():
             LOG.exception(_LE('Policy not registered'))
-    except Exception:
+    except Exception as e:
         with excutils.save_and_reraise_exception():
+            if memo is not None and isinstance(e, exc):
+                memo.set(context, action, target, False)
             LOG.debug('Policy check for %(action)s failed with credentials '
                       '%(credentials)s',
                       {'action': action, 'credentials': credentials})
+    if memo is not None:
+        memo.set(context, action, target, result)
     return result
 
 
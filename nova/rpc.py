@@ -25,8 +25,11 @@ __all__ = [
     'get_notifier',
 ]
 
+import collections
 import functools
 
+import eventlet
+from eventlet import queue
 from oslo_log import log as logging
 import oslo_messaging as messaging
 from oslo_messaging.rpc import dispatcher
@@ -50,6 +53,7 @@ TRANSPORT = None
 LEGACY_NOTIFIER = None
 NOTIFICATION_TRANSPORT = None
 NOTIFIER = None
+NOTIFICATION_QUEUE = None
 
 ALLOWED_EXMODS = [
     nova.exception.__name__,
@@ -59,6 +63,7 @@ EXTRA_EXMODS = []
 
 def init(conf):
     global TRANSPORT, NOTIFICATION_TRANSPORT, LEGACY_NOTIFIER, NOTIFIER
+    global NOTIFICATION_QUEUE
     exmods = get_allowed_exmods()
     TRANSPORT = create_transport(get_transport_url())
     NOTIFICATION_TRANSPORT = messaging.get_notification_transport(
@@ -84,10 +89,15 @@ def init(conf):
             NOTIFICATION_TRANSPORT,
             serializer=serializer,
             topics=conf.notifications.versioned_notifications_topics)
+    if conf.notifications.notification_queue_size:
+        NOTIFICATION_QUEUE = NotificationQueue(
+            conf.notifications.notification_queue_size,
+            conf.notifications.notification_queue_overflow)
 
 
 def cleanup():
     global TRANSPORT, NOTIFICATION_TRANSPORT, LEGACY_NOTIFIER, NOTIFIER
+    global NOTIFICATION_QUEUE
     assert TRANSPORT is not None
     assert NOTIFICATION_TRANSPORT is not None
     assert LEGACY_NOTIFIER is not None
@@ -95,6 +105,7 @@ def cleanup():
     TRANSPORT.cleanup()
     NOTIFICATION_TRANSPORT.cleanup()
     TRANSPORT = NOTIFICATION_TRANSPORT = LEGACY_NOTIFIER = NOTIFIER = None
+    NOTIFICATION_QUEUE = None
 
 
 def set_defaults(control_exchange):
@@ -113,9 +124,18 @@ def get_allowed_exmods():
     return ALLOWED_EXMODS + EXTRA_EXMODS
 
 
+class PrimitivePayload(dict):
+    """A notification payload already made only of JSON primitives, such as
+    the primitive of a versioned notification payload, which
+    JsonPayloadSerializer passes on as is.
+    """
+
+
 class JsonPayloadSerializer(messaging.NoOpSerializer):
     @staticmethod
     def serialize_entity(context, entity):
+        if isinstance(entity, PrimitivePayload):
+            return entity
         return jsonutils.to_primitive(entity, convert_instances=True)
 
 
@@ -215,19 +235,88 @@ def get_versioned_notifier(publisher_id):
     return NOTIFIER.prepare(publisher_id=publisher_id)
 
 
+def legacy_notifications_enabled():
+    return (LEGACY_NOTIFIER.is_enabled() and
+            CONF.notifications.notification_format in ('both',
+                                                       'unversioned'))
+
+
+def versioned_notifications_enabled():
+    return (NOTIFIER.is_enabled() and
+            CONF.notifications.notification_format in ('both', 'versioned'))
+
+
 def if_notifications_enabled(f):
     """Calls decorated method only if versioned notifications are enabled."""
     @functools.wraps(f)
     def wrapped(*args, **kwargs):
-        if (NOTIFIER.is_enabled() and
-                CONF.notifications.notification_format in ('both',
-                                                           'versioned')):
+        if versioned_notifications_enabled():
             return f(*args, **kwargs)
         else:
             return None
     return wrapped
 
 
+def emit_notification(send, *args, **kwargs):
+    """Calls send to emit a versioned notification.
+
+    With [notifications]/notification_queue_size, send is called later by
+    the background green thread of the notification queue.
+    """
+    if NOTIFICATION_QUEUE is None:
+        return send(*args, **kwargs)
+    NOTIFICATION_QUEUE.put(send, *args, **kwargs)
+
+
+class NotificationQueue(object):
+    """Queue of versioned notifications sent by a background green thread."""
+
+    def __init__(self, size, overflow):
+        self.overflow = overflow
+        self.stats = collections.Counter(queued=0, sent=0, dropped=0,
+                                         failed=0, max_depth=0)
+        self._queue = queue.LightQueue(size)
+        self._worker = None
+
+    def put(self, send, *args, **kwargs):
+        if eventlet.getcurrent() is self._worker:
+            # Notifications emitted while building a queued one are sent
+            # right away, the worker must not wait for room in its own queue
+            send(*args, **kwargs)
+            return
+        if self._worker is None:
+            self._worker = eventlet.spawn_n(self._run)
+
+        item = (send, args, kwargs)
+        if self.overflow == 'drop':
+            try:
+                self._queue.put_nowait(item)
+            except queue.Full:
+                self.stats['dropped'] += 1
+                LOG.warning('The notification queue is full, dropping a '
+                            'notification. %d notifications were dropped '
+                            'so far.', self.stats['dropped'])
+                return
+        else:
+            self._queue.put(item)
+        self.stats['queued'] += 1
+        self.stats['max_depth'] = max(self.stats['max_depth'],
+                                      self._queue.qsize())
+
+    def _run(self):
+        while True:
+            send, args, kwargs = self._queue.get()
+            try:
+                send(*args, **kwargs)
+                self.stats['sent'] += 1
+            except Exception:
+                self.stats['failed'] += 1
+                LOG.exception('Failed to send a queued notification')
+            if self._queue.empty():
+                LOG.debug('The notification queue is empty, totals since '
+                          'the service started: %s', dict(self.stats))
+
+
 def create_transport(url):
     exmods = get_allowed_exmods()
     return messaging.get_rpc_transport(CONF,
@@ -18,6 +18,7 @@ import oslo_messaging as messaging
 from oslo_utils import timeutils
 import six
 
+from nova import conductor
 import nova.conf
 from nova.i18n import _, _LI, _LW, _LE
 from nova.servicegroup import api
@@ -33,6 +34,13 @@ class DbDriver(base.Driver):
 
     def __init__(self, *args, **kwargs):
         self.service_down_time = CONF.service_down_time
+        self._conductor_api = None
+
+    @property
+    def conductor_api(self):
+        if self._conductor_api is None:
+            self._conductor_api = conductor.API()
+        return self._conductor_api
 
     def join(self, member, group, service=None):
         """Add a new member to a service group.
@@ -87,8 +95,16 @@ class DbDriver(base.Driver):
         """Update the state of this service in the datastore."""
 
         try:
-            service.service_ref.report_count += 1
-            service.service_ref.save()
+            service_ref = service.service_ref
+            # NOTE: Services which do not access the database directly can
+            # have their state reports aggregated by nova-conductor.
+            if (CONF.heartbeat_batch_interval and
+                    service_ref.indirection_api is not None):
+                self.conductor_api.service_heartbeat(service_ref._context,
+                                                     service_ref)
+            else:
+                service_ref.report_count += 1
+                service_ref.save()
 
             # TODO(termie): make this pattern be more elegant.
             if getattr(service, 'model_disconnected', False):
@@ -183,3 +183,30 @@ class InstanceMappingListTestCase(test.NoDBTestCase):
             self.context, uuids + [uuidsentinel.deleted_instance])
         self.assertEqual(sorted(uuids),
                          sorted([m.instance_uuid for m in mappings]))
+
+    def test_instance_mapping_create_missing(self):
+        cell = create_cell_mapping()
+        cell_mapping_obj = cell_mapping.CellMapping._from_db_object(
+            self.context, cell_mapping.CellMapping(), cell)
+        db_inst_mapping = create_mapping(project_id='other-project')
+        project_ids = {db_inst_mapping.instance_uuid: 'fake-project',
+                       uuidsentinel.instance1: 'fake-project',
+                       uuidsentinel.instance2: 'fake-project'}
+
+        self.assertEqual(
+            2, instance_mapping.InstanceMappingList.create_missing(
+                self.context, cell_mapping_obj, project_ids))
+        self.assertEqual(
+            0, instance_mapping.InstanceMappingList.create_missing(
+                self.context, cell_mapping_obj, project_ids))
+
+        mappings = instance_mapping.InstanceMappingList.get_by_instance_uuids(
+            self.context, list(project_ids))
+        self.assertEqual(3, len(mappings))
+        for mapping in mappings:
+            if mapping.instance_uuid == db_inst_mapping.instance_uuid:
+                # The existing mapping was left alone
+                self.assertEqual('other-project', mapping.project_id)
+            else:
+                self.assertEqual('fake-project', mapping.project_id)
+                self.assertEqual(cell['uuid'], mapping.cell_mapping.uuid)
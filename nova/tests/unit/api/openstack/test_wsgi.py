@@ -10,6 +10,8 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import datetime
+
 import mock
 from oslo_serialization import jsonutils
 import six
@@ -198,6 +200,14 @@ class JSONDictSerializerTest(test.NoDBTestCase):
         result = result.replace('\n', '').replace(' ', '')
         self.assertEqual(result, expected_json)
 
+    def test_json_matches_jsonutils(self):
+        input_dict = {'server': {'created': datetime.datetime(2017, 1, 1),
+                                 'name': u'\u0441\u0435\u0440\u0432',
+                                 'ids': set([1])}}
+        serializer = wsgi.JSONDictSerializer()
+        self.assertEqual(six.text_type(jsonutils.dumps(input_dict)),
+                         serializer.serialize(input_dict))
+
 
 class JSONDeserializerTest(test.NoDBTestCase):
     def test_json(self):
@@ -1018,3 +1028,58 @@ class TestController(test.NoDBTestCase):
         result = wsgi.Controller.check_for_versions_intersection(func_list=
                                                                  func_list)
         self.assertTrue(result)
+
+    def test_versioned_method_dispatch(self):
+        class Controller(wsgi.Controller):
+            @wsgi.Controller.api_version('2.1', '2.9')
+            def show(self, req):
+                return 'old'
+
+            @wsgi.Controller.api_version('2.10')  # noqa
+            def show(self, req):
+                return 'new'
+
+        controller = Controller()
+
+        def request(version):
+            req = mock.Mock()
+            req.api_version_request = api_version.APIVersionRequest(version)
+            return req
+
+        with mock.patch.object(api_version.APIVersionRequest, 'matches',
+                               autospec=True,
+                               side_effect=api_version.APIVersionRequest.
+                               matches) as mock_matches:
+            for i in range(3):
+                self.assertEqual('old', controller.show(request('2.5')))
+                self.assertEqual('new', controller.show(req=request('2.12')))
+                self.assertRaises(exception.VersionNotFoundForAPIMethod,
+                                  controller.show, request('1.1'))
+        # The versions are only matched the first time each microversion
+        # is requested, newest first: 2.10, then 2.1 for 2.5.
+        self.assertEqual(5, mock_matches.call_count)
+        self.assertIsNone(wsgi._VERSIONED_METHODS[(Controller, 'show', 1, 1)])
+
+    def test_unversioned_attribute(self):
+        class Controller(wsgi.Controller):
+            @wsgi.Controller.api_version('2.10')
+            def show(self, req):
+                return 'new'
+
+            def index(self, req):
+                return 'index'
+
+        controller = Controller()
+
+        def request(version):
+            req = mock.Mock()
+            req.api_version_request = api_version.APIVersionRequest(version)
+            return req
+
+        # The unversioned method is called whatever the microversion, the
+        # versioned one only for the microversions it supports.
+        for version in ('2.5', '2.12'):
+            self.assertEqual('index', controller.index(request(version)))
+        self.assertEqual('new', controller.show(request('2.12')))
+        self.assertRaises(exception.VersionNotFoundForAPIMethod,
+                          controller.show, request('2.5'))
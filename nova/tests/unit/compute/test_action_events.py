@@ -0,0 +1,156 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Tests for buffered instance action event recording."""
+
+import mock
+
+from nova.compute import action_events
+from nova.compute import utils as compute_utils
+from nova import context
+from nova import exception
+from nova import objects
+from nova import test
+from nova.tests import uuidsentinel as uuids
+
+
+@mock.patch.object(objects.InstanceActionEvent, 'record_events')
+class ActionEventBufferTestCase(test.NoDBTestCase):
+
+    def setUp(self):
+        super(ActionEventBufferTestCase, self).setUp()
+        self.context = context.RequestContext('fake-user', 'fake-project')
+        self.buffer = action_events.ActionEventBuffer(10, 3)
+
+    def _recorded(self, mock_record):
+        return [[(e['instance_uuid'], e['event'], 'start_time' in e,
+                  'finish_time' in e) for e in call[0][1]]
+                for call in mock_record.call_args_list]
+
+    def test_start_finish_coalesced(self, mock_record):
+        self.buffer.event_start(self.context, uuids.instance, 'compute_stop')
+        self.buffer.event_finish(self.context, uuids.instance, 'compute_stop')
+        self.buffer.flush()
+
+        self.assertEqual([[(uuids.instance, 'compute_stop', True, True)]],
+                         self._recorded(mock_record))
+        event = mock_record.call_args[0][1][0]
+        self.assertEqual('Success', event['result'])
+        self.assertEqual('fake-project', event['project_id'])
+        self.assertEqual(self.context.request_id, event['request_id'])
+        self.assertIsInstance(event['start_time'], str)
+        self.assertIsInstance(event['finish_time'], str)
+        self.assertEqual(1, self.buffer.stats['coalesced'])
+
+    def test_finish_after_flush_not_coalesced(self, mock_record):
+        self.buffer.event_start(self.context, uuids.instance, 'compute_stop')
+        self.buffer.flush()
+        self.buffer.event_finish(self.context, uuids.instance, 'compute_stop',
+                                 exc_val=exception.NovaException('boom'),
+                                 exc_tb='fake-tb')
+        self.buffer.flush()
+
+        self.assertEqual([[(uuids.instance, 'compute_stop', True, False)],
+                          [(uuids.instance, 'compute_stop', False, True)]],
+                         self._recorded(mock_record))
+        event = mock_record.call_args[0][1][0]
+        self.assertEqual('Error', event['result'])
+        self.assertEqual('boom', event['message'])
+        self.assertEqual('fake-tb', event['traceback'])
+
+    @mock.patch.object(action_events.LOG, 'debug')
+    def test_flush_in_batches_and_order(self, mock_debug, mock_record):
+        for uuid in (uuids.inst1, uuids.inst2, uuids.inst3, uuids.inst4):
+            self.buffer.event_start(self.context, uuid, 'compute_reboot')
+        self.buffer.flush()
+        mock_debug.assert_called_once_with(
+            mock.ANY, {'count': 4, 'stats': self.buffer.stats})
+
+        self.assertEqual([[(uuids.inst1, 'compute_reboot', True, False),
+                           (uuids.inst2, 'compute_reboot', True, False),
+                           (uuids.inst3, 'compute_reboot', True, False)],
+                          [(uuids.inst4, 'compute_reboot', True, False)]],
+                         self._recorded(mock_record))
+        self.assertEqual(2, self.buffer.stats['batches'])
+        self.assertEqual(4, self.buffer.stats['written'])
+
+    @mock.patch('nova.utils.spawn_n')
+    def test_full_batch_triggers_flush(self, mock_spawn, mock_record):
+        for uuid in (uuids.inst1, uuids.inst2, uuids.inst3, uuids.inst4):
+            self.buffer.event_start(self.context, uuid, 'compute_reboot')
+        mock_spawn.assert_called_once_with(self.buffer.flush)
+
+    def test_flush_failure_requeued(self, mock_record):
+        mock_record.side_effect = [test.TestingException, None]
+        self.buffer.event_start(self.context, uuids.instance, 'compute_stop')
+        self.buffer.flush()
+        self.buffer.event_finish(self.context, uuids.instance, 'compute_stop')
+        self.buffer.flush()
+
+        # The failed start is sent again ahead of its finish.
+        self.assertEqual([[(uuids.instance, 'compute_stop', True, False)],
+                          [(uuids.instance, 'compute_stop', True, False),
+                           (uuids.instance, 'compute_stop', False, True)]],
+                         self._recorded(mock_record))
+
+    @mock.patch('oslo_service.loopingcall.FixedIntervalLoopingCall')
+    def test_stop_flushes(self, mock_loop, mock_record):
+        self.buffer.start()
+        mock_loop.return_value.start.assert_called_once_with(
+            interval=10, initial_delay=10)
+        self.buffer.event_start(self.context, uuids.instance, 'compute_stop')
+        self.buffer.stop()
+        mock_loop.return_value.stop.assert_called_once_with()
+        self.assertEqual(1, mock_record.call_count)
+
+
+class ActionEventsModuleTestCase(test.NoDBTestCase):
+
+    def setUp(self):
+        super(ActionEventsModuleTestCase, self).setUp()
+        self.addCleanup(action_events.cleanup)
+        self.context = context.RequestContext('fake-user', 'fake-project')
+
+    def test_init_disabled(self):
+        action_events.init()
+        self.assertIsNone(action_events.get_buffer())
+
+    @mock.patch.object(action_events.ActionEventBuffer, 'stop')
+    @mock.patch.object(action_events.ActionEventBuffer, 'start')
+    def test_init_cleanup(self, mock_start, mock_stop):
+        self.flags(action_event_flush_interval=5, group='compute')
+        action_events.init()
+        event_buffer = action_events.get_buffer()
+        self.assertEqual(5, event_buffer.flush_interval)
+        mock_start.assert_called_once_with()
+        action_events.cleanup()
+        mock_stop.assert_called_once_with()
+        self.assertIsNone(action_events.get_buffer())
+
+    @mock.patch.object(objects.InstanceActionEvent, 'event_start')
+    @mock.patch.object(objects.InstanceActionEvent,
+                       'event_finish_with_failure')
+    @mock.patch.object(action_events.ActionEventBuffer, 'start')
+    def test_event_reporter_buffered(self, mock_start, mock_finish,
+                                     mock_event_start):
+        self.flags(action_event_flush_interval=5, group='compute')
+        action_events.init()
+        event_buffer = action_events.get_buffer()
+
+        with compute_utils.EventReporter(self.context, 'compute_stop',
+                                         uuids.inst1, uuids.inst2):
+            pass
+
+        self.assertFalse(mock_event_start.called)
+        self.assertFalse(mock_finish.called)
+        self.assertEqual(2, event_buffer.stats['queued'])
+        self.assertEqual(2, event_buffer.stats['coalesced'])
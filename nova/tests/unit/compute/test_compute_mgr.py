@@ -126,6 +126,39 @@ class ComputeManagerUnitTestCase(test.NoDBTestCase):
             event_pwr_state=power_state.SHUTDOWN,
             current_pwr_state=power_state.RUNNING)
 
+    @mock.patch.object(manager.ComputeManager, '_get_power_state',
+                       return_value=power_state.RUNNING)
+    @mock.patch.object(manager.ComputeManager, '_sync_instance_power_state')
+    @mock.patch.object(objects.InstanceList, 'get_by_filters')
+    def test_handle_events_lifecycle_event_batch(self, mock_get, mock_sync,
+                                                 mock_get_power_state):
+        instance1 = fake_instance.fake_instance_obj(self.context,
+                                                    uuid=uuids.instance1)
+        instance2 = fake_instance.fake_instance_obj(self.context,
+                                                    uuid=uuids.instance2)
+        mock_get.return_value = objects.InstanceList(
+            objects=[instance2, instance1])
+        mock_sync.side_effect = [test.TestingException, None]
+        batch = virtevent.LifecycleEventBatch([
+            virtevent.LifecycleEvent(uuids.instance1,
+                                     virtevent.EVENT_LIFECYCLE_STARTED),
+            virtevent.LifecycleEvent(uuids.deleted,
+                                     virtevent.EVENT_LIFECYCLE_STARTED),
+            virtevent.LifecycleEvent(uuids.instance2,
+                                     virtevent.EVENT_LIFECYCLE_RESUMED)])
+
+        self.compute.handle_events(batch)
+
+        # the instances are fetched at once
+        mock_get.assert_called_once_with(
+            mock.ANY, {'uuid': [uuids.instance1, uuids.deleted,
+                                uuids.instance2]}, expected_attrs=[])
+        # the failure to handle one event does not stop the others from
+        # being handled
+        mock_sync.assert_has_calls([
+            mock.call(mock.ANY, instance1, power_state.RUNNING),
+            mock.call(mock.ANY, instance2, power_state.RUNNING)])
+
     @mock.patch('nova.compute.utils.notify_about_instance_action')
     def test_delete_instance_info_cache_delete_ordering(self, mock_notify):
         call_tracker = mock.Mock()
@@ -248,6 +281,48 @@ class ComputeManagerUnitTestCase(test.NoDBTestCase):
             else:
                 self.assertFalse(db_node.destroy.called)
 
+    @mock.patch.object(utils, 'log_execute_stats')
+    @mock.patch.object(manager.ComputeManager,
+                       'update_available_resource_for_node')
+    @mock.patch.object(fake_driver.FakeDriver, 'get_available_nodes',
+                       return_value=set())
+    @mock.patch.object(manager.ComputeManager, '_get_compute_nodes_in_db',
+                       return_value=[])
+    def test_update_available_resource_logs_execute_stats(
+            self, get_db_nodes, get_avail_nodes, update_mock, log_stats):
+        self.compute.update_available_resource(self.context)
+        log_stats.assert_called_once_with()
+
+    @mock.patch('nova.scheduler.client.report.SchedulerReportClient.'
+                'delete_resource_provider')
+    @mock.patch.object(manager.ComputeManager, '_get_resource_tracker')
+    @mock.patch.object(manager.ComputeManager,
+                       'update_available_resource_for_node')
+    @mock.patch.object(fake_driver.FakeDriver, 'get_available_nodes')
+    @mock.patch.object(manager.ComputeManager, '_get_compute_nodes_in_db')
+    def test_update_available_resource_rebalanced_node(
+            self, get_db_nodes, get_avail_nodes, update_mock, get_rt,
+            del_rp_mock):
+        db_nodes = [self._make_compute_node('node%s' % i, i)
+                    for i in range(1, 4)]
+        get_db_nodes.return_value = db_nodes
+        get_avail_nodes.return_value = set(['node3'])
+
+        # node1 moved to another host, node2 was deleted
+        with test.nested(
+            mock.patch.object(self.compute.driver, 'rebalances_nodes', True),
+            mock.patch.object(self.compute.driver, 'node_is_available',
+                              side_effect=lambda n: n == 'node1')
+        ):
+            self.compute.update_available_resource(self.context)
+
+        self.assertFalse(db_nodes[0].destroy.called)
+        get_rt.return_value.remove_node.assert_called_once_with('node1')
+        db_nodes[1].destroy.assert_called_once_with()
+        del_rp_mock.assert_called_once_with(self.context, db_nodes[1],
+                                            cascade=True)
+        self.assertFalse(db_nodes[2].destroy.called)
+
     @mock.patch('nova.context.get_admin_context')
     def test_pre_start_hook(self, get_admin_context):
         """Very simple test just to make sure update_available_resource is
@@ -2699,6 +2774,58 @@ class ComputeManagerUnitTestCase(test.NoDBTestCase):
                 self.context, instances[3], events[3].tag)
         do_test()
 
+    @mock.patch.object(manager.ComputeManager, '_process_instance_event')
+    def test_external_instance_event_prefetches_nw_info(self, mock_process):
+        instances = [objects.Instance(id=i, uuid=getattr(uuids, 'inst%d' % i))
+                     for i in range(3)]
+        events = [
+            objects.InstanceExternalEvent(name='network-changed',
+                                          instance_uuid=instances[0].uuid,
+                                          tag='tag'),
+            objects.InstanceExternalEvent(name='network-vif-plugged',
+                                          instance_uuid=instances[1].uuid,
+                                          tag='tag'),
+            objects.InstanceExternalEvent(name='network-changed',
+                                          instance_uuid=instances[2].uuid,
+                                          tag='tag')]
+        kwargs = {'admin_client': mock.sentinel.client}
+        with test.nested(
+            mock.patch.object(self.compute.network_api,
+                              'prefetch_instance_nw_info',
+                              return_value=kwargs),
+            mock.patch.object(self.compute.network_api,
+                              'get_instance_nw_info')
+        ) as (mock_prefetch, mock_get_nw_info):
+            self.compute.external_instance_event(self.context, instances,
+                                                 events)
+        mock_prefetch.assert_called_once_with(
+            self.context, [instances[0], instances[2]])
+        mock_get_nw_info.assert_has_calls([
+            mock.call(self.context, instances[0], **kwargs),
+            mock.call(self.context, instances[2], **kwargs)])
+        mock_process.assert_called_once_with(instances[1], events[1])
+
+    @mock.patch.object(manager.ComputeManager, '_process_instance_event')
+    def test_external_instance_event_prefetch_fails(self, mock_process):
+        instances = [objects.Instance(id=i, uuid=getattr(uuids, 'inst%d' % i))
+                     for i in range(2)]
+        events = [objects.InstanceExternalEvent(name='network-changed',
+                                                instance_uuid=inst.uuid,
+                                                tag='tag')
+                  for inst in instances]
+        with test.nested(
+            mock.patch.object(self.compute.network_api,
+                              'prefetch_instance_nw_info',
+                              side_effect=test.TestingException),
+            mock.patch.object(self.compute.network_api,
+                              'get_instance_nw_info')
+        ) as (mock_prefetch, mock_get_nw_info):
+            self.compute.external_instance_event(self.context, instances,
+                                                 events)
+        mock_get_nw_info.assert_has_calls([
+            mock.call(self.context, instances[0]),
+            mock.call(self.context, instances[1])])
+
     def test_external_instance_event_with_exception(self):
         vif1 = fake_network_cache_model.new_vif()
         vif1['id'] = '1'
@@ -3901,40 +4028,56 @@ class ComputeManagerUnitTestCase(test.NoDBTestCase):
                 self.context, instance, clean_shutdown=True)
 
     @mock.patch.object(utils, 'last_completed_audit_period',
-            return_value=(0, 0))
+            return_value=(datetime.datetime(2017, 1, 1),
+                          datetime.datetime(2017, 2, 1)))
     @mock.patch.object(time, 'time', side_effect=[10, 20, 21])
     @mock.patch.object(objects.InstanceList, 'get_by_host', return_value=[])
-    @mock.patch.object(objects.BandwidthUsage, 'get_by_instance_uuid_and_mac')
-    @mock.patch.object(db, 'bw_usage_update')
-    def test_poll_bandwidth_usage(self, bw_usage_update, get_by_uuid_mac,
+    @mock.patch.object(objects.BandwidthUsageList, 'get_by_uuids')
+    @mock.patch.object(db, 'bw_usage_update_all')
+    def test_poll_bandwidth_usage(self, bw_usage_update_all, get_by_uuids,
             get_by_host, time, last_completed_audit):
         bw_counters = [{'uuid': uuids.instance, 'mac_address': 'fake-mac',
-                        'bw_in': 1, 'bw_out': 2}]
+                        'bw_in': 1, 'bw_out': 2},
+                       {'uuid': uuids.instance, 'mac_address': 'other-mac',
+                        'bw_in': 5, 'bw_out': 6}]
         usage = objects.BandwidthUsage()
+        usage.instance_uuid = uuids.instance
+        usage.mac = 'fake-mac'
         usage.bw_in = 3
         usage.bw_out = 4
         usage.last_ctr_in = 0
         usage.last_ctr_out = 0
         self.flags(bandwidth_poll_interval=1)
-        get_by_uuid_mac.return_value = usage
+        get_by_uuids.side_effect = [[usage], []]
         _time = timeutils.utcnow()
-        bw_usage_update.return_value = {'uuid': uuids.instance, 'mac': '',
-                'start_period': _time, 'last_refreshed': _time, 'bw_in': 0,
-                'bw_out': 0, 'last_ctr_in': 0, 'last_ctr_out': 0, 'deleted': 0,
-                'created_at': _time, 'updated_at': _time, 'deleted_at': _time}
+        bw_usage_update_all.return_value = [
+            {'uuid': uuids.instance, 'mac': mac, 'start_period': _time,
+             'last_refreshed': _time, 'bw_in': 0, 'bw_out': 0,
+             'last_ctr_in': 0, 'last_ctr_out': 0, 'deleted': 0,
+             'created_at': _time, 'updated_at': _time, 'deleted_at': _time}
+            for mac in ('fake-mac', 'other-mac')]
         with mock.patch.object(self.compute.driver,
                 'get_all_bw_counters', return_value=bw_counters):
             self.compute._poll_bandwidth_usage(self.context)
-            get_by_uuid_mac.assert_called_once_with(self.context,
-                    uuids.instance, 'fake-mac',
-                    start_period=0, use_slave=True)
+            get_by_uuids.assert_has_calls([
+                mock.call(self.context, [uuids.instance],
+                          start_period=datetime.datetime(2017, 2, 1),
+                          use_slave=True),
+                mock.call(self.context, [uuids.instance],
+                          start_period=datetime.datetime(2017, 1, 1),
+                          use_slave=True)])
             # NOTE(sdague): bw_usage_update happens at some time in
             # the future, so what last_refreshed is irrelevant.
-            bw_usage_update.assert_called_once_with(self.context,
-                    uuids.instance,
-                    'fake-mac', 0, 4, 6, 1, 2,
-                    last_refreshed=mock.ANY,
-                    update_cells=False)
+            bw_usage_update_all.assert_called_once_with(self.context, [
+                dict(uuid=uuids.instance, mac='fake-mac',
+                     start_period=mock.ANY, bw_in=4, bw_out=6,
+                     last_ctr_in=1, last_ctr_out=2,
+                     last_refreshed=mock.ANY),
+                dict(uuid=uuids.instance, mac='other-mac',
+                     start_period=mock.ANY, bw_in=0, bw_out=0,
+                     last_ctr_in=5, last_ctr_out=6,
+                     last_refreshed=mock.ANY)],
+                update_cells=False)
 
     def test_reverts_task_state_instance_not_found(self):
         # Tests that the reverts_task_state decorator in the compute manager
@@ -1045,6 +1045,18 @@ class TestInitComputeNode(BaseTestCase):
 
         self.assertEqual(_HOSTNAME, self.rt.compute_nodes[_NODENAME].host)
 
+    def test_remove_node(self):
+        self._setup_rt()
+        self.rt.compute_nodes[_NODENAME] = mock.sentinel.cn
+        self.rt.old_resources[_NODENAME] = mock.sentinel.old_cn
+
+        self.rt.remove_node(_NODENAME)
+
+        self.assertNotIn(_NODENAME, self.rt.compute_nodes)
+        self.assertNotIn(_NODENAME, self.rt.old_resources)
+        # Removing a node which is not tracked is a noop
+        self.rt.remove_node(_NODENAME)
+
     @mock.patch('nova.objects.ComputeNodeList.get_by_hypervisor')
     @mock.patch('nova.objects.PciDeviceList.get_by_compute_node',
                 return_value=objects.PciDeviceList(objects=[]))
@@ -106,6 +106,27 @@ class ComputeRpcAPITestCase(test.NoDBTestCase):
         mock_get_min.assert_called_once_with(mock.ANY, 'nova-compute')
         self.assertEqual('4.4', compute_rpcapi.LAST_VERSION)
 
+    def _test_compact_serialization(self, version_cap, enabled, expected):
+        self.flags(compact_rpc_objects=enabled, group='compute')
+        self.flags(compute=version_cap, group='upgrade_levels')
+        with mock.patch.object(compute_rpcapi.ComputeAPI,
+                               'get_client') as mock_get_client:
+            compute_rpcapi.ComputeAPI()
+        serializer = mock_get_client.call_args[0][2]
+        self.assertEqual(expected, serializer.compact)
+
+    def test_compact_serialization_disabled(self):
+        self._test_compact_serialization(None, False, False)
+
+    def test_compact_serialization_no_version_cap(self):
+        self._test_compact_serialization(None, True, True)
+
+    def test_compact_serialization_version_cap(self):
+        self._test_compact_serialization('4.19', True, True)
+
+    def test_compact_serialization_old_computes(self):
+        self._test_compact_serialization('4.18', True, False)
+
     def _test_compute_api(self, method, rpc_method,
                           expected_args=None, **kwargs):
         ctxt = context.RequestContext('fake_user', 'fake_project')
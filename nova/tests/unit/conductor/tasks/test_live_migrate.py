@@ -33,6 +33,8 @@ fake_selection1 = objects.Selection(service_host="host1", nodename="node1",
         cell_uuid=uuids.cell)
 fake_selection2 = objects.Selection(service_host="host2", nodename="node2",
         cell_uuid=uuids.cell)
+fake_selection3 = objects.Selection(service_host="host3", nodename="node3",
+        cell_uuid=uuids.cell)
 
 
 class LiveMigrationTaskTestCase(test.NoDBTestCase):
@@ -580,6 +582,78 @@ class LiveMigrationTaskTestCase(test.NoDBTestCase):
             self.assertRaises(exception.MigrationSchedulerRPCError,
                               self.task._find_destination)
 
+    @mock.patch.object(live_migrate.LiveMigrationTask,
+                       '_get_request_spec_for_select_destinations')
+    @mock.patch.object(live_migrate.LiveMigrationTask,
+                       '_call_livem_checks_on_host')
+    @mock.patch.object(live_migrate.LiveMigrationTask,
+                       '_check_compatible_with_source_hypervisor')
+    def test_find_destination_preselected(self, mock_check, mock_livem,
+                                          mock_get_spec):
+        self.task.selection = fake_selection1
+        with mock.patch.object(self.task.scheduler_client,
+                               'select_destinations') as mock_select:
+            self.assertEqual(("host1", "node1"),
+                             self.task._find_destination())
+        self.assertFalse(mock_select.called)
+        mock_check.assert_called_once_with("host1")
+        mock_livem.assert_called_once_with("host1")
+        self.assertIsNone(self.task.selection)
+
+    @mock.patch.object(live_migrate.LiveMigrationTask,
+                       '_remove_host_allocations')
+    @mock.patch.object(live_migrate.LiveMigrationTask,
+                       '_get_request_spec_for_select_destinations')
+    @mock.patch.object(live_migrate.LiveMigrationTask,
+                       '_call_livem_checks_on_host')
+    @mock.patch.object(live_migrate.LiveMigrationTask,
+                       '_check_compatible_with_source_hypervisor')
+    def test_find_destination_preselected_fails_checks(self, mock_check,
+            mock_livem, mock_get_spec, mock_remove):
+        self.task.selection = fake_selection1
+        mock_livem.side_effect = [exception.MigrationPreCheckError(
+            reason='dummy'), None]
+        with mock.patch.object(
+                self.task.scheduler_client, 'select_destinations',
+                return_value=[[fake_selection2]]) as mock_select:
+            self.assertEqual(("host2", "node2"),
+                             self.task._find_destination())
+        mock_select.assert_called_once_with(
+            self.context, mock_get_spec.return_value, [self.instance.uuid],
+            return_objects=True, return_alternates=False)
+        mock_remove.assert_called_once_with('host1', 'node1')
+        self.assertEqual(['host', 'host1'],
+                         mock_get_spec.return_value.ignore_hosts)
+
+    @mock.patch.object(live_migrate.LiveMigrationTask,
+                       '_get_request_spec_for_select_destinations')
+    @mock.patch.object(live_migrate.LiveMigrationTask,
+                       '_call_livem_checks_on_host')
+    @mock.patch.object(live_migrate.LiveMigrationTask,
+                       '_check_compatible_with_source_hypervisor')
+    def test_find_destination_ignore_hosts(self, mock_check, mock_livem,
+                                           mock_get_spec):
+        self.task.ignore_hosts = ['busy']
+        with mock.patch.object(
+                self.task.scheduler_client, 'select_destinations',
+                return_value=[[fake_selection1]]):
+            self.assertEqual(("host1", "node1"),
+                             self.task._find_destination())
+        self.assertEqual(['host', 'busy'],
+                         mock_get_spec.return_value.ignore_hosts)
+
+    @mock.patch.object(live_migrate, 'should_do_migration_allocation',
+                       return_value=False)
+    def test_prepare_once(self, mock_alloc):
+        with test.nested(
+            mock.patch.object(self.task, '_check_instance_is_active'),
+            mock.patch.object(self.task, '_check_host_is_up'),
+        ) as (mock_active, mock_up):
+            self.task.prepare()
+            self.task.prepare()
+        mock_active.assert_called_once_with()
+        mock_up.assert_called_once_with(self.instance_host)
+
     def test_call_livem_checks_on_host(self):
         with mock.patch.object(self.task.compute_rpcapi,
             'check_can_live_migrate_destination',
@@ -622,3 +696,107 @@ class LiveMigrationTaskTestCase(test.NoDBTestCase):
                 'remove_provider_from_instance_allocation') as remove_provider:
             self.task._remove_host_allocations('host', 'node')
         remove_provider.assert_not_called()
+
+
+class SelectDestinationsForTasksTestCase(test.NoDBTestCase):
+    def setUp(self):
+        super(SelectDestinationsForTasksTestCase, self).setUp()
+        self.context = "context"
+        self.scheduler_client = mock.Mock(
+            spec=scheduler_client.SchedulerClient)
+
+    def _task(self, uuid, flavorid='1', request_spec=None, **kwargs):
+        instance = fake_instance.fake_instance_obj(
+            self.context, uuid=uuid, host='host', image_ref='image',
+            project_id='project', availability_zone='nova',
+            flavor=objects.Flavor(flavorid=flavorid), **kwargs)
+        instance.numa_topology = None
+        instance.pci_requests = None
+        return live_migrate.LiveMigrationTask(
+            self.context, instance, None, False, False, objects.Migration(),
+            compute_rpcapi.ComputeAPI(), servicegroup.API(),
+            self.scheduler_client, request_spec)
+
+    @mock.patch.object(live_migrate.LiveMigrationTask,
+                       '_get_request_spec_for_select_destinations')
+    def test_select_destinations_for_tasks(self, mock_get_spec):
+        mock_get_spec.return_value = objects.RequestSpec(num_instances=1)
+        tasks = [self._task(uuids.inst1),
+                 self._task(uuids.other_flavor, flavorid='2'),
+                 self._task(uuids.inst2)]
+        self.scheduler_client.select_destinations.side_effect = [
+            [[fake_selection1], [fake_selection2]], [[fake_selection3]]]
+
+        live_migrate.select_destinations_for_tasks(
+            self.context, self.scheduler_client, tasks)
+
+        self.scheduler_client.select_destinations.assert_has_calls([
+            mock.call(self.context, mock.ANY, [uuids.inst1, uuids.inst2],
+                      return_objects=True, return_alternates=False),
+            mock.call(self.context, mock.ANY, [uuids.other_flavor],
+                      return_objects=True, return_alternates=False)])
+        request_spec = (
+            self.scheduler_client.select_destinations.call_args_list[0][0][1])
+        self.assertEqual(2, request_spec.num_instances)
+        self.assertEqual(['host'], request_spec.ignore_hosts)
+        # The spec of the task is not changed by the batch
+        self.assertEqual(1, mock_get_spec.return_value.num_instances)
+        self.assertEqual(fake_selection1, tasks[0].selection)
+        self.assertEqual(fake_selection3, tasks[1].selection)
+        self.assertEqual(fake_selection2, tasks[2].selection)
+
+    @mock.patch.object(live_migrate.LiveMigrationTask,
+                       '_get_request_spec_for_select_destinations')
+    def test_select_destinations_for_tasks_busy_hosts(self, mock_get_spec):
+        mock_get_spec.return_value = objects.RequestSpec(num_instances=1)
+        tasks = [self._task(uuids.inst1), self._task(uuids.inst2)]
+        self.scheduler_client.select_destinations.return_value = [
+            [fake_selection1], [fake_selection2]]
+
+        live_migrate.select_destinations_for_tasks(
+            self.context, self.scheduler_client, tasks, ['busy'])
+
+        request_spec = self.scheduler_client.select_destinations.call_args[
+            0][1]
+        self.assertEqual(['host', 'busy'], request_spec.ignore_hosts)
+
+    @mock.patch.object(live_migrate.LiveMigrationTask,
+                       '_get_request_spec_for_select_destinations')
+    def test_select_destinations_for_tasks_no_valid_host(self,
+                                                         mock_get_spec):
+        mock_get_spec.return_value = objects.RequestSpec(num_instances=1)
+        tasks = [self._task(uuids.inst1), self._task(uuids.inst2)]
+        self.scheduler_client.select_destinations.side_effect = (
+            exception.NoValidHost(reason=''))
+
+        live_migrate.select_destinations_for_tasks(
+            self.context, self.scheduler_client, tasks)
+
+        self.assertIsNone(tasks[0].selection)
+        self.assertIsNone(tasks[1].selection)
+
+    @mock.patch.object(live_migrate.LiveMigrationTask,
+                       '_get_request_spec_for_select_destinations')
+    def test_select_destinations_for_tasks_scheduler_hints(self,
+                                                           mock_get_spec):
+        mock_get_spec.return_value = objects.RequestSpec(num_instances=1)
+        request_spec = objects.RequestSpec(
+            scheduler_hints={'different_host': [uuids.other]})
+        tasks = [self._task(uuids.inst1, request_spec=request_spec),
+                 self._task(uuids.inst2, request_spec=request_spec)]
+        self.scheduler_client.select_destinations.side_effect = [
+            [[fake_selection1]], [[fake_selection2]]]
+
+        live_migrate.select_destinations_for_tasks(
+            self.context, self.scheduler_client, tasks, ['busy'])
+
+        # The destinations are picked one by one, without the busy hosts
+        self.scheduler_client.select_destinations.assert_has_calls([
+            mock.call(self.context, mock.ANY, [uuids.inst1],
+                      return_objects=True, return_alternates=False),
+            mock.call(self.context, mock.ANY, [uuids.inst2],
+                      return_objects=True, return_alternates=False)])
+        for call in self.scheduler_client.select_destinations.call_args_list:
+            self.assertEqual(['host', 'busy'], call[0][1].ignore_hosts)
+        self.assertEqual(fake_selection1, tasks[0].selection)
+        self.assertEqual(fake_selection2, tasks[1].selection)
@@ -16,6 +16,7 @@
 """Tests for the conductor service."""
 
 import copy
+import time
 
 import mock
 from mox3 import mox
@@ -256,6 +257,54 @@ class ConductorTestCase(_BaseTestCase, test.TestCase):
         result = self.conductor.provider_fw_rule_get_all(self.context)
         self.assertEqual([], result)
 
+    @mock.patch.object(time, 'time', return_value=1000)
+    @mock.patch('nova.db.service_heartbeat_all')
+    def test_service_heartbeat(self, mock_heartbeat_all, mock_time):
+        self.flags(heartbeat_batch_interval=10)
+        self.conductor._heartbeats_written = 1000
+
+        self.conductor.service_heartbeat(self.context, 1)
+        self.conductor.service_heartbeat(self.context, 2)
+        mock_time.return_value = 1005
+        self.conductor.service_heartbeat(self.context, 1)
+        self.assertFalse(mock_heartbeat_all.called)
+
+        # The state reports received within the interval are written together
+        mock_time.return_value = 1010
+        with mock.patch.object(conductor_manager.LOG, 'debug') as mock_debug:
+            self.conductor.service_heartbeat(self.context, 3)
+        mock_heartbeat_all.assert_called_once_with(self.context,
+                                                   {1: 2, 2: 1, 3: 1})
+        self.assertEqual({'received': 4, 'writes': 1, 'services_updated': 3,
+                          'last_write_duration': 0},
+                         self.conductor.heartbeat_stats)
+        # The statistics are logged with each write
+        mock_debug.assert_called_once_with(
+            mock.ANY, {'num': 3, 'duration': 0,
+                       'stats': self.conductor.heartbeat_stats})
+
+        # Those received since are written by the periodic task
+        self.conductor.service_heartbeat(self.context, 1)
+        mock_heartbeat_all.reset_mock()
+        mock_time.return_value = 1015
+        self.conductor._flush_heartbeats(self.context)
+        self.assertFalse(mock_heartbeat_all.called)
+        mock_time.return_value = 1020
+        self.conductor._flush_heartbeats(self.context)
+        mock_heartbeat_all.assert_called_once_with(self.context, {1: 1})
+
+    @mock.patch('nova.db.service_heartbeat_all',
+                side_effect=test.TestingException)
+    def test_service_heartbeat_write_failed(self, mock_heartbeat_all):
+        self.conductor.service_heartbeat(self.context, 1)
+        mock_heartbeat_all.assert_called_once_with(self.context, {1: 1})
+
+        # The state reports are kept to be written with the next ones
+        mock_heartbeat_all.side_effect = None
+        self.conductor.service_heartbeat(self.context, 1)
+        mock_heartbeat_all.assert_called_with(self.context, {1: 2})
+        self.assertEqual(1, self.conductor.heartbeat_stats['writes'])
+
 
 class ConductorRPCAPITestCase(_BaseTestCase, test.TestCase):
     """Conductor RPC API Tests."""
@@ -266,6 +315,18 @@ class ConductorRPCAPITestCase(_BaseTestCase, test.TestCase):
         self.conductor_manager = self.conductor_service.manager
         self.conductor = conductor_rpcapi.ConductorAPI()
 
+    def test_service_heartbeat(self):
+        service = objects.Service(self.context, host='fake-host',
+                                  binary='nova-compute', topic='compute',
+                                  report_count=2)
+        service.create()
+
+        self.conductor.service_heartbeat(self.context, service.id)
+
+        service = objects.Service.get_by_id(self.context, service.id)
+        self.assertEqual(3, service.report_count)
+        self.assertIsNotNone(service.last_seen_up)
+
 
 class ConductorAPITestCase(_BaseTestCase, test.TestCase):
     """Conductor API Tests."""
@@ -293,6 +354,27 @@ class ConductorAPITestCase(_BaseTestCase, test.TestCase):
         self.assertEqual(timeouts.count(10), 10)
         self.assertIn(None, timeouts)
 
+    @mock.patch.object(conductor_rpcapi.ConductorAPI, 'service_heartbeat')
+    def test_service_heartbeat(self, mock_heartbeat):
+        service_ref = objects.Service(id=1, report_count=2)
+        with mock.patch.object(service_ref, 'save') as mock_save:
+            self.conductor.service_heartbeat(self.context, service_ref)
+        mock_heartbeat.assert_called_once_with(self.context, 1)
+        self.assertFalse(mock_save.called)
+        self.assertEqual(2, service_ref.report_count)
+
+    @mock.patch.object(conductor_rpcapi.ConductorAPI,
+                       'can_send_service_heartbeat', return_value=False)
+    @mock.patch.object(conductor_rpcapi.ConductorAPI, 'service_heartbeat')
+    def test_service_heartbeat_old_conductor(self, mock_heartbeat,
+                                             mock_can_send):
+        service_ref = objects.Service(id=1, report_count=2)
+        with mock.patch.object(service_ref, 'save') as mock_save:
+            self.conductor.service_heartbeat(self.context, service_ref)
+        self.assertFalse(mock_heartbeat.called)
+        mock_save.assert_called_once_with()
+        self.assertEqual(3, service_ref.report_count)
+
 
 class _BaseTaskTestCase(object):
     def setUp(self):
@@ -2044,6 +2126,226 @@ class ConductorTaskTestCase(_BaseTaskTestCase, test_compute.BaseTestCase):
                         expected_ex, request_spec)
         self.assertEqual(ex.kwargs['reason'], six.text_type(expected_ex))
 
+    @mock.patch('eventlet.greenthread.sleep')
+    @mock.patch.object(objects.Migration, 'get_by_id')
+    @mock.patch.object(objects.Migration, 'create', autospec=True)
+    @mock.patch.object(live_migrate.LiveMigrationTask, 'execute',
+                       autospec=True)
+    @mock.patch.object(live_migrate, 'select_destinations_for_tasks')
+    @mock.patch.object(live_migrate.LiveMigrationTask, 'prepare')
+    @mock.patch.object(objects.RequestSpec, 'get_by_instance_uuid',
+                       side_effect=exc.RequestSpecNotFound(
+                           instance_uuid=uuids.instance))
+    @mock.patch.object(objects.InstanceAction, 'action_start')
+    @mock.patch.object(objects.Instance, 'save')
+    @mock.patch.object(objects.InstanceList, 'get_by_host')
+    @mock.patch.object(objects.HostMapping, 'get_by_host')
+    def test_drain_host(self, get_hm, get_instances, save, action_start,
+                        get_spec, prepare, select_destinations, execute,
+                        create, get_migration, sleep):
+        self.flags(drain_max_concurrent_migrations=2,
+                   drain_max_concurrent_migrations_per_destination=1,
+                   group='conductor')
+        get_hm.return_value.cell_mapping = (
+            objects.CellMappingList.get_all(self.context)[0])
+        flavor = objects.Flavor(id=1)
+        instances = [
+            objects.Instance(uuid=getattr(uuids, name), host='source',
+                             vm_state=vm_state, task_state=task_state,
+                             flavor=flavor)
+            for name, vm_state, task_state in (
+                ('inst1', vm_states.ACTIVE, None),
+                ('inst2', vm_states.ACTIVE, None),
+                ('inst3', vm_states.PAUSED, None),
+                ('inst4', vm_states.ACTIVE, None),
+                ('stopped', vm_states.STOPPED, None),
+                ('rebooting', vm_states.ACTIVE, task_states.REBOOTING))]
+        get_instances.return_value = instances
+        migration_ids = iter(range(1, 5))
+
+        def fake_create(migration):
+            migration.id = next(migration_ids)
+        create.side_effect = fake_create
+
+        destinations = {uuids.inst1: 'dest1', uuids.inst2: 'dest1',
+                        uuids.inst3: 'dest2', uuids.inst4: 'dest3'}
+
+        def fake_select_destinations(context, client, tasks, busy_hosts):
+            for task in tasks:
+                task.selection = objects.Selection(
+                    service_host=destinations[task.instance.uuid])
+        select_destinations.side_effect = fake_select_destinations
+
+        started = []
+
+        def fake_execute(task):
+            task.destination = task.selection.service_host
+            started.append(task.instance.uuid)
+        execute.side_effect = fake_execute
+        get_migration.return_value = objects.Migration(status='completed')
+
+        self.conductor.drain_host(self.context, 'source', None, None)
+
+        get_instances.assert_called_once_with(
+            self.context, 'source', expected_attrs=mock.ANY)
+        self.assertEqual(4, prepare.call_count)
+        self.assertEqual(4, action_start.call_count)
+        for instance in instances[:4]:
+            self.assertEqual(task_states.MIGRATING, instance.task_state)
+        # The instances are prepared as live migrations can be started
+        self.assertEqual(
+            [[uuids.inst1, uuids.inst2], [uuids.inst3], [uuids.inst4]],
+            [[task.instance.uuid for task in call[0][2]]
+             for call in select_destinations.call_args_list])
+        # Only one live migration runs to dest1 at a time and no more than
+        # two run at once
+        self.assertEqual([uuids.inst1, uuids.inst2, uuids.inst3,
+                          uuids.inst4], started)
+        self.assertEqual(3, sleep.call_count)
+        self.assertEqual(4, get_migration.call_count)
+
+    @mock.patch('eventlet.greenthread.sleep')
+    @mock.patch.object(objects.Migration, 'get_by_id')
+    @mock.patch.object(live_migrate.LiveMigrationTask, 'execute',
+                       autospec=True)
+    @mock.patch.object(live_migrate, 'select_destinations_for_tasks')
+    @mock.patch.object(conductor_manager.ComputeTaskManager,
+                       '_prepare_drain_task')
+    def test_run_drain_tasks_without_selection(self, prepare,
+                                               select_destinations, execute,
+                                               get_migration, sleep):
+        self.flags(drain_max_concurrent_migrations=2,
+                   drain_max_concurrent_migrations_per_destination=1,
+                   group='conductor')
+        instances = [objects.Instance(uuid=uuids.inst1, host='source'),
+                     objects.Instance(uuid=uuids.inst2, host='source')]
+
+        def fake_prepare(context, instance, block_migration,
+                         disk_over_commit):
+            return live_migrate.LiveMigrationTask(
+                context, instance, None, None, None,
+                objects.Migration(id=len(prepare.mock_calls)), None, None,
+                None)
+        prepare.side_effect = fake_prepare
+
+        ignored = []
+
+        # The scheduler could not pick the destinations of the tasks in
+        # advance, it picks them when the tasks are executed.
+        def fake_execute(task):
+            ignored.append(list(task.ignore_hosts))
+            task.destination = [host for host in ('dest1', 'dest2')
+                                if host not in task.ignore_hosts][0]
+        execute.side_effect = fake_execute
+        get_migration.return_value = objects.Migration(status='completed')
+
+        self.conductor._run_drain_tasks(self.context, instances, None, None)
+
+        # The second live migration runs at the same time as the first one
+        # but to another destination.
+        self.assertEqual([[], ['dest1']], ignored)
+        self.assertEqual(['dest1', 'dest2'],
+                         [call[0][0].destination
+                          for call in execute.call_args_list])
+        self.assertEqual(1, sleep.call_count)
+
+    @mock.patch('nova.conductor.manager.time')
+    @mock.patch('eventlet.greenthread.sleep')
+    @mock.patch.object(objects.Migration, 'get_by_id')
+    @mock.patch.object(objects.Migration, 'save')
+    @mock.patch.object(live_migrate.LiveMigrationTask, 'rollback')
+    @mock.patch.object(live_migrate.LiveMigrationTask, 'execute',
+                       autospec=True)
+    @mock.patch.object(live_migrate, 'select_destinations_for_tasks')
+    @mock.patch.object(objects.Instance, 'save')
+    @mock.patch.object(conductor_manager.ComputeTaskManager,
+                       '_prepare_drain_task')
+    def test_run_drain_tasks_timeout(self, prepare, save, select_destinations,
+                                     execute, rollback, save_migration,
+                                     get_migration, sleep, mock_time):
+        self.flags(drain_max_concurrent_migrations=2,
+                   drain_migration_timeout=60, group='conductor')
+        mock_time.time.side_effect = [0, 0, 100]
+        instances = [objects.Instance(uuid=uuids.inst1, host='source',
+                                      task_state=task_states.MIGRATING),
+                     objects.Instance(uuid=uuids.inst2, host='source',
+                                      task_state=task_states.MIGRATING)]
+
+        def fake_prepare(context, instance, block_migration,
+                         disk_over_commit):
+            task = live_migrate.LiveMigrationTask(
+                context, instance, None, None, None,
+                objects.Migration(id=len(prepare.mock_calls)), None, None,
+                None)
+            task.selection = objects.Selection(service_host='dest')
+            return task
+        prepare.side_effect = fake_prepare
+
+        def fake_execute(task):
+            task.destination = task.selection.service_host
+        execute.side_effect = fake_execute
+        get_migration.return_value = objects.Migration(status='running')
+
+        self.conductor._run_drain_tasks(self.context, instances, None, None)
+
+        # The first live migration is no longer waited for and the second one
+        # which could not start is cancelled
+        execute.assert_called_once_with(mock.ANY)
+        self.assertEqual(uuids.inst1, execute.call_args[0][0].instance.uuid)
+        get_migration.assert_called_once_with(self.context, 1)
+        rollback.assert_called_once_with()
+        save_migration.assert_called_once_with()
+        save.assert_called_once_with(
+            expected_task_state=[task_states.MIGRATING])
+        self.assertEqual(task_states.MIGRATING, instances[0].task_state)
+        self.assertIsNone(instances[1].task_state)
+        self.assertEqual(1, sleep.call_count)
+
+    @mock.patch.object(scheduler_utils, 'set_vm_state_and_notify')
+    @mock.patch.object(objects.Migration, 'save')
+    @mock.patch.object(objects.Migration, 'create')
+    @mock.patch.object(live_migrate.LiveMigrationTask, 'execute')
+    @mock.patch.object(live_migrate, 'select_destinations_for_tasks')
+    @mock.patch.object(live_migrate.LiveMigrationTask, 'prepare')
+    @mock.patch.object(objects.RequestSpec, 'get_by_instance_uuid')
+    @mock.patch.object(objects.InstanceAction, 'action_start')
+    @mock.patch.object(objects.Instance, 'save')
+    @mock.patch.object(objects.InstanceList, 'get_by_host')
+    @mock.patch.object(objects.HostMapping, 'get_by_host')
+    def test_drain_host_prepare_fails(self, get_hm, get_instances, save,
+                                      action_start, get_spec, prepare,
+                                      select_destinations, execute, create,
+                                      save_migration, set_vm_state):
+        get_hm.return_value.cell_mapping = (
+            objects.CellMappingList.get_all(self.context)[0])
+        instance = objects.Instance(uuid=uuids.instance, host='source',
+                                    vm_state=vm_states.ACTIVE,
+                                    task_state=None,
+                                    flavor=objects.Flavor(id=1))
+        get_instances.return_value = [instance]
+        ex = exc.ComputeServiceUnavailable(host='source')
+        prepare.side_effect = ex
+
+        self.conductor.drain_host(self.context, 'source', None, None)
+
+        set_vm_state.assert_called_once_with(
+            self.context, instance.uuid, 'compute_task', 'migrate_server',
+            {'vm_state': vm_states.ACTIVE,
+             'task_state': None,
+             'expected_task_state': task_states.MIGRATING},
+            ex, self._build_request_spec(instance))
+        save_migration.assert_called_once_with()
+        select_destinations.assert_called_once_with(
+            self.context, self.conductor.scheduler_client, [], [])
+        self.assertFalse(execute.called)
+
+    @mock.patch.object(objects.InstanceList, 'get_by_host')
+    @mock.patch.object(objects.HostMapping, 'get_by_host',
+                       side_effect=exc.HostMappingNotFound(name='source'))
+    def test_drain_host_not_mapped(self, get_hm, get_instances):
+        self.conductor.drain_host(self.context, 'source', None, None)
+        self.assertFalse(get_instances.called)
+
     def test_set_vm_state_and_notify(self):
         self.mox.StubOutWithMock(scheduler_utils,
                                  'set_vm_state_and_notify')
@@ -2670,6 +2972,19 @@ class ConductorTaskRPCAPITestCase(_BaseTaskTestCase,
                 self.context, 'live_migrate_instance', **kw)
         _test()
 
+    def test_drain_host(self):
+        cctxt_mock = mock.MagicMock()
+
+        @mock.patch.object(self.conductor.client, 'prepare',
+                          return_value=cctxt_mock)
+        def _test(prepare_mock):
+            self.conductor.drain_host(self.context, 'host', None, None)
+            prepare_mock.assert_called_once_with(version='1.18')
+            cctxt_mock.cast.assert_called_once_with(
+                self.context, 'drain_host', host='host',
+                block_migration=None, disk_over_commit=None)
+        _test()
+
     @mock.patch.object(objects.InstanceMapping, 'get_by_instance_uuid')
     def test_targets_cell_no_instance_mapping(self, mock_im):
 
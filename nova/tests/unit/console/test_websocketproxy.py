@@ -14,9 +14,11 @@
 
 """Tests for nova websocketproxy."""
 
-import mock
+import errno
 import socket
 
+import mock
+
 from nova.console.securityproxy import base
 from nova.console import websocketproxy
 from nova import exception
@@ -300,6 +302,36 @@ class NovaProxyRequestHandlerBaseTestCase(test.NoDBTestCase):
         self.wh.socket.assert_called_with('node1', 10000, connect=True)
         self.wh.do_proxy.assert_called_with('<socket>')
 
+    @mock.patch('nova.consoleauth.rpcapi.ConsoleAuthAPI.check_token')
+    def test_new_websocket_client_origin_not_kept(self, check_token):
+        self.flags(proxy_use_greenthreads=True, group='console')
+        check_token.return_value = {
+            'host': 'node1',
+            'port': '10000',
+            'console_type': 'novnc',
+            'access_url': 'https://evil.example:6080'
+        }
+        self.wh.path = "http://127.0.0.1/"
+        self.wh.headers = {
+            'cookie': 'token="123-456-789"',
+            'Origin': 'https://evil.example:6080',
+            'Host': 'evil.example:6080',
+        }
+        self.wh.new_websocket_client()
+
+        # The next connection served by the process does not allow the
+        # host of the previous one as its origin.
+        self.wh.headers = {
+            'cookie': 'token="123-456-789"',
+            'Origin': 'https://evil.example:6080',
+            'Host': 'example.net:6080',
+        }
+        self.assertRaises(exception.ValidationError,
+                          self.wh.new_websocket_client)
+        self.assertEqual(['allowed-origin-example-1.net',
+                          'allowed-origin-example-2.net'],
+                         websocketproxy.CONF.console.allowed_origins)
+
     @mock.patch('nova.consoleauth.rpcapi.ConsoleAuthAPI.check_token')
     def test_new_websocket_client_novnc_blank_origin_header(self, check_token):
         check_token.return_value = {
@@ -395,6 +427,155 @@ class NovaProxyRequestHandlerBaseTestCase(test.NoDBTestCase):
         self.wh.socket.assert_called_with('node1', 10000, connect=True)
         self.wh.do_proxy.assert_called_with('<socket>')
 
+    @mock.patch('time.time', return_value=1000)
+    @mock.patch('nova.consoleauth.rpcapi.ConsoleAuthAPI.check_token')
+    def test_check_token_cached(self, check_token, mock_time):
+        self.flags(token_cache_ttl=30, group='console')
+        connect_info = {'host': 'node1', 'port': '10000'}
+        check_token.return_value = connect_info
+
+        self.assertEqual(connect_info, self.wh._check_token('123-456-789'))
+        mock_time.return_value = 1029
+        self.assertEqual(connect_info, self.wh._check_token('123-456-789'))
+
+        check_token.assert_called_once_with(mock.ANY, token='123-456-789')
+        self.assertEqual({'123-456-789': (1030, connect_info)},
+                         self.server.token_cache)
+
+    @mock.patch('time.time', return_value=1000)
+    @mock.patch('nova.consoleauth.rpcapi.ConsoleAuthAPI.check_token')
+    def test_check_token_cache_expired(self, check_token, mock_time):
+        self.flags(token_cache_ttl=30, group='console')
+        self.flags(token_ttl=600, group='consoleauth')
+        # The token expires before the cached entry would
+        connect_info = {'host': 'node1', 'port': '10000',
+                        'last_activity_at': 420}
+        check_token.side_effect = [connect_info, None]
+        self.server.token_cache['old-token'] = (990, {})
+
+        self.assertEqual(connect_info, self.wh._check_token('123-456-789'))
+        self.assertEqual({'123-456-789': (1020, connect_info)},
+                         self.server.token_cache)
+        mock_time.return_value = 1020
+        self.assertIsNone(self.wh._check_token('123-456-789'))
+
+        self.assertEqual(2, check_token.call_count)
+
+    @mock.patch('nova.consoleauth.rpcapi.ConsoleAuthAPI.check_token')
+    def test_check_token_not_cached(self, check_token):
+        connect_info = {'host': 'node1', 'port': '10000'}
+        check_token.return_value = connect_info
+
+        self.assertEqual(connect_info, self.wh._check_token('123-456-789'))
+        self.assertEqual(connect_info, self.wh._check_token('123-456-789'))
+
+        self.assertEqual(2, check_token.call_count)
+        self.assertEqual({}, self.server.token_cache)
+
+    @mock.patch('nova.consoleauth.rpcapi.ConsoleAuthAPI.check_token')
+    def test_check_token_invalid_not_cached(self, check_token):
+        self.flags(token_cache_ttl=30, group='console')
+        check_token.return_value = None
+
+        self.assertIsNone(self.wh._check_token('XXX'))
+        self.assertEqual({}, self.server.token_cache)
+
+
+class TenantSockTestCase(test.NoDBTestCase):
+
+    def setUp(self):
+        super(TenantSockTestCase, self).setUp()
+        self.reqhandler = mock.MagicMock()
+        self.sock = websocketproxy.TenantSock(self.reqhandler)
+
+    def test_recv(self):
+        self.reqhandler.recv_frames.side_effect = [
+            ([b'RFB 003', b'.008'], False), ([b'\nabc'], False)]
+
+        self.assertEqual(b'RFB 003.008\n', self.sock.recv(12))
+        self.assertEqual(b'abc', self.sock.recv(3))
+        self.assertEqual(2, self.reqhandler.recv_frames.call_count)
+
+    def test_recv_closed(self):
+        self.reqhandler.recv_frames.return_value = ([b'RFB'], True)
+
+        self.assertEqual(b'RFB', self.sock.recv(12))
+
+    def test_finish_up(self):
+        self.reqhandler.recv_frames.return_value = ([b'RFB 003.008'], False)
+        self.sock.recv(4)
+
+        self.sock.finish_up()
+
+        self.reqhandler.send_frames.assert_called_once_with([b'003.008'])
+
+
+class NovaWebSocketProxyTestCase(test.NoDBTestCase):
+
+    @mock.patch('websockify.websocket.WebSocketServer.start_server')
+    def test_start_server(self, mock_start):
+        server = websocketproxy.NovaWebSocketProxy()
+
+        server.start_server()
+
+        mock_start.assert_called_once_with()
+
+    @mock.patch('eventlet.GreenPool')
+    @mock.patch.object(websocketproxy.NovaWebSocketProxy, 'started')
+    @mock.patch.object(websocketproxy.NovaWebSocketProxy, 'socket')
+    def test_start_server_greenthreads(self, mock_socket, mock_started,
+                                       mock_pool):
+        self.flags(proxy_use_greenthreads=True, proxy_max_connections=50,
+                   group='console')
+        server = websocketproxy.NovaWebSocketProxy()
+        lsock = mock_socket.return_value
+        lsock.accept.side_effect = [('sock1', 'addr1'), ('sock2', 'addr2'),
+                                    KeyboardInterrupt]
+
+        server.start_server()
+
+        mock_started.assert_called_once_with()
+        mock_pool.assert_called_once_with(50)
+        mock_pool.return_value.spawn_n.assert_has_calls([
+            mock.call(server._serve_client, 'sock1', 'addr1'),
+            mock.call(server._serve_client, 'sock2', 'addr2')])
+        lsock.close.assert_called_once_with()
+
+    @mock.patch('eventlet.sleep')
+    @mock.patch('eventlet.GreenPool')
+    @mock.patch.object(websocketproxy.NovaWebSocketProxy, 'started')
+    @mock.patch.object(websocketproxy.NovaWebSocketProxy, 'socket')
+    def test_start_server_greenthreads_accept_error(self, mock_socket,
+                                                    mock_started, mock_pool,
+                                                    mock_sleep):
+        self.flags(proxy_use_greenthreads=True, group='console')
+        server = websocketproxy.NovaWebSocketProxy()
+        lsock = mock_socket.return_value
+        lsock.accept.side_effect = [
+            socket.error(errno.EMFILE, 'Too many open files'),
+            socket.error(errno.EINTR, 'Interrupted system call'),
+            ('sock1', 'addr1'), KeyboardInterrupt]
+
+        server.start_server()
+
+        # The proxy keeps accepting connections after the errors
+        mock_pool.return_value.spawn_n.assert_called_once_with(
+            server._serve_client, 'sock1', 'addr1')
+        mock_sleep.assert_called_once_with(
+            websocketproxy.ACCEPT_RETRY_INTERVAL)
+        lsock.close.assert_called_once_with()
+
+    @mock.patch('websockify.websocket.WebSocketServer.top_new_client',
+                side_effect=socket.error)
+    def test_serve_client(self, mock_top_new_client):
+        server = websocketproxy.NovaWebSocketProxy()
+        sock = mock.Mock()
+
+        self.assertRaises(socket.error, server._serve_client, sock, 'addr')
+
+        mock_top_new_client.assert_called_once_with(sock, 'addr')
+        sock.close.assert_called_once_with()
+
 
 class NovaWebsocketSecurityProxyTestCase(test.NoDBTestCase):
 
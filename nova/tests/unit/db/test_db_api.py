@@ -3428,6 +3428,31 @@ class ServiceTestCase(test.TestCase, ModelsObjectComparatorMixin):
         for key, value in new_values.items():
             self.assertEqual(value, updated_service[key])
 
+    def test_service_heartbeat_all(self):
+        services = [self._create_service({'host': 'host%d' % i,
+                                          'report_count': 2})
+                    for i in range(4)]
+        now = timeutils.utcnow().replace(microsecond=0)
+        self.useFixture(utils_fixture.TimeFixture(now))
+
+        with mock.patch.object(query.Query, 'update',
+                               side_effect=query.Query.update,
+                               autospec=True) as mock_update:
+            db.service_heartbeat_all(self.ctxt, {services[0]['id']: 1,
+                                                 services[1]['id']: 1,
+                                                 services[2]['id']: 3})
+
+        # One update per number of state reports
+        self.assertEqual(2, mock_update.call_count)
+        for service, report_count in zip(services, (3, 3, 5)):
+            updated_service = db.service_get(self.ctxt, service['id'])
+            self.assertEqual(report_count, updated_service['report_count'])
+            self.assertEqual(now, updated_service['last_seen_up'])
+            self.assertEqual(now, updated_service['updated_at'])
+        updated_service = db.service_get(self.ctxt, services[3]['id'])
+        self.assertEqual(2, updated_service['report_count'])
+        self.assertIsNone(updated_service['last_seen_up'])
+
     def test_service_update_not_found_exception(self):
         self.assertRaises(exception.ServiceNotFound,
                           db.service_update, self.ctxt, 100500, {})
@@ -3728,6 +3753,30 @@ class ServiceTestCase(test.TestCase, ModelsObjectComparatorMixin):
         self.assertEqual(0, total)
         self.assertEqual(0, done)
 
+    def test_migration_migrate_to_uuid_batches(self):
+        for i in range(5):
+            db.migration_create(self.ctxt,
+                                dict(source_compute='src',
+                                     source_node='srcnode',
+                                     dest_compute='dst', dest_node='dstnode',
+                                     status='running'))
+
+        self.assertEqual((2, 2),
+                         sqlalchemy_api.migration_migrate_to_uuid(self.ctxt,
+                                                                  2))
+        self.assertEqual((2, 2),
+                         sqlalchemy_api.migration_migrate_to_uuid(self.ctxt,
+                                                                  2))
+        self.assertEqual((1, 1),
+                         sqlalchemy_api.migration_migrate_to_uuid(self.ctxt,
+                                                                  2))
+
+        # Every migration got its own uuid
+        migrations = db.migration_get_all_by_filters(self.ctxt, {})
+        uuids = set(m.uuid for m in migrations)
+        self.assertEqual(5, len(uuids))
+        self.assertNotIn(None, uuids)
+
 
 class BaseInstanceTypeTestCase(test.TestCase, ModelsObjectComparatorMixin):
     def setUp(self):
@@ -4206,6 +4255,64 @@ class InstanceActionTestCase(test.TestCase, ModelsObjectComparatorMixin):
                          updated_event_finish.isoformat())
         self.assertTrue(updated_event_finish > updated_event_start)
 
+    def test_instance_action_events_record(self):
+        uuid1 = uuidsentinel.uuid1
+        uuid2 = uuidsentinel.uuid2
+        action1 = db.action_start(self.ctxt,
+                                  self._create_action_values(uuid1))
+        action2 = db.action_start(self.ctxt,
+                                  self._create_action_values(uuid2))
+        time_start = timeutils.utcnow()
+        time_finish = time_start + datetime.timedelta(seconds=5)
+        finished = {'finish_time': time_finish.isoformat(),
+                    'result': 'Error', 'traceback': 'fake-tb',
+                    'project_id': self.ctxt.project_id}
+        # A start and finish pair coalesced into a single entry, followed by
+        # a start and a separate finish of another event.
+        events = [
+            self._create_event_values(uuid1, 'run', extra=dict(
+                finished, start_time=time_start.isoformat())),
+            self._create_event_values(uuid2, 'stop', extra={
+                'start_time': time_start.isoformat(),
+                'project_id': self.ctxt.project_id}),
+            dict(finished, event='stop', instance_uuid=uuid2,
+                 request_id=self.ctxt.request_id, result='Success'),
+        ]
+
+        failed = db.action_events_record(self.ctxt, events)
+
+        self.assertEqual([], failed)
+        event1 = db.action_events_get(self.ctxt, action1['id'])[0]
+        event2 = db.action_events_get(self.ctxt, action2['id'])[0]
+        for event, result in ((event1, 'Error'), (event2, 'Success')):
+            self.assertEqual(time_start, event['start_time'])
+            self.assertEqual(time_finish, event['finish_time'])
+            self.assertEqual(result, event['result'])
+        action1 = db.action_get_by_request_id(self.ctxt, uuid1,
+                                              self.ctxt.request_id)
+        self.assertEqual('Error', action1['message'])
+        self.assertEqual(time_finish, action1['updated_at'])
+
+    def test_instance_action_events_record_not_found(self):
+        uuid1 = uuidsentinel.uuid1
+        action = db.action_start(self.ctxt, self._create_action_values(uuid1))
+        project = {'project_id': self.ctxt.project_id}
+        events = [
+            # No action for this instance.
+            self._create_event_values(uuidsentinel.uuid2, extra=project),
+            # Finish of an event which was never started.
+            {'event': 'stop', 'instance_uuid': uuid1,
+             'request_id': self.ctxt.request_id, 'project_id': 'fake',
+             'finish_time': timeutils.utcnow(), 'result': 'Success'},
+            self._create_event_values(uuid1, extra=project),
+        ]
+
+        failed = db.action_events_record(self.ctxt, events)
+
+        self.assertEqual(events[:2], failed)
+        self.assertEqual(1, len(db.action_events_get(self.ctxt,
+                                                     action['id'])))
+
     def test_instance_action_not_updated_with_unknown_event_request(self):
         """Tests that we don't update the action.updated_at field when
         starting or finishing an action event if we couldn't find the
@@ -6323,6 +6430,32 @@ class VolumeUsageDBApiTestCase(test.TestCase):
         for key, value in expected_vol_usage.items():
             self.assertEqual(vol_usage[key], value, key)
 
+    def test_vol_usage_update_all(self):
+        ctxt = context.get_admin_context()
+        start_time = timeutils.utcnow() - datetime.timedelta(seconds=10)
+        db.vol_usage_update(ctxt, u'1', rd_req=10, rd_bytes=20,
+                            wr_req=30, wr_bytes=40,
+                            instance_id='fake-instance-uuid1',
+                            project_id='fake-project-uuid1',
+                            user_id='fake-user-uuid1',
+                            availability_zone='fake-az')
+
+        vol_usages = db.vol_usage_update_all(ctxt, [
+            dict(id=u'1', rd_req=1000, rd_bytes=2000, wr_req=3000,
+                 wr_bytes=4000, instance_id='fake-instance-uuid1',
+                 project_id='fake-project-uuid1', user_id='fake-user-uuid1',
+                 availability_zone='fake-az'),
+            dict(id=u'2', rd_req=100, rd_bytes=200, wr_req=300,
+                 wr_bytes=400, instance_id='fake-instance-uuid2',
+                 project_id='fake-project-uuid2', user_id='fake-user-uuid2',
+                 availability_zone='fake-az')])
+
+        self.assertEqual([u'1', u'2'],
+                         [vol_usage.volume_id for vol_usage in vol_usages])
+        self.assertEqual([1000, 100],
+                         [vol_usage.curr_reads for vol_usage in vol_usages])
+        self.assertEqual(2, len(db.vol_get_usage_by_time(ctxt, start_time)))
+
 
 class TaskLogTestCase(test.TestCase):
 
@@ -7663,6 +7796,19 @@ class ComputeNodeTestCase(test.TestCase, ModelsObjectComparatorMixin):
         cns = db.compute_node_get_all_mapped_less_than(self.ctxt, 1)
         self.assertEqual(2, len(cns))
 
+    def test_compute_node_set_mapped(self):
+        cn = dict(self.compute_node_dict,
+                  hostname='foo',
+                  hypervisor_hostname='foo',
+                  uuid=uuidutils.generate_uuid())
+        foo = db.compute_node_create(self.ctxt, cn)
+
+        self.assertEqual(0, db.compute_node_set_mapped(self.ctxt, [], 1))
+        self.assertEqual(2, db.compute_node_set_mapped(
+            self.ctxt, [self.item['id'], foo['id']], 1))
+        self.assertEqual(
+            [], db.compute_node_get_all_mapped_less_than(self.ctxt, 1))
+
     def test_compute_node_get_all_by_pagination(self):
         service_dict = dict(host='host2', binary='nova-compute',
                             topic=compute_rpcapi.RPC_TOPIC,
@@ -8782,6 +8928,38 @@ class BwUsageTestCase(test.TestCase, ModelsObjectComparatorMixin):
 
         self._test_bw_usage_update(**expected_bw_usage)
 
+    def test_bw_usage_update_all(self):
+        now = timeutils.utcnow()
+        start_period = now - datetime.timedelta(seconds=10)
+
+        expected_bw_usages = [
+            {'uuid': 'fake_uuid1',
+             'mac': 'fake_mac1',
+             'start_period': start_period,
+             'bw_in': 100,
+             'bw_out': 200,
+             'last_ctr_in': 12345,
+             'last_ctr_out': 67890,
+             'last_refreshed': now},
+            {'uuid': 'fake_uuid2',
+             'mac': 'fake_mac2',
+             'start_period': start_period,
+             'bw_in': 300,
+             'bw_out': 400,
+             'last_ctr_in': 23456,
+             'last_ctr_out': 78901,
+             'last_refreshed': now}]
+        self._test_bw_usage_update(**expected_bw_usages[0])
+        expected_bw_usages[0]['bw_in'] = 150
+
+        bw_usages = db.bw_usage_update_all(self.ctxt, expected_bw_usages)
+        self._assertEqualListsOfObjects(expected_bw_usages, bw_usages,
+                                        ignored_keys=self._ignored_keys)
+        bw_usages = db.bw_usage_get_by_uuids(
+            self.ctxt, ['fake_uuid1', 'fake_uuid2'], start_period)
+        self._assertEqualListsOfObjects(expected_bw_usages, bw_usages,
+                                        ignored_keys=self._ignored_keys)
+
 
 class Ec2TestCase(test.TestCase):
 
@@ -601,6 +601,28 @@ class TestUpdateInstanceCache(test.NoDBTestCase):
                                         {'network_info': self.nw_json})
         self.assertEqual(self.nw_info, self.instance.info_cache.network_info)
 
+    @mock.patch('nova.cache_utils.invalidate_metadata')
+    def test_update_nw_info_invalidates_metadata(self, mock_invalidate,
+                                                 db_mock, api_mock):
+        info_cache = copy.deepcopy(fake_info_cache)
+        info_cache.update({'network_info': self.nw_json})
+        db_mock.return_value = info_cache
+        self.instance.info_cache = objects.InstanceInfoCache(
+            network_info=network_model.NetworkInfo([]))
+        base_api.update_instance_cache_with_nw_info(api_mock, self.context,
+                                                    self.instance,
+                                                    self.nw_info)
+        mock_invalidate.assert_called_once_with(
+            self.instance, network_model.NetworkInfo([]), self.nw_info)
+
+        # The cached metadata is left alone when the network info of the
+        # instance did not change
+        mock_invalidate.reset_mock()
+        base_api.update_instance_cache_with_nw_info(
+            api_mock, self.context, self.instance,
+            network_model.NetworkInfo([network_model.VIF(id='super_vif')]))
+        self.assertFalse(mock_invalidate.called)
+
     def test_update_nw_info_empty_list(self, db_mock, api_mock):
         new_nw_info = network_model.NetworkInfo([])
         db_mock.return_value = fake_info_cache
@@ -4807,6 +4807,60 @@ class TestNeutronv2WithMock(test.TestCase):
         mock_delete_ports.assert_called_once_with(
             ntrn, instance, [uuids.created_port_id])
 
+    @mock.patch('nova.network.neutronv2.api.API.'
+                '_populate_neutron_extension_values')
+    @mock.patch('nova.network.neutronv2.api.API._update_port')
+    @mock.patch.object(objects.VirtualInterface, 'create')
+    @mock.patch.object(objects.VirtualInterface, 'destroy')
+    @mock.patch('nova.network.neutronv2.api.API._unbind_ports')
+    @mock.patch('nova.network.neutronv2.api.API._delete_ports')
+    @mock.patch('nova.network.neutronv2.api.API.'
+                '_refresh_neutron_extensions_cache')
+    def test_update_ports_for_instance_concurrent_fails_rollback(self,
+            mock_refresh_extensions,
+            mock_delete_ports,
+            mock_unbind_ports,
+            mock_vif_destroy,
+            mock_vif_create,
+            mock_update_port,
+            mock_populate_ext_values):
+        self.flags(max_concurrent_port_operations=4, group='neutron')
+        instance = fake_instance.fake_instance_obj(self.context)
+        ntrn = mock.Mock(spec='neutronclient.v2_0.client.Client')
+        requests_and_created_ports = [
+            (objects.NetworkRequest(network_id=uuids.network_id,
+                                    port_id=uuids.preexisting_port_id),
+             None),
+            (objects.NetworkRequest(network_id=uuids.network_id),
+             uuids.created_port_id1),
+            (objects.NetworkRequest(network_id=uuids.network_id),
+             uuids.created_port_id2),
+        ]
+        nets = {uuids.network_id: {'id': uuids.network_id}}
+
+        def update_port(port_client, instance, port_id, port_req_body):
+            if port_id == uuids.created_port_id1:
+                raise exception.PortInUse(port_id=port_id)
+            return {'id': port_id, 'mac_address': 'fa:16:3e:00:00:01'}
+        mock_update_port.side_effect = update_port
+
+        self.assertRaises(exception.PortInUse,
+                          self.api._update_ports_for_instance,
+                          self.context, instance, ntrn, ntrn,
+                          requests_and_created_ports, nets, bind_host_id=None,
+                          available_macs=None, requested_ports_dict=None)
+        # all the ports are updated even though one of them failed, and
+        # everything that was done is undone
+        self.assertEqual(3, mock_update_port.call_count)
+        self.assertEqual(2, mock_vif_create.call_count)
+        self.assertEqual(2, mock_vif_destroy.call_count)
+        mock_unbind_ports.assert_called_once_with(
+            self.context, [uuids.preexisting_port_id], ntrn, ntrn)
+        mock_delete_ports.assert_called_once_with(
+            ntrn, instance, [uuids.created_port_id1, uuids.created_port_id2])
+        mock_refresh_extensions.assert_called_once_with(self.context,
+                                                        neutron=ntrn)
+
     @mock.patch('nova.network.neutronv2.api.API._get_floating_ip_by_address',
                 return_value={"port_id": "1"})
     @mock.patch('nova.network.neutronv2.api.API._show_port',
@@ -4927,6 +4981,113 @@ class TestNeutronv2WithMock(test.TestCase):
                               self.context, instance,
                               '172.24.5.15', '10.1.0.9')
 
+    def _prefetch_fixtures(self):
+        networks = [{'id': uuids.net, 'name': 'private', 'mtu': 1450,
+                     'tenant_id': self.context.project_id}]
+        subnets = [{'id': uuids.subnet, 'network_id': uuids.net,
+                    'cidr': '10.0.0.0/24', 'gateway_ip': '10.0.0.1',
+                    'dns_nameservers': [], 'host_routes': []}]
+        dhcp_ports = [{'id': uuids.dhcp, 'network_id': uuids.net,
+                       'fixed_ips': [{'subnet_id': uuids.subnet,
+                                      'ip_address': '10.0.0.2'}]}]
+        instances, ports = [], []
+        for i in range(3):
+            port_id = getattr(uuids, 'port%d' % i)
+            port = {'id': port_id, 'network_id': uuids.net,
+                    'device_id': getattr(uuids, 'instance%d' % i),
+                    'tenant_id': self.context.project_id,
+                    'admin_state_up': True, 'status': 'ACTIVE',
+                    'mac_address': 'fa:16:3e:00:00:0%d' % i,
+                    'fixed_ips': [{'subnet_id': uuids.subnet,
+                                   'ip_address': '10.0.0.1%d' % i}],
+                    'binding:vif_type': model.VIF_TYPE_OVS}
+            ports.append(port)
+            nw_info = model.NetworkInfo([model.VIF(
+                id=port_id, network=model.Network(id=uuids.net))])
+            instances.append(objects.Instance(
+                uuid=port['device_id'], project_id=self.context.project_id,
+                info_cache=objects.InstanceInfoCache(network_info=nw_info)))
+        fips = [{'port_id': uuids.port1, 'fixed_ip_address': '10.0.0.11',
+                 'floating_ip_address': '172.24.4.11'}]
+
+        def list_ports(retrieve_all=True, **search_opts):
+            if search_opts.get('device_owner') == 'network:dhcp':
+                return {'ports': dhcp_ports}
+            device_ids = search_opts['device_id']
+            return {'ports': [port for port in ports
+                              if port['device_id'] in device_ids]}
+
+        client = mock.Mock()
+        client.list_ports.side_effect = list_ports
+        client.list_networks.return_value = {'networks': networks}
+        client.list_subnets.return_value = {'subnets': subnets}
+        client.list_floatingips.return_value = {'floatingips': fips}
+        return client, instances
+
+    @mock.patch('nova.compute.utils.refresh_info_cache_for_instance')
+    @mock.patch.object(neutronapi, 'get_client')
+    def test_prefetch_instance_nw_info(self, mock_get_client, mock_refresh):
+        client, instances = self._prefetch_fixtures()
+        mock_get_client.return_value = client
+
+        kwargs = self.api.prefetch_instance_nw_info(self.context, instances)
+        client.list_ports.assert_has_calls([
+            mock.call(device_id=[inst.uuid for inst in instances]),
+            mock.call(network_id=[uuids.net], device_owner='network:dhcp')])
+        client.list_floatingips.assert_called_once_with(
+            port_id=[uuids.port0, uuids.port1, uuids.port2])
+        client.list_subnets.assert_called_once_with(id=[uuids.subnet])
+        client.list_networks.assert_called_once_with(id=[uuids.net])
+
+        for i, instance in enumerate(instances):
+            nw_info = self.api._get_instance_nw_info(self.context, instance,
+                                                     **kwargs)
+            self.assertEqual(1, len(nw_info))
+            vif = nw_info[0]
+            self.assertEqual(getattr(uuids, 'port%d' % i), vif['id'])
+            self.assertEqual('private', vif['network']['label'])
+            self.assertEqual(1450, vif['network']['meta']['mtu'])
+            subnet = vif['network']['subnets'][0]
+            self.assertEqual('10.0.0.2', subnet['meta']['dhcp_server'])
+            self.assertEqual(['10.0.0.1%d' % i],
+                             [ip['address'] for ip in subnet['ips']])
+            self.assertEqual(['172.24.4.11'] if i == 1 else [],
+                             [fip['address']
+                              for fip in vif.floating_ips()])
+
+        # Everything was answered from what was prefetched.
+        self.assertEqual(2, client.list_ports.call_count)
+        self.assertEqual(1, client.list_floatingips.call_count)
+        self.assertEqual(1, client.list_subnets.call_count)
+        self.assertEqual(1, client.list_networks.call_count)
+
+    @mock.patch('nova.compute.utils.refresh_info_cache_for_instance')
+    @mock.patch.object(neutronapi, 'get_client')
+    def test_prefetch_instance_nw_info_new_port(self, mock_get_client,
+                                                mock_refresh):
+        client, instances = self._prefetch_fixtures()
+        mock_get_client.return_value = client
+        kwargs = self.api.prefetch_instance_nw_info(self.context,
+                                                    instances[:2])
+
+        # A port attached to the instance since the prefetch is looked up.
+        instance = instances[0]
+        instance.info_cache.network_info.append(model.VIF(
+            id=uuids.port3, network=model.Network(id=uuids.net)))
+        client.list_ports.reset_mock()
+        self.api._get_instance_nw_info(self.context, instance, **kwargs)
+        client.list_ports.assert_called_once_with(
+            True, tenant_id=self.context.project_id, device_id=instance.uuid)
+
+        # As are the instances which were not prefetched.
+        client.list_ports.reset_mock()
+        nw_info = self.api._get_instance_nw_info(self.context, instances[2],
+                                                 **kwargs)
+        client.list_ports.assert_called_once_with(
+            True, tenant_id=self.context.project_id,
+            device_id=instances[2].uuid)
+        self.assertEqual([uuids.port2], [vif['id'] for vif in nw_info])
+
 
 class TestNeutronv2ModuleMethods(test.NoDBTestCase):
 
@@ -5598,19 +5759,75 @@ class TestAllocateForInstance(test.NoDBTestCase):
             uuids.net3: {"id": uuids.net3, "port_security_enabled": True}
         }
         mock_client = mock.Mock()
+
+        self.assertRaises(exception.SecurityGroupCannotBeApplied,
+            api._create_ports_for_instance,
+            self.context, self.instance, ordered_networks, nets,
+            mock_client, None)
+
+        # All the networks are checked before any port is created, so there
+        # is nothing to clean up.
+        self.assertFalse(mock_client.create_port.called)
+        self.assertFalse(mock_client.delete_port.called)
+
+    def test_create_ports_for_instance_bulk(self):
+        self.flags(max_concurrent_port_operations=4, group='neutron')
+        api = neutronapi.API()
+        ordered_networks = [
+            objects.NetworkRequest(network_id=uuids.net1),
+            objects.NetworkRequest(network_id=uuids.net2,
+                                   port_id=uuids.port2),
+            objects.NetworkRequest(network_id=uuids.net3,
+                                   address='10.0.0.3'),
+        ]
+        nets = {net_id: {"id": net_id, "port_security_enabled": False}
+                for net_id in (uuids.net1, uuids.net2, uuids.net3)}
+        mock_client = mock.Mock()
+        mock_client.create_port.return_value = {
+            "ports": [{"id": uuids.port1}, {"id": uuids.port3}]}
+
+        result = api._create_ports_for_instance(self.context, self.instance,
+            ordered_networks, nets, mock_client, None)
+
+        self.assertEqual([(ordered_networks[0], uuids.port1),
+                          (ordered_networks[1], None),
+                          (ordered_networks[2], uuids.port3)], result)
+        mock_client.create_port.assert_called_once_with({'ports': [
+            {'network_id': uuids.net1, 'tenant_id': uuids.tenant_id,
+             'admin_state_up': True, 'device_id': self.instance.uuid},
+            {'network_id': uuids.net3, 'tenant_id': uuids.tenant_id,
+             'admin_state_up': True, 'device_id': self.instance.uuid,
+             'fixed_ips': [{'ip_address': '10.0.0.3'}]}]})
+
+    def test_create_ports_for_instance_bulk_fails(self):
+        self.flags(max_concurrent_port_operations=4, group='neutron')
+        api = neutronapi.API()
+        ordered_networks = [
+            objects.NetworkRequest(network_id=uuids.net1),
+            objects.NetworkRequest(network_id=uuids.net2),
+            objects.NetworkRequest(network_id=uuids.net3),
+        ]
+        nets = {net_id: {"id": net_id, "port_security_enabled": False}
+                for net_id in (uuids.net1, uuids.net2, uuids.net3)}
+        mock_client = mock.Mock()
+        # The bulk request fails, then the ports are created one by one to
+        # find out which one could not be created.
         mock_client.create_port.side_effect = [
+            exceptions.OverQuotaClient(),
             {"port": {"id": uuids.port1}},
-            {"port": {"id": uuids.port2}}
+            exceptions.OverQuotaClient(),
+            {"port": {"id": uuids.port3}},
         ]
 
-        self.assertRaises(exception.SecurityGroupCannotBeApplied,
+        self.assertRaises(exception.PortLimitExceeded,
             api._create_ports_for_instance,
             self.context, self.instance, ordered_networks, nets,
             mock_client, None)
 
-        self.assertEqual([mock.call(uuids.port1), mock.call(uuids.port2)],
+        self.assertEqual(4, mock_client.create_port.call_count)
+        self.assertIn('ports', mock_client.create_port.call_args_list[0][0][0])
+        self.assertEqual([mock.call(uuids.port1), mock.call(uuids.port3)],
             mock_client.delete_port.call_args_list)
-        self.assertEqual(2, mock_client.create_port.call_count)
 
     def test_create_ports_for_instance_raises_subnets_missing(self):
         api = neutronapi.API()
@@ -26,6 +26,7 @@ from nova import objects
 from nova.objects import base
 from nova.objects import fields
 from nova.objects import instance as instance_obj
+from nova import rpc
 from nova import test
 from nova.tests.unit.objects import test_objects
 from nova.tests import uuidsentinel as uuids
@@ -313,6 +314,56 @@ class TestNotificationBase(test.NoDBTestCase):
              'nova_object.version': '1.0',
              'nova_object.namespace': 'nova'})
 
+    def test_schema_extractors_built_once_per_class(self):
+        @base.NovaObjectRegistry.register_if(False)
+        class TestExtendedNotificationPayload(self.TestNotificationPayload):
+            SCHEMA = dict(
+                extra_field=('source_field', 'field_1'),
+                **TestNotificationBase.TestNotificationPayload.SCHEMA)
+
+        extractors = self.TestNotificationPayload._get_schema_extractors()
+        self.assertIs(extractors,
+                      self.TestNotificationPayload._get_schema_extractors())
+        self.assertEqual(
+            ['field_1', 'field_2', 'lazy_field'],
+            sorted(key for key, _field, _obj, _get_value in extractors))
+        self.assertEqual(
+            ['extra_field', 'field_1', 'field_2', 'lazy_field'],
+            sorted(key for key, _field, _obj, _get_value in
+                   TestExtendedNotificationPayload._get_schema_extractors()))
+
+    def test_populate_schema_coerces_values(self):
+        source = mock.Mock(field_1=1, field_2='15', lazy_field=42)
+
+        payload = self.TestNotificationPayload(extra_field='test string',
+                                               source_field=source)
+
+        self.assertEqual('1', payload.field_1)
+        self.assertEqual(15, payload.field_2)
+        self.assertEqual(set(), payload.obj_what_changed())
+
+    def test_obj_reset_changes_recursive(self):
+        self.payload.extra_field = 'changed'
+        self.assertIn('payload', self.notification.obj_what_changed())
+        self.assertTrue(self.notification.obj_attr_is_set('payload'))
+
+        self.notification.obj_reset_changes(recursive=True)
+
+        self.assertEqual(set(), self.notification.obj_what_changed())
+        self.assertEqual(set(), self.payload.obj_what_changed())
+
+    @mock.patch('nova.rpc.NOTIFIER')
+    def test_emit_primitive_payload(self, mock_notifier):
+        mock_context = mock.Mock()
+        mock_context.to_dict.return_value = {}
+        self.notification.emit(mock_context)
+
+        mock_notify = mock_notifier.prepare.return_value.info
+        payload = mock_notify.call_args[1]['payload']
+        self.assertIsInstance(payload, rpc.PrimitivePayload)
+        self.assertEqual(payload, rpc.JsonPayloadSerializer.serialize_entity(
+            mock_context, payload))
+
     def test_sample_decorator(self):
         self.assertEqual(2, len(self.TestNotification.samples))
         self.assertIn('test-update-1.json', self.TestNotification.samples)
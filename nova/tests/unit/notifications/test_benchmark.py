@@ -0,0 +1,224 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Measure the CPU cost of emitting versioned notifications.
+
+This builds and emits the instance.update, instance.create.end and
+service.update versioned notifications through an oslo.messaging notifier
+using the test driver, and prints the CPU time taken per notification, split
+between building the payload and emitting the notification:
+
+    python -m nova.tests.unit.notifications.test_benchmark -n 2000
+
+With --profile, the functions taking the most time are printed as well. The
+unit tests only emit each notification once, to check the benchmark works.
+"""
+
+from __future__ import print_function
+
+import argparse
+import cProfile
+import pstats
+import time
+
+from oslo_utils import timeutils
+
+import nova.conf
+from nova import config
+from nova import context
+from nova.network import model as network_model
+from nova.notifications.objects import base as notification_base
+from nova.notifications.objects import instance as instance_notification
+from nova.notifications.objects import service as service_notification
+from nova import objects
+from nova.objects import fields
+from nova import rpc
+from nova import test
+from nova.tests.unit import fake_notifier
+
+CONF = nova.conf.CONF
+
+UUID = '0b5e4f6d-8a3a-4c9c-a5d0-0a6a2ec6ab41'
+
+# NOTE: time.clock() is the CPU time of the process on Python 2
+_cpu_time = getattr(time, 'process_time', time.clock)
+
+
+def _network_info():
+    vifs = []
+    for i in range(2):
+        subnet = network_model.Subnet(
+            cidr='10.0.%d.0/24' % i, gateway=network_model.IP('10.0.%d.1' % i),
+            ips=[network_model.FixedIP(address='10.0.%d.5' % i)])
+        network = network_model.Network(id='net-%d' % i, bridge='br-int',
+                                        label='private-%d' % i,
+                                        subnets=[subnet])
+        vifs.append(network_model.VIF(id='port-%d' % i,
+                                      address='fa:16:3e:00:00:0%d' % i,
+                                      network=network, type='ovs'))
+    return network_model.NetworkInfo(vifs)
+
+
+def build_instance(ctxt):
+    flavor = objects.Flavor(
+        id=1, flavorid='42', name='m1.large', memory_mb=8192, vcpus=4,
+        root_gb=80, ephemeral_gb=0, swap=0, rxtx_factor=1.0,
+        vcpu_weight=None, disabled=False, is_public=True,
+        extra_specs={'hw:cpu_policy': 'dedicated'}, description=None)
+    now = timeutils.utcnow()
+    return objects.Instance(
+        ctxt, id=1, uuid=UUID, user_id='user', project_id='project',
+        reservation_id='r-1', display_name='vm-1', display_description='',
+        hostname='vm-1', host='compute-1', node='compute-1', os_type='linux',
+        architecture='x86_64', availability_zone='nova', image_ref=UUID,
+        key_name='key', kernel_id='', ramdisk_id='', created_at=now,
+        launched_at=now, terminated_at=None, deleted_at=None, updated_at=now,
+        vm_state='active', power_state=1, task_state=None, progress=0,
+        metadata={'role': 'db'}, locked=False, auto_disk_config=False,
+        flavor=flavor,
+        info_cache=objects.InstanceInfoCache(instance_uuid=UUID,
+                                             network_info=_network_info()),
+        keypairs=objects.KeyPairList(objects=[
+            objects.KeyPair(user_id='user', name='key', type='ssh',
+                            public_key='ssh-rsa AAAA')]),
+        tags=objects.TagList(objects=[objects.Tag(resource_id=UUID,
+                                                  tag='tag-%d' % i)
+                                      for i in range(3)]))
+
+
+def build_service():
+    return objects.Service(
+        id=1, uuid=UUID, host='compute-1', binary='nova-compute',
+        topic='compute', report_count=42, disabled=False,
+        disabled_reason=None, availability_zone='nova',
+        last_seen_up=timeutils.utcnow(), forced_down=False)
+
+
+def instance_update(ctxt, instance):
+    payload = instance_notification.InstanceUpdatePayload(
+        instance=instance,
+        state_update=instance_notification.InstanceStateUpdatePayload(
+            old_state='active', state='active', old_task_state=None,
+            new_task_state='rebooting'),
+        audit_period=instance_notification.AuditPeriodPayload(
+            audit_period_beginning=timeutils.utcnow(),
+            audit_period_ending=timeutils.utcnow()),
+        bandwidth=[],
+        old_display_name=None)
+    return instance_notification.InstanceUpdateNotification(
+        priority=fields.NotificationPriority.INFO,
+        event_type=notification_base.EventType(
+            object='instance',
+            action=fields.NotificationAction.UPDATE),
+        publisher=notification_base.NotificationPublisher(
+            host='compute-1', source=fields.NotificationSource.COMPUTE),
+        payload=payload)
+
+
+def instance_create_end(ctxt, instance):
+    payload = instance_notification.InstanceCreatePayload(
+        instance=instance, fault=None, bdms=[])
+    return instance_notification.InstanceCreateNotification(
+        priority=fields.NotificationPriority.INFO,
+        event_type=notification_base.EventType(
+            object='instance',
+            action=fields.NotificationAction.CREATE,
+            phase=fields.NotificationPhase.END),
+        publisher=notification_base.NotificationPublisher(
+            host='compute-1', source=fields.NotificationSource.COMPUTE),
+        payload=payload)
+
+
+def service_update(ctxt, service):
+    payload = service_notification.ServiceStatusPayload(service)
+    return service_notification.ServiceStatusNotification(
+        priority=fields.NotificationPriority.INFO,
+        event_type=notification_base.EventType(
+            object='service',
+            action=fields.NotificationAction.UPDATE),
+        publisher=notification_base.NotificationPublisher.from_service_obj(
+            service),
+        payload=payload)
+
+
+BENCHMARKS = (
+    ('instance.update', instance_update, build_instance),
+    ('instance.create.end', instance_create_end, build_instance),
+    ('service.update', service_update, lambda ctxt: build_service()),
+)
+
+
+def run(build, ctxt, source, number):
+    """Returns the CPU time taken to build and emit a notification."""
+    build_time = emit_time = 0
+    for _i in range(number):
+        start = _cpu_time()
+        notification = build(ctxt, source)
+        built = _cpu_time()
+        notification.emit(ctxt)
+        emit_time += _cpu_time() - built
+        build_time += built - start
+    return build_time / number, emit_time / number
+
+
+class NotificationBenchmarkTestCase(test.NoDBTestCase):
+    def setUp(self):
+        super(NotificationBenchmarkTestCase, self).setUp()
+        fake_notifier.stub_notifier(self)
+        self.addCleanup(fake_notifier.reset)
+        self.context = context.get_admin_context()
+
+    def test_benchmarks(self):
+        for name, build, build_source in BENCHMARKS:
+            run(build, self.context, build_source(self.context), 1)
+
+        self.assertEqual(
+            [name for name, build, build_source in BENCHMARKS],
+            [notification['event_type']
+             for notification in fake_notifier.VERSIONED_NOTIFICATIONS])
+        for notification in fake_notifier.VERSIONED_NOTIFICATIONS:
+            self.assertEqual(UUID, notification['payload'][
+                'nova_object.data']['uuid'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('-n', '--number', type=int, default=1000,
+                        help='Number of notifications emitted per type')
+    parser.add_argument('--profile', action='store_true',
+                        help='Print the functions taking the most time')
+    args = parser.parse_args()
+
+    config.parse_args([])
+    CONF.set_override('driver', ['test'],
+                      group='oslo_messaging_notifications')
+    CONF.set_override('transport_url', 'fake:/')
+    rpc.init(CONF)
+    objects.register_all()
+    ctxt = context.get_admin_context()
+
+    profiler = cProfile.Profile() if args.profile else None
+    if profiler:
+        profiler.enable()
+    for name, build, build_source in BENCHMARKS:
+        build_time, emit_time = run(build, ctxt, build_source(ctxt),
+                                    args.number)
+        print('%-20s build %7.1f us  emit %7.1f us  total %7.1f us' % (
+            name, build_time * 1e6, emit_time * 1e6,
+            (build_time + emit_time) * 1e6))
+    if profiler:
+        profiler.disable()
+        pstats.Stats(profiler).sort_stats('tottime').print_stats(25)
+
+
+if __name__ == '__main__':
+    main()
@@ -103,6 +103,30 @@ class _TestBandwidthUsage(test.TestCase):
 
         self._compare(self, self.expected_bw_usage, bw_usage)
 
+    @mock.patch.object(db, 'bw_usage_update_all')
+    def test_create_list(self, mock_create):
+        mock_create.return_value = [self.expected_bw_usage]
+
+        bw_usage = bandwidth_usage.BandwidthUsage(
+            instance_uuid=uuids.instance, mac='fake_mac1',
+            start_period=self.expected_bw_usage['start_period'],
+            last_refreshed=self.expected_bw_usage['last_refreshed'],
+            bw_in=100, bw_out=200, last_ctr_in=12345, last_ctr_out=67890)
+        bw_usages = bandwidth_usage.BandwidthUsageList(
+            context=self.context, objects=[bw_usage])
+        bw_usages.create(update_cells=False)
+
+        mock_create.assert_called_once_with(
+            self.context,
+            [dict(uuid=uuids.instance, mac='fake_mac1',
+                  start_period=self.expected_bw_usage['start_period'],
+                  bw_in=100, bw_out=200, last_ctr_in=12345,
+                  last_ctr_out=67890,
+                  last_refreshed=self.expected_bw_usage['last_refreshed'])],
+            update_cells=False)
+        self.assertEqual(1, len(bw_usages))
+        self._compare(self, self.expected_bw_usage, bw_usages[0])
+
     def test_update_with_db(self):
         expected_bw_usage1 = self._fake_bw_usage(
             time=self.expected_bw_usage['last_refreshed'],
@@ -11,9 +11,9 @@
 #    under the License.
 
 import mock
+from oslo_db import exception as db_exc
 
 from nova import context
-from nova import exception
 from nova import objects
 from nova.objects import host_mapping
 from nova import test
@@ -151,63 +151,102 @@ class TestRemoteHostMappingObject(test_objects._RemoteTest,
 
 
 class TestHostMappingDiscovery(test.NoDBTestCase):
+    @mock.patch('nova.db.compute_node_set_mapped')
     @mock.patch('nova.objects.CellMappingList.get_all')
-    @mock.patch('nova.objects.HostMapping.create')
-    @mock.patch('nova.objects.HostMapping.get_by_host')
+    @mock.patch.object(host_mapping, '_create_missing_host_mappings_in_db')
     @mock.patch('nova.objects.ComputeNodeList.get_all_by_not_mapped')
-    def test_discover_hosts_all(self, mock_cn_get, mock_hm_get, mock_hm_create,
-                                mock_cm):
-        def _hm_get(context, host):
-            if host in ['a', 'b', 'c']:
-                return objects.HostMapping()
-            raise exception.HostMappingNotFound(name=host)
-
-        mock_hm_get.side_effect = _hm_get
-        mock_cn_get.side_effect = [[objects.ComputeNode(host='d',
-                                                        uuid=uuids.cn1)],
-                                   [objects.ComputeNode(host='e',
-                                                        uuid=uuids.cn2)]]
-
-        cell_mappings = [objects.CellMapping(name='foo',
+    def test_discover_hosts_all(self, mock_cn_get, mock_hm_create, mock_cm,
+                                mock_set_mapped):
+        def _hm_create(context, cell_id, hosts):
+            return [host for host in hosts if host not in ['a', 'b', 'c']]
+
+        mock_hm_create.side_effect = _hm_create
+        mock_cn_get.side_effect = [[objects.ComputeNode(id=1, host='a',
+                                                        uuid=uuids.cn1),
+                                    objects.ComputeNode(id=2, host='d',
+                                                        uuid=uuids.cn2)],
+                                   [objects.ComputeNode(id=3, host='e',
+                                                        uuid=uuids.cn3)]]
+
+        cell_mappings = [objects.CellMapping(name='foo', id=1,
                                              uuid=uuids.cm1),
-                         objects.CellMapping(name='bar',
+                         objects.CellMapping(name='bar', id=2,
                                              uuid=uuids.cm2)]
         mock_cm.return_value = cell_mappings
         ctxt = context.get_admin_context()
-        with mock.patch('nova.objects.ComputeNode.save') as mock_save:
-            hms = host_mapping.discover_hosts(ctxt)
-            mock_save.assert_has_calls([mock.call(), mock.call()])
+        hms = host_mapping.discover_hosts(ctxt)
         self.assertEqual(2, len(hms))
-        self.assertTrue(mock_hm_create.called)
+        mock_hm_create.assert_has_calls([
+            mock.call(test.MatchType(context.RequestContext), 1, ['a', 'd']),
+            mock.call(test.MatchType(context.RequestContext), 2, ['e'])])
+        # The compute nodes of the hosts which were already mapped are
+        # flagged as well
+        mock_set_mapped.assert_has_calls([
+            mock.call(test.MatchType(context.RequestContext), [1, 2], 1),
+            mock.call(test.MatchType(context.RequestContext), [3], 1)])
         self.assertEqual(['d', 'e'],
                          [hm.host for hm in hms])
+        self.assertEqual([uuids.cm1, uuids.cm2],
+                         [hm.cell_mapping.uuid for hm in hms])
 
+    @mock.patch('nova.db.compute_node_set_mapped')
     @mock.patch('nova.objects.CellMapping.get_by_uuid')
-    @mock.patch('nova.objects.HostMapping.create')
-    @mock.patch('nova.objects.HostMapping.get_by_host')
+    @mock.patch.object(host_mapping, '_create_missing_host_mappings_in_db')
     @mock.patch('nova.objects.ComputeNodeList.get_all_by_not_mapped')
-    def test_discover_hosts_one(self, mock_cn_get, mock_hm_get, mock_hm_create,
-                                mock_cm):
-        def _hm_get(context, host):
-            if host in ['a', 'b', 'c']:
-                return objects.HostMapping()
-            raise exception.HostMappingNotFound(name=host)
-
-        mock_hm_get.side_effect = _hm_get
+    def test_discover_hosts_one(self, mock_cn_get, mock_hm_create, mock_cm,
+                                mock_set_mapped):
+        mock_hm_create.side_effect = lambda context, cell_id, hosts: hosts
         # NOTE(danms): Provide both side effects, but expect it to only
         # be called once if we provide a cell
-        mock_cn_get.side_effect = [[objects.ComputeNode(host='d',
-                                                        uuid=uuids.cn1)],
-                                   [objects.ComputeNode(host='e',
-                                                        uuid=uuids.cn2)]]
-
-        mock_cm.return_value = objects.CellMapping(name='foo',
+        mock_cn_get.side_effect = [[objects.ComputeNode(id=1, host='d',
+                                                        uuid=uuids.cn1),
+                                    objects.ComputeNode(id=2, host='d',
+                                                        uuid=uuids.cn2)],
+                                   [objects.ComputeNode(id=3, host='e',
+                                                        uuid=uuids.cn3)]]
+
+        mock_cm.return_value = objects.CellMapping(name='foo', id=1,
                                                    uuid=uuids.cm1)
         ctxt = context.get_admin_context()
-        with mock.patch('nova.objects.ComputeNode.save') as mock_save:
-            hms = host_mapping.discover_hosts(ctxt, uuids.cm1)
-            mock_save.assert_called_once_with()
+        hms = host_mapping.discover_hosts(ctxt, uuids.cm1)
+        # The host of several compute nodes is mapped once
+        mock_hm_create.assert_called_once_with(
+            test.MatchType(context.RequestContext), 1, ['d'])
+        mock_set_mapped.assert_called_once_with(
+            test.MatchType(context.RequestContext), [1, 2], 1)
         self.assertEqual(1, len(hms))
-        self.assertTrue(mock_hm_create.called)
         self.assertEqual(['d'],
                          [hm.host for hm in hms])
+
+    @mock.patch('nova.db.compute_node_set_mapped')
+    @mock.patch.object(host_mapping, '_create_missing_host_mappings_in_db')
+    @mock.patch('nova.objects.ComputeNodeList.get_all_by_not_mapped')
+    def test_discover_hosts_duplicate(self, mock_cn_get, mock_hm_create,
+                                      mock_set_mapped):
+        mock_hm_create.side_effect = [db_exc.DBDuplicateEntry, []]
+        mock_cn_get.return_value = [objects.ComputeNode(id=1, host='d',
+                                                        uuid=uuids.cn1)]
+        cm = objects.CellMapping(name='foo', id=1, uuid=uuids.cm1)
+        ctxt = context.get_admin_context()
+        with mock.patch('nova.objects.CellMapping.get_by_uuid',
+                        return_value=cm):
+            hms = host_mapping.discover_hosts(ctxt, uuids.cm1)
+        self.assertEqual([], hms)
+        self.assertEqual(2, mock_hm_create.call_count)
+        mock_set_mapped.assert_called_once_with(
+            test.MatchType(context.RequestContext), [1], 1)
+
+    @mock.patch('nova.objects.host_mapping._discover_hosts_in_cell')
+    @mock.patch('nova.objects.CellMappingList.get_all')
+    def test_discover_hosts_workers(self, mock_cm, mock_discover):
+        cell0 = objects.CellMapping(name='cell0',
+                                    uuid=objects.CellMapping.CELL0_UUID)
+        cell_mappings = [cell0,
+                         objects.CellMapping(name='foo', uuid=uuids.cm1),
+                         objects.CellMapping(name='bar', uuid=uuids.cm2)]
+        mock_cm.return_value = cell_mappings
+        mock_discover.side_effect = lambda ctxt, cm, status_fn: [cm.name]
+        ctxt = context.get_admin_context()
+        self.assertEqual(['foo', 'bar'],
+                         host_mapping.discover_hosts(ctxt, workers=2))
+        self.assertEqual(2, mock_discover.call_count)
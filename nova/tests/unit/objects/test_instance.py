@@ -1596,6 +1596,72 @@ class TestInstanceObject(test_objects._LocalTest,
                 instance.obj_reset_changes(fields=[field])
             _test()
 
+    # NOTE: The deferred instance_extra columns only exist on the object
+    # built from the database, any copy sent over RPC is fully loaded.
+    def _get_with_deferred_extra(self, mock_get):
+        flavors = {'cur': objects.Flavor(name='cur'),
+                   'old': objects.Flavor(name='old')}
+        for flavor in flavors.values():
+            flavor.obj_reset_changes()
+        fake_flavor = jsonutils.dumps(
+            {'cur': flavors['cur'].obj_to_primitive(),
+             'old': flavors['old'].obj_to_primitive(),
+             'new': None})
+        mock_get.return_value = dict(
+            self.fake_instance,
+            extra={'numa_topology': (test_instance_numa_topology.
+                                     fake_db_topology['numa_topology']),
+                   'flavor': fake_flavor})
+        return objects.Instance.get_by_uuid(
+            self.context, 'uuid',
+            expected_attrs=['numa_topology', 'flavor'])
+
+    @mock.patch.object(objects.InstanceNUMATopology, 'obj_from_db_obj',
+                       wraps=objects.InstanceNUMATopology.obj_from_db_obj)
+    @mock.patch.object(db, 'instance_get_by_uuid')
+    def test_get_defers_extra(self, mock_get, mock_from_db):
+        inst = self._get_with_deferred_extra(mock_get)
+
+        self.assertIn('numa_topology', inst)
+        self.assertIn('old_flavor', inst)
+        self.assertEqual(set(), inst.obj_what_changed())
+        self.assertFalse(mock_from_db.called)
+
+        inst._context = None
+        self.assertEqual(2, len(inst.numa_topology.cells))
+        mock_from_db.assert_called_once_with(
+            inst.uuid,
+            test_instance_numa_topology.fake_db_topology['numa_topology'])
+        self.assertEqual('cur', inst.flavor.name)
+        self.assertEqual('old', inst.old_flavor.name)
+        self.assertIsNone(inst.new_flavor)
+        mock_get.assert_called_once_with(
+            self.context, 'uuid',
+            columns_to_join=['extra', 'extra.numa_topology', 'extra.flavor'])
+
+    @mock.patch.object(db, 'instance_get_by_uuid')
+    def test_deferred_extra_set_before_access(self, mock_get):
+        inst = self._get_with_deferred_extra(mock_get)
+
+        inst.flavor = objects.Flavor(name='resized')
+        self.assertEqual('old', inst.old_flavor.name)
+        self.assertEqual('resized', inst.flavor.name)
+        self.assertIn('flavor', inst.obj_what_changed())
+        self.assertNotIn('old_flavor', inst.obj_what_changed())
+
+    @mock.patch.object(db, 'instance_get_by_uuid')
+    def test_deferred_extra_clone_and_primitive(self, mock_get):
+        inst = self._get_with_deferred_extra(mock_get)
+
+        clone = inst.obj_clone()
+        self.assertEqual(inst._deferred_extra, clone._deferred_extra)
+        self.assertIsNot(inst._deferred_extra, clone._deferred_extra)
+
+        primitive = inst.obj_to_primitive()['nova_object.data']
+        for attr in ('numa_topology', 'flavor', 'old_flavor', 'new_flavor'):
+            self.assertIn(attr, primitive)
+        self.assertEqual('old', clone.old_flavor.name)
+
     def test_save_objectfield_missing_instance_row(self):
         self._test_save_objectfield_fk_constraint_fails(
                 'instance_uuid', exception.InstanceNotFound)
@@ -361,6 +361,23 @@ class _TestInstanceActionEventObject(object):
                                           exc_tb='traceback')
         mock_format.assert_called_once_with(mock.sentinel.exc_tb)
 
+    @mock.patch.object(instance_action.LOG, 'warning')
+    @mock.patch.object(db, 'action_events_record')
+    def test_record_events(self, mock_record, mock_warn):
+        events = [{'event': 'fake-event', 'instance_uuid': uuids.instance,
+                   'request_id': 'fake-request',
+                   'start_time': '2017-01-01T00:00:00.000000',
+                   'project_id': 'fake-project'},
+                  {'event': 'fake-event', 'instance_uuid': uuids.instance2,
+                   'request_id': 'fake-request',
+                   'finish_time': '2017-01-01T00:00:01.000000',
+                   'result': 'Success', 'project_id': 'fake-project'}]
+        mock_record.return_value = events[1:]
+        instance_action.InstanceActionEvent.record_events(self.context,
+                                                          events)
+        mock_record.assert_called_once_with(self.context, events)
+        self.assertEqual(1, mock_warn.call_count)
+
 
 class TestInstanceActionEventObject(test_objects._LocalTest,
                                     _TestInstanceActionEventObject):
@@ -22,6 +22,7 @@ import pprint
 import fixtures
 import mock
 from oslo_log import log
+from oslo_serialization import jsonutils
 from oslo_utils import timeutils
 from oslo_versionedobjects import base as ovo_base
 from oslo_versionedobjects import exception as ovo_exc
@@ -995,6 +996,62 @@ class TestObjectSerializer(_BaseTestCase):
         thing2 = ser.deserialize_entity(self.context, thing)
         self.assertIsInstance(thing2['foo'], base.NovaObject)
 
+    def _get_compact_obj(self):
+        obj = MyObj(foo=2, bar='bar', rel_object=MyOwnedObject(baz=1),
+                    rel_objects=[MyOwnedObject(baz=2), MyOwnedObject(baz=3)])
+        obj.obj_reset_changes(['foo', 'rel_objects'])
+        return obj
+
+    def test_object_serialization_compact(self):
+        ser = base.NovaObjectSerializer(compact=True)
+        obj = self._get_compact_obj()
+        primitive = ser.serialize_entity(self.context, obj)
+        self.assertNotIn('nova_object.name', primitive)
+        # One schema per object class, shared by the items of the list.
+        self.assertEqual(['MyObj', 'MyOwnedObject'],
+                         [s[0] for s in primitive[base.COMPACT_SCHEMAS_KEY]])
+        primitive = jsonutils.loads(jsonutils.dumps(primitive))
+
+        obj2 = ser.deserialize_entity(self.context, primitive)
+
+        self.assertIsInstance(obj2, MyObj)
+        self.assertEqual(self.context, obj2._context)
+        self.assertTrue(base.obj_equal_prims(obj, obj2))
+        self.assertEqual(obj.obj_what_changed(), obj2.obj_what_changed())
+        self.assertEqual([2, 3], [o.baz for o in obj2.rel_objects])
+        self.assertEqual(self.context, obj2.rel_objects[0]._context)
+        self.assertNotIn('missing', obj2)
+
+    def test_compact_primitive_to_primitive(self):
+        obj = self._get_compact_obj()
+        compact = base.obj_to_compact_primitive(obj)
+        self.assertEqual(
+            jsonutils.loads(jsonutils.dumps(obj.obj_to_primitive())),
+            jsonutils.loads(jsonutils.dumps(
+                base.compact_primitive_to_primitive(compact))))
+
+    def test_object_serialization_compact_deserialized_by_default(self):
+        obj = self._get_compact_obj()
+        primitive = base.NovaObjectSerializer(compact=True).serialize_entity(
+            self.context, [obj])
+        obj2 = base.NovaObjectSerializer().deserialize_entity(
+            self.context, primitive)[0]
+        self.assertTrue(base.obj_equal_prims(obj, obj2))
+
+    def test_object_serialization_compact_backport(self):
+        ser = base.NovaObjectSerializer(compact=True)
+        obj = self._get_compact_obj()
+        primitive = ser.serialize_entity(self.context, obj)
+        primitive[base.COMPACT_SCHEMAS_KEY][0][2] = '1.25'
+
+        with mock.patch.object(ser, '_process_object') as mock_process:
+            result = ser.deserialize_entity(self.context, primitive)
+
+        self.assertEqual(mock_process.return_value, result)
+        expanded = base.compact_primitive_to_primitive(primitive)
+        self.assertEqual('1.25', expanded['nova_object.version'])
+        mock_process.assert_called_once_with(self.context, expanded)
+
 
 class TestArgsSerializer(test.NoDBTestCase):
     def setUp(self):
@@ -1063,7 +1120,7 @@ object_data = {
     'Aggregate': '1.3-f315cb68906307ca2d1cca84d4753585',
     'AggregateList': '1.2-fb6e19f3c3a3186b04eceb98b5dadbfa',
     'BandwidthUsage': '1.2-c6e4c779c7f40f2407e3d70022e3cd1c',
-    'BandwidthUsageList': '1.2-5fe7475ada6fe62413cbfcc06ec70746',
+    'BandwidthUsageList': '1.3-5cba806fd88be17a1a7c35d432b1f274',
     'BlockDeviceMapping': '1.18-ad87cece6f84c65f5ec21615755bc6d3',
     'BlockDeviceMappingList': '1.17-1e568eecb91d06d4112db9fd656de235',
     'BuildRequest': '1.3-077dee42bed93f8a5b62be77657b7152',
@@ -1100,7 +1157,7 @@ object_data = {
     'ImageMetaProps': '1.19-dc9581ff2b80d8c33462889916b82df0',
     'Instance': '2.3-4f98ab23f4b0a25fabb1040c8f5edecc',
     'InstanceAction': '1.1-f9f293e526b66fca0d05c3b3a2d13914',
-    'InstanceActionEvent': '1.1-e56a64fa4710e43ef7af2ad9d6028b33',
+    'InstanceActionEvent': '1.2-51f2145b31dbf4927ea9f75e60ae5550',
     'InstanceActionEventList': '1.1-13d92fb953030cdbfee56481756e02be',
     'InstanceActionList': '1.1-a2b2fb6006b47c27076d3a1d48baa759',
     'InstanceDeviceMetadata': '1.0-74d78dd36aa32d26d2769a1b57caf186',
@@ -1168,6 +1225,7 @@ object_data = {
     'VirtualInterface': '1.3-efd3ca8ebcc5ce65fff5a25f31754c54',
     'VirtualInterfaceList': '1.0-9750e2074437b3077e46359102779fc6',
     'VolumeUsage': '1.0-6c8190c46ce1469bb3286a1f21c2e475',
+    'VolumeUsageList': '1.0-da1ade67cbb121830c600669cf117597',
     'XenDeviceBus': '1.0-272a4f899b24e31e42b2b9a7ed7e9194',
     'XenapiLiveMigrateData': '1.2-72b9b6e70de34a283689ec7126aa4879',
 }
@@ -81,6 +81,32 @@ class _TestVolumeUsage(object):
             'fake-project-id', 'fake-user-id', None, update_totals=True)
         self.compare_obj(vol_usage, fake_vol_usage)
 
+    @mock.patch('nova.db.vol_usage_update_all',
+                return_value=[fake_vol_usage])
+    def test_save_list(self, mock_upd):
+        vol_usage = objects.VolumeUsage()
+        vol_usage.volume_id = uuids.volume_id
+        vol_usage.instance_uuid = uuids.instance
+        vol_usage.project_id = 'fake-project-id'
+        vol_usage.user_id = 'fake-user-id'
+        vol_usage.availability_zone = None
+        vol_usage.curr_reads = 10
+        vol_usage.curr_read_bytes = 20
+        vol_usage.curr_writes = 30
+        vol_usage.curr_write_bytes = 40
+        vol_usages = objects.VolumeUsageList(self.context,
+                                             objects=[vol_usage])
+        vol_usages.save()
+        mock_upd.assert_called_once_with(
+            self.context,
+            [dict(id=uuids.volume_id, rd_req=10, rd_bytes=20, wr_req=30,
+                  wr_bytes=40, instance_id=uuids.instance,
+                  project_id='fake-project-id', user_id='fake-user-id',
+                  availability_zone=None)],
+            update_totals=False)
+        self.assertEqual(1, len(vol_usages))
+        self.compare_obj(vol_usages[0], fake_vol_usage)
+
 
 class TestVolumeUsage(test_objects._LocalTest, _TestVolumeUsage):
     pass
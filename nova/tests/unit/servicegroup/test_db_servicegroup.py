@@ -90,6 +90,37 @@ class DBServiceGroupTestCase(test.NoDBTestCase):
         self.assertEqual(11, service_ref.report_count)
         self.assertFalse(service.model_disconnected)
 
+    @mock.patch('nova.conductor.API')
+    @mock.patch.object(objects.Service, 'save')
+    def test_report_state_batched(self, upd_mock, mock_conductor_api):
+        self.flags(heartbeat_batch_interval=10)
+        service_ref = objects.Service(host='fake-host', topic='compute',
+                                      report_count=10)
+        service = mock.MagicMock(model_disconnected=False,
+                                 service_ref=service_ref)
+        fn = self.servicegroup_api._driver._report_state
+        with mock.patch.object(objects.Service, 'indirection_api'):
+            fn(service)
+        mock_conductor_api.return_value.service_heartbeat.\
+            assert_called_once_with(service_ref._context, service_ref)
+        self.assertFalse(upd_mock.called)
+        self.assertFalse(service.model_disconnected)
+
+    @mock.patch('nova.conductor.API')
+    @mock.patch.object(objects.Service, 'save')
+    def test_report_state_batched_local(self, upd_mock, mock_conductor_api):
+        # Services accessing the database directly save their record
+        self.flags(heartbeat_batch_interval=10)
+        service_ref = objects.Service(host='fake-host', topic='compute',
+                                      report_count=10)
+        service = mock.MagicMock(model_disconnected=False,
+                                 service_ref=service_ref)
+        fn = self.servicegroup_api._driver._report_state
+        fn(service)
+        self.assertFalse(mock_conductor_api.called)
+        upd_mock.assert_called_once_with()
+        self.assertEqual(11, service_ref.report_count)
+
     @mock.patch.object(objects.Service, 'save')
     def _test_report_state_error(self, exc_cls, upd_mock):
         upd_mock.side_effect = exc_cls("service save failed")
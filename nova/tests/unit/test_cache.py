@@ -10,10 +10,14 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
+import fixtures
 import mock
 
 from nova import cache_utils
+from nova.network import model as network_model
+from nova import objects
 from nova import test
+from nova.tests import uuidsentinel as uuids
 
 
 class TestOsloCache(test.NoDBTestCase):
@@ -57,3 +61,64 @@ class TestOsloCache(test.NoDBTestCase):
 
         methods_called = [a[0] for n, a, k in mock_cacheregion.mock_calls]
         self.assertEqual(['dogpile.cache.null'], methods_called)
+
+
+class InvalidateMetadataTestCase(test.NoDBTestCase):
+    def setUp(self):
+        super(InvalidateMetadataTestCase, self).setUp()
+        self.flags(enabled=True, group='cache')
+        self.client = mock.Mock()
+        self.useFixture(fixtures.MockPatchObject(
+            cache_utils, '_get_metadata_client', return_value=self.client))
+        self.instance = objects.Instance(uuid=uuids.instance)
+        self.network_info = network_model.NetworkInfo([
+            network_model.VIF(network=network_model.Network(subnets=[
+                network_model.Subnet(ips=[
+                    network_model.FixedIP(address='10.0.0.%d' % i)
+                    for i in (2, 3)])]))])
+
+    def _expected_keys(self):
+        return ['metadata-%s' % uuids.instance,
+                'metadata-10.0.0.2', 'metadata-10.0.0.3']
+
+    def test_invalidate(self):
+        cache_utils.invalidate_metadata(self.instance, self.network_info)
+        self.client.delete_multi.assert_called_once_with(
+            self._expected_keys())
+
+    def test_invalidate_from_info_cache(self):
+        self.instance.info_cache = objects.InstanceInfoCache(
+            network_info=self.network_info)
+        cache_utils.invalidate_metadata(self.instance)
+        self.client.delete_multi.assert_called_once_with(
+            self._expected_keys())
+
+    def test_invalidate_no_network_info(self):
+        cache_utils.invalidate_metadata(self.instance)
+        self.client.delete_multi.assert_called_once_with(
+            ['metadata-%s' % uuids.instance])
+
+    def test_invalidate_cache_disabled(self):
+        self.flags(enabled=False, group='cache')
+        cache_utils.invalidate_metadata(self.instance, self.network_info)
+        self.flags(enabled=True, group='cache')
+        self.flags(metadata_cache_expiration=0, group='api')
+        cache_utils.invalidate_metadata(self.instance, self.network_info)
+        self.assertFalse(self.client.delete_multi.called)
+
+    def test_invalidate_several_network_infos(self):
+        network_info = network_model.NetworkInfo([
+            network_model.VIF(network=network_model.Network(subnets=[
+                network_model.Subnet(ips=[
+                    network_model.FixedIP(address='10.0.0.%d' % i)
+                    for i in (3, 4)])]))])
+        cache_utils.invalidate_metadata(self.instance, self.network_info,
+                                        None, network_info)
+        self.client.delete_multi.assert_called_once_with(
+            self._expected_keys() + ['metadata-10.0.0.4'])
+
+    def test_invalidate_fails(self):
+        self.client.delete_multi.side_effect = Exception('boom')
+        cache_utils.invalidate_metadata(self.instance, self.network_info)
+        self.client.delete_multi.assert_called_once_with(
+            self._expected_keys())
@@ -43,6 +43,7 @@ class ContextTestCase(test.NoDBTestCase):
         self.assertIn('admin', admin_ctxt.roles)
         self.assertFalse(user_ctxt.is_admin)
         self.assertNotIn('admin', user_ctxt.roles)
+        self.assertIsNot(user_ctxt.policy_memo, admin_ctxt.policy_memo)
 
     def test_request_context_sets_is_admin(self):
         ctxt = context.RequestContext('111',
@@ -15,6 +15,7 @@
 #    under the License.
 """Unit Tests for network code."""
 
+import fixtures
 import mock
 import six
 
@@ -274,3 +275,103 @@ class IptablesManagerTestCase(test.NoDBTestCase):
                                                self.manager.ipv4['filter'],
                                                'filter')
         self.assertEqual(current_lines, new_lines)
+
+    def _stub_execute(self):
+        # applying the rules takes an external lock
+        self.flags(lock_path=self.useFixture(fixtures.TempDir()).path,
+                   group='oslo_concurrency')
+        calls = []
+
+        def fake_execute(*cmd, **kwargs):
+            calls.append((cmd, kwargs.get('process_input')))
+            if cmd[0].endswith('-save'):
+                return '\n'.join(self.sample_filter + self.sample_nat), ''
+            return '', ''
+
+        self.manager.execute = fake_execute
+        return calls
+
+    def test_apply_skipped_when_already_applied(self):
+        calls = self._stub_execute()
+        for table in six.itervalues(self.manager.ipv4):
+            table.dirty = False
+        for table in six.itervalues(self.manager.ipv6):
+            table.dirty = False
+
+        self.manager._apply()
+        self.assertEqual([], calls)
+
+    def test_apply_incremental(self):
+        self.flags(iptables_incremental_apply=True, use_ipv6=False)
+        calls = self._stub_execute()
+        self.manager.apply()
+        # the first apply rewrites the whole tables
+        self.assertEqual([('iptables-save', '-c'), ('iptables-restore', '-c')],
+                         [cmd for cmd, _input in calls])
+
+        del calls[:]
+        table = self.manager.ipv4['filter']
+        table.add_chain('inst-1')
+        table.add_rule('inst-1', '-s 1.2.3.4/32 -j ACCEPT')
+        table.add_rule('local', '-d 10.0.0.1 -j $inst-1')
+        self.manager.apply()
+        self.assertEqual(1, len(calls))
+        cmd, process_input = calls[0]
+        self.assertEqual(('iptables-restore', '-c', '--noflush'), cmd)
+        self.assertEqual(
+            ['*filter',
+             ':%s-inst-1 - [0:0]' % self.binary_name,
+             ':%s-local - [0:0]' % self.binary_name,
+             '[0:0] -A %s-inst-1 -s 1.2.3.4/32 -j ACCEPT' % self.binary_name,
+             '[0:0] -A %s-local -d 10.0.0.1 -j %s-inst-1' % (
+                 self.binary_name, self.binary_name),
+             'COMMIT',
+             ''],
+            process_input.decode().split('\n'))
+
+        del calls[:]
+        table.remove_chain('inst-1')
+        self.manager.apply()
+        self.assertEqual(1, len(calls))
+        cmd, process_input = calls[0]
+        self.assertEqual(('iptables-restore', '-c', '--noflush'), cmd)
+        self.assertEqual(
+            ['*filter',
+             ':%s-local - [0:0]' % self.binary_name,
+             ':%s-inst-1 - [0:0]' % self.binary_name,
+             '-X %s-inst-1' % self.binary_name,
+             'COMMIT',
+             ''],
+            process_input.decode().split('\n'))
+
+    def test_apply_incremental_unwrapped_change(self):
+        self.flags(iptables_incremental_apply=True, use_ipv6=False)
+        calls = self._stub_execute()
+        self.manager.apply()
+
+        del calls[:]
+        self.manager.ipv4['filter'].add_rule('FORWARD', '-i br100 -j ACCEPT',
+                                             wrap=False)
+        self.manager.apply()
+        # rules outside of the wrapped chains require the whole tables to be
+        # rewritten
+        self.assertEqual([('iptables-save', '-c'), ('iptables-restore', '-c')],
+                         [cmd for cmd, _input in calls])
+
+    def test_apply_incremental_error(self):
+        self.flags(iptables_incremental_apply=True, use_ipv6=False)
+        calls = self._stub_execute()
+        self.manager.apply()
+
+        table = self.manager.ipv4['filter']
+        table.add_chain('inst-1')
+        with mock.patch.object(self.manager, 'execute',
+                               side_effect=test.TestingException):
+            self.assertRaises(test.TestingException, self.manager.apply)
+
+        del calls[:]
+        table.add_rule('inst-1', '-s 1.2.3.4/32 -j ACCEPT')
+        self.manager.apply()
+        # the rules are rewritten after an error
+        self.assertEqual([('iptables-save', '-c'), ('iptables-restore', '-c')],
+                         [cmd for cmd, _input in calls])
@@ -796,6 +796,23 @@ class OpenStackMetadataTestCase(test.TestCase):
         self.assertRaises(base.InvalidMetadataPath,
             mdinst.lookup, "/openstack/2012-08-10/user_data")
 
+    def test_lookup_response(self):
+        inst = self.instance.obj_clone()
+        mdinst = fake_InstanceMetadata(self, inst)
+
+        self.assertEqual(
+            (USER_DATA_STRING, base.MIME_TYPE_TEXT_PLAIN),
+            mdinst.lookup_response('/openstack/2012-08-10/user_data'))
+
+        body, mimetype = mdinst.lookup_response(
+            '/openstack/latest/meta_data.json')
+        self.assertEqual(base.MIME_TYPE_APPLICATION_JSON, mimetype)
+        self.assertEqual(inst.uuid, jsonutils.loads(body)['uuid'])
+
+        self.assertEqual(
+            password.handle_password,
+            mdinst.lookup_response('/openstack/latest/password'))
+
     def test_random_seed(self):
         fakes.stub_out_key_pair_funcs(self)
         inst = self.instance.obj_clone()
@@ -1094,7 +1111,9 @@ class MetadataHandlerTestCase(test.TestCase):
             return "foo"
 
         class CallableMD(object):
-            def lookup(self, path_info):
+            cache_id = uuids.cache_id
+
+            def lookup_response(self, path_info):
                 return verify
 
         response = fake_request(self, CallableMD(), "/bar")
@@ -1376,6 +1395,25 @@ class MetadataHandlerTestCase(test.TestCase):
         self._metadata_handler_with_instance_id(hnd)
         self.assertEqual(1, get_by_uuid.call_count)
 
+    @mock.patch.object(base, 'get_metadata_by_instance_id')
+    def test_metadata_handler_response_cached(self, get_by_uuid):
+        # The cache is shared between the metadata API processes, which each
+        # get their own copy of the cached metadata
+        self.flags(metadata_cache_expiration=15, group='api')
+        get_by_uuid.return_value = self.mdinst
+        hnd = handler.MetadataRequestHandler()
+        with mock.patch.object(hnd._cache, 'get',
+                               side_effect=lambda key: copy.deepcopy(
+                                   hnd._cache.region.get(key) or None)):
+            with mock.patch.object(base.InstanceMetadata, 'lookup_response',
+                                   autospec=True,
+                                   side_effect=base.InstanceMetadata.
+                                   lookup_response) as mock_lookup:
+                self._metadata_handler_with_instance_id(hnd)
+                self._metadata_handler_with_instance_id(hnd)
+        self.assertEqual(1, get_by_uuid.call_count)
+        self.assertEqual(1, mock_lookup.call_count)
+
     @mock.patch.object(base, 'get_metadata_by_instance_id')
     def test_metadata_handler_with_instance_id_no_cache(self, get_by_uuid):
         # test twice to ensure that disabling the cache works
@@ -32,6 +32,7 @@ from nova import exception
 from nova.notifications import base as notifications
 from nova import objects
 from nova.objects import base as obj_base
+from nova import rpc
 from nova import test
 from nova.tests.unit import fake_network
 from nova.tests.unit import fake_notifier
@@ -466,6 +467,44 @@ class NotificationsTestCase(test.TestCase):
                          fake_notifier.VERSIONED_NOTIFICATIONS[0]
                          ['payload']['nova_object.data']['tags'])
 
+    @mock.patch.object(notifications, 'info_from_instance')
+    def test_send_versioned_only(self, mock_info):
+        self.flags(notification_format='versioned', group='notifications')
+
+        notifications.send_update(self.context, self.instance, self.instance)
+
+        self.assertFalse(mock_info.called)
+        self.assertEqual(0, len(fake_notifier.NOTIFICATIONS))
+        self.assertEqual(1, len(fake_notifier.VERSIONED_NOTIFICATIONS))
+
+    @mock.patch.object(notifications, 'bandwidth_usage')
+    def test_send_no_notifications_enabled(self, mock_bandwidth_usage):
+        self.flags(notification_format='versioned', group='notifications')
+
+        with mock.patch('nova.rpc.NOTIFIER.is_enabled', return_value=False):
+            notifications.send_update(self.context, self.instance,
+                                      self.instance)
+
+        self.assertFalse(mock_bandwidth_usage.called)
+        self.assertEqual(0, len(fake_notifier.NOTIFICATIONS))
+        self.assertEqual(0, len(fake_notifier.VERSIONED_NOTIFICATIONS))
+
+    def test_send_versioned_update_queued(self):
+        self.stub_out('nova.rpc.NOTIFICATION_QUEUE',
+                      rpc.NotificationQueue(10, 'block'))
+
+        notifications.send_update(self.context, self.instance, self.instance)
+        self.assertEqual(1, len(fake_notifier.NOTIFICATIONS))
+        self.assertEqual(0, len(fake_notifier.VERSIONED_NOTIFICATIONS))
+        # The notification is built from the instance as it was when it was
+        # queued
+        self.instance.display_name = 'renamed'
+        fake_notifier.wait_for_versioned_notifications('instance.update')
+
+        payload = fake_notifier.VERSIONED_NOTIFICATIONS[0]['payload']
+        self.assertEqual('test_instance',
+                         payload['nova_object.data']['display_name'])
+
     def test_send_no_state_change(self):
         called = [False]
 
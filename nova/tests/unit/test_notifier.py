@@ -31,6 +31,7 @@ class TestNotifier(test.NoDBTestCase):
         conf = mock.Mock()
         conf.notifications.versioned_notifications_topics = [
             'versioned_notifications']
+        conf.notifications.notification_queue_size = 0
 
         cases = {
             'unversioned': [
@@ -210,6 +210,48 @@ class PolicyTestCase(test.NoDBTestCase):
 
         self.assertFalse(using_old_action)
 
+    def test_authorize_memoized(self):
+        target = {'project_id': 'fake'}
+        with mock.patch.object(policy._ENFORCER, 'authorize',
+                               wraps=policy._ENFORCER.authorize) as authz:
+            for i in range(3):
+                self.assertTrue(policy.authorize(
+                    self.context, "example:my_file", target))
+                self.assertRaises(exception.PolicyNotAuthorized,
+                                  policy.authorize, self.context,
+                                  "example:denied", target)
+                self.assertFalse(policy.authorize(
+                    self.context, "example:denied", target, do_raise=False))
+            policy.authorize(self.context, "example:my_file",
+                             {'project_id': 'other'}, do_raise=False)
+        self.assertEqual(3, authz.call_count)
+
+    def test_authorize_memo_not_used(self):
+        with mock.patch.object(policy._ENFORCER, 'authorize',
+                               wraps=policy._ENFORCER.authorize) as authz:
+            for i in range(2):
+                # Only plain dicts of hashable values are memoized, and not
+                # checks raising a custom exception
+                policy.authorize(self.context, "example:allowed",
+                                 {'project_id': ['fake']})
+                policy.authorize(self.context, "example:allowed",
+                                 mock.sentinel.target)
+                self.assertRaises(exception.Forbidden, policy.authorize,
+                                  self.context, "example:denied", {},
+                                  exc=exception.Forbidden)
+        self.assertEqual(6, authz.call_count)
+
+    def test_authorize_memo_invalidated(self):
+        action = "example:lowercase_admin"
+        self.assertFalse(policy.authorize(self.context, action, {},
+                                          do_raise=False))
+        self.context.roles.append('admin')
+        self.assertTrue(policy.authorize(self.context, action, {}))
+
+        policy._ENFORCER.set_rules(oslo_policy.Rules.from_dict({action: '!'}))
+        self.assertFalse(policy.authorize(self.context, action, {},
+                                          do_raise=False))
+
 
 class IsAdminCheckTestCase(test.NoDBTestCase):
     def setUp(self):
@@ -13,6 +13,7 @@
 #    under the License.
 import copy
 
+import eventlet
 import fixtures
 import mock
 import oslo_messaging as messaging
@@ -30,6 +31,7 @@ class RPCResetFixture(fixtures.Fixture):
         self.trans = copy.copy(rpc.TRANSPORT)
         self.noti_trans = copy.copy(rpc.NOTIFICATION_TRANSPORT)
         self.noti = copy.copy(rpc.NOTIFIER)
+        self.noti_queue = rpc.NOTIFICATION_QUEUE
         self.all_mods = copy.copy(rpc.ALLOWED_EXMODS)
         self.ext_mods = copy.copy(rpc.EXTRA_EXMODS)
         self.conf = copy.copy(rpc.CONF)
@@ -39,6 +41,7 @@ class RPCResetFixture(fixtures.Fixture):
         rpc.TRANSPORT = self.trans
         rpc.NOTIFICATION_TRANSPORT = self.noti_trans
         rpc.NOTIFIER = self.noti
+        rpc.NOTIFICATION_QUEUE = self.noti_queue
         rpc.ALLOWED_EXMODS = self.all_mods
         rpc.EXTRA_EXMODS = self.ext_mods
         rpc.CONF = self.conf
@@ -86,6 +89,20 @@ class TestRPC(test.NoDBTestCase):
         self._test_init(mock_notif, mock_noti_trans, mock_ser,
                         mock_exmods, 'versioned', expected)
 
+    @mock.patch.object(rpc, 'create_transport')
+    @mock.patch.object(rpc, 'get_transport_url')
+    @mock.patch.object(messaging, 'get_notification_transport')
+    @mock.patch.object(messaging, 'Notifier')
+    def test_init_notification_queue(self, mock_notif, mock_noti_trans,
+                                     mock_get_url, mock_create_transport):
+        self.flags(notification_queue_size=10,
+                   notification_queue_overflow='drop', group='notifications')
+
+        rpc.init(rpc.CONF)
+
+        self.assertIsInstance(rpc.NOTIFICATION_QUEUE, rpc.NotificationQueue)
+        self.assertEqual('drop', rpc.NOTIFICATION_QUEUE.overflow)
+
     @mock.patch.object(rpc, 'get_allowed_exmods')
     @mock.patch.object(rpc, 'RequestContextSerializer')
     @mock.patch.object(messaging, 'get_notification_transport')
@@ -329,6 +346,7 @@ class TestRPC(test.NoDBTestCase):
         conf.notifications.notification_format = notif_format
         conf.notifications.versioned_notifications_topics = (
             versioned_notification_topics)
+        conf.notifications.notification_queue_size = 0
         mock_exmods.return_value = ['foo']
         mock_noti_trans.return_value = notif_transport
         mock_ser.return_value = serializer
@@ -369,6 +387,14 @@ class TestJsonPayloadSerializer(test.NoDBTestCase):
 
         mock_prim.assert_called_once_with('entity', convert_instances=True)
 
+    def test_serialize_entity_primitive_payload(self):
+        payload = rpc.PrimitivePayload({'nova_object.name': 'Payload'})
+        with mock.patch.object(jsonutils, 'to_primitive') as mock_prim:
+            self.assertIs(payload, rpc.JsonPayloadSerializer.serialize_entity(
+                'context', payload))
+
+        self.assertFalse(mock_prim.called)
+
 
 class TestRequestContextSerializer(test.NoDBTestCase):
     def setUp(self):
@@ -512,3 +538,93 @@ class TestIsNotificationsEnabledDecorator(test.NoDBTestCase):
         self.flags(notification_format='unversioned', group='notifications')
         self.decorated()
         self.assertEqual(0, len(self.f.mock_calls))
+
+
+class TestNotificationQueue(test.NoDBTestCase):
+
+    def setUp(self):
+        super(TestNotificationQueue, self).setUp()
+        self.send = mock.Mock()
+
+    def test_emit_notification_without_queue(self):
+        self.stub_out('nova.rpc.NOTIFICATION_QUEUE', None)
+
+        rpc.emit_notification(self.send, 'ctxt', payload='payload')
+
+        self.send.assert_called_once_with('ctxt', payload='payload')
+
+    def test_emit_notification(self):
+        self.stub_out('nova.rpc.NOTIFICATION_QUEUE',
+                      rpc.NotificationQueue(10, 'block'))
+
+        rpc.emit_notification(self.send, 'ctxt', payload='payload')
+        self.assertFalse(self.send.called)
+        # Let the worker send the queued notification
+        eventlet.sleep(0)
+
+        self.send.assert_called_once_with('ctxt', payload='payload')
+        self.assertEqual(1, rpc.NOTIFICATION_QUEUE.stats['queued'])
+        self.assertEqual(1, rpc.NOTIFICATION_QUEUE.stats['sent'])
+
+    def test_put_drop(self):
+        notification_queue = rpc.NotificationQueue(2, 'drop')
+
+        for i in range(3):
+            notification_queue.put(self.send, i)
+        eventlet.sleep(0)
+
+        self.assertEqual([mock.call(0), mock.call(1)],
+                         self.send.call_args_list)
+        self.assertEqual(
+            {'queued': 2, 'sent': 2, 'dropped': 1, 'failed': 0,
+             'max_depth': 2},
+            notification_queue.stats)
+
+    def test_put_block(self):
+        notification_queue = rpc.NotificationQueue(1, 'block')
+
+        for i in range(3):
+            notification_queue.put(self.send, i)
+        eventlet.sleep(0)
+
+        self.assertEqual([mock.call(0), mock.call(1), mock.call(2)],
+                         self.send.call_args_list)
+        self.assertEqual(0, notification_queue.stats['dropped'])
+
+    def test_put_failed(self):
+        notification_queue = rpc.NotificationQueue(10, 'block')
+        self.send.side_effect = [ValueError, None]
+
+        notification_queue.put(self.send, 0)
+        notification_queue.put(self.send, 1)
+        eventlet.sleep(0)
+
+        self.assertEqual(2, self.send.call_count)
+        self.assertEqual(1, notification_queue.stats['sent'])
+        self.assertEqual(1, notification_queue.stats['failed'])
+
+    @mock.patch.object(rpc.LOG, 'debug')
+    def test_queue_emptied_logs_stats(self, mock_debug):
+        notification_queue = rpc.NotificationQueue(10, 'block')
+
+        notification_queue.put(self.send, 0)
+        notification_queue.put(self.send, 1)
+        eventlet.sleep(0)
+
+        # The totals are logged once, when the last notification is sent
+        mock_debug.assert_called_once_with(
+            'The notification queue is empty, totals since the service '
+            'started: %s',
+            {'queued': 2, 'sent': 2, 'dropped': 0, 'failed': 0,
+             'max_depth': 2})
+
+    def test_put_from_worker(self):
+        notification_queue = rpc.NotificationQueue(1, 'block')
+        nested_send = mock.Mock()
+        self.send.side_effect = lambda: notification_queue.put(nested_send)
+
+        notification_queue.put(self.send)
+        eventlet.sleep(0)
+
+        nested_send.assert_called_once_with()
+        self.assertEqual(1, notification_queue.stats['queued'])
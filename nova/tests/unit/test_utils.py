@@ -284,6 +284,42 @@ class TestCachedFile(test.NoDBTestCase):
         self.assertNotIn(filename, utils._FILE_CACHE)
 
 
+@mock.patch.dict(utils.EXECUTE_STATS, clear=True)
+class ExecuteStatsTestCase(test.NoDBTestCase):
+    @mock.patch('time.time', side_effect=[10, 12, 20, 21])
+    @mock.patch('oslo_concurrency.processutils.execute')
+    def test_execute(self, mock_execute, mock_time):
+        utils.execute('/sbin/ip', 'link', 'show')
+        utils.execute('ip', 'addr', 'show')
+        self.assertEqual({'count': 2, 'time': 3.0, 'max_time': 2.0},
+                         utils.EXECUTE_STATS['ip'])
+
+    @mock.patch('time.time', side_effect=[10, 15])
+    @mock.patch('oslo_concurrency.processutils.trycmd',
+                side_effect=processutils.ProcessExecutionError)
+    def test_trycmd_failed(self, mock_trycmd, mock_time):
+        self.assertRaises(processutils.ProcessExecutionError,
+                          utils.trycmd, 'qemu-img', 'info', 'disk')
+        self.assertEqual({'count': 1, 'time': 5.0, 'max_time': 5.0},
+                         utils.EXECUTE_STATS['qemu-img'])
+
+    @mock.patch.object(utils.LOG, 'debug')
+    def test_log_execute_stats(self, mock_debug):
+        utils._record_execute_time('lvremove', 2.0)
+        utils._record_execute_time('lvremove', 1.0)
+        utils._record_execute_time('ip', 0.5)
+
+        utils.log_execute_stats()
+
+        msg = ("Command %(name)s ran %(count)d times in %(time).3f seconds, "
+               "longest run: %(max_time).3f seconds")
+        self.assertEqual([
+            mock.call(msg, {'name': 'ip', 'count': 1, 'time': 0.5,
+                            'max_time': 0.5}),
+            mock.call(msg, {'name': 'lvremove', 'count': 2, 'time': 3.0,
+                            'max_time': 2.0})], mock_debug.call_args_list)
+
+
 class RootwrapDaemonTesetCase(test.NoDBTestCase):
     @mock.patch('oslo_rootwrap.client.Client')
     def test_get_client(self, mock_client):
@@ -539,8 +539,8 @@ class IronicDriverTestCase(test.NoDBTestCase):
                                           fields=ironic_driver._NODE_FIELDS)
 
     @mock.patch.object(cw.IronicClientWrapper, 'call')
-    @mock.patch.object(objects.Instance, 'get_by_uuid')
-    def test_list_instances(self, mock_inst_by_uuid, mock_call):
+    @mock.patch.object(objects.InstanceList, 'get_by_filters')
+    def test_list_instances(self, mock_inst_by_filters, mock_call):
         nodes = []
         instances = []
         for i in range(2):
@@ -550,24 +550,27 @@ class IronicDriverTestCase(test.NoDBTestCase):
                                                              uuid=uuid))
             nodes.append(ironic_utils.get_test_node(instance_uuid=uuid))
 
-        mock_inst_by_uuid.side_effect = instances
+        mock_inst_by_filters.return_value = objects.InstanceList(
+            objects=instances)
         mock_call.return_value = nodes
 
         response = self.driver.list_instances()
-        mock_call.assert_called_with("node.list", associated=True, limit=0)
-        expected_calls = [mock.call(mock.ANY, instances[0].uuid),
-                          mock.call(mock.ANY, instances[1].uuid)]
-        mock_inst_by_uuid.assert_has_calls(expected_calls)
+        mock_call.assert_called_with("node.list", associated=True,
+                                     fields=('instance_uuid',), limit=0)
+        mock_inst_by_filters.assert_called_once_with(
+            mock.ANY, {'uuid': [instances[0].uuid, instances[1].uuid]},
+            expected_attrs=[])
         self.assertEqual(['instance-00000000', 'instance-00000001'],
                           sorted(response))
 
     @mock.patch.object(cw.IronicClientWrapper, 'call')
-    @mock.patch.object(objects.Instance, 'get_by_uuid')
-    def test_list_instances_fail(self, mock_inst_by_uuid, mock_call):
+    @mock.patch.object(objects.InstanceList, 'get_by_filters')
+    def test_list_instances_fail(self, mock_inst_by_filters, mock_call):
         mock_call.side_effect = exception.NovaException
         response = self.driver.list_instances()
-        mock_call.assert_called_with("node.list", associated=True, limit=0)
-        self.assertFalse(mock_inst_by_uuid.called)
+        mock_call.assert_called_with("node.list", associated=True,
+                                     fields=('instance_uuid',), limit=0)
+        self.assertFalse(mock_inst_by_filters.called)
         self.assertThat(response, matchers.HasLength(0))
 
     @mock.patch.object(cw.IronicClientWrapper, 'call')
@@ -580,7 +583,8 @@ class IronicDriverTestCase(test.NoDBTestCase):
 
         mock_call.return_value = nodes
         uuids = self.driver.list_instance_uuids()
-        mock_call.assert_called_with('node.list', associated=True, limit=0)
+        mock_call.assert_called_with('node.list', associated=True,
+                                     fields=('instance_uuid',), limit=0)
         expected = [n.instance_uuid for n in nodes]
         self.assertEqual(sorted(expected), sorted(uuids))
 
@@ -597,7 +601,8 @@ class IronicDriverTestCase(test.NoDBTestCase):
         self.assertTrue(self.driver.node_is_available(node.uuid))
         mock_get.assert_called_with(node.uuid,
                                     fields=ironic_driver._NODE_FIELDS)
-        mock_list.assert_called_with(detail=True, limit=0)
+        mock_list.assert_called_with(
+            fields=ironic_driver._NODE_CACHE_FIELDS, limit=0)
 
         mock_get.side_effect = ironic_exception.NotFound
         self.assertFalse(self.driver.node_is_available(node.uuid))
@@ -612,7 +617,8 @@ class IronicDriverTestCase(test.NoDBTestCase):
         mock_get.return_value = node
         mock_list.return_value = [node]
         self.assertTrue(self.driver.node_is_available(node.uuid))
-        mock_list.assert_called_with(detail=True, limit=0)
+        mock_list.assert_called_with(
+            fields=ironic_driver._NODE_CACHE_FIELDS, limit=0)
         self.assertEqual(0, mock_get.call_count)
 
     @mock.patch.object(FAKE_CLIENT.node, 'list')
@@ -2808,6 +2814,131 @@ class HashRingTestCase(test.NoDBTestCase):
         self.mock_is_up.side_effect = [True, True, False, True]
         self._test__refresh_hash_ring(services, expected_hosts)
 
+    @mock.patch.object(objects.ServiceList, 'get_all_computes_by_hv_type')
+    def test__refresh_hash_ring_rebalance(self, mock_services):
+        self.flags(host='host1')
+        self.mock_is_up.return_value = True
+        mock_services.return_value = [_make_compute_service(host)
+                                      for host in ('host1', 'host2')]
+
+        self.assertFalse(self.driver._refresh_hash_ring(self.ctx))
+        ring = self.driver.hash_ring
+        self.assertFalse(self.driver._refresh_hash_ring(self.ctx))
+
+        mock_services.return_value = [_make_compute_service(host)
+                                      for host in ('host1', 'host3')]
+        self.assertTrue(self.driver._refresh_hash_ring(self.ctx))
+
+        # The ring is updated in place and maps the nodes as a new one would
+        self.assertIs(ring, self.driver.hash_ring)
+        self.assertEqual({'host1', 'host3'}, set(ring.nodes))
+        expected = hash_ring.HashRing({'host1', 'host3'}, partitions=32)
+        for i in range(100):
+            key = uuidutils.generate_uuid().encode('utf-8')
+            self.assertEqual(expected.get_nodes(key), ring.get_nodes(key))
+
+    @mock.patch.object(objects.InstanceList, 'get_uuids_by_host',
+                       return_value=[])
+    @mock.patch.object(ironic_driver.IronicDriver, '_get_node_list')
+    @mock.patch.object(objects.ServiceList, 'get_all_computes_by_hv_type')
+    def test_rolling_restart_moves_nodes_of_restarted_service(
+            self, mock_services, mock_nodes, mock_instances):
+        # Simulates the restart of each of the compute services managing a
+        # few thousand nodes in turn, and checks that only the nodes of the
+        # restarted service move, which is the number of compute node
+        # records moved between services, and so of database writes, for
+        # each rebalance. As the records are moved rather than deleted, no
+        # resource provider is deleted from placement.
+        hosts = ['host%d' % i for i in range(5)]
+        nodes = [ironic_utils.get_test_node(uuid=uuidutils.generate_uuid(),
+                                            instance_uuid=None)
+                 for i in range(2000)]
+        mock_nodes.return_value = nodes
+        self.mock_is_up.return_value = True
+        with mock.patch.object(servicegroup, 'API', autospec=True):
+            drivers = {host: ironic_driver.IronicDriver(None)
+                       for host in hosts}
+        for d in drivers.values():
+            d.servicegroup_api.service_is_up.return_value = True
+
+        def refresh(up):
+            mock_services.return_value = [_make_compute_service(host)
+                                          for host in up]
+            for host in up:
+                self.flags(host=host)
+                drivers[host]._refresh_cache()
+
+        def owners():
+            owners = {}
+            for host, d in drivers.items():
+                for uuid in d.node_cache:
+                    owners.setdefault(uuid, set()).add(host)
+            return owners
+
+        refresh(hosts)
+        self.assertEqual(len(nodes), len(owners()))
+        self.assertTrue(all(len(o) == 1 for o in owners().values()))
+
+        for host in hosts:
+            before = owners()
+            owned = set(drivers[host].node_cache)
+            moved = sum(d.node_cache_stats['nodes_moved']
+                        for d in drivers.values())
+
+            # The service goes down and its nodes move to the others
+            refresh([h for h in hosts if h != host])
+            after = owners()
+            changed = set(uuid for uuid in after
+                          if after[uuid] - {host} != before[uuid] - {host})
+            self.assertEqual(owned, changed)
+            self.assertEqual(
+                moved + len(owned),
+                sum(d.node_cache_stats['nodes_moved']
+                    for d in drivers.values()))
+
+            # The service comes back and takes over the same nodes
+            refresh(hosts)
+            self.assertEqual(before, owners())
+            self.assertEqual(
+                moved + 2 * len(owned),
+                sum(d.node_cache_stats['nodes_moved']
+                    for d in drivers.values()))
+
+    @mock.patch.object(objects.InstanceList, 'get_uuids_by_host',
+                       return_value=[])
+    @mock.patch.object(ironic_driver.IronicDriver, '_get_node_list')
+    @mock.patch.object(objects.ServiceList, 'get_all_computes_by_hv_type')
+    def test_refresh_cache_listing_fails_after_rebalance(
+            self, mock_services, mock_nodes, mock_instances):
+        self.flags(host='host1')
+        self.mock_is_up.return_value = True
+        nodes = [ironic_utils.get_test_node(uuid=uuidutils.generate_uuid(),
+                                            instance_uuid=None)
+                 for i in range(100)]
+        mock_nodes.return_value = nodes
+        mock_services.return_value = [_make_compute_service('host1')]
+        self.driver._refresh_cache()
+        self.assertEqual(len(nodes), len(self.driver.node_cache))
+
+        # A service joins the ring but the nodes cannot be listed
+        mock_services.return_value = [_make_compute_service(host)
+                                      for host in ('host1', 'host2')]
+        with mock.patch.object(
+                self.driver, '_get_nodes_for_cache',
+                side_effect=ironic_exception.ServiceUnavailable()):
+            self.assertRaises(ironic_exception.ServiceUnavailable,
+                              self.driver._refresh_cache)
+
+        # The nodes are looked up on the changed ring by the next refresh
+        # although the ring did not change since the previous one
+        self.driver._refresh_cache()
+        ring = hash_ring.HashRing({'host1', 'host2'}, partitions=32)
+        expected = set(node.uuid for node in nodes
+                       if 'host1' in ring.get_nodes(
+                           node.uuid.encode('utf-8')))
+        self.assertNotEqual(len(nodes), len(expected))
+        self.assertEqual(expected, set(self.driver.node_cache))
+
 
 class NodeCacheTestCase(test.NoDBTestCase):
 
@@ -2839,7 +2970,8 @@ class NodeCacheTestCase(test.NoDBTestCase):
 
         mock_hash_ring.assert_called_once_with(mock.ANY)
         mock_instances.assert_called_once_with(mock.ANY, self.host)
-        mock_nodes.assert_called_once_with(detail=True, limit=0)
+        mock_nodes.assert_called_once_with(
+            fields=ironic_driver._NODE_CACHE_FIELDS, limit=0)
         self.assertIsNotNone(self.driver.node_cache_time)
 
     def test__refresh_cache(self):
@@ -2918,6 +3050,89 @@ class NodeCacheTestCase(test.NoDBTestCase):
         expected_cache = {n.uuid: n for n in nodes[1:]}
         self.assertEqual(expected_cache, self.driver.node_cache)
 
+    def _get_test_node(self, uuid, updated_at):
+        node = ironic_utils.get_test_node(uuid=uuid, instance_uuid=None)
+        node.updated_at = updated_at
+        return node
+
+    @mock.patch.object(ironic_driver.IronicDriver, '_refresh_hash_ring')
+    @mock.patch.object(hash_ring.HashRing, 'get_nodes')
+    @mock.patch.object(cw.IronicClientWrapper, 'call')
+    @mock.patch.object(ironic_driver.IronicDriver, '_get_node_list')
+    @mock.patch.object(objects.InstanceList, 'get_uuids_by_host',
+                       return_value=[])
+    def test__refresh_cache_incremental(self, mock_instances, mock_nodes,
+                                        mock_call, mock_hosts,
+                                        mock_hash_ring):
+        self.flags(incremental_node_cache=True, group='ironic')
+        mock_hosts.return_value = {self.host}
+        nodes = [self._get_test_node(uuids.node1, '2017-01-01T00:00:00'),
+                 self._get_test_node(uuids.node2, '2017-01-01T00:00:00'),
+                 self._get_test_node(uuids.node3, '2017-01-01T00:00:00')]
+        updated_node2 = self._get_test_node(uuids.node2,
+                                            '2017-01-02T00:00:00')
+        new_node = self._get_test_node(uuids.node4, '2017-01-02T00:00:00')
+        mock_nodes.side_effect = [
+            nodes,
+            [nodes[0], updated_node2, new_node, nodes[2]]]
+        mock_call.side_effect = [updated_node2, new_node]
+
+        self.driver._refresh_cache()
+        with mock.patch.object(ironic_driver.LOG, 'debug') as mock_debug:
+            self.driver._refresh_cache()
+
+        mock_nodes.assert_has_calls([
+            mock.call(fields=ironic_driver._NODE_CACHE_FIELDS, limit=0),
+            mock.call(fields=('uuid', 'updated_at'), limit=0)])
+        mock_call.assert_has_calls([
+            mock.call('node.get', uuids.node2,
+                      fields=ironic_driver._NODE_CACHE_FIELDS),
+            mock.call('node.get', uuids.node4,
+                      fields=ironic_driver._NODE_CACHE_FIELDS)])
+        expected_cache = {n.uuid: n for n in
+                          (nodes[0], updated_node2, new_node, nodes[2])}
+        self.assertEqual(expected_cache, self.driver.node_cache)
+        self.assertEqual(2, self.driver.node_cache_stats['refreshes'])
+        self.assertEqual(1, self.driver.node_cache_stats['full_refreshes'])
+        self.assertEqual(5, self.driver.node_cache_stats['nodes_retrieved'])
+        # The statistics are logged on each refresh
+        self.assertIn(self.driver.node_cache_stats,
+                      [call[0][1].get('stats')
+                       for call in mock_debug.call_args_list
+                       if len(call[0]) > 1 and isinstance(call[0][1], dict)])
+
+    @mock.patch.object(ironic_driver, '_NODE_CACHE_MAX_UPDATED_NODES', 1)
+    @mock.patch.object(ironic_driver.IronicDriver, '_refresh_hash_ring')
+    @mock.patch.object(hash_ring.HashRing, 'get_nodes')
+    @mock.patch.object(cw.IronicClientWrapper, 'call')
+    @mock.patch.object(ironic_driver.IronicDriver, '_get_node_list')
+    @mock.patch.object(objects.InstanceList, 'get_uuids_by_host',
+                       return_value=[])
+    def test__refresh_cache_incremental_many_updated(self, mock_instances,
+                                                     mock_nodes, mock_call,
+                                                     mock_hosts,
+                                                     mock_hash_ring):
+        self.flags(incremental_node_cache=True, group='ironic')
+        mock_hosts.return_value = {self.host}
+        nodes = [self._get_test_node(uuids.node1, '2017-01-01T00:00:00'),
+                 self._get_test_node(uuids.node2, '2017-01-01T00:00:00')]
+        updated_nodes = [
+            self._get_test_node(uuids.node1, '2017-01-02T00:00:00'),
+            self._get_test_node(uuids.node2, '2017-01-02T00:00:00')]
+        mock_nodes.side_effect = [nodes, updated_nodes, updated_nodes]
+
+        self.driver._refresh_cache()
+        self.driver._refresh_cache()
+
+        mock_nodes.assert_has_calls([
+            mock.call(fields=ironic_driver._NODE_CACHE_FIELDS, limit=0),
+            mock.call(fields=('uuid', 'updated_at'), limit=0),
+            mock.call(fields=ironic_driver._NODE_CACHE_FIELDS, limit=0)])
+        self.assertFalse(mock_call.called)
+        expected_cache = {n.uuid: n for n in updated_nodes}
+        self.assertEqual(expected_cache, self.driver.node_cache)
+        self.assertEqual(2, self.driver.node_cache_stats['full_refreshes'])
+
 
 @mock.patch.object(FAKE_CLIENT, 'node')
 class IronicDriverConsoleTestCase(test.NoDBTestCase):
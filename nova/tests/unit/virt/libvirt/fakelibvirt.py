@@ -58,6 +58,9 @@ VIR_DOMAIN_BLOCK_JOB_ABORT_ASYNC = 1
 VIR_DOMAIN_BLOCK_JOB_ABORT_PIVOT = 2
 
 VIR_DOMAIN_EVENT_ID_LIFECYCLE = 0
+VIR_DOMAIN_EVENT_ID_BLOCK_JOB = 8
+VIR_DOMAIN_EVENT_ID_DEVICE_REMOVED = 15
+VIR_DOMAIN_EVENT_ID_DEVICE_ADDED = 19
 
 VIR_DOMAIN_EVENT_DEFINED = 0
 VIR_DOMAIN_EVENT_UNDEFINED = 1
@@ -149,6 +152,11 @@ VIR_DOMAIN_BLOCK_REBASE_RELATIVE = 8
 VIR_CONNECT_LIST_DOMAINS_ACTIVE = 1
 VIR_CONNECT_LIST_DOMAINS_INACTIVE = 2
 
+VIR_CONNECT_GET_ALL_DOMAINS_STATS_ACTIVE = 1
+
+VIR_DOMAIN_STATS_INTERFACE = 16
+VIR_DOMAIN_STATS_BLOCK = 32
+
 # secret type
 VIR_SECRET_USAGE_TYPE_NONE = 0
 VIR_SECRET_USAGE_TYPE_VOLUME = 1
@@ -672,6 +680,10 @@ class Domain(object):
                 if mac is not None:
                     nic_info['mac'] = mac.get('address')
 
+                target = nic.find('./target')
+                if target is not None:
+                    nic_info['target_dev'] = target.get('dev')
+
                 source = nic.find('./source')
                 if source is not None:
                     if nic_info['type'] == 'network':
@@ -1067,6 +1079,35 @@ class Connection(object):
                 error_code=VIR_ERR_NO_DOMAIN,
                 error_domain=VIR_FROM_QEMU)
 
+    def getAllDomainStats(self, stats=0, flags=0):
+        domain_stats = []
+        for dom in self._running_vms.values():
+            values = {}
+            devices = dom._def['devices']
+            if stats & VIR_DOMAIN_STATS_BLOCK:
+                disks = devices.get('disks', [])
+                values['block.count'] = len(disks)
+                for i, disk in enumerate(disks):
+                    counters = dom.blockStats(disk['target_dev'])
+                    prefix = 'block.%d.' % i
+                    values[prefix + 'name'] = disk['target_dev']
+                    values[prefix + 'rd.reqs'] = counters[0]
+                    values[prefix + 'rd.bytes'] = counters[1]
+                    values[prefix + 'wr.reqs'] = counters[2]
+                    values[prefix + 'wr.bytes'] = counters[3]
+            if stats & VIR_DOMAIN_STATS_INTERFACE:
+                nics = [nic for nic in devices.get('nics', [])
+                        if 'target_dev' in nic]
+                values['net.count'] = len(nics)
+                for i, nic in enumerate(nics):
+                    counters = dom.interfaceStats(nic['target_dev'])
+                    prefix = 'net.%d.' % i
+                    values[prefix + 'name'] = nic['target_dev']
+                    values[prefix + 'rx.bytes'] = counters[0]
+                    values[prefix + 'tx.bytes'] = counters[4]
+            domain_stats.append((dom, values))
+        return domain_stats
+
     def listAllDomains(self, flags=None):
         vms = []
         for vm in self._vms.values():
@@ -125,3 +125,15 @@ class LvmTestCase(test.NoDBTestCase):
                           lvm.remove_volumes,
                           ['vol1', 'vol2', 'vol3'])
         self.assertEqual(3, mock_lvremove.call_count)
+
+    @mock.patch('nova.privsep.fs.lvremove')
+    @mock.patch.object(lvm, 'clear_volume')
+    def test_remove_volumes_clear_failed(self, mock_clear, mock_lvremove):
+        mock_clear.side_effect = [
+            None, processutils.ProcessExecutionError('Error'), None]
+        self.assertRaises(exception.VolumesNotRemoved,
+                          lvm.remove_volumes,
+                          ['vol1', 'vol2', 'vol3'])
+        # The volume which could not be cleared is not removed
+        self.assertEqual([mock.call('vol1'), mock.call('vol3')],
+                         mock_lvremove.call_args_list)
@@ -9608,6 +9608,48 @@ class LibvirtConnTestCase(test.NoDBTestCase,
                                             mock.call(50),
                                             mock.call(200)])
 
+    @mock.patch.object(fakelibvirt.virDomain, "migrateSetMaxDowntime")
+    @mock.patch("nova.virt.libvirt.migration.downtime_steps")
+    def test_live_migration_monitor_adaptive_downtime(self,
+            mock_downtime_steps, mock_set_downtime):
+        self.flags(live_migration_completion_timeout=1000000,
+                   live_migration_progress_timeout=1000000,
+                   live_migration_downtime=500,
+                   live_migration_adaptive_tuning=True,
+                   group='libvirt')
+        mock_downtime_steps.return_value = [
+            (90, 10),
+            (180, 50),
+        ]
+
+        fake_times = [0, 1, 2, 3, 4, 5]
+
+        # 1000 bytes are transferred every second, so the last 300 bytes
+        # remaining can be transferred with a 300 ms downtime, which is
+        # set long before the first downtime step
+        domain_info_records = [
+            libvirt_guest.JobInfo(
+                type=fakelibvirt.VIR_DOMAIN_JOB_NONE),
+            libvirt_guest.JobInfo(
+                type=fakelibvirt.VIR_DOMAIN_JOB_UNBOUNDED,
+                data_processed=0, data_remaining=2000),
+            libvirt_guest.JobInfo(
+                type=fakelibvirt.VIR_DOMAIN_JOB_UNBOUNDED,
+                data_processed=1000, data_remaining=1000),
+            libvirt_guest.JobInfo(
+                type=fakelibvirt.VIR_DOMAIN_JOB_UNBOUNDED,
+                data_processed=2000, data_remaining=300),
+            "thread-finish",
+            "domain-stop",
+            libvirt_guest.JobInfo(
+                type=fakelibvirt.VIR_DOMAIN_JOB_COMPLETED),
+        ]
+
+        self._test_live_migration_monitoring(domain_info_records,
+                                             fake_times, self.EXPECT_SUCCESS)
+
+        mock_set_downtime.assert_called_once_with(300)
+
     def test_live_migration_monitor_completion(self):
         self.flags(live_migration_completion_timeout=100,
                    live_migration_progress_timeout=1000000,
@@ -15863,6 +15905,39 @@ class HostStateTestCase(test.NoDBTestCase):
         super(HostStateTestCase, self).setUp()
         self.useFixture(fakelibvirt.FakeLibvirtFixture())
 
+    @mock.patch.object(libvirt_driver.LOG, 'debug')
+    @mock.patch.object(fakelibvirt, "openAuth")
+    def test_update_status_logs_event_stats(self, mock_open, mock_debug):
+        mock_open.return_value = fakelibvirt.Connection("qemu:///system")
+        drvr = HostStateTestCase.FakeConnection()
+        drvr._host._event_stats['received'] = 3
+        drvr._host._event_stats['max_queue_depth'] = 2
+
+        drvr.get_available_resource("compute1")
+
+        stats = {'received': 3, 'coalesced': 0, 'max_queue_depth': 2,
+                 'max_latency': 0.0}
+        self.assertIn(stats, [call[0][1] for call in mock_debug.call_args_list
+                              if len(call[0]) > 1])
+        self.assertEqual(0, drvr._host._event_stats['max_queue_depth'])
+
+    @mock.patch.object(libvirt_driver.LOG, 'debug')
+    @mock.patch.object(fakelibvirt, "openAuth")
+    def test_update_status_logs_guest_config_stats(self, mock_open,
+                                                   mock_debug):
+        self.flags(guest_config_cache=True, group='libvirt')
+        mock_open.return_value = fakelibvirt.Connection("qemu:///system")
+        drvr = HostStateTestCase.FakeConnection()
+        drvr._host._guest_config_cache.stats.update(
+            hits=5, misses=2, invalidations=0)
+
+        drvr.get_available_resource("compute1")
+
+        # The connection to libvirt was opened and dropped the cached configs
+        stats = {'hits': 5, 'misses': 2, 'invalidations': 1}
+        self.assertIn(stats, [call[0][1] for call in mock_debug.call_args_list
+                              if len(call[0]) > 1])
+
     @mock.patch.object(fakelibvirt, "openAuth")
     def test_update_status(self, mock_open):
         mock_open.return_value = fakelibvirt.Connection("qemu:///system")
@@ -18194,7 +18269,41 @@ class LibvirtVolumeUsageTestCase(test.NoDBTestCase):
                      {'volume_id': 2,
                       'device_name': 'vda'}]
 
-    def test_get_all_volume_usage(self):
+    @mock.patch.object(host.Host, 'get_all_guest_stats')
+    def test_get_all_volume_usage(self, mock_stats):
+        guest = mock.Mock(uuid=self.ins_ref.uuid)
+        mock_stats.return_value = [
+            (guest, {'block.count': 3,
+                     'block.0.name': 'vda',
+                     'block.0.rd.reqs': 169, 'block.0.rd.bytes': 688640,
+                     'block.0.wr.reqs': 0, 'block.0.wr.bytes': 0,
+                     'block.1.name': 'hdc',
+                     'block.2.name': 'vde',
+                     'block.2.rd.reqs': 1, 'block.2.rd.bytes': 512,
+                     'block.2.wr.reqs': 2, 'block.2.wr.bytes': 1024}),
+            (mock.Mock(uuid=uuids.other), {'block.count': 0})]
+        vol_usage = self.drvr.get_all_volume_usage(self.c,
+              [dict(instance=self.ins_ref, instance_bdms=self.bdms)])
+
+        mock_stats.assert_called_once_with(fakelibvirt.VIR_DOMAIN_STATS_BLOCK)
+        expected_usage = [{'volume': 1,
+                           'instance': self.ins_ref,
+                           'rd_bytes': 512, 'wr_req': 2,
+                           'rd_req': 1, 'wr_bytes': 1024},
+                           {'volume': 2,
+                            'instance': self.ins_ref,
+                            'rd_bytes': 688640, 'wr_req': 0,
+                            'rd_req': 169, 'wr_bytes': 0}]
+        self.assertEqual(vol_usage, expected_usage)
+
+    @mock.patch.object(host.Host, 'get_all_guest_stats', return_value=[])
+    def test_get_all_volume_usage_not_running(self, mock_stats):
+        vol_usage = self.drvr.get_all_volume_usage(self.c,
+              [dict(instance=self.ins_ref, instance_bdms=self.bdms)])
+        self.assertEqual(vol_usage, [])
+
+    @mock.patch.object(host.Host, 'get_all_guest_stats', return_value=None)
+    def test_get_all_volume_usage_no_bulk_stats(self, mock_stats):
         def fake_block_stats(instance_name, disk):
             return (169, 688640, 0, 0, -1)
 
@@ -18212,7 +18321,8 @@ class LibvirtVolumeUsageTestCase(test.NoDBTestCase):
                             'rd_req': 169, 'wr_bytes': 0}]
         self.assertEqual(vol_usage, expected_usage)
 
-    def test_get_all_volume_usage_device_not_found(self):
+    @mock.patch.object(host.Host, 'get_all_guest_stats', return_value=None)
+    def test_get_all_volume_usage_device_not_found(self, mock_stats):
         def fake_get_domain(self, instance):
             raise exception.InstanceNotFound(instance_id="fakedom")
 
@@ -18222,6 +18332,55 @@ class LibvirtVolumeUsageTestCase(test.NoDBTestCase):
         self.assertEqual(vol_usage, [])
 
 
+class LibvirtBandwidthUsageTestCase(test.NoDBTestCase):
+    """Test for LibvirtDriver.get_all_bw_counters."""
+
+    def setUp(self):
+        super(LibvirtBandwidthUsageTestCase, self).setUp()
+        self.useFixture(fakelibvirt.FakeLibvirtFixture())
+        self.drvr = libvirt_driver.LibvirtDriver(fake.FakeVirtAPI(), False)
+        self.instances = [objects.Instance(uuid=uuids.instance1),
+                          objects.Instance(uuid=uuids.instance2)]
+
+    @mock.patch.object(host.Host, 'get_all_guest_stats')
+    def test_get_all_bw_counters(self, mock_stats):
+        guest = mock.Mock(uuid=uuids.instance1)
+        interfaces = []
+        for mac, dev in (('fa:16:3e:00:00:01', 'tap1'),
+                         ('fa:16:3e:00:00:02', 'tap2'),
+                         ('fa:16:3e:00:00:03', None)):
+            interface = vconfig.LibvirtConfigGuestInterface()
+            interface.mac_addr = mac
+            interface.target_dev = dev
+            interfaces.append(interface)
+        guest.get_all_devices.return_value = interfaces
+        mock_stats.return_value = [
+            (guest, {'net.count': 2,
+                     'net.0.name': 'tap1',
+                     'net.0.rx.bytes': 100, 'net.0.tx.bytes': 200,
+                     'net.1.name': 'tap2',
+                     'net.1.rx.bytes': 300, 'net.1.tx.bytes': 400}),
+            (mock.Mock(uuid=uuids.other), {'net.count': 0})]
+
+        bw_counters = self.drvr.get_all_bw_counters(self.instances)
+
+        mock_stats.assert_called_once_with(
+            fakelibvirt.VIR_DOMAIN_STATS_INTERFACE)
+        guest.get_all_devices.assert_called_once_with(
+            vconfig.LibvirtConfigGuestInterface)
+        self.assertEqual([{'uuid': uuids.instance1,
+                           'mac_address': 'fa:16:3e:00:00:01',
+                           'bw_in': 100, 'bw_out': 200},
+                          {'uuid': uuids.instance1,
+                           'mac_address': 'fa:16:3e:00:00:02',
+                           'bw_in': 300, 'bw_out': 400}], bw_counters)
+
+    @mock.patch.object(host.Host, 'get_all_guest_stats', return_value=None)
+    def test_get_all_bw_counters_not_supported(self, mock_stats):
+        self.assertRaises(NotImplementedError,
+                          self.drvr.get_all_bw_counters, self.instances)
+
+
 class LibvirtNonblockingTestCase(test.NoDBTestCase):
     """Test libvirtd calls are nonblocking."""
 
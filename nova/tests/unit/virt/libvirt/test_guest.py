@@ -25,6 +25,7 @@ from nova import context
 from nova import exception
 from nova import test
 from nova.tests.unit.virt.libvirt import fakelibvirt
+from nova.tests import uuidsentinel as uuids
 from nova.virt.libvirt import config as vconfig
 from nova.virt.libvirt import guest as libvirt_guest
 from nova.virt.libvirt import host
@@ -433,6 +434,47 @@ class GuestTestCase(test.NoDBTestCase):
         self.assertEqual('kvm', result.virt_type)
         self.assertEqual('fake', result.name)
 
+    def test_get_config_cached(self):
+        self.domain.UUIDString.return_value = uuids.instance
+        self.domain.XMLDesc.return_value = "<domain type='kvm'/>"
+        cache = libvirt_guest.ConfigCache()
+        guest = libvirt_guest.Guest(self.domain, config_cache=cache)
+
+        result = guest.get_config()
+        self.assertIs(result, guest.get_config())
+        self.domain.XMLDesc.assert_called_once_with(0)
+
+        conf = mock.Mock(spec=vconfig.LibvirtConfigGuestDevice)
+        conf.to_xml.return_value = "</xml>"
+        guest.attach_device(conf)
+        self.assertIsNot(result, guest.get_config())
+        guest.detach_device(conf)
+        guest.get_config()
+        self.assertEqual(3, self.domain.XMLDesc.call_count)
+        self.assertEqual({'hits': 1, 'misses': 3, 'invalidations': 2},
+                         cache.stats)
+
+    def test_config_cache_invalidated_while_loading(self):
+        cache = libvirt_guest.ConfigCache()
+
+        def load():
+            cache.invalidate(uuids.instance)
+            return mock.sentinel.config
+
+        self.assertEqual(mock.sentinel.config, cache.get(uuids.instance, load))
+        self.assertEqual(mock.sentinel.other,
+                         cache.get(uuids.instance,
+                                   lambda: mock.sentinel.other))
+
+    def test_config_cache_invalidate_all(self):
+        cache = libvirt_guest.ConfigCache()
+        cache.get(uuids.instance1, lambda: mock.sentinel.config1)
+        cache.get(uuids.instance2, lambda: mock.sentinel.config2)
+        cache.invalidate()
+        self.assertEqual(mock.sentinel.other,
+                         cache.get(uuids.instance2,
+                                   lambda: mock.sentinel.other))
+
     def test_get_devices(self):
         xml = """
 <domain type='qemu'>
@@ -627,6 +669,19 @@ class GuestTestCase(test.NoDBTestCase):
                 | fakelibvirt.VIR_DOMAIN_SNAPSHOT_CREATE_QUIESCE))
         conf.to_xml.assert_called_once_with()
 
+    def test_snapshot_invalidates_config_cache(self):
+        self.domain.UUIDString.return_value = uuids.instance
+        self.domain.XMLDesc.return_value = "<domain type='kvm'/>"
+        cache = libvirt_guest.ConfigCache()
+        guest = libvirt_guest.Guest(self.domain, config_cache=cache)
+        result = guest.get_config()
+
+        guest.snapshot(self._conf_snapshot(), disk_only=True, reuse_ext=True)
+
+        self.assertIsNot(result, guest.get_config())
+        self.assertEqual(2, self.domain.XMLDesc.call_count)
+        self.assertEqual(1, cache.stats['invalidations'])
+
     def test_pause(self):
         self.guest.pause()
         self.domain.suspend.assert_called_once_with()
@@ -132,7 +132,8 @@ class HostTestCase(test.NoDBTestCase):
         hostimpl._queue_event(event2)
         hostimpl._dispatch_events()
 
-        want_events = [event1, event2]
+        # only the latest event of a domain is dispatched
+        want_events = [event2]
         self.assertEqual(want_events, got_events)
 
         event3 = event.LifecycleEvent(
@@ -146,13 +147,52 @@ class HostTestCase(test.NoDBTestCase):
         hostimpl._queue_event(event4)
         hostimpl._dispatch_events()
 
-        want_events = [event1, event2, event3]
+        want_events = [event2]
         self.assertEqual(want_events, got_events)
 
         # STOPPED is delayed so it's handled separately
         mock_spawn_after.assert_called_once_with(
             hostimpl._lifecycle_delay, hostimpl._event_emit, event4)
 
+        stats = hostimpl.get_event_stats()
+        self.assertEqual(4, stats['received'])
+        self.assertEqual(2, stats['coalesced'])
+        self.assertEqual(2, stats['max_queue_depth'])
+        # The maxima are reset once reported
+        stats = hostimpl.get_event_stats()
+        self.assertEqual(4, stats['received'])
+        self.assertEqual(0, stats['max_queue_depth'])
+        self.assertEqual(0.0, stats['max_latency'])
+
+    @mock.patch.object(greenthread, 'spawn_after')
+    def test_event_dispatch_batch(self, mock_spawn_after):
+        got_events = []
+        hostimpl = host.Host("qemu:///system",
+                             lifecycle_event_handler=got_events.append)
+        hostimpl._init_events_pipe()
+        gt_mock = mock.Mock()
+        hostimpl._events_delayed[uuids.instance2] = gt_mock
+
+        event1 = event.LifecycleEvent(uuids.instance1,
+                                      event.EVENT_LIFECYCLE_STARTED)
+        event2 = event.LifecycleEvent(uuids.instance2,
+                                      event.EVENT_LIFECYCLE_STARTED)
+        event3 = event.LifecycleEvent(uuids.instance3,
+                                      event.EVENT_LIFECYCLE_STOPPED)
+        event4 = event.LifecycleEvent(uuids.instance1,
+                                      event.EVENT_LIFECYCLE_PAUSED)
+        for ev in (event1, event2, event3, event4):
+            hostimpl._queue_event(ev)
+        hostimpl._dispatch_events()
+
+        # the events which are not delayed are emitted as a batch
+        self.assertEqual(1, len(got_events))
+        self.assertIsInstance(got_events[0], event.LifecycleEventBatch)
+        self.assertEqual([event2, event4], got_events[0].get_events())
+        gt_mock.cancel.assert_called_once_with()
+        mock_spawn_after.assert_called_once_with(
+            hostimpl._lifecycle_delay, hostimpl._event_emit, event3)
+
     def test_event_lifecycle(self):
         got_events = []
 
@@ -441,6 +481,119 @@ class HostTestCase(test.NoDBTestCase):
 
         fake_lookup.assert_called_once_with(uuid)
 
+    def test_get_all_guest_stats(self):
+        conn = self.host.get_connection()
+        dom = fakelibvirt.Domain(conn, """
+            <domain type='kvm'>
+              <uuid>cef19ce0-0ca2-11df-855d-b19fbce37686</uuid>
+              <devices>
+                <disk type='file' device='disk'>
+                  <source file='filename'/>
+                  <target dev='vda' bus='virtio'/>
+                </disk>
+                <interface type='bridge'>
+                  <mac address='fa:16:3e:00:00:01'/>
+                  <target dev='tap1'/>
+                </interface>
+              </devices>
+            </domain>""", False)
+        dom.createWithFlags(0)
+
+        all_stats = self.host.get_all_guest_stats(
+            fakelibvirt.VIR_DOMAIN_STATS_BLOCK |
+            fakelibvirt.VIR_DOMAIN_STATS_INTERFACE)
+
+        self.assertEqual(1, len(all_stats))
+        guest, stats = all_stats[0]
+        self.assertIsInstance(guest, libvirt_guest.Guest)
+        self.assertEqual("cef19ce0-0ca2-11df-855d-b19fbce37686", guest.uuid)
+        self.assertEqual(1, stats['block.count'])
+        self.assertEqual('vda', stats['block.0.name'])
+        self.assertEqual(10000242400, stats['block.0.rd.bytes'])
+        self.assertEqual(1, stats['net.count'])
+        self.assertEqual('tap1', stats['net.0.name'])
+        self.assertEqual(213412343233, stats['net.0.tx.bytes'])
+
+    @mock.patch.object(fakelibvirt.virConnect, "getAllDomainStats")
+    def test_get_all_guest_stats_not_supported(self, mock_stats):
+        mock_stats.side_effect = fakelibvirt.make_libvirtError(
+            fakelibvirt.libvirtError, 'this function is not supported',
+            error_code=fakelibvirt.VIR_ERR_NO_SUPPORT)
+        self.assertIsNone(self.host.get_all_guest_stats(
+            fakelibvirt.VIR_DOMAIN_STATS_BLOCK))
+        mock_stats.assert_called_once_with(
+            fakelibvirt.VIR_DOMAIN_STATS_BLOCK,
+            fakelibvirt.VIR_CONNECT_GET_ALL_DOMAINS_STATS_ACTIVE)
+
+    @mock.patch.object(fakelibvirt.virConnect, "getAllDomainStats")
+    def test_get_all_guest_stats_error(self, mock_stats):
+        mock_stats.side_effect = fakelibvirt.make_libvirtError(
+            fakelibvirt.libvirtError, 'internal error',
+            error_code=fakelibvirt.VIR_ERR_INTERNAL_ERROR)
+        self.assertRaises(fakelibvirt.libvirtError,
+                          self.host.get_all_guest_stats,
+                          fakelibvirt.VIR_DOMAIN_STATS_BLOCK)
+
+    def test_get_guest_config_stats_disabled(self):
+        dom = mock.Mock(spec=fakelibvirt.virDomain)
+        guest = self.host.get_guest_for_domain(dom)
+        self.assertIsNone(guest._config_cache)
+        self.assertIsNone(self.host.get_guest_config_stats())
+
+    def _guest_config_cache_host(self):
+        self.flags(guest_config_cache=True, group='libvirt')
+        hostimpl = host.Host("qemu:///system")
+        dom = mock.Mock(spec=fakelibvirt.virDomain)
+        dom.UUIDString.return_value = uuids.instance
+        dom.XMLDesc.return_value = "<domain type='kvm'><name>a</name></domain>"
+        return hostimpl, dom
+
+    def test_guest_config_cache(self):
+        hostimpl, dom = self._guest_config_cache_host()
+
+        config = hostimpl.get_guest_for_domain(dom).get_config()
+        self.assertIs(config, hostimpl.get_guest_for_domain(dom).get_config())
+        dom.XMLDesc.assert_called_once_with(0)
+        self.assertEqual({'hits': 1, 'misses': 1, 'invalidations': 0},
+                         hostimpl.get_guest_config_stats())
+
+    def test_guest_config_cache_lifecycle_event(self):
+        hostimpl, dom = self._guest_config_cache_host()
+        hostimpl._queue_event = mock.Mock()
+        guest = hostimpl.get_guest_for_domain(dom)
+        guest.get_config()
+
+        hostimpl._event_lifecycle_callback(
+            None, dom, fakelibvirt.VIR_DOMAIN_EVENT_STOPPED, 0, hostimpl)
+        guest.get_config()
+        self.assertEqual(2, dom.XMLDesc.call_count)
+
+    def test_guest_config_cache_device_event(self):
+        hostimpl, dom = self._guest_config_cache_host()
+        conn = hostimpl.get_connection()
+        for event_id in (fakelibvirt.VIR_DOMAIN_EVENT_ID_DEVICE_ADDED,
+                         fakelibvirt.VIR_DOMAIN_EVENT_ID_DEVICE_REMOVED,
+                         fakelibvirt.VIR_DOMAIN_EVENT_ID_BLOCK_JOB):
+            self.assertEqual([hostimpl._event_config_callback, hostimpl],
+                             conn._event_callbacks[event_id])
+        guest = hostimpl.get_guest_for_domain(dom)
+        guest.get_config()
+
+        hostimpl._event_config_callback(conn, dom, 'virtio-disk1', hostimpl)
+        guest.get_config()
+        self.assertEqual(2, dom.XMLDesc.call_count)
+
+    @mock.patch.object(fakelibvirt.virConnect, "defineXML")
+    def test_guest_config_cache_write_instance_config(self, mock_defineXML):
+        hostimpl, dom = self._guest_config_cache_host()
+        hostimpl.get_guest_for_domain(dom).get_config()
+        mock_defineXML.return_value = dom
+
+        guest = hostimpl.write_instance_config("<domain/>")
+        guest.get_config()
+        self.assertEqual(2, dom.XMLDesc.call_count)
+        self.assertEqual(2, hostimpl.get_guest_config_stats()['misses'])
+
     @mock.patch.object(fakelibvirt.Connection, "listAllDomains")
     def test_list_instance_domains(self, mock_list_all):
         vm0 = FakeVirtDomain(id=0, name="Domain-0")  # Xen dom-0
@@ -824,3 +824,121 @@ class MigrationMonitorTestCase(test.NoDBTestCase):
             (810, 364),
             (900, 400),
         ], list(steps))
+
+
+class AdaptiveControllerTestCase(test.NoDBTestCase):
+    def setUp(self):
+        super(AdaptiveControllerTestCase, self).setUp()
+
+        self.useFixture(fakelibvirt.FakeLibvirtFixture())
+        self.guest = mock.Mock(spec=libvirt_guest.Guest)
+        self.controller = migration.AdaptiveController(500)
+
+    def _replay(self, trace):
+        """Feed (time, processed, remaining, iteration) samples"""
+        for now, processed, remaining, iteration in trace:
+            self.controller.update(now, libvirt_guest.JobInfo(
+                type=fakelibvirt.VIR_DOMAIN_JOB_UNBOUNDED,
+                data_processed=processed,
+                data_remaining=remaining,
+                memory_iteration=iteration))
+
+    def test_rates(self):
+        self._replay([(0, 0, 1000, 1),
+                      (1, 100, 920, 1),
+                      (2, 300, 800, 1)])
+
+        # 100 then 200 bytes/sec transferred, 20 then 80 bytes/sec dirtied
+        self.assertEqual(150, self.controller.transfer_rate)
+        self.assertEqual(50, self.controller.dirty_rate)
+        self.assertTrue(self.controller.is_converging())
+        self.assertEqual(5334, self.controller.expected_downtime())
+
+    def test_expected_downtime_unknown(self):
+        self._replay([(0, 0, 1000, 1)])
+
+        self.assertIsNone(self.controller.expected_downtime())
+        self.assertTrue(self.controller.is_converging())
+
+    def test_update_downtime_steps(self):
+        self._replay([(0, 0, 10000, 1),
+                      (1, 100, 9900, 1)])
+
+        newdt = self.controller.update_downtime(
+            self.guest, None, None, [(0, 50), (10, 100)], 5)
+
+        self.assertEqual(50, newdt)
+        self.guest.migrate_configure_max_downtime.assert_called_once_with(50)
+
+    def test_update_downtime_expected(self):
+        self._replay([(0, 0, 1000, 1),
+                      (1, 1000, 300, 2)])
+
+        # 300 bytes remaining at 1000 bytes/sec take 300 ms, which is
+        # within the max downtime so there's no need to wait for the steps
+        newdt = self.controller.update_downtime(
+            self.guest, None, 50, [(0, 50), (10, 100)], 5)
+
+        self.assertEqual(300, newdt)
+        self.guest.migrate_configure_max_downtime.assert_called_once_with(
+            300)
+
+    def test_update_downtime_not_lowered(self):
+        self._replay([(0, 0, 1000, 1),
+                      (1, 1000, 100, 2)])
+
+        newdt = self.controller.update_downtime(
+            self.guest, None, 400, [(0, 50), (10, 100)], 5)
+
+        self.assertEqual(400, newdt)
+        self.assertFalse(self.guest.migrate_configure_max_downtime.called)
+
+    def test_update_downtime_error(self):
+        self.guest.migrate_configure_max_downtime.side_effect = (
+            fakelibvirt.make_libvirtError(
+                fakelibvirt.libvirtError, "error",
+                error_code=fakelibvirt.VIR_ERR_OPERATION_FAILED))
+
+        newdt = self.controller.update_downtime(
+            self.guest, None, None, [(0, 50)], 5)
+
+        self.assertEqual(50, newdt)
+
+    def test_should_switch_to_postcopy(self):
+        # The guest dirties its memory as fast as it is transferred
+        self._replay([(0, 0, 10000, 1),
+                      (1, 1000, 10000, 2),
+                      (2, 2000, 10000, 2)])
+        self.assertFalse(self.controller.should_switch_to_postcopy('running'))
+
+        self._replay([(3, 3000, 10000, 2)])
+        self.assertTrue(self.controller.should_switch_to_postcopy('running'))
+        self.assertFalse(self.controller.should_switch_to_postcopy(
+            'running (post-copy)'))
+
+    def test_should_switch_to_postcopy_first_iteration(self):
+        self._replay([(0, 0, 10000, 1),
+                      (1, 1000, 10000, 1),
+                      (2, 2000, 10000, 1),
+                      (3, 3000, 10000, 1)])
+
+        self.assertFalse(self.controller.should_switch_to_postcopy('running'))
+
+    def test_should_switch_to_postcopy_converging(self):
+        self._replay([(0, 0, 10000, 1),
+                      (1, 1000, 10000, 2),
+                      (2, 2000, 10000, 2),
+                      (3, 3000, 9000, 2),
+                      (4, 4000, 8000, 2)])
+
+        self.assertFalse(self.controller.should_switch_to_postcopy('running'))
+
+    def test_should_switch_to_postcopy_within_downtime(self):
+        # The migration doesn't converge, but the remaining data can be
+        # transferred within the max downtime
+        self._replay([(0, 0, 400, 1),
+                      (1, 1000, 400, 2),
+                      (2, 2000, 400, 2),
+                      (3, 3000, 400, 2)])
+
+        self.assertFalse(self.controller.should_switch_to_postcopy('running'))
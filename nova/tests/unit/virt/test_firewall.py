@@ -10,7 +10,7 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
-
+import eventlet
 import mock
 
 from nova import exception
@@ -557,6 +557,74 @@ class TestIptablesFirewallDriver(test.NoDBTestCase):
         self.driver.do_refresh_instance_rules.assert_called_with('myinstance')
         self.driver.iptables.apply.assert_called()
 
+    def _refresh_concurrently(self, *requests):
+        threads = [eventlet.spawn(refresh, *args)
+                   for refresh, args in requests]
+        results = []
+        for thread in threads:
+            try:
+                results.append(thread.wait())
+            except Exception as e:
+                results.append(e)
+        return results
+
+    @mock.patch.object(_IPT_DRIVER_CLS, 'do_refresh_instance_rules')
+    def test_refresh_instance_security_rules_coalesced(self, refresh_mock):
+        self.flags(firewall_refresh_delay=0.01)
+        self.driver.iptables.apply = mock.Mock()
+        instance1 = objects.Instance(id=1)
+        instance2 = objects.Instance(id=2)
+
+        refresh = self.driver.refresh_instance_security_rules
+        results = self._refresh_concurrently((refresh, (instance1,)),
+                                             (refresh, (instance2,)),
+                                             (refresh, (instance1,)))
+
+        self.assertEqual([None, None, None], results)
+        self.assertEqual(2, refresh_mock.call_count)
+        refresh_mock.assert_has_calls([mock.call(instance1),
+                                       mock.call(instance2)], any_order=True)
+        self.driver.iptables.apply.assert_called_once_with()
+        self.assertEqual(3, self.driver.refresh_queue.requested)
+        self.assertEqual(2, self.driver.refresh_queue.coalesced)
+
+    @mock.patch.object(_IPT_DRIVER_CLS, 'do_refresh_instance_rules')
+    @mock.patch.object(_IPT_DRIVER_CLS, 'do_refresh_security_group_rules')
+    def test_refresh_security_group_rules_coalesced(self, refresh_all_mock,
+                                                    refresh_mock):
+        self.flags(firewall_refresh_delay=0.01)
+        self.driver.iptables.apply = mock.Mock()
+        instance = objects.Instance(id=1)
+        self.driver.instance_info = {instance.id: (instance, [])}
+
+        results = self._refresh_concurrently(
+            (self.driver.refresh_security_group_rules, ('mysecgroup',)),
+            (self.driver.refresh_instance_security_rules, (instance,)))
+
+        self.assertEqual([None, None], results)
+        refresh_all_mock.assert_called_once_with(None)
+        # the instance was refreshed with all of the others
+        refresh_mock.assert_not_called()
+        self.driver.iptables.apply.assert_called_once_with()
+
+    @mock.patch.object(_IPT_DRIVER_CLS, 'do_refresh_instance_rules')
+    def test_refresh_instance_security_rules_coalesced_fails(self,
+                                                             refresh_mock):
+        self.flags(firewall_refresh_delay=0.01)
+        self.driver.iptables.apply = mock.Mock()
+        instance1 = objects.Instance(id=1)
+        instance2 = objects.Instance(id=2)
+        refresh_mock.side_effect = [test.TestingException, None]
+
+        refresh = self.driver.refresh_instance_security_rules
+        results = self._refresh_concurrently((refresh, (instance1,)),
+                                             (refresh, (instance2,)))
+
+        # only the refresh which failed raises
+        self.assertIsInstance(results[0], test.TestingException)
+        self.assertIsNone(results[1])
+        self.driver.iptables.apply.assert_called_once_with()
+
     def test_do_refresh_security_group_rules(self):
         self.driver.instance_info = \
             {'1': ['myinstance1', 'netinfo1'],
@@ -132,6 +132,47 @@ class VMwareVMUtilTestCase(test.NoDBTestCase):
     def test_get_stats_from_cluster_hosts_connected_and_maintenance(self):
         self._test_get_stats_from_cluster(maintenance_mode=True)
 
+    def test_get_vm_states(self):
+        session = driver.VMwareAPISession()
+        res_pool_ref = list(fake._db_content['ResourcePool'].keys())[0]
+        uuids = [uuidutils.generate_uuid() for i in range(3)]
+        vm_refs = [fake.create_vm(extraConfig=[
+                       fake.OptionValue(key='nvp.vm-uuid', value=uuid)])
+                   for uuid in uuids]
+        # VMs which are not instances are ignored
+        fake.create_vm()
+        fake._get_object(vm_refs[1]).set('runtime.powerState', 'poweredOn')
+
+        with mock.patch.object(session, '_call_method',
+                               wraps=session._call_method) as call_method:
+            vm_states = vm_util.get_vm_states(session, res_pool_ref)
+
+        call_method.assert_any_call(vm_util.vim_util, 'get_inner_objects',
+                                    res_pool_ref, 'vm', 'VirtualMachine',
+                                    mock.ANY)
+        self.assertEqual(1, len([c for c in call_method.call_args_list
+                                 if c[0][1] == 'get_inner_objects']))
+        self.assertEqual(set(uuids), set(vm_states))
+        for uuid, vm_ref in zip(uuids, vm_refs):
+            self.assertEqual(vm_ref, vm_states[uuid].vm_ref)
+            self.assertEqual('connected', vm_states[uuid].connection_state)
+        self.assertEqual('poweredOff', vm_states[uuids[0]].power_state)
+        self.assertEqual('poweredOn', vm_states[uuids[1]].power_state)
+
+    def test_get_vm_states_seeds_vm_ref_cache(self):
+        session = driver.VMwareAPISession()
+        res_pool_ref = list(fake._db_content['ResourcePool'].keys())[0]
+        uuid = uuidutils.generate_uuid()
+        vm_ref = fake.create_vm(extraConfig=[
+            fake.OptionValue(key='nvp.vm-uuid', value=uuid)])
+        vm_util.get_vm_states(session, res_pool_ref)
+        self.assertEqual(vm_ref, vm_util.vm_ref_cache_get(uuid))
+
+        instance = fake_instance.fake_instance_obj(None, uuid=uuid)
+        with mock.patch.object(session, '_call_method') as call_method:
+            self.assertEqual(vm_ref, vm_util.get_vm_ref(session, instance))
+        call_method.assert_not_called()
+
     def test_get_host_ref_no_hosts_in_cluster(self):
         self.assertRaises(exception.NoValidHost,
                           vm_util.get_host_ref,
@@ -343,6 +343,99 @@ class VMwareVMOpsTestCase(test.NoDBTestCase):
             mock_get_vm_ref.assert_called_once_with(self._session,
                 self._instance)
 
+    def _create_instance_vm(self, uuid, powerstate='poweredOff'):
+        vm_ref = vmwareapi_fake.create_vm(
+            extraConfig=[vmwareapi_fake.OptionValue(key='nvp.vm-uuid',
+                                                    value=uuid)],
+            res_pool_ref=self._vmops._root_resource_pool)
+        vmwareapi_fake._get_object(vm_ref).set('runtime.powerState',
+                                               powerstate)
+        return vm_ref
+
+    def test_get_info_vm_state_cache(self):
+        self.flags(vm_state_cache_ttl=60, group='vmware')
+        self._create_instance_vm(self._uuid, powerstate='poweredOn')
+        self._create_instance_vm(uuidsentinel.other)
+        other = fake_instance.fake_instance_obj(self._context,
+                                                uuid=uuidsentinel.other)
+
+        with test.nested(
+            mock.patch.object(self._session, '_call_method',
+                              wraps=self._session._call_method),
+            mock.patch.object(vm_util, 'get_vm_ref')
+        ) as (mock_call_method, mock_get_vm_ref):
+            self.assertEqual(hardware.InstanceInfo(state=power_state.RUNNING),
+                             self._vmops.get_info(self._instance))
+            self.assertEqual(hardware.InstanceInfo(state=power_state.SHUTDOWN),
+                             self._vmops.get_info(other))
+
+        # The state of both VMs was retrieved by a single query
+        self.assertEqual(1, len([c for c in mock_call_method.call_args_list
+                                 if c[0][1] == 'get_inner_objects']))
+        self.assertFalse(mock_get_vm_ref.called)
+
+    def test_get_info_vm_state_cache_expired(self):
+        self.flags(vm_state_cache_ttl=60, group='vmware')
+        vm_ref = self._create_instance_vm(self._uuid)
+
+        with mock.patch.object(time, 'time', return_value=1000):
+            self.assertEqual(hardware.InstanceInfo(state=power_state.SHUTDOWN),
+                             self._vmops.get_info(self._instance))
+        vmwareapi_fake._get_object(vm_ref).set('runtime.powerState',
+                                               'poweredOn')
+        with mock.patch.object(time, 'time', return_value=1030):
+            self.assertEqual(hardware.InstanceInfo(state=power_state.SHUTDOWN),
+                             self._vmops.get_info(self._instance))
+        with mock.patch.object(time, 'time', return_value=1060):
+            self.assertEqual(hardware.InstanceInfo(state=power_state.RUNNING),
+                             self._vmops.get_info(self._instance))
+
+    @mock.patch.object(vm_util, 'power_on_instance')
+    def test_get_info_vm_state_cache_invalidated(self, mock_power_on):
+        self.flags(vm_state_cache_ttl=60, group='vmware')
+        vm_ref = self._create_instance_vm(self._uuid)
+
+        def fake_power_on(session, instance):
+            vmwareapi_fake._get_object(vm_ref).set('runtime.powerState',
+                                                   'poweredOn')
+
+        mock_power_on.side_effect = fake_power_on
+        self.assertEqual(hardware.InstanceInfo(state=power_state.SHUTDOWN),
+                         self._vmops.get_info(self._instance))
+        self._vmops.power_on(self._instance)
+
+        # The state of the instance is retrieved again after the operation
+        self.assertNotIn(self._uuid, self._vmops._vm_states)
+        self.assertEqual(hardware.InstanceInfo(state=power_state.RUNNING),
+                         self._vmops.get_info(self._instance))
+
+    def test_get_vm_states_changed_during_retrieval(self):
+        self.flags(vm_state_cache_ttl=60, group='vmware')
+        self._create_instance_vm(self._uuid)
+        self._create_instance_vm(uuidsentinel.other)
+
+        def fake_get_vm_states(session, res_pool_ref):
+            # The instance is powered on while the states are retrieved
+            self._vmops._invalidate_vm_state(self._uuid)
+            return get_vm_states(session, res_pool_ref)
+
+        get_vm_states = vm_util.get_vm_states
+        with mock.patch.object(vm_util, 'get_vm_states',
+                               side_effect=fake_get_vm_states):
+            vm_states = self._vmops._get_vm_states()
+
+        self.assertEqual({uuidsentinel.other}, set(vm_states))
+
+    def test_list_instances_vm_state_cache(self):
+        self.flags(vm_state_cache_ttl=60, group='vmware')
+        self._create_instance_vm(self._uuid)
+        vm_ref = self._create_instance_vm(uuidsentinel.orphaned)
+        vmwareapi_fake._get_object(vm_ref).set('runtime.connectionState',
+                                               'orphaned')
+
+        self.assertEqual([self._uuid], self._vmops.list_instances())
+        self.assertIn(uuidsentinel.orphaned, self._vmops._vm_states)
+
     def _test_get_datacenter_ref_and_name(self, ds_ref_exists=False):
         instance_ds_ref = mock.Mock()
         instance_ds_ref.value = "ds-1"
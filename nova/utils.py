@@ -17,6 +17,7 @@
 
 """Utilities and helper functions."""
 
+import collections
 import contextlib
 import copy
 import datetime
@@ -94,6 +95,26 @@ _FILE_CACHE = {}
 
 _SERVICE_TYPES = service_types.ServiceTypes()
 
+# The number of times, total and longest time in seconds taken by the
+# commands run by execute() and trycmd(), keyed by the name of the command.
+EXECUTE_STATS = collections.defaultdict(
+    lambda: {'count': 0, 'time': 0.0, 'max_time': 0.0})
+
+
+def _record_execute_time(name, duration):
+    stats = EXECUTE_STATS[name]
+    stats['count'] += 1
+    stats['time'] += duration
+    stats['max_time'] = max(stats['max_time'], duration)
+
+
+def log_execute_stats():
+    """Logs the time taken by the commands run so far, by command."""
+    for name, stats in sorted(EXECUTE_STATS.items()):
+        LOG.debug("Command %(name)s ran %(count)d times in %(time).3f "
+                  "seconds, longest run: %(max_time).3f seconds",
+                  dict(stats, name=name))
+
 
 def get_root_helper():
     if CONF.workarounds.disable_rootwrap:
@@ -220,15 +241,23 @@ class RootwrapDaemonHelper(RootwrapProcessHelper):
                         time.sleep(random.randint(20, 200) / 100.0)
 
 
+def _command_name(cmd):
+    return os.path.basename(str(cmd[0])) if cmd else ''
+
+
 def execute(*cmd, **kwargs):
     """Convenience wrapper around oslo's execute() method."""
-    if 'run_as_root' in kwargs and kwargs.get('run_as_root'):
-        if CONF.use_rootwrap_daemon:
-            return RootwrapDaemonHelper(CONF.rootwrap_config).execute(
-                *cmd, **kwargs)
-        else:
-            return RootwrapProcessHelper().execute(*cmd, **kwargs)
-    return processutils.execute(*cmd, **kwargs)
+    start = time.time()
+    try:
+        if 'run_as_root' in kwargs and kwargs.get('run_as_root'):
+            if CONF.use_rootwrap_daemon:
+                return RootwrapDaemonHelper(CONF.rootwrap_config).execute(
+                    *cmd, **kwargs)
+            else:
+                return RootwrapProcessHelper().execute(*cmd, **kwargs)
+        return processutils.execute(*cmd, **kwargs)
+    finally:
+        _record_execute_time(_command_name(cmd), time.time() - start)
 
 
 def ssh_execute(dest, *cmd, **kwargs):
@@ -241,13 +270,17 @@ def ssh_execute(dest, *cmd, **kwargs):
 
 def trycmd(*args, **kwargs):
     """Convenience wrapper around oslo's trycmd() method."""
-    if kwargs.get('run_as_root', False):
-        if CONF.use_rootwrap_daemon:
-            return RootwrapDaemonHelper(CONF.rootwrap_config).trycmd(
-                *args, **kwargs)
-        else:
-            return RootwrapProcessHelper().trycmd(*args, **kwargs)
-    return processutils.trycmd(*args, **kwargs)
+    start = time.time()
+    try:
+        if kwargs.get('run_as_root', False):
+            if CONF.use_rootwrap_daemon:
+                return RootwrapDaemonHelper(CONF.rootwrap_config).trycmd(
+                    *args, **kwargs)
+            else:
+                return RootwrapProcessHelper().trycmd(*args, **kwargs)
+        return processutils.trycmd(*args, **kwargs)
+    finally:
+        _record_execute_time(_command_name(args), time.time() - start)
 
 
 def generate_uid(topic, size=8):
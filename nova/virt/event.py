@@ -115,3 +115,27 @@ class LifecycleEvent(InstanceEvent):
             self.timestamp,
             self.uuid,
             self.get_name())
+
+
+class LifecycleEventBatch(Event):
+    """Class for a batch of instance lifecycle state change events.
+
+    Drivers which receive lifecycle events in bursts, for example while
+    many instances are being rebooted at once, can emit the events they
+    received together as a batch so that they are handled together. A batch
+    holds at most one event per instance.
+    """
+
+    def __init__(self, events, timestamp=None):
+        super(LifecycleEventBatch, self).__init__(timestamp)
+
+        self.events = events
+
+    def get_events(self):
+        return self.events
+
+    def __repr__(self):
+        return "<%s: %s, %d events>" % (
+            self.__class__.__name__,
+            self.timestamp,
+            len(self.events))
@@ -15,8 +15,13 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import sys
+
+from eventlet import event
+from eventlet import greenthread
 from oslo_log import log as logging
 from oslo_utils import importutils
+import six
 
 import nova.conf
 from nova import context
@@ -35,6 +40,85 @@ def load_driver(default, *args, **kwargs):
     return fw_class(*args, **kwargs)
 
 
+class RefreshQueue(object):
+    """Coalesces the security group refreshes of an iptables firewall driver.
+
+    A requested refresh is not done right away but after waiting for
+    [DEFAULT]/firewall_refresh_delay seconds, during which more refreshes may
+    be requested. All of the refreshes requested by then are done together:
+    the rules of each affected instance are rebuilt once, and then applied
+    once. Callers wait for the refresh they requested to be done.
+    """
+
+    def __init__(self, driver):
+        self.driver = driver
+        # Number of refreshes requested, and of those which were done along
+        # with an earlier request
+        self.requested = 0
+        self.coalesced = 0
+        self._done = None
+        self._all = False
+        self._instances = {}
+
+    def refresh_all(self):
+        """Refresh the rules of all of the filtered instances."""
+        done = self._request()
+        self._all = True
+        failures = done.wait()
+        if None in failures:
+            six.reraise(*failures[None])
+
+    def refresh_instance(self, instance):
+        """Refresh the rules of an instance."""
+        done = self._request()
+        self._instances[instance.id] = instance
+        failures = done.wait()
+        if instance.id in failures:
+            six.reraise(*failures[instance.id])
+
+    def _request(self):
+        self.requested += 1
+        if self._done is not None:
+            self.coalesced += 1
+            return self._done
+        self._done = event.Event()
+        greenthread.spawn_after(CONF.firewall_refresh_delay, self._refresh)
+        return self._done
+
+    def _refresh(self):
+        done, refresh_all, instances = self._done, self._all, self._instances
+        self._done, self._all, self._instances = None, False, {}
+
+        # The failures to refresh the rules of each instance, keyed by
+        # instance id, or None for refreshing all of them
+        failures = {}
+        try:
+            if refresh_all:
+                try:
+                    self.driver.do_refresh_security_group_rules(None)
+                except Exception:
+                    failures[None] = sys.exc_info()
+            for instance_id, instance in instances.items():
+                if (refresh_all and None not in failures and
+                        instance_id in self.driver.instance_info):
+                    continue
+                try:
+                    self.driver.do_refresh_instance_rules(instance)
+                except Exception:
+                    failures[instance_id] = sys.exc_info()
+            self.driver.iptables.apply()
+        except Exception:
+            done.send_exception(*sys.exc_info())
+            return
+        LOG.debug('Refreshed security group rules of %(instances)s for '
+                  '%(requested)d requests, %(coalesced)d coalesced so far',
+                  {'instances': 'all instances' if refresh_all else
+                                '%d instances' % len(instances),
+                   'requested': self.requested,
+                   'coalesced': self.coalesced})
+        done.send(failures)
+
+
 class FirewallDriver(object):
     """Firewall Driver base class.
 
@@ -107,6 +191,7 @@ class IptablesFirewallDriver(FirewallDriver):
     def __init__(self, **kwargs):
         self.iptables = linux_net.iptables_manager
         self.instance_info = {}
+        self.refresh_queue = RefreshQueue(self)
 
         # Flags for DHCP request rule
         self.dhcp_create = False
@@ -374,10 +459,16 @@ class IptablesFirewallDriver(FirewallDriver):
         pass
 
     def refresh_security_group_rules(self, security_group):
+        if CONF.firewall_refresh_delay > 0:
+            self.refresh_queue.refresh_all()
+            return
         self.do_refresh_security_group_rules(security_group)
         self.iptables.apply()
 
     def refresh_instance_security_rules(self, instance):
+        if CONF.firewall_refresh_delay > 0:
+            self.refresh_queue.refresh_instance(instance)
+            return
         self.do_refresh_instance_rules(instance)
         self.iptables.apply()
 
@@ -78,6 +78,13 @@ _NODE_FIELDS = ('uuid', 'power_state', 'target_power_state', 'provision_state',
                 'target_provision_state', 'last_error', 'maintenance',
                 'properties', 'instance_uuid')
 
+# The fields of the nodes kept in the node cache
+_NODE_CACHE_FIELDS = _NODE_FIELDS + ('resource_class', 'updated_at')
+
+# Above this number of nodes updated since the previous refresh of the node
+# cache, listing all the nodes again is cheaper than getting each of them
+_NODE_CACHE_MAX_UPDATED_NODES = 20
+
 # Console state checking interval in seconds
 _CONSOLE_STATE_CHECKING_INTERVAL = 1
 
@@ -160,6 +167,26 @@ class IronicDriver(virt_driver.ComputeDriver):
             default='nova.virt.firewall.NoopFirewallDriver')
         self.node_cache = {}
         self.node_cache_time = 0
+        # All the nodes, including those not managed by this service, as
+        # of the last refresh of the node cache. Only kept with
+        # [ironic]/incremental_node_cache.
+        self._all_nodes = {}
+        # The number of refreshes of the node cache, of which how many listed
+        # all the nodes, the number of nodes retrieved from Ironic by them
+        # and how long the last refresh took. With node_cache_time, which
+        # gives the age of the cache, this tells the load the cache puts on
+        # the Ironic API. The number of rebalances of the hash ring and of
+        # nodes which moved to or from this service tells how much the
+        # compute services joining or leaving the ring cost.
+        self.node_cache_stats = {'refreshes': 0, 'full_refreshes': 0,
+                                 'nodes_retrieved': 0,
+                                 'last_refresh_duration': 0.0,
+                                 'rebalances': 0, 'nodes_moved': 0}
+        self.hash_ring = None
+        # Whether each node without an instance was mapped to this service
+        # on the hash ring, keyed by node UUID, as of the last refresh of the
+        # node cache. It is emptied when the ring changes.
+        self._hash_ring_owned = {}
         self.servicegroup_api = servicegroup.API()
 
         self.ironicclient = client_wrapper.IronicClientWrapper()
@@ -622,11 +649,15 @@ class IronicDriver(virt_driver.ComputeDriver):
         """
         # NOTE(lucasagomes): limit == 0 is an indicator to continue
         # pagination until there're no more values to be returned.
-        node_list = self._get_node_list(associated=True, limit=0)
+        node_list = self._get_node_list(associated=True,
+                                        fields=('instance_uuid',), limit=0)
+        instance_uuids = [node.instance_uuid for node in node_list]
+        if not instance_uuids:
+            return []
         context = nova_context.get_admin_context()
-        return [objects.Instance.get_by_uuid(context,
-                                             i.instance_uuid).name
-                for i in node_list]
+        instances = objects.InstanceList.get_by_filters(
+            context, {'uuid': instance_uuids}, expected_attrs=[])
+        return [instance.name for instance in instances]
 
     def list_instance_uuids(self):
         """Return the UUIDs of all the instances provisioned.
@@ -637,7 +668,9 @@ class IronicDriver(virt_driver.ComputeDriver):
         # NOTE(lucasagomes): limit == 0 is an indicator to continue
         # pagination until there're no more values to be returned.
         return list(n.instance_uuid
-                    for n in self._get_node_list(associated=True, limit=0))
+                    for n in self._get_node_list(associated=True,
+                                                 fields=('instance_uuid',),
+                                                 limit=0))
 
     def node_is_available(self, nodename):
         """Confirms a Nova hypervisor node exists in the Ironic inventory.
@@ -672,6 +705,10 @@ class IronicDriver(virt_driver.ComputeDriver):
             return False
 
     def _refresh_hash_ring(self, ctxt):
+        """Updates the hash ring with the compute services which are up.
+
+        :returns: True if services joined or left the ring, else False
+        """
         service_list = objects.ServiceList.get_all_computes_by_hv_type(
             ctxt, self._get_hypervisor_type())
         services = set()
@@ -684,21 +721,106 @@ class IronicDriver(virt_driver.ComputeDriver):
         # table will be here so far, and we might be brand new.
         services.add(CONF.host)
 
-        self.hash_ring = hash_ring.HashRing(services,
-                                            partitions=_HASH_RING_PARTITIONS)
+        if self.hash_ring is None:
+            self.hash_ring = hash_ring.HashRing(
+                services, partitions=_HASH_RING_PARTITIONS)
+            return False
 
-    def _refresh_cache(self):
+        # NOTE: only the partitions of the services which joined or left the
+        # ring are added or removed, which keeps the placement of the nodes
+        # on the rest of the ring.
+        current = set(self.hash_ring.nodes)
+        joined = services - current
+        left = current - services
+        if not joined and not left:
+            return False
+        LOG.info("Rebalancing the hash ring, services joined: %(joined)s, "
+                 "services left: %(left)s",
+                 {'joined': sorted(joined), 'left': sorted(left)})
+        # NOTE: the nodes are looked up on the changed ring by the next
+        # refresh of the node cache which succeeds, even if the nodes cannot
+        # be listed by this one.
+        self._hash_ring_owned = {}
+        self.hash_ring.add_nodes(joined)
+        for service in left:
+            self.hash_ring.remove_node(service)
+        return True
+
+    def _get_updated_nodes(self):
+        """Returns all the nodes, getting from Ironic only those updated
+        since the previous call.
+
+        :returns: a list of nodes, or None if too many nodes were updated
+                  and all of them should be listed instead
+        """
         # NOTE(lucasagomes): limit == 0 is an indicator to continue
         # pagination until there're no more values to be returned.
+        node_list = self._get_node_list(fields=('uuid', 'updated_at'),
+                                        limit=0)
+        updated = set(node.uuid for node in node_list
+                      if node.uuid not in self._all_nodes or
+                      self._all_nodes[node.uuid].updated_at !=
+                      node.updated_at)
+        if len(updated) > _NODE_CACHE_MAX_UPDATED_NODES:
+            return None
+
+        all_nodes = {}
+        for node in node_list:
+            if node.uuid not in updated:
+                all_nodes[node.uuid] = self._all_nodes[node.uuid]
+                continue
+            try:
+                all_nodes[node.uuid] = self.ironicclient.call(
+                    'node.get', node.uuid, fields=_NODE_CACHE_FIELDS)
+            except ironic.exc.NotFound:
+                # The node was deleted since it was listed
+                continue
+            except Exception as e:
+                LOG.warning("Failed to get node %(node)s to refresh the node "
+                            "cache, listing all the nodes instead. Error: "
+                            "%(error)s", {'node': node.uuid, 'error': e})
+                return None
+        self.node_cache_stats['nodes_retrieved'] += len(updated)
+        self._all_nodes = all_nodes
+        return list(all_nodes.values())
+
+    def _get_nodes_for_cache(self):
+        """Returns all the nodes, with the fields kept in the node cache.
+
+        With [ironic]/incremental_node_cache, only the nodes updated since
+        the previous call are retrieved from Ironic.
+        """
+        if CONF.ironic.incremental_node_cache and self._all_nodes:
+            node_list = self._get_updated_nodes()
+            if node_list is not None:
+                return node_list
+
+        # NOTE(lucasagomes): limit == 0 is an indicator to continue
+        # pagination until there're no more values to be returned.
+        node_list = self._get_node_list(fields=_NODE_CACHE_FIELDS, limit=0)
+        self.node_cache_stats['full_refreshes'] += 1
+        self.node_cache_stats['nodes_retrieved'] += len(node_list)
+        if CONF.ironic.incremental_node_cache:
+            self._all_nodes = {node.uuid: node for node in node_list}
+        return node_list
+
+    def _refresh_cache(self):
         ctxt = nova_context.get_admin_context()
-        self._refresh_hash_ring(ctxt)
+        previously_owned = self._hash_ring_owned
+        rebalanced = self._refresh_hash_ring(ctxt)
         instances = objects.InstanceList.get_uuids_by_host(ctxt, CONF.host)
         node_cache = {}
+        hash_ring_owned = {}
+        moved = []
 
-        for node in self._get_node_list(detail=True, limit=0):
+        start = time.time()
+        for node in self._get_nodes_for_cache():
             # NOTE(jroll): we always manage the nodes for instances we manage
             if node.instance_uuid in instances:
                 node_cache[node.uuid] = node
+                continue
+            if node.instance_uuid is not None:
+                continue
 
             # NOTE(jroll): check if the node matches us in the hash ring, and
             # does not have an instance_uuid (which would imply the node has
@@ -706,13 +828,36 @@ class IronicDriver(virt_driver.ComputeDriver):
             # Note that this means nodes with an instance that was deleted in
             # nova while the service was down, and not yet reaped, will not be
             # reported until the periodic task cleans it up.
-            elif (node.instance_uuid is None and
-                  CONF.host in
-                  self.hash_ring.get_nodes(node.uuid.encode('utf-8'))):
+            # The ring is only looked up for new nodes unless it changed,
+            # since the nodes keep their place on an unchanged ring.
+            owned = self._hash_ring_owned.get(node.uuid)
+            if owned is None:
+                owned = CONF.host in self.hash_ring.get_nodes(
+                    node.uuid.encode('utf-8'))
+                was_owned = previously_owned.get(node.uuid)
+                if was_owned is not None and was_owned != owned:
+                    moved.append(node.uuid)
+            hash_ring_owned[node.uuid] = owned
+            if owned:
                 node_cache[node.uuid] = node
 
+        if rebalanced:
+            self.node_cache_stats['rebalances'] += 1
+            self.node_cache_stats['nodes_moved'] += len(moved)
+            LOG.info("%(num_moved)s node(s) moved to or from this service "
+                     "on the hash ring", {'num_moved': len(moved)})
+            LOG.debug("Nodes moved on the hash ring: %s", moved)
+        self._hash_ring_owned = hash_ring_owned
         self.node_cache = node_cache
         self.node_cache_time = time.time()
+        duration = self.node_cache_time - start
+        self.node_cache_stats['refreshes'] += 1
+        self.node_cache_stats['last_refresh_duration'] = duration
+        LOG.debug("Refreshed the node cache with %(num_nodes)s node(s) in "
+                  "%(duration).2f seconds, totals since the service started: "
+                  "%(stats)s",
+                  {'num_nodes': len(node_cache), 'duration': duration,
+                   'stats': self.node_cache_stats})
         # For Pike, we need to ensure that all instances have their flavor
         # migrated to include the resource_class. Since there could be many,
         # many instances controlled by this host, spawn this asynchronously so
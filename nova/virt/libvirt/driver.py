@@ -5634,12 +5634,80 @@ class LibvirtDriver(driver.ComputeDriver):
 
         return objects.NUMATopology(cells=cells)
 
+    @staticmethod
+    def _get_device_stats(stats, group, keys):
+        """Get the counters of each device of a group of the statistics
+        returned for a guest by Host.get_all_guest_stats
+
+        :param stats: dict of the statistics of a guest
+        :param group: the group of the devices, 'block' or 'net'
+        :param keys: the keys of the counters of each device to get
+
+        :returns: dict of the tuples of the counters of each device, keyed
+                  by device name
+        """
+        devices = {}
+        for i in range(stats.get('%s.count' % group, 0)):
+            prefix = '%s.%d.' % (group, i)
+            try:
+                devices[stats[prefix + 'name']] = tuple(
+                    stats[prefix + key] for key in keys)
+            except KeyError:
+                # e.g. a cdrom drive without media has no counters
+                continue
+        return devices
+
+    def get_all_bw_counters(self, instances):
+        """Return bandwidth usage counters for each interface on each
+           running VM.
+        """
+        all_stats = self._host.get_all_guest_stats(
+            libvirt.VIR_DOMAIN_STATS_INTERFACE)
+        if all_stats is None:
+            raise NotImplementedError()
+
+        guests = {guest.uuid: (guest, stats) for guest, stats in all_stats}
+        bw_counters = []
+        for instance in instances:
+            if instance.uuid not in guests:
+                continue
+            guest, stats = guests[instance.uuid]
+            net_stats = self._get_device_stats(stats, 'net',
+                                               ('rx.bytes', 'tx.bytes'))
+            if not net_stats:
+                continue
+            # The statistics are keyed by the name of the host side device
+            # of each interface, so the config of the guest is needed to
+            # find the MAC address of the interface
+            for interface in guest.get_all_devices(
+                    vconfig.LibvirtConfigGuestInterface):
+                counters = net_stats.get(interface.target_dev)
+                if counters is None:
+                    continue
+                bw_counters.append(dict(uuid=instance.uuid,
+                                        mac_address=interface.mac_addr,
+                                        bw_in=counters[0],
+                                        bw_out=counters[1]))
+        return bw_counters
+
     def get_all_volume_usage(self, context, compute_host_bdms):
         """Return usage info for volumes attached to vms on
            a given host.
         """
         vol_usage = []
 
+        # Get the counters of the disks of all the guests at once, falling
+        # back to getting those of each volume when the hypervisor does not
+        # support it
+        all_stats = self._host.get_all_guest_stats(
+            libvirt.VIR_DOMAIN_STATS_BLOCK)
+        if all_stats is not None:
+            block_stats = {
+                guest.uuid: self._get_device_stats(
+                    stats, 'block',
+                    ('rd.reqs', 'rd.bytes', 'wr.reqs', 'wr.bytes'))
+                for guest, stats in all_stats}
+
         for instance_bdms in compute_host_bdms:
             instance = instance_bdms['instance']
 
@@ -5651,7 +5719,11 @@ class LibvirtDriver(driver.ComputeDriver):
 
                 LOG.debug("Trying to get stats for the volume %s",
                           volume_id, instance=instance)
-                vol_stats = self.block_stats(instance, mountpoint)
+                if all_stats is None:
+                    vol_stats = self.block_stats(instance, mountpoint)
+                else:
+                    vol_stats = block_stats.get(instance.uuid, {}).get(
+                        mountpoint)
 
                 if vol_stats:
                     stats = dict(volume=volume_id,
@@ -5792,6 +5864,16 @@ class LibvirtDriver(driver.ComputeDriver):
         else:
             data['numa_topology'] = None
 
+        LOG.debug("Lifecycle events received: %(received)d, coalesced: "
+                  "%(coalesced)d, largest batch since the last resource "
+                  "update: %(max_queue_depth)d, longest wait since the last "
+                  "resource update: %(max_latency).3f seconds",
+                  self._host.get_event_stats())
+        config_stats = self._host.get_guest_config_stats()
+        if config_stats is not None:
+            LOG.debug("Guest configs served from the cache: %(hits)d, "
+                      "parsed: %(misses)d, invalidations: %(invalidations)d",
+                      config_stats)
         return data
 
     def check_instance_shared_storage_local(self, context, instance):
@@ -6497,6 +6579,10 @@ class LibvirtDriver(driver.ComputeDriver):
         progress_watermark = None
         previous_data_remaining = -1
         is_post_copy_enabled = self._is_post_copy_enabled(migration_flags)
+        controller = None
+        if CONF.libvirt.live_migration_adaptive_tuning:
+            controller = libvirt_migrate.AdaptiveController(
+                CONF.libvirt.live_migration_downtime)
         while True:
             info = guest.get_job_info()
 
@@ -6552,18 +6638,28 @@ class LibvirtDriver(driver.ComputeDriver):
                         self._clear_empty_migration(instance)
                         raise
 
+                if controller is not None:
+                    controller.update(now, info)
+
                 if (is_post_copy_enabled and
-                    libvirt_migrate.should_switch_to_postcopy(
-                    info.memory_iteration, info.data_remaining,
-                    previous_data_remaining, migration.status)):
+                    (controller.should_switch_to_postcopy(migration.status)
+                     if controller is not None else
+                     libvirt_migrate.should_switch_to_postcopy(
+                         info.memory_iteration, info.data_remaining,
+                         previous_data_remaining, migration.status))):
                     libvirt_migrate.trigger_postcopy_switch(guest,
                                                             instance,
                                                             migration)
                 previous_data_remaining = info.data_remaining
 
-                curdowntime = libvirt_migrate.update_downtime(
-                    guest, instance, curdowntime,
-                    downtime_steps, elapsed)
+                if controller is not None:
+                    curdowntime = controller.update_downtime(
+                        guest, instance, curdowntime,
+                        downtime_steps, elapsed)
+                else:
+                    curdowntime = libvirt_migrate.update_downtime(
+                        guest, instance, curdowntime,
+                        downtime_steps, elapsed)
 
                 # We loop every 500ms, so don't log on every
                 # iteration to avoid spamming logs for long
@@ -7272,7 +7368,7 @@ class LibvirtDriver(driver.ComputeDriver):
 
         for dom in instance_domains:
             try:
-                guest = libvirt_guest.Guest(dom)
+                guest = self._host.get_guest_for_domain(dom)
                 config = guest.get_config()
 
                 block_device_info = None
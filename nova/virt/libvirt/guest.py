@@ -77,15 +77,65 @@ LIBVIRT_POWER_STATE = {
 }
 
 
+class ConfigCache(object):
+    """Cache of the configs parsed from the XML descriptions of guests
+
+    The config of a guest is kept until invalidate() is called for it, which
+    the Host does on the libvirt events signalling that the guest changed,
+    and the Guest does after changing the guest itself.
+    """
+
+    def __init__(self):
+        self._configs = {}
+        # Bumped on each invalidation, so that a config loaded while the
+        # guest was being changed is not kept
+        self._generation = 0
+        self.stats = {'hits': 0, 'misses': 0, 'invalidations': 0}
+
+    def get(self, uuid, load):
+        """Returns the config of a guest
+
+        :param uuid: the uuid of the guest
+        :param load: a callable returning the config of the guest, called
+            when it is not cached
+        :returns: LibvirtConfigGuest instance
+        """
+        config = self._configs.get(uuid)
+        if config is not None:
+            self.stats['hits'] += 1
+            return config
+
+        self.stats['misses'] += 1
+        generation = self._generation
+        config = load()
+        if generation == self._generation:
+            self._configs[uuid] = config
+        return config
+
+    def invalidate(self, uuid=None):
+        """Drops the config of a guest, or of all guests if uuid is None
+
+        This is called by the native thread receiving the libvirt events, so
+        it must not use logging.
+        """
+        self._generation += 1
+        self.stats['invalidations'] += 1
+        if uuid is None:
+            self._configs.clear()
+        else:
+            self._configs.pop(uuid, None)
+
+
 class Guest(object):
 
-    def __init__(self, domain):
+    def __init__(self, domain, config_cache=None):
 
         global libvirt
         if libvirt is None:
             libvirt = importutils.import_module('libvirt')
 
         self._domain = domain
+        self._config_cache = config_cache
 
     def __repr__(self):
         return "<Guest %(id)d %(name)s %(uuid)s>" % {
@@ -106,6 +156,10 @@ class Guest(object):
     def name(self):
         return self._domain.name()
 
+    def _invalidate_config(self):
+        if self._config_cache is not None:
+            self._config_cache.invalidate(self.uuid)
+
     @property
     def _encoded_xml(self):
         return encodeutils.safe_decode(self._domain.XMLDesc(0))
@@ -278,6 +332,7 @@ class Guest(object):
             except AttributeError:
                 pass
             self._domain.undefine()
+        self._invalidate_config()
 
     def has_persistent_configuration(self):
         """Whether domain config is persistently stored on the host."""
@@ -301,12 +356,21 @@ class Guest(object):
 
         LOG.debug("attach device xml: %s", device_xml)
         self._domain.attachDeviceFlags(device_xml, flags=flags)
+        self._invalidate_config()
 
     def get_config(self):
         """Returns the config instance for a guest
 
+        The config may come from the cache of the host and be shared with
+        other callers, so it must not be modified.
+
         :returns: LibvirtConfigGuest instance
         """
+        if self._config_cache is None:
+            return self._parse_config()
+        return self._config_cache.get(self.uuid, self._parse_config)
+
+    def _parse_config(self):
         config = vconfig.LibvirtConfigGuest()
         config.parse_str(self._domain.XMLDesc(0))
         return config
@@ -351,9 +415,7 @@ class Guest(object):
         """
 
         try:
-            config = vconfig.LibvirtConfigGuest()
-            config.parse_str(
-                self._domain.XMLDesc(0))
+            config = self.get_config()
         except Exception:
             return []
 
@@ -476,6 +538,7 @@ class Guest(object):
 
         LOG.debug("detach device xml: %s", device_xml)
         self._domain.detachDeviceFlags(device_xml, flags=flags)
+        self._invalidate_config()
 
     def get_xml_desc(self, dump_inactive=False, dump_sensitive=False,
                      dump_migratable=False):
@@ -583,6 +646,8 @@ class Guest(object):
             device_xml = device_xml.decode('utf-8')
 
         self._domain.snapshotCreateXML(device_xml, flags=flags)
+        # An external disk snapshot changes the source of the disks
+        self._invalidate_config()
 
     def shutdown(self):
         """Shutdown guest"""
@@ -755,6 +820,7 @@ class BlockDevice(object):
         flags = async and libvirt.VIR_DOMAIN_BLOCK_JOB_ABORT_ASYNC or 0
         flags |= pivot and libvirt.VIR_DOMAIN_BLOCK_JOB_ABORT_PIVOT or 0
         self._guest._domain.blockJobAbort(self._disk, flags=flags)
+        self._guest._invalidate_config()
 
     def get_job_info(self):
         """Returns information about job currently running
@@ -799,8 +865,11 @@ class BlockDevice(object):
         flags |= copy and libvirt.VIR_DOMAIN_BLOCK_REBASE_COPY or 0
         flags |= copy_dev and libvirt.VIR_DOMAIN_BLOCK_REBASE_COPY_DEV or 0
         flags |= relative and libvirt.VIR_DOMAIN_BLOCK_REBASE_RELATIVE or 0
-        return self._guest._domain.blockRebase(
-            self._disk, base, self.REBASE_DEFAULT_BANDWIDTH, flags=flags)
+        try:
+            return self._guest._domain.blockRebase(
+                self._disk, base, self.REBASE_DEFAULT_BANDWIDTH, flags=flags)
+        finally:
+            self._guest._invalidate_config()
 
     def commit(self, base, top, relative=False):
         """Merge data from overlays into backing file
@@ -811,8 +880,12 @@ class BlockDevice(object):
         :param relative: Keep backing chain referenced using relative names
         """
         flags = relative and libvirt.VIR_DOMAIN_BLOCK_COMMIT_RELATIVE or 0
-        return self._guest._domain.blockCommit(
-            self._disk, base, top, self.COMMIT_DEFAULT_BANDWIDTH, flags=flags)
+        try:
+            return self._guest._domain.blockCommit(
+                self._disk, base, top, self.COMMIT_DEFAULT_BANDWIDTH,
+                flags=flags)
+        finally:
+            self._guest._invalidate_config()
 
     def resize(self, size_kb):
         """Resize block device to KiB size"""
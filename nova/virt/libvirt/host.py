@@ -27,11 +27,13 @@ the raw libvirt API. These APIs are then used by all
 the other libvirt related classes
 """
 
+import collections
 import operator
 import os
 import socket
 import sys
 import threading
+import time
 
 from eventlet import greenio
 from eventlet import greenthread
@@ -100,6 +102,14 @@ class Host(object):
         #                down the domain during a reboot, delay the
         #                STOPPED lifecycle event some seconds.
         self._lifecycle_delay = 15
+        # Statistics of the lifecycle events dispatched, see
+        # get_event_stats()
+        self._event_stats = {'received': 0, 'coalesced': 0,
+                             'max_queue_depth': 0, 'max_latency': 0.0}
+
+        self._guest_config_cache = None
+        if CONF.libvirt.guest_config_cache:
+            self._guest_config_cache = libvirt_guest.ConfigCache()
 
         self._initialized = False
 
@@ -163,6 +173,8 @@ class Host(object):
         self = opaque
 
         uuid = dom.UUIDString()
+        if self._guest_config_cache is not None:
+            self._guest_config_cache.invalidate(uuid)
         transition = None
         if event == libvirt.VIR_DOMAIN_EVENT_STOPPED:
             transition = virtevent.EVENT_LIFECYCLE_STOPPED
@@ -176,6 +188,17 @@ class Host(object):
         if transition is not None:
             self._queue_event(virtevent.LifecycleEvent(uuid, transition))
 
+    @staticmethod
+    def _event_config_callback(conn, dom, *args):
+        """Receives the libvirt events signalling a change of a guest config.
+
+        This is registered for the device and block job events, whose
+        callbacks have different arguments but all get the opaque value
+        last. As _event_lifecycle_callback, this executes in a native thread.
+        """
+        self = args[-1]
+        self._guest_config_cache.invalidate(dom.UUIDString())
+
     def _close_callback(self, conn, reason, opaque):
         close_info = {'conn': conn, 'reason': reason}
         self._queue_event(close_info)
@@ -260,17 +283,24 @@ class Host(object):
         # Process as many events as possible without
         # blocking
         last_close_event = None
+        # Only the latest transition of a domain matters, so only the latest
+        # lifecycle event of each domain is kept, in the order they arrived
+        lifecycle_events = collections.OrderedDict()
+        received = 0
         while not self._event_queue.empty():
             try:
                 event = self._event_queue.get(block=False)
                 if isinstance(event, virtevent.LifecycleEvent):
-                    # call possibly with delay
-                    self._event_emit_delayed(event)
+                    received += 1
+                    lifecycle_events.pop(event.uuid, None)
+                    lifecycle_events[event.uuid] = event
 
                 elif 'conn' in event and 'reason' in event:
                     last_close_event = event
             except native_Queue.Empty:
                 pass
+        if lifecycle_events:
+            self._event_emit_batch(list(lifecycle_events.values()), received)
         if last_close_event is None:
             return
         conn = last_close_event['conn']
@@ -283,6 +313,65 @@ class Host(object):
                 self._wrapped_conn = None
                 self._queue_conn_event_handler(False, msg)
 
+    def _event_emit_batch(self, events, received):
+        """Emit the lifecycle events dispatched together.
+
+        The events which are not delayed are emitted as a single batch, so
+        that they can be handled together.
+
+        :param events: the latest lifecycle event of each of the domains
+            which had some, in the order they arrived
+        :param received: the number of lifecycle events they were coalesced
+            from
+        """
+        latency = time.time() - min(event.timestamp for event in events)
+        stats = self._event_stats
+        stats['received'] += received
+        stats['coalesced'] += received - len(events)
+        stats['max_queue_depth'] = max(stats['max_queue_depth'], received)
+        stats['max_latency'] = max(stats['max_latency'], latency)
+        LOG.debug("Dispatching %(events)d lifecycle events coalesced from "
+                  "%(received)d, received up to %(latency).3f seconds ago",
+                  {'events': len(events), 'received': received,
+                   'latency': latency})
+
+        batch = []
+        for event in events:
+            if event.transition == virtevent.EVENT_LIFECYCLE_STOPPED:
+                self._event_emit_delayed(event)
+            else:
+                self._cancel_delayed_event(event)
+                batch.append(event)
+        if len(batch) == 1:
+            self._event_emit(batch[0])
+        elif batch:
+            self._event_emit(virtevent.LifecycleEventBatch(batch))
+
+    def _cancel_delayed_event(self, event):
+        # Cleanup possible delayed stop events.
+        if event.uuid in self._events_delayed.keys():
+            self._events_delayed[event.uuid].cancel()
+            self._events_delayed.pop(event.uuid, None)
+            LOG.debug("Removed pending event for %s due to "
+                      "lifecycle event", event.uuid)
+
+    def get_event_stats(self):
+        """Returns statistics of the lifecycle events received so far.
+
+        The maxima are reset by each call, so that they cover the events
+        dispatched since the previous call.
+
+        :returns: a dict with the number of lifecycle events ``received``,
+            the number of those which were ``coalesced`` with a later event
+            of the same domain, the largest number of events dispatched at
+            once, ``max_queue_depth``, and the longest time in seconds an
+            event waited to be dispatched, ``max_latency``.
+        """
+        stats = dict(self._event_stats)
+        self._event_stats['max_queue_depth'] = 0
+        self._event_stats['max_latency'] = 0.0
+        return stats
+
     def _event_emit_delayed(self, event):
         """Emit events - possibly delayed."""
         def event_cleanup(gt, *args, **kwargs):
@@ -293,12 +382,7 @@ class Host(object):
             event = args[0]
             self._events_delayed.pop(event.uuid, None)
 
-        # Cleanup possible delayed stop events.
-        if event.uuid in self._events_delayed.keys():
-            self._events_delayed[event.uuid].cancel()
-            self._events_delayed.pop(event.uuid, None)
-            LOG.debug("Removed pending event for %s due to "
-                      "lifecycle event", event.uuid)
+        self._cancel_delayed_event(event)
 
         if event.transition == virtevent.EVENT_LIFECYCLE_STOPPED:
             # Delay STOPPED event, as they may be followed by a STARTED
@@ -378,6 +462,24 @@ class Host(object):
             LOG.warning("URI %(uri)s does not support events: %(error)s",
                         {'uri': self._uri, 'error': e})
 
+        if self._guest_config_cache is not None:
+            # The guests may have changed while we were not connected
+            self._guest_config_cache.invalidate()
+            for name in ('VIR_DOMAIN_EVENT_ID_DEVICE_ADDED',
+                         'VIR_DOMAIN_EVENT_ID_DEVICE_REMOVED',
+                         'VIR_DOMAIN_EVENT_ID_BLOCK_JOB'):
+                event_id = getattr(libvirt, name, None)
+                if event_id is None:
+                    continue
+                try:
+                    wrapped_conn.domainEventRegisterAny(
+                        None, event_id, self._event_config_callback, self)
+                except Exception as e:
+                    LOG.warning("URI %(uri)s does not support %(event)s "
+                                "events: %(error)s",
+                                {'uri': self._uri, 'event': name,
+                                 'error': e})
+
         try:
             LOG.debug("Registering for connection events: %s", str(self))
             wrapped_conn.registerCloseCallback(self._close_callback, None)
@@ -522,7 +624,32 @@ class Host(object):
         :raises exception.InstanceNotFound: The domain was not found
         :raises exception.InternalError: A libvirt error occurred
         """
-        return libvirt_guest.Guest(self._get_domain(instance))
+        return self.get_guest_for_domain(self._get_domain(instance))
+
+    def get_guest_for_domain(self, domain):
+        """Returns the Guest object for a libvirt domain object
+
+        Guests should be created this way rather than directly so that
+        they share the configs cached by the host.
+
+        :param domain: a libvirt.Domain object
+        :returns: a nova.virt.libvirt.Guest object
+        """
+        return libvirt_guest.Guest(domain,
+                                   config_cache=self._guest_config_cache)
+
+    def get_guest_config_stats(self):
+        """Returns statistics of the guest configs cached so far.
+
+        :returns: a dict with the number of configs served from the cache,
+            ``hits``, which saved parsing the XML description of a guest,
+            the number of configs parsed, ``misses``, and the number of
+            times cached configs were dropped, ``invalidations``, or None
+            if [libvirt]/guest_config_cache is not enabled.
+        """
+        if self._guest_config_cache is None:
+            return None
+        return dict(self._guest_config_cache.stats)
 
     def _get_domain(self, instance):
         """Retrieve libvirt domain object for an instance.
@@ -561,8 +688,9 @@ class Host(object):
 
         :returns: list of Guest objects
         """
-        return [libvirt_guest.Guest(dom) for dom in self.list_instance_domains(
-            only_running=only_running, only_guests=only_guests)]
+        return [self.get_guest_for_domain(dom)
+                for dom in self.list_instance_domains(
+                    only_running=only_running, only_guests=only_guests)]
 
     def list_instance_domains(self, only_running=True, only_guests=True):
         """Get a list of libvirt.Domain objects for nova instances
@@ -592,6 +720,30 @@ class Host(object):
 
         return doms
 
+    def get_all_guest_stats(self, stats):
+        """Get the statistics of all the running guests at once
+
+        :param stats: libvirt.VIR_DOMAIN_STATS_* flags selecting the
+                      statistics to get
+
+        This gets the statistics of all the guests in a single call to
+        libvirt, instead of one call per device of each guest.
+
+        :returns: list of (Guest, dict of statistics) tuples, or None if
+                  the hypervisor does not support getting them at once
+        """
+        try:
+            all_stats = self.get_connection().getAllDomainStats(
+                stats, libvirt.VIR_CONNECT_GET_ALL_DOMAINS_STATS_ACTIVE)
+        except libvirt.libvirtError as ex:
+            if ex.get_error_code() == libvirt.VIR_ERR_NO_SUPPORT:
+                LOG.debug("Getting the statistics of all guests at once "
+                          "is not supported: %s", ex)
+                return None
+            raise
+        return [(self.get_guest_for_domain(dom), dom_stats)
+                for dom, dom_stats in all_stats]
+
     def get_online_cpus(self):
         """Get the set of CPUs that are online on the host
 
@@ -824,7 +976,9 @@ class Host(object):
         :returns: an instance of Guest
         """
         domain = self.get_connection().defineXML(xml)
-        return libvirt_guest.Guest(domain)
+        if self._guest_config_cache is not None:
+            self._guest_config_cache.invalidate(domain.UUIDString())
+        return self.get_guest_for_domain(domain)
 
     def device_lookup_by_name(self, name):
         """Lookup a node device by its name.
@@ -18,6 +18,7 @@
 """
 
 from collections import deque
+import math
 
 from lxml import etree
 from oslo_log import log as logging
@@ -375,6 +376,160 @@ def update_downtime(guest, instance,
     return thisstep[1]
 
 
+class AdaptiveController(object):
+    """Tunes a live migration from the progress it is observed to make
+
+    The rate at which data is transferred and the rate at which the guest
+    dirties its memory are estimated from successive JobInfo samples, as
+    exponentially weighted moving averages. They are used to raise the max
+    downtime as soon as the remaining data could be transferred within the
+    maximum permitted downtime, and to switch to post-copy as soon as the
+    guest is seen to dirty its memory about as fast as it is transferred.
+    """
+
+    # Weight of the latest sample in the moving averages of the rates
+    SMOOTHING = 0.5
+    # The migration is not converging when the guest dirties its memory at
+    # this ratio of the transfer rate or more
+    CONVERGENCE_RATIO = 0.9
+    # Number of successive samples the migration has to be seen not to
+    # converge in before switching to post-copy
+    NONCONVERGENT_SAMPLES = 3
+
+    def __init__(self, max_downtime):
+        """:param max_downtime: maximum permitted downtime in ms"""
+        self.max_downtime = max_downtime
+        self.transfer_rate = None
+        self.dirty_rate = None
+        self.data_remaining = None
+        self.memory_iteration = 0
+        self.nonconvergent_samples = 0
+        self._last_sample = None
+
+    def _average(self, average, rate):
+        if average is None:
+            return rate
+        return self.SMOOTHING * rate + (1 - self.SMOOTHING) * average
+
+    def update(self, now, info):
+        """Record a sample of the progress of the migration
+
+        :param now: time the sample was taken at in secs since epoch
+        :param info: a nova.virt.libvirt.guest.JobInfo
+        """
+        self.data_remaining = info.data_remaining
+        self.memory_iteration = info.memory_iteration
+        last_sample = self._last_sample
+        self._last_sample = (now, info.data_processed, info.data_remaining)
+        if last_sample is None or now <= last_sample[0]:
+            return
+
+        last_time, last_processed, last_remaining = last_sample
+        elapsed = float(now - last_time)
+        transferred = max(info.data_processed - last_processed, 0)
+        # Whatever was transferred without reducing the data remaining by
+        # as much was dirtied again by the guest in the meantime
+        dirtied = max(transferred - (last_remaining - info.data_remaining),
+                      0)
+        self.transfer_rate = self._average(self.transfer_rate,
+                                           transferred / elapsed)
+        self.dirty_rate = self._average(self.dirty_rate, dirtied / elapsed)
+
+        if self.is_converging():
+            self.nonconvergent_samples = 0
+        else:
+            self.nonconvergent_samples += 1
+
+    def is_converging(self):
+        """Whether data is transferred faster than the guest dirties it"""
+        if self.transfer_rate is None:
+            return True
+        return self.dirty_rate < self.transfer_rate * self.CONVERGENCE_RATIO
+
+    def expected_downtime(self):
+        """Downtime in ms needed to transfer the remaining data
+
+        :returns: the downtime, or None if the transfer rate is not known
+        """
+        if not self.transfer_rate:
+            return None
+        return int(math.ceil(self.data_remaining * 1000.0 /
+                             self.transfer_rate))
+
+    def update_downtime(self, guest, instance, olddowntime,
+                        downtime_steps, elapsed):
+        """Update max downtime if needed
+
+        :param guest: a nova.virt.libvirt.guest.Guest to set downtime for
+        :param instance: a nova.objects.Instance
+        :param olddowntime: current set downtime, or None
+        :param downtime_steps: list of downtime steps
+        :param elapsed: total time of migration in secs
+
+        The max downtime follows the downtime steps, as with
+        update_downtime(), but is raised ahead of them to the downtime
+        expected to be needed to transfer the remaining data when that is
+        within the maximum permitted downtime. The downtime is never
+        lowered.
+
+        Any errors hit when updating downtime will be ignored
+
+        :returns: the new downtime value
+        """
+        downtime = None
+        for step in downtime_steps:
+            if elapsed > step[0]:
+                downtime = step[1]
+
+        expected = self.expected_downtime()
+        if expected is not None and expected <= self.max_downtime:
+            downtime = max(downtime or 0, expected)
+
+        if downtime is None or (olddowntime is not None and
+                                downtime <= olddowntime):
+            return olddowntime
+
+        LOG.info("Increasing downtime to %(downtime)d ms after %(elapsed)d "
+                 "sec elapsed time, with %(remaining)d bytes remaining "
+                 "transferred at %(rate)d bytes/sec",
+                 {"downtime": downtime, "elapsed": elapsed,
+                  "remaining": self.data_remaining or 0,
+                  "rate": self.transfer_rate or 0},
+                 instance=instance)
+
+        try:
+            guest.migrate_configure_max_downtime(downtime)
+        except libvirt.libvirtError as e:
+            LOG.warning("Unable to increase max downtime to %(time)d ms: "
+                        "%(e)s", {"time": downtime, "e": e},
+                        instance=instance)
+        return downtime
+
+    def should_switch_to_postcopy(self, migration_status):
+        """Determine if the migration should be switched to postcopy mode
+
+        :param migration_status: current status of the migration
+
+        The migration is switched to post-copy after the first memory
+        iteration once the guest has been seen to dirty its memory about as
+        fast as it is transferred for a few samples in a row, unless the
+        remaining data could be transferred within the maximum permitted
+        downtime.
+
+        :returns: True if migration should be switched to postcopy mode,
+        False otherwise
+        """
+        if (migration_status == 'running (post-copy)' or
+                self.memory_iteration <= 1):
+            return False
+
+        if self.nonconvergent_samples < self.NONCONVERGENT_SAMPLES:
+            return False
+
+        expected = self.expected_downtime()
+        return expected is None or expected > self.max_downtime
+
+
 def save_stats(instance, migration, info, remaining):
     """Save migration stats to the database
 
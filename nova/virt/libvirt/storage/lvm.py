@@ -179,12 +179,15 @@ def clear_volume(path):
 
 
 def remove_volumes(paths):
-    """Remove one or more logical volume."""
+    """Remove one or more logical volume.
+
+    The volumes which could not be cleared are not removed.
+    """
 
     errors = []
     for path in paths:
-        clear_volume(path)
         try:
+            clear_volume(path)
             nova.privsep.fs.lvremove(path)
         except processutils.ProcessExecutionError as exp:
             errors.append(six.text_type(exp))
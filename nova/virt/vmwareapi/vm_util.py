@@ -146,6 +146,10 @@ def vm_ref_cache_from_name(func):
 # the config key which stores the VNC port
 VNC_CONFIG_KEY = 'config.extraConfig["RemoteDisplay.vnc.port"]'
 
+# The state of a VM, as retrieved for all the VMs of a cluster at once
+VMState = collections.namedtuple('VMState', ['vm_ref', 'power_state',
+                                             'connection_state'])
+
 VmdkInfo = collections.namedtuple('VmdkInfo', ['path', 'adapter_type',
                                                'disk_type',
                                                'capacity_in_bytes',
@@ -1156,6 +1160,37 @@ def get_vm_state(session, instance):
     return constants.POWER_STATES[vm_state]
 
 
+def get_vm_states(session, res_pool_ref):
+    """Get the state of all the instance VMs in a resource pool.
+
+    The state of all the VMs is retrieved by a single property collector
+    query rather than a query per VM. The VM references found are added to
+    the VM reference cache, so that later lookups of these VMs do not need
+    a query of their own.
+
+    :returns: a dict of VMState, keyed by instance UUID
+    """
+    properties = ['runtime.connectionState', 'runtime.powerState',
+                  'config.extraConfig["nvp.vm-uuid"]']
+    results = session._call_method(vim_util, 'get_inner_objects',
+                                   res_pool_ref, 'vm', 'VirtualMachine',
+                                   properties)
+    vm_states = {}
+    while results:
+        for obj in results.objects:
+            props = propset_dict(obj.propSet)
+            uuid = props.get('config.extraConfig["nvp.vm-uuid"]')
+            # Ignore VM's that do not have nvp.vm-uuid defined
+            if uuid is None or not uuid.value:
+                continue
+            vm_states[uuid.value] = VMState(
+                obj.obj, props.get('runtime.powerState'),
+                props.get('runtime.connectionState'))
+            vm_ref_cache_update(uuid.value, obj.obj)
+        results = session._call_method(vutil, 'continue_retrieval', results)
+    return vm_states
+
+
 def get_stats_from_cluster(session, cluster):
     """Get the aggregate resource stats of a cluster."""
     vcpus = 0
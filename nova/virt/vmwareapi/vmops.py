@@ -20,6 +20,7 @@ Class for VM tasks like spawn, snapshot, suspend, resume etc.
 """
 
 import collections
+import inspect
 import os
 import time
 
@@ -125,6 +126,16 @@ def retry_if_task_in_progress(f, *args, **kwargs):
             pass
 
 
+@decorator.decorator
+def _invalidates_vm_state(f, self, *args, **kwargs):
+    """Drops the cached state of the instance once the operation is done."""
+    instance = inspect.getcallargs(f, self, *args, **kwargs)['instance']
+    try:
+        return f(self, *args, **kwargs)
+    finally:
+        self._invalidate_vm_state(instance.uuid)
+
+
 class VMwareVMOps(object):
     """Management class for VM-related tasks."""
 
@@ -145,6 +156,14 @@ class VMwareVMOps(object):
         self._imagecache = imagecache.ImageCacheManager(self._session,
                                                         self._base_folder)
         self._network_api = network.API()
+        # The state of the VMs in the cluster, keyed by instance UUID, and
+        # when it was retrieved. Only used with [vmware]/vm_state_cache_ttl.
+        self._vm_states = {}
+        self._vm_states_time = 0
+        # When the state of each instance was last changed by an operation,
+        # so that a retrieval of the state of the VMs started before the
+        # change does not cache the state from before it.
+        self._vm_states_changed = {}
 
     def _get_base_folder(self):
         # Enable more than one compute node to run on the same host
@@ -711,6 +730,7 @@ class VMwareVMOps(object):
         if new_size is not None:
             vi.ii.file_size = new_size
 
+    @_invalidates_vm_state
     def spawn(self, context, instance, image_meta, injected_files,
               admin_password, network_info, block_device_info=None):
 
@@ -1013,6 +1033,7 @@ class VMwareVMOps(object):
             # TODO(vui) Add handling for when vmdk volume is attached.
             self._delete_vm_snapshot(instance, vm_ref, snapshot_ref)
 
+    @_invalidates_vm_state
     def reboot(self, instance, network_info, reboot_type="SOFT"):
         """Reboot a VM instance."""
         vm_ref = vm_util.get_vm_ref(self._session, instance)
@@ -1111,6 +1132,7 @@ class VMwareVMOps(object):
         finally:
             vm_util.vm_ref_cache_delete(instance.uuid)
 
+    @_invalidates_vm_state
     def destroy(self, instance, destroy_disks=True):
         """Destroy a VM instance.
 
@@ -1131,6 +1153,7 @@ class VMwareVMOps(object):
         msg = _("unpause not supported for vmwareapi")
         raise NotImplementedError(msg)
 
+    @_invalidates_vm_state
     def suspend(self, instance):
         """Suspend the specified instance."""
         vm_ref = vm_util.get_vm_ref(self._session, instance)
@@ -1153,6 +1176,7 @@ class VMwareVMOps(object):
             LOG.debug("VM was already in suspended state. So returning "
                       "without doing anything", instance=instance)
 
+    @_invalidates_vm_state
     def resume(self, instance):
         """Resume the specified instance."""
         vm_ref = vm_util.get_vm_ref(self._session, instance)
@@ -1179,6 +1203,7 @@ class VMwareVMOps(object):
         return vm_util.find_rescue_device(hardware_devices,
                                           instance)
 
+    @_invalidates_vm_state
     def rescue(self, context, instance, network_info, image_meta):
         """Rescue the specified instance.
 
@@ -1227,6 +1252,7 @@ class VMwareVMOps(object):
         vm_util.reconfigure_vm(self._session, vm_ref, boot_spec)
         vm_util.power_on_instance(self._session, instance, vm_ref=vm_ref)
 
+    @_invalidates_vm_state
     def unrescue(self, instance, power_on=True):
         """Unrescue the specified instance."""
 
@@ -1244,6 +1270,7 @@ class VMwareVMOps(object):
         if power_on:
             vm_util.power_on_instance(self._session, instance, vm_ref=vm_ref)
 
+    @_invalidates_vm_state
     def power_off(self, instance, timeout=0, retry_interval=0):
         """Power off the specified instance.
 
@@ -1318,6 +1345,7 @@ class VMwareVMOps(object):
                                           "get_object_properties_dict",
                                           vm_ref, lst_properties)
 
+    @_invalidates_vm_state
     def power_on(self, instance):
         vm_util.power_on_instance(self._session, instance)
 
@@ -1402,6 +1430,7 @@ class VMwareVMOps(object):
         self._create_swap(block_device_info, instance, vm_ref, dc_info,
                           datastore, folder, vmdk.adapter_type)
 
+    @_invalidates_vm_state
     def migrate_disk_and_power_off(self, context, instance, dest,
                                    flavor):
         """Transfers the disk of a running instance in multiple phases, turning
@@ -1451,6 +1480,7 @@ class VMwareVMOps(object):
                                        step=4,
                                        total_steps=RESIZE_TOTAL_STEPS)
 
+    @_invalidates_vm_state
     def confirm_migration(self, migration, instance, network_info):
         """Confirms a resize, destroying the source VM."""
         vm_ref = vm_util.get_vm_ref(self._session, instance)
@@ -1496,6 +1526,7 @@ class VMwareVMOps(object):
         self._resize_create_ephemerals_and_swap(vm_ref, instance,
                                                 block_device_info)
 
+    @_invalidates_vm_state
     def finish_revert_migration(self, context, instance, network_info,
                                 block_device_info, power_on=True):
         """Finish reverting a resize."""
@@ -1524,6 +1555,7 @@ class VMwareVMOps(object):
         if power_on:
             vm_util.power_on_instance(self._session, instance)
 
+    @_invalidates_vm_state
     def finish_migration(self, context, migration, instance, disk_info,
                          network_info, image_meta, resize_instance=False,
                          block_device_info=None, power_on=True):
@@ -1560,8 +1592,42 @@ class VMwareVMOps(object):
             LOG.info("Automatically hard rebooting", instance=instance)
             self.compute_api.reboot(ctxt, instance, "HARD")
 
+    def _get_vm_states(self):
+        """Returns the state of the VMs in the cluster, keyed by instance
+        UUID, retrieving it again when it is older than
+        [vmware]/vm_state_cache_ttl.
+        """
+        now = time.time()
+        if now - self._vm_states_time < CONF.vmware.vm_state_cache_ttl:
+            return self._vm_states
+
+        vm_states = {}
+        if self._root_resource_pool:
+            vm_states = vm_util.get_vm_states(self._session,
+                                              self._root_resource_pool)
+        for uuid, changed in list(self._vm_states_changed.items()):
+            if changed >= now:
+                vm_states.pop(uuid, None)
+            else:
+                del self._vm_states_changed[uuid]
+        self._vm_states = vm_states
+        self._vm_states_time = now
+        LOG.debug("Retrieved the state of %d VMs", len(vm_states))
+        return vm_states
+
+    def _invalidate_vm_state(self, uuid):
+        if CONF.vmware.vm_state_cache_ttl:
+            self._vm_states.pop(uuid, None)
+            self._vm_states_changed[uuid] = time.time()
+
     def get_info(self, instance):
         """Return data about the VM instance."""
+        if CONF.vmware.vm_state_cache_ttl:
+            vm_state = self._get_vm_states().get(instance.uuid)
+            if vm_state is not None:
+                return hardware.InstanceInfo(
+                    state=constants.POWER_STATES[vm_state.power_state])
+
         vm_ref = vm_util.get_vm_ref(self._session, instance)
 
         lst_properties = ["runtime.powerState"]
@@ -1998,6 +2064,11 @@ class VMwareVMOps(object):
 
     def list_instances(self):
         """Lists the VM instances that are registered with vCenter cluster."""
+        if CONF.vmware.vm_state_cache_ttl:
+            return [uuid for uuid, vm_state in self._get_vm_states().items()
+                    if vm_state.connection_state not in ["orphaned",
+                                                         "inaccessible"]]
+
         properties = ['runtime.connectionState',
                       'config.extraConfig["nvp.vm-uuid"]']
         LOG.debug("Getting list of instances from cluster %s",
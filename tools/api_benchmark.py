@@ -0,0 +1,173 @@
+#!/usr/bin/env python
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Measure the request rate of the compute API WSGI application.
+
+This drives the v2.1 API in-process, with the compute API and the database
+lookups made by the server and flavor controllers replaced by in-memory
+data, so that what is measured is the API request pipeline itself: routing,
+microversion dispatch, extensions, policy checks, view building and JSON
+serialization.
+
+    python tools/api_benchmark.py --servers 100 -n 200
+"""
+
+from __future__ import print_function
+
+import argparse
+import time
+
+import mock
+from oslo_utils import timeutils
+import webob
+
+from nova.api import auth as api_auth
+from nova.api import openstack as openstack_api
+from nova.api.openstack import api_version_request
+from nova.api.openstack import compute
+from nova.api.openstack.compute import versions
+from nova.api.openstack import urlmap
+from nova.compute import api as compute_api
+from nova.compute import vm_states
+from nova import config
+from nova import context
+from nova.network import model as network_model
+from nova import objects
+from nova import policy
+
+
+def _flavor(flavorid):
+    return objects.Flavor(
+        id=int(flavorid), flavorid=flavorid, name='m1.flavor%s' % flavorid,
+        memory_mb=2048 * int(flavorid), vcpus=int(flavorid), root_gb=20,
+        ephemeral_gb=0, swap=0, rxtx_factor=1.0, vcpu_weight=None,
+        disabled=False, is_public=True, extra_specs={}, description=None,
+        created_at=None, updated_at=None, deleted_at=None, deleted=False)
+
+
+def _instance(ctxt, i, flavor):
+    uuid = '00000000-0000-0000-0000-%012d' % i
+    vif = network_model.VIF(
+        id='port-%d' % i, address='fa:16:3e:00:%02x:%02x' % (i // 256,
+                                                             i % 256),
+        network=network_model.Network(
+            id='net', bridge='br-int', label='private',
+            subnets=[network_model.Subnet(
+                cidr='10.0.0.0/16', ips=[network_model.FixedIP(
+                    address='10.0.%d.%d' % (i // 256, i % 256))])]))
+    inst = objects.Instance(
+        context=ctxt, id=i + 1, uuid=uuid, user_id=ctxt.user_id,
+        project_id=ctxt.project_id, host='compute-%d' % (i % 10),
+        node='compute-%d' % (i % 10), hostname='server-%d' % i,
+        display_name='server-%d' % i, display_description=None,
+        image_ref='155d900f-4e14-4e4c-a73d-069cbf4541e6',
+        vm_state=vm_states.ACTIVE, task_state=None, power_state=1,
+        launched_at=timeutils.utcnow(), created_at=timeutils.utcnow(),
+        updated_at=timeutils.utcnow(), terminated_at=None, deleted=False,
+        key_name=None, access_ip_v4=None, access_ip_v6=None, progress=0,
+        availability_zone='nova', config_drive='', locked=False,
+        locked_by=None, launch_index=0, kernel_id='', ramdisk_id='',
+        reservation_id='r-%d' % i, root_device_name='/dev/vda',
+        user_data=None, cell_name=None, auto_disk_config=False,
+        os_type=None, architecture=None, vm_mode=None, key_data=None,
+        launched_on=None, deleted_at=None, cleaned=False,
+        shutdown_terminate=False, disable_terminate=False,
+        ephemeral_key_uuid=None, default_ephemeral_device=None,
+        default_swap_device=None, instance_type_id=flavor.id,
+        memory_mb=flavor.memory_mb, vcpus=flavor.vcpus,
+        root_gb=flavor.root_gb, ephemeral_gb=flavor.ephemeral_gb,
+        flavor=flavor, old_flavor=None, new_flavor=None,
+        numa_topology=None, pci_requests=None, pci_devices=None,
+        device_metadata=None, vcpu_model=None, migration_context=None,
+        metadata={'index': str(i)}, system_metadata={}, fault=None,
+        info_cache=objects.InstanceInfoCache(
+            instance_uuid=uuid,
+            network_info=network_model.NetworkInfo([vif])),
+        security_groups=objects.SecurityGroupList(objects=[
+            objects.SecurityGroup(name='default')]),
+        tags=objects.TagList(objects=[]), services=objects.ServiceList())
+    inst.obj_reset_changes(recursive=True)
+    return inst
+
+
+def build_app(ctxt):
+    api_v21 = openstack_api.FaultWrapper(
+        api_auth.InjectContext(ctxt, compute.APIRouterV21()))
+    mapper = urlmap.URLMap()
+    mapper['/v2.1'] = api_v21
+    mapper['/'] = openstack_api.FaultWrapper(versions.Versions())
+    return mapper
+
+
+def run(app, path, version, number):
+    headers = {'OpenStack-API-Version': 'compute %s' % version}
+    req = webob.Request.blank(path, headers=headers)
+    resp = req.get_response(app)
+    assert resp.status_int == 200, (path, resp.status, resp.body)
+    start = time.time()
+    for i in range(number):
+        webob.Request.blank(path, headers=headers).get_response(app)
+    elapsed = time.time() - start
+    print('%8.1f req/s  %8d bytes  %-5s GET %s' % (
+        number / elapsed, len(resp.body), version, path))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--servers', type=int, default=100,
+                        help='Number of servers returned by server lists')
+    parser.add_argument('-n', '--number', type=int, default=100,
+                        help='Number of requests per endpoint')
+    args = parser.parse_args()
+
+    config.parse_args([])
+    objects.register_all()
+    policy.init()
+    ctxt = context.RequestContext('user', 'project', roles=['member'])
+    flavors = [_flavor(str(i)) for i in range(1, 6)]
+    instances = objects.InstanceList(objects=[
+        _instance(ctxt, i, flavors[i % len(flavors)])
+        for i in range(args.servers)])
+
+    with mock.patch.object(compute_api.API, 'get_all',
+                           return_value=instances), \
+            mock.patch.object(compute_api.API, 'get',
+                              return_value=instances[0]), \
+            mock.patch.object(objects.InstanceList, 'fill_faults',
+                              return_value=[]), \
+            mock.patch.object(objects.InstanceMappingList,
+                              'get_by_instance_uuids', return_value=[]), \
+            mock.patch.object(objects.BlockDeviceMappingList,
+                              'bdms_by_instance_uuid', return_value={}), \
+            mock.patch.object(objects.FlavorList, 'get_all',
+                              return_value=objects.FlavorList(
+                                  objects=flavors)), \
+            mock.patch('nova.availability_zones.'
+                       'get_instance_availability_zone',
+                       return_value='nova'), \
+            mock.patch('nova.network.security_group.openstack_driver.'
+                       'is_neutron_security_groups', return_value=False):
+        app = build_app(ctxt)
+        latest = api_version_request.max_api_version().get_string()
+        server = instances[0].uuid
+        for path, version in (('/', '2.1'),
+                              ('/v2.1/flavors/detail', '2.1'),
+                              ('/v2.1/servers', '2.1'),
+                              ('/v2.1/servers/detail', '2.1'),
+                              ('/v2.1/servers/detail', latest),
+                              ('/v2.1/servers/%s' % server, latest)):
+            run(app, path, version, args.number)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,238 @@
+#!/usr/bin/env python
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Load test the nova console websocket proxy.
+
+This starts a fake VNC server echoing back what it receives and a nova
+websocket proxy in front of it, with the token checks of nova-consoleauth
+replaced by a static mapping to the fake server. It then opens a number of
+simultaneous console sessions through the proxy, sends messages over each of
+them and prints the time taken to establish the sessions and the latency of
+the messages echoed back:
+
+    python tools/console_proxy_load_test.py --sessions 500 --greenthreads
+
+Without --greenthreads, the proxy forks a process per session as it does by
+default.
+"""
+
+from __future__ import print_function
+
+import argparse
+import base64
+import multiprocessing
+import os
+import socket
+import struct
+import time
+
+import eventlet
+from eventlet import hubs
+eventlet.monkey_patch()
+
+import nova.conf  # noqa
+from nova import config  # noqa
+from nova.console import websocketproxy  # noqa
+from nova.consoleauth import rpcapi as consoleauth_rpcapi  # noqa
+
+CONF = nova.conf.CONF
+
+TOKEN = 'load-test-token'
+
+
+def fake_vnc_server(sock):
+    def _serve(conn):
+        try:
+            conn.sendall(b'RFB 003.008\n')
+            while True:
+                data = conn.recv(65536)
+                if not data:
+                    break
+                conn.sendall(data)
+        finally:
+            conn.close()
+
+    pool = eventlet.GreenPool(100000)
+    while True:
+        conn, _address = sock.accept()
+        pool.spawn_n(_serve, conn)
+
+
+def run_proxy(args, vnc_port):
+    # Do not share the eventlet hub with the parent process
+    hubs.use_hub()
+    config.parse_args([])
+    CONF.set_override('proxy_use_greenthreads', args.greenthreads,
+                      group='console')
+    CONF.set_override('proxy_max_connections', args.sessions,
+                      group='console')
+    CONF.set_override('token_cache_ttl', args.token_cache_ttl,
+                      group='console')
+
+    def check_token(self, ctxt, token):
+        if token == TOKEN:
+            return {'host': '127.0.0.1', 'port': vnc_port,
+                    'console_type': 'novnc'}
+
+    consoleauth_rpcapi.ConsoleAuthAPI.check_token = check_token
+    websocketproxy.NovaWebSocketProxy(
+        listen_host='127.0.0.1',
+        listen_port=args.port,
+        file_only=True,
+        RequestHandlerClass=websocketproxy.NovaProxyRequestHandler,
+    ).start_server()
+
+
+def _recv_exactly(sock, size):
+    data = b''
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise IOError('Connection closed')
+        data += chunk
+    return data
+
+
+def _send_frame(sock, payload):
+    # A masked binary frame, as sent by the browsers
+    mask = os.urandom(4)
+    masked = bytearray(payload)
+    for i in range(len(masked)):
+        masked[i] ^= bytearray(mask)[i % 4]
+    if len(payload) < 126:
+        header = struct.pack('!BB', 0x82, 0x80 | len(payload))
+    else:
+        header = struct.pack('!BBH', 0x82, 0x80 | 126, len(payload))
+    sock.sendall(header + mask + bytes(masked))
+
+
+def _recv_frame(sock):
+    opcode, length = struct.unpack('!BB', _recv_exactly(sock, 2))
+    length &= 0x7f
+    if length == 126:
+        length = struct.unpack('!H', _recv_exactly(sock, 2))[0]
+    elif length == 127:
+        length = struct.unpack('!Q', _recv_exactly(sock, 8))[0]
+    return _recv_exactly(sock, length)
+
+
+def _recv_message(sock, size):
+    data = b''
+    while len(data) < size:
+        data += _recv_frame(sock)
+    return data
+
+
+def session(args, results):
+    start = time.time()
+    sock = socket.create_connection(('127.0.0.1', args.port),
+                                    timeout=args.timeout)
+    key = base64.b64encode(os.urandom(16)).decode()
+    request = ('GET /?token=%s HTTP/1.1\r\n'
+               'Host: 127.0.0.1:%d\r\n'
+               'Upgrade: websocket\r\n'
+               'Connection: Upgrade\r\n'
+               'Sec-WebSocket-Key: %s\r\n'
+               'Sec-WebSocket-Version: 13\r\n'
+               'Sec-WebSocket-Protocol: binary\r\n\r\n' % (
+                   TOKEN, args.port, key))
+    sock.sendall(request.encode())
+    response = b''
+    while b'\r\n\r\n' not in response:
+        chunk = sock.recv(4096)
+        if not chunk:
+            raise IOError('Connection closed')
+        response += chunk
+    if b' 101 ' not in response.split(b'\r\n')[0]:
+        raise IOError('Unexpected response: %r' % response)
+    _recv_message(sock, len(b'RFB 003.008\n'))
+    results['connect'].append(time.time() - start)
+
+    payload = b'x' * args.message_size
+    for _i in range(args.messages):
+        sent = time.time()
+        _send_frame(sock, payload)
+        _recv_message(sock, len(payload))
+        results['echo'].append(time.time() - sent)
+    sock.close()
+
+
+def _percentile(values, percent):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * percent / 100.0))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--sessions', type=int, default=100,
+                        help='Number of simultaneous console sessions')
+    parser.add_argument('--messages', type=int, default=20,
+                        help='Messages sent over each session')
+    parser.add_argument('--message-size', type=int, default=1024,
+                        help='Size of the messages in bytes')
+    parser.add_argument('--timeout', type=float, default=30,
+                        help='Seconds to wait for the proxy before failing '
+                             'a session')
+    parser.add_argument('--port', type=int, default=16080,
+                        help='Port the proxy listens on')
+    parser.add_argument('--greenthreads', action='store_true',
+                        help='Serve the sessions from green threads')
+    parser.add_argument('--token-cache-ttl', type=int, default=0,
+                        help='Seconds the validated tokens are cached')
+    args = parser.parse_args()
+
+    vnc_sock = eventlet.listen(('127.0.0.1', 0), backlog=args.sessions)
+    vnc_port = vnc_sock.getsockname()[1]
+    # NOTE: The proxy is forked before anything runs in the eventlet hub of
+    # this process, so that they do not share it.
+    proxy = multiprocessing.Process(target=run_proxy, args=(args, vnc_port))
+    proxy.start()
+    eventlet.spawn_n(fake_vnc_server, vnc_sock)
+    # Wait for the proxy to listen
+    for _i in range(50):
+        try:
+            socket.create_connection(('127.0.0.1', args.port)).close()
+            break
+        except socket.error:
+            time.sleep(0.1)
+
+    results = {'connect': [], 'echo': []}
+    errors = []
+
+    def _session():
+        try:
+            session(args, results)
+        except Exception as e:
+            errors.append(e)
+
+    start = time.time()
+    pool = eventlet.GreenPool(args.sessions)
+    for _i in range(args.sessions):
+        pool.spawn_n(_session)
+    pool.waitall()
+    elapsed = time.time() - start
+    proxy.terminate()
+    proxy.join()
+
+    print('%d sessions, %d failed, in %.2f secs' % (
+        args.sessions, len(errors), elapsed))
+    for name in ('connect', 'echo'):
+        values = results[name]
+        if values:
+            print('%-8s p50 %8.2f ms  p99 %8.2f ms  max %8.2f ms' % (
+                name, _percentile(values, 50) * 1000,
+                _percentile(values, 99) * 1000, max(values) * 1000))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,203 @@
+#!/usr/bin/env python
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Simulate how the libvirt driver tunes live migrations.
+
+This runs the downtime and post-copy decisions the libvirt driver makes
+while monitoring a live migration against a model of a pre-copy migration of
+a guest dirtying its memory, once with the static downtime steps and once
+with [libvirt]/live_migration_adaptive_tuning, and prints how each migration
+ends up completing:
+
+    python tools/live_migration_simulator.py --memory-gb 8 \\
+        --bandwidth-mbps 1000 --dirty-rate-mbps 800 --post-copy
+
+It can also replay the JobInfo statistics recorded from a real migration,
+given as a JSON list of objects with the time they were sampled at and the
+data_processed, data_remaining and memory_iteration fields, and print the
+decisions the adaptive tuning would have made for each sample:
+
+    python tools/live_migration_simulator.py --trace migration.json
+"""
+
+from __future__ import print_function
+
+import argparse
+import collections
+import json
+
+import nova.conf
+from nova import config
+from nova.virt.libvirt import migration
+
+CONF = nova.conf.CONF
+
+MiB = 1024 * 1024
+
+Sample = collections.namedtuple(
+    'Sample', ['data_processed', 'data_remaining', 'memory_iteration'])
+
+
+class SimulatedMigration(object):
+    """Model of a pre-copy migration of a guest dirtying its memory.
+
+    Each memory iteration transfers the memory dirtied since the previous
+    one. The guest dirties memory at a constant rate, within a working set
+    of a fixed size.
+    """
+
+    def __init__(self, memory, bandwidth, dirty_rate, working_set):
+        self.bandwidth = bandwidth
+        self.dirty_rate = dirty_rate
+        self.working_set = working_set
+        self.processed = 0
+        self.iteration = 1
+        self.iteration_remaining = memory
+        self.dirtied = 0
+
+    @property
+    def remaining(self):
+        return self.iteration_remaining + self.dirtied
+
+    def run(self, period):
+        sent = min(self.bandwidth * period, self.iteration_remaining)
+        self.processed += sent
+        self.iteration_remaining -= sent
+        self.dirtied = min(self.dirtied + self.dirty_rate * period,
+                           self.working_set)
+        if self.iteration_remaining <= 0:
+            self.iteration += 1
+            self.iteration_remaining, self.dirtied = self.dirtied, 0
+
+    def sample(self):
+        return Sample(self.processed, self.remaining, self.iteration)
+
+
+class FakeGuest(object):
+
+    def __init__(self):
+        self.downtime = None
+        self.postcopy = False
+
+    def migrate_configure_max_downtime(self, mstime):
+        self.downtime = mstime
+
+    def migrate_start_postcopy(self):
+        self.postcopy = True
+
+
+class FakeMigration(object):
+    status = 'running'
+
+    def save(self):
+        pass
+
+
+def simulate(args, adaptive):
+    memory = args.memory_gb * 1024 * MiB
+    bandwidth = args.bandwidth_mbps * MiB / 8.0
+    model = SimulatedMigration(
+        memory, bandwidth, args.dirty_rate_mbps * MiB / 8.0,
+        args.working_set_gb * 1024 * MiB)
+    guest = FakeGuest()
+    mig = FakeMigration()
+    data_gb = max(args.memory_gb, 2)
+    steps = list(migration.downtime_steps(data_gb))
+    timeout = CONF.libvirt.live_migration_completion_timeout * data_gb
+    controller = migration.AdaptiveController(
+        CONF.libvirt.live_migration_downtime) if adaptive else None
+
+    elapsed = 0.0
+    downtime = None
+    previous_remaining = -1
+    while elapsed < timeout:
+        model.run(args.period)
+        elapsed += args.period
+        info = model.sample()
+        # QEMU switches over once the remaining data can be transferred
+        # within the max downtime
+        if (guest.downtime is not None and
+                model.remaining * 1000.0 / bandwidth <= guest.downtime):
+            return 'completed', elapsed, guest.downtime
+        if controller is not None:
+            controller.update(elapsed, info)
+            switch = controller.should_switch_to_postcopy(mig.status)
+            downtime = controller.update_downtime(
+                guest, None, downtime, steps, elapsed)
+        else:
+            switch = migration.should_switch_to_postcopy(
+                info.memory_iteration, info.data_remaining,
+                previous_remaining, mig.status)
+            downtime = migration.update_downtime(
+                guest, None, downtime, steps, elapsed)
+        previous_remaining = info.data_remaining
+        if args.post_copy and switch:
+            return 'post-copy', elapsed, guest.downtime
+    return 'timed out', elapsed, guest.downtime
+
+
+def replay(trace_file):
+    with open(trace_file) as f:
+        trace = json.load(f)
+    controller = migration.AdaptiveController(
+        CONF.libvirt.live_migration_downtime)
+    guest = FakeGuest()
+    start = trace[0]['time']
+    downtime = None
+    print('%8s %14s %14s %14s %10s %s' % (
+        'secs', 'remaining', 'transfer B/s', 'dirty B/s', 'downtime',
+        'post-copy'))
+    for record in trace:
+        elapsed = record['time'] - start
+        controller.update(record['time'], Sample(
+            record['data_processed'], record['data_remaining'],
+            record['memory_iteration']))
+        downtime = controller.update_downtime(guest, None, downtime, [],
+                                              elapsed)
+        print('%8.1f %14d %14d %14d %10s %s' % (
+            elapsed, record['data_remaining'],
+            controller.transfer_rate or 0, controller.dirty_rate or 0,
+            downtime, controller.should_switch_to_postcopy('running')))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--memory-gb', type=int, default=8,
+                        help='Memory of the guest')
+    parser.add_argument('--working-set-gb', type=float, default=2,
+                        help='Memory the guest keeps dirtying')
+    parser.add_argument('--bandwidth-mbps', type=int, default=1000,
+                        help='Bandwidth of the migration in Mbit/s')
+    parser.add_argument('--dirty-rate-mbps', type=int, default=600,
+                        help='Rate the guest dirties memory at in Mbit/s')
+    parser.add_argument('--post-copy', action='store_true',
+                        help='Permit switching to post-copy')
+    parser.add_argument('--period', type=float, default=0.5,
+                        help='Seconds between samples of the migration')
+    parser.add_argument('--trace',
+                        help='JSON file of JobInfo samples to replay')
+    args = parser.parse_args()
+
+    config.parse_args([])
+    if args.trace:
+        replay(args.trace)
+        return
+    for adaptive in (False, True):
+        outcome, elapsed, downtime = simulate(args, adaptive)
+        print('%-8s %-10s after %7.1f secs, max downtime %s ms' % (
+            'adaptive' if adaptive else 'static', outcome, elapsed,
+            downtime))
+
+
+if __name__ == '__main__':
+    main()
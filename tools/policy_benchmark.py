@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Measure the policy overhead of listing servers in detail.
+
+This runs the policy checks that GET /servers/detail makes for every server
+in the response against the default policy, once with the per-request
+policy memo of the context and once without it, and prints the time spent
+in policy checks per request.
+
+    python tools/policy_benchmark.py --servers 1000 -n 20
+"""
+
+from __future__ import print_function
+
+import argparse
+import timeit
+
+from nova import config
+from nova import context
+from nova.policies import extended_availability_zone
+from nova.policies import extended_server_attributes
+from nova.policies import extended_status
+from nova.policies import extended_volumes
+from nova.policies import flavor_extra_specs
+from nova.policies import hide_server_addresses
+from nova.policies import servers
+from nova import policy
+
+
+# Checks made once per server in the response, with the default target.
+PER_SERVER_RULES = [
+    extended_availability_zone.BASE_POLICY_NAME,
+    extended_server_attributes.BASE_POLICY_NAME,
+    extended_status.BASE_POLICY_NAME,
+    extended_volumes.BASE_POLICY_NAME,
+    hide_server_addresses.BASE_POLICY_NAME,
+    flavor_extra_specs.POLICY_ROOT % 'index',
+]
+
+
+def list_servers(ctxt, count, memo):
+    ctxt.policy_memo = policy.ResultMemo() if memo else None
+    ctxt.can(servers.SERVERS % 'detail')
+    for i in range(count):
+        for rule in PER_SERVER_RULES:
+            ctxt.can(rule, fatal=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--servers', type=int, default=1000,
+                        help='Number of servers in each response')
+    parser.add_argument('-n', '--number', type=int, default=10,
+                        help='Number of requests per measurement')
+    args = parser.parse_args()
+
+    config.parse_args([])
+    policy.init()
+    for roles in (['member'], ['admin']):
+        ctxt = context.RequestContext('user', 'project', roles=roles)
+        for memo in (False, True):
+            elapsed = timeit.timeit(
+                lambda: list_servers(ctxt, args.servers, memo),
+                number=args.number) / args.number
+            print('%-8s %-10s %6d checks  %8.2f ms per request' % (
+                roles[0], 'memo' if memo else 'no memo',
+                args.servers * len(PER_SERVER_RULES) + 1, elapsed * 1e3))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,185 @@
+#!/usr/bin/env python
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Compare the regular and compact RPC serialization of nova objects.
+
+For an Instance with its usual extra attributes, a RequestSpec and a
+ComputeNode, this prints the size of the JSON message and the time taken to
+serialize and deserialize the object with NovaObjectSerializer, with and
+without compact=True.
+
+    python tools/rpc_object_benchmark.py -n 2000
+"""
+
+from __future__ import print_function
+
+import argparse
+import timeit
+
+from oslo_serialization import jsonutils
+from oslo_utils import timeutils
+
+from nova.network import model as network_model
+from nova import objects
+from nova.objects import base as obj_base
+from nova.objects import fields
+
+
+UUID = '0b5e4f6d-8a3a-4c9c-a5d0-0a6a2ec6ab41'
+
+
+def _flavor():
+    return objects.Flavor(
+        id=1, flavorid='42', name='m1.large', memory_mb=8192, vcpus=4,
+        root_gb=80, ephemeral_gb=0, swap=0, rxtx_factor=1.0,
+        vcpu_weight=None, disabled=False, is_public=True,
+        extra_specs={'hw:cpu_policy': 'dedicated', 'hw:numa_nodes': '2'},
+        description=None, created_at=None, updated_at=None,
+        deleted_at=None, deleted=False)
+
+
+def _numa_topology():
+    return objects.InstanceNUMATopology(instance_uuid=UUID, cells=[
+        objects.InstanceNUMACell(id=i, cpuset=set([i * 2, i * 2 + 1]),
+                                 memory=4096, pagesize=None,
+                                 cpu_pinning={i * 2: i * 4,
+                                              i * 2 + 1: i * 4 + 1},
+                                 cpu_policy=fields.CPUAllocationPolicy.
+                                 DEDICATED)
+        for i in range(2)])
+
+
+def _pci_requests():
+    return objects.InstancePCIRequests(instance_uuid=UUID, requests=[
+        objects.InstancePCIRequest(count=1, spec=[{'vendor_id': '8086',
+                                                   'product_id': '154d'}],
+                                   alias_name='nic', is_new=False,
+                                   request_id=None)
+        for i in range(2)])
+
+
+def _network_info():
+    vifs = []
+    for i in range(4):
+        subnet = network_model.Subnet(
+            cidr='10.0.%d.0/24' % i, gateway=network_model.IP('10.0.%d.1' % i),
+            dns=[network_model.IP('8.8.8.8')],
+            ips=[network_model.FixedIP(address='10.0.%d.5' % i)],
+            routes=[])
+        network = network_model.Network(id='net-%d' % i, bridge='br-int',
+                                        label='private-%d' % i,
+                                        subnets=[subnet])
+        vifs.append(network_model.VIF(id='port-%d' % i,
+                                      address='fa:16:3e:00:00:0%d' % i,
+                                      network=network, type='ovs',
+                                      details={'port_filter': True},
+                                      devname='tap-%d' % i, active=True))
+    return network_model.NetworkInfo(vifs)
+
+
+def build_instance():
+    flavor = _flavor()
+    return objects.Instance(
+        id=1, uuid=UUID, user_id='user', project_id='project',
+        host='compute-1', node='compute-1', hostname='vm-1',
+        display_name='vm-1', image_ref='image', vm_state='active',
+        task_state=None, power_state=1, launched_at=timeutils.utcnow(),
+        memory_mb=flavor.memory_mb, vcpus=flavor.vcpus, root_gb=80,
+        ephemeral_gb=0, instance_type_id=flavor.id, flavor=flavor,
+        old_flavor=None, new_flavor=None,
+        metadata={'role': 'db'}, system_metadata={'image_os_type': 'linux'},
+        numa_topology=_numa_topology(), pci_requests=_pci_requests(),
+        info_cache=objects.InstanceInfoCache(instance_uuid=UUID,
+                                             network_info=_network_info()),
+        security_groups=objects.SecurityGroupList(objects=[
+            objects.SecurityGroup(name='default')]),
+        tags=objects.TagList(objects=[objects.Tag(resource_id=UUID,
+                                                  tag='tag-%d' % i)
+                                      for i in range(3)]))
+
+
+def build_request_spec():
+    return objects.RequestSpec(
+        instance_uuid=UUID, project_id='project', flavor=_flavor(),
+        image=objects.ImageMeta.from_dict(
+            {'id': 'image', 'properties': {'os_type': 'linux'}}),
+        numa_topology=_numa_topology(), pci_requests=_pci_requests(),
+        num_instances=1, availability_zone=None, ignore_hosts=None,
+        force_hosts=None, force_nodes=None, scheduler_hints={},
+        security_groups=objects.SecurityGroupList(objects=[
+            objects.SecurityGroup(name='default')]),
+        retry=objects.SchedulerRetries(num_attempts=1,
+                                       hosts=objects.ComputeNodeList()),
+        limits=objects.SchedulerLimits(numa_topology=None, vcpu=None,
+                                       disk_gb=None, memory_mb=None))
+
+
+def build_compute_node():
+    cells = [objects.NUMACell(id=i, cpuset=set(range(i * 8, i * 8 + 8)),
+                              memory=65536, cpu_usage=2, memory_usage=8192,
+                              pinned_cpus=set([i * 8]), siblings=[],
+                              mempages=[objects.NUMAPagesTopology(
+                                  size_kb=4, total=16384, used=0)])
+             for i in range(2)]
+    return objects.ComputeNode(
+        id=1, uuid=UUID, host='compute-1', hypervisor_hostname='compute-1',
+        vcpus=16, memory_mb=131072, local_gb=2000, vcpus_used=4,
+        memory_mb_used=16384, local_gb_used=160, hypervisor_type='QEMU',
+        hypervisor_version=2011000, cpu_info='{"arch": "x86_64"}',
+        disk_available_least=1800, free_ram_mb=114688, free_disk_gb=1840,
+        current_workload=0, running_vms=2, host_ip='192.168.1.10',
+        supported_hv_specs=[objects.HVSpec(arch='x86_64',
+                                           hv_type='kvm', vm_mode='hvm')],
+        metrics='[]', stats={'num_instances': '2'},
+        numa_topology=objects.NUMATopology(cells=cells)._to_json(),
+        pci_device_pools=objects.PciDevicePoolList(objects=[
+            objects.PciDevicePool(product_id='154d', vendor_id='8086',
+                                  numa_node=i, tags={}, count=8)
+            for i in range(2)]),
+        cpu_allocation_ratio=16.0, ram_allocation_ratio=1.5,
+        disk_allocation_ratio=1.0)
+
+
+def run(name, obj, number):
+    for compact in (False, True):
+        serializer = obj_base.NovaObjectSerializer(compact=compact)
+        message = jsonutils.dumps(serializer.serialize_entity(None, obj))
+
+        def encode():
+            jsonutils.dumps(serializer.serialize_entity(None, obj))
+
+        def decode():
+            serializer.deserialize_entity(None, jsonutils.loads(message))
+
+        encode_time = timeit.timeit(encode, number=number) / number
+        decode_time = timeit.timeit(decode, number=number) / number
+        print('%-12s %-8s %8d bytes  encode %7.1f us  decode %7.1f us' % (
+            name, 'compact' if compact else 'regular', len(message),
+            encode_time * 1e6, decode_time * 1e6))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('-n', '--number', type=int, default=1000,
+                        help='Number of iterations per measurement')
+    args = parser.parse_args()
+
+    objects.register_all()
+    for name, builder in (('Instance', build_instance),
+                          ('RequestSpec', build_request_spec),
+                          ('ComputeNode', build_compute_node)):
+        run(name, builder(), args.number)
+
+
+if __name__ == '__main__':
+    main()